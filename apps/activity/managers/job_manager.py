@@ -19,7 +19,7 @@ from django.db.models import Value as V
 from django.db.models.functions import Cast, Concat
 
 import apps.peoples.models as pm
-from apps.core import utils
+from apps.core import search, utils
 
 from django.conf import settings
 
@@ -351,16 +351,16 @@ class JobneedManager(models.Manager):
 
     def get_adhoctasks_listview(self, R, task = True):
         idf = 'TASK' if task else ('INTERNALTOUR', 'EXTERNALTOUR')
-        qobjs, dir,  fields, length, start = utils.get_qobjs_dir_fields_start_length(R)
+        qobjs, dir,  fields, length, start = utils.get_qobjs_dir_fields_start_length(R, self.model)
         qset = self.select_related(
                  'performedby', 'qset', 'asset').filter(
                     identifier__in = idf, jobtype='ADHOC', plandatetime__date__gte = R['pd1'],
                      plandatetime__date__lte = R['pd2']
              ).values(*fields).order_by(dir)
-        total = qset.count()
+        total = search.count(qset)
         if qobjs:
             filteredqset = qset.filter(qobjs)
-            fcount = filteredqset.count()
+            fcount = search.count(filteredqset)
             filteredqset = filteredqset[start:start+length]
             return total, fcount, filteredqset
         qset = qset[start:start+length]
@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activity', '0004_alter_questionsetbelonging_max_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='jobneed',
+            index=models.Index(fields=['mdtz', 'id'], name='jobneed_mdtz_id_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    # indexes of large tables are built without locking writes
+    atomic = False
+
+    dependencies = [
+        ('activity', '0005_jobneed_mdtz_id_idx'),
+        ('core', '0005_pg_trgm'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='jobneed',
+            index=GinIndex(fields=['jobdesc'], name='jobneed_jobdesc_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        AddIndexConcurrently(
+            model_name='asset',
+            index=GinIndex(fields=['assetname'], name='asset_assetname_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        AddIndexConcurrently(
+            model_name='asset',
+            index=GinIndex(fields=['assetcode'], name='asset_assetcode_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        AddIndexConcurrently(
+            model_name='questionset',
+            index=GinIndex(fields=['qsetname'], name='questionset_qsetname_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
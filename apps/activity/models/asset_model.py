@@ -1,4 +1,5 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
 from apps.peoples.models import BaseModel
 from apps.tenants.models import TenantAwareModel
 from django.contrib.gis.db.models import PointField
@@ -80,6 +81,11 @@ class Asset(BaseModel,TenantAwareModel):
                 name='assetcode_client_uk'
             ),
         ]
+        indexes             = [
+            # search of the list views, see apps.core.search
+            GinIndex(fields=['assetname'], name='asset_assetname_trgm_idx', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['assetcode'], name='asset_assetcode_trgm_idx', opclasses=['gin_trgm_ops']),
+        ]
         
                 
 
@@ -3,6 +3,7 @@ from django.conf import settings
 from django.contrib.gis.db.models import LineStringField, PointField
 from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
 from django.utils.translation import gettext_lazy as _
 
 from apps.activity.managers.job_manager import JobManager,JobneedDetailsManager,JobneedManager
@@ -238,6 +239,12 @@ class Jobneed(BaseModel, TenantAwareModel):
                 name='jobneed_gracetime_gte_0_ck'
             ),
         ]
+        indexes             = [
+            # keyset pagination of the sync api
+            models.Index(fields=['mdtz', 'id'], name='jobneed_mdtz_id_idx'),
+            # search of the list views, see apps.core.search
+            GinIndex(fields=['jobdesc'], name='jobneed_jobdesc_trgm_idx', opclasses=['gin_trgm_ops']),
+        ]
         
     def save(self, *args, **kwargs):
         if self.ticket_id is None:
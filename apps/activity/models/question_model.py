@@ -1,4 +1,5 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
 from apps.peoples.models import BaseModel
 from apps.tenants.models import TenantAwareModel
 from django.utils.translation import gettext_lazy as _
@@ -114,6 +115,10 @@ class QuestionSet(BaseModel, TenantAwareModel):
                 condition = models.Q(seqno__gte = 0),
                 name='slno_gte_0_ck')
         ]
+        indexes             = [
+            # search of the list views, see apps.core.search
+            GinIndex(fields=['qsetname'], name='questionset_qsetname_trgm_idx', opclasses=['gin_trgm_ops']),
+        ]
 
     def __str__(self) -> str:
         return self.qsetname
@@ -9,7 +9,7 @@ from .serializers import AttachmentSerializer,AssetSerializer,LocationSerializer
 from django.utils import timezone
 import json
 import datetime
-from background_tasks.tasks import publish_mqtt
+from apps.core import outbox
 TOPIC = "redmine_to_noc"
 
 
@@ -71,34 +71,28 @@ def build_payload(instance, model_name, created):
 
 @receiver(post_save,sender=Attachment)
 def attachment_post_save(sender,instance,created,**kwargs):
-    payload = build_payload(instance, "Attachment", created)
-    publish_mqtt.delay(TOPIC, payload)
+    outbox.enqueue(TOPIC, instance, "Attachment", created, build_payload)
 
 
 @receiver(post_save,sender=Asset)
 def asset_post_save(sender,instance,created,**kwargs):
-    payload = build_payload(instance, "Asset", created)
-    publish_mqtt.delay(TOPIC, payload)
+    outbox.enqueue(TOPIC, instance, "Asset", created, build_payload)
 
 @receiver(post_save,sender=Location)
 def location_post_save(sender,instance,created,**kwargs):
-    payload = build_payload(instance, "Location", created)
-    publish_mqtt.delay(TOPIC, payload)
+    outbox.enqueue(TOPIC, instance, "Location", created, build_payload)
 
 @receiver(post_save,sender=Question)
 def question_post_save(sender,instance,created,**kwargs):
-    payload = build_payload(instance, "Question", created)
-    publish_mqtt.delay(TOPIC, payload)
+    outbox.enqueue(TOPIC, instance, "Question", created, build_payload)
 
 @receiver(post_save,sender=QuestionSet)
 def questionset_post_save(sender,instance,created,**kwargs):
-    payload = build_payload(instance, "QuestionSet", created)
-    publish_mqtt.delay(TOPIC, payload)
+    outbox.enqueue(TOPIC, instance, "QuestionSet", created, build_payload)
 
 @receiver(post_save,sender=QuestionSetBelonging)
 def questionsetbelonging_post_save(sender,instance,created,**kwargs):
-    payload = build_payload(instance, "QuestionSetBelonging", created)
-    publish_mqtt.delay(TOPIC, payload)
+    outbox.enqueue(TOPIC, instance, "QuestionSetBelonging", created, build_payload)
 
     
 
@@ -8,32 +8,17 @@ from django.http import response as rp
 from django.shortcuts import render
 from django.views.generic.base import View
 from apps.activity.models.attachment_model import Attachment
-from apps.activity.models.job_model import Job
-import apps.activity.utils as av_utils
-import apps.onboarding.models as obm
-from apps.core import utils
-from apps.onboarding.utils import is_point_in_geofence, polygon_to_address
+from apps.core import geocoding, utils
+from apps.attendance import geofence
+from apps.onboarding.utils import polygon_to_address
 from apps.service.utils import get_model_or_form
-import time
-from requests.exceptions import RequestException
 
 logger = logging.getLogger('django')
 def get_address(lat, lon):
     if lat == 0.0 and lon == 0.0:
         return "Invalid coordinates"
-
-    for attempt in range(3):  # Retry up to 3 times
-        try:
-            response = av_utils.get_address_from_coordinates(lat, lon)
-            if response and response.get("full_address"):
-                return response.get("full_address")
-        except RequestException as e:
-            logger.warning(f"Retrying due to error: {e}")
-            time.sleep(2**attempt)  # Exponential backoff
-    logger.error(
-        f"Failed to retrieve address after retries for coordinates: {lat}, {lon}"
-    )
-    return "Address lookup failed"
+    # cached per geohash cell, see apps.core.geocoding
+    return geocoding.reverse(lat, lon) or "Address lookup failed"
 
 
 
@@ -86,6 +71,7 @@ class PreviewImage(LoginRequiredMixin, View):
     P = {
         'model':Attachment
     }
+    @geocoding.memoize()
     def get(self, request, *args, **kwargs):
         R = request.GET
         S = request.session
@@ -100,17 +86,12 @@ class PreviewImage(LoginRequiredMixin, View):
                     return rp.JsonResponse({'error': 'Invalid eventlog_in_out data'}, status=400)
 
                 eventlog_entry = resp['eventlog_in_out'][0]
-                get_people = Job.objects.filter(
-                    people_id=eventlog_entry['people_id'], identifier='GEOFENCE'
-                ).values()
+                # cached geofence of the people's GEOFENCE job
+                people_geofence = geofence.get_people_geofence(eventlog_entry['people_id'])
                 base_address = ""
 
-                if get_people:
-                    get_geofence_data = obm.GeofenceMaster.objects.filter(
-                        id=get_people[0]['geofence_id'], enable=True
-                    ).exclude(id=1).values()
-                    if get_geofence_data:
-                        base_address = polygon_to_address(get_geofence_data[0]['geofence'])
+                if people_geofence:
+                    base_address = polygon_to_address(people_geofence.polygon)
 
                 # Handle startgps
                 start_address = ""
@@ -141,23 +122,19 @@ class PreviewImage(LoginRequiredMixin, View):
                         end_address = "Error parsing endgps"
 
                 # Determine in_address and out_address
-                if start_address and get_people and get_geofence_data:
+                if start_address and people_geofence:
                     eventlog_entry['in_address'] = (
                         f"{start_address} (Inside Geofence)"
-                        if is_point_in_geofence(
-                            start_coordinates[1], start_coordinates[0], get_geofence_data[0]['geofence']
-                        )
+                        if people_geofence.contains(start_coordinates[1], start_coordinates[0])
                         else f"{start_address} (Outside Geofence)"
                     )
                 else:
                     eventlog_entry['in_address'] = start_address or "Unknown address"
 
-                if end_address and get_people and get_geofence_data:
+                if end_address and people_geofence:
                     eventlog_entry['out_address'] = (
                         f"{end_address} (Inside Geofence)"
-                        if is_point_in_geofence(
-                            end_coordinates[1], end_coordinates[0], get_geofence_data[0]['geofence']
-                        )
+                        if people_geofence.contains(end_coordinates[1], end_coordinates[0])
                         else f"{end_address} (Outside Geofence)"
                     )
                 else:
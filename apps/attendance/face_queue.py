@@ -0,0 +1,92 @@
+'''
+Queue of the punches waiting for face verification.
+
+save_attachment_record started perform_facerecognition_bgt for every punch,
+each task read the stored reference embedding of its people and embedded
+its picture on its own. The punches are now queued per database in the
+shared cache and verified in batches by perform_facerecognition_batch_bgt:
+
+- push() appends a punch, an incr of the sequence of the database and an
+  item per punch, and schedules the batch task FACE_BATCH_DELAY seconds
+  later unless one is scheduled already, the punches of a burst share
+  one batch.
+- pop() returns the next queued punches in order, up to FACE_BATCH_SIZE,
+  and drops them from the queue. acquire() lets one batch task run per
+  database at a time.
+- a batch reads the stored reference embeddings with one query and embeds
+  each picture once, see face_verification.verify_many.
+
+The cache has to be shared by the web and the worker processes (redis).
+FACE_VERIFICATION_BATCH = False starts one task per punch as before.
+'''
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+log = logging.getLogger('django')
+
+BATCH_ENABLED = getattr(settings, 'FACE_VERIFICATION_BATCH', True)
+BATCH_DELAY = getattr(settings, 'FACE_BATCH_DELAY', 2)
+BATCH_SIZE = getattr(settings, 'FACE_BATCH_SIZE', 50)
+ITEM_TTL = getattr(settings, 'FACE_QUEUE_TTL', 24 * 3600)
+# a batch task holding the lock longer than this is assumed dead
+RUN_TIMEOUT = getattr(settings, 'FACE_BATCH_RUN_TIMEOUT', 600)
+
+SEQ_KEY = 'face_punches:{}:seq'
+DONE_KEY = 'face_punches:{}:done'
+ITEM_KEY = 'face_punches:{}:{}'
+KICK_KEY = 'face_punches:{}:kick'
+RUN_KEY = 'face_punches:{}:run'
+
+
+def kick(using, delay=BATCH_DELAY):
+    "schedules the batch task of the database unless one is scheduled already"
+    key = KICK_KEY.format(using)
+    if not cache.add(key, 1, delay):
+        return False
+    from background_tasks.tasks import perform_facerecognition_batch_bgt
+    try:
+        perform_facerecognition_batch_bgt.apply_async(args=[using], countdown=delay)
+    except Exception:
+        cache.delete(key)
+        raise
+    return True
+
+
+def push(pel_uuid, peopleid, using):
+    "queues a punch for the next batch, returns its position"
+    key = SEQ_KEY.format(using)
+    cache.add(key, 0, None)
+    position = cache.incr(key)
+    cache.set(ITEM_KEY.format(using, position), [pel_uuid, peopleid], ITEM_TTL)
+    kick(using)
+    return position
+
+
+def pop(using, size=BATCH_SIZE):
+    "[(pel_uuid, peopleid)] of the next queued punches, removed from the queue"
+    done = cache.get(DONE_KEY.format(using)) or 0
+    last = min(cache.get(SEQ_KEY.format(using)) or 0, done + size)
+    keys = [ITEM_KEY.format(using, position) for position in range(done + 1, last + 1)]
+    if not keys:
+        return []
+    items = cache.get_many(keys)
+    if len(items) < len(keys):
+        # a punch between the incr of the sequence and the set of its item
+        time.sleep(0.1)
+        items.update(cache.get_many([key for key in keys if key not in items]))
+    cache.set(DONE_KEY.format(using), last, None)
+    cache.delete_many(keys)
+    if len(items) < len(keys):
+        log.warning(f"{len(keys) - len(items)} queued punches of {using} expired before their batch")
+    return [tuple(items[key]) for key in keys if key in items]
+
+
+def acquire(using):
+    return cache.add(RUN_KEY.format(using), 1, RUN_TIMEOUT)
+
+
+def release(using):
+    cache.delete(RUN_KEY.format(using))
@@ -0,0 +1,159 @@
+'''
+Face verification of the attendance punches.
+
+perform_facerecognition_bgt used to call DeepFace.verify for every punch,
+which detects and embeds the default image of the people again, then the
+event picture, then compares them.
+
+- The recognition model and the detector are loaded once per worker
+  process. warmup() is called at worker start when FACE_MODEL_WARMUP is
+  set, which is meant for the workers of the face recognition queue only.
+- The embedding of the default image of a people is stored in
+  FaceEmbedding with the sha1 of the image. It is computed again only when
+  the image changed.
+- A punch costs one detection and one embedding of the event picture and
+  a cosine distance.
+- verify_many() checks a batch of queued punches (see face_queue) with one
+  query for the stored embeddings, each reference and event picture of
+  the batch is embedded once.
+
+The results have the keys of DeepFace.verify, the distance is the same as
+the one DeepFace.verify returns for the same model, detector and metric.
+'''
+import hashlib
+import logging
+import os
+import time
+
+import numpy as np
+from django.conf import settings
+
+log = logging.getLogger('django')
+
+MODEL_NAME = getattr(settings, 'FACE_MODEL_NAME', 'Facenet512')
+DETECTOR = getattr(settings, 'FACE_DETECTOR', 'mtcnn')
+# DeepFace.verify threshold used so far for 'verified'
+MATCH_THRESHOLD = getattr(settings, 'FACE_MATCH_THRESHOLD', 0.4)
+MEDIA_PREFIX = '/youtility4_media/'
+BLANK_IMAGE = 'blank.png'
+
+_state = {'pid': None}
+
+
+def deepface():
+    from deepface import DeepFace
+    return DeepFace
+
+
+def warmup():
+    "loads the model and the detector in this process"
+    if _state['pid'] == os.getpid():
+        return
+    start = time.time()
+    blank = np.zeros((224, 224, 3), dtype=np.uint8)
+    deepface().represent(img_path=blank, model_name=MODEL_NAME, detector_backend=DETECTOR, enforce_detection=False)
+    _state['pid'] = os.getpid()
+    log.info(f"face models {MODEL_NAME}/{DETECTOR} loaded in {time.time() - start:.1f}s")
+
+
+def embed(img):
+    "embeddings of the faces of an image path or array, ValueError without a face"
+    warmup()
+    faces = deepface().represent(
+        img_path=img, model_name=MODEL_NAME, detector_backend=DETECTOR, enforce_detection=True, align=True)
+    return [np.asarray(face['embedding'], dtype=float) for face in faces]
+
+
+def cosine_distance(a, b):
+    return float(1 - np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+
+def checksum(path):
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def image_path(people):
+    "file of the default image of the people, ValueError when there is none"
+    if not people.peopleimg or people.peopleimg.name.endswith(BLANK_IMAGE):
+        raise ValueError(f"people {people.id} has no default image")
+    return f'{settings.MEDIA_ROOT}/{people.peopleimg.url.replace(MEDIA_PREFIX, "")}'
+
+
+def stored(people_ids, using):
+    "{people_id: FaceEmbedding} of the current model and detector"
+    from apps.attendance.models import FaceEmbedding
+    return {row.people_id: row for row in FaceEmbedding.objects.using(using).filter(
+        people_id__in=people_ids, model_name=MODEL_NAME, detector=DETECTOR)}
+
+
+def reference(people, using='default', row=None):
+    "embedding of the default image of the people, stored again when the image changed"
+    from apps.attendance.models import FaceEmbedding
+    path = image_path(people)
+    try:
+        digest = checksum(path)
+    except FileNotFoundError:
+        raise ValueError(f"default image {path} not found")
+    if row is not None and row.checksum == digest:
+        return np.asarray(row.embedding, dtype=float)
+    embedding = embed(path)[0]
+    FaceEmbedding.objects.using(using).update_or_create(
+        people_id=people.id, model_name=MODEL_NAME, detector=DETECTOR,
+        defaults={'image': people.peopleimg.name, 'checksum': digest, 'embedding': embedding.tolist()})
+    log.info(f"face embedding of people {people.id} stored")
+    return embedding
+
+
+def result(distance, started):
+    return {
+        'verified': distance <= MATCH_THRESHOLD,
+        'distance': distance,
+        'threshold': MATCH_THRESHOLD,
+        'model': MODEL_NAME,
+        'detector_backend': DETECTOR,
+        'similarity_metric': 'cosine',
+        'time': round(time.time() - started, 2),
+    }
+
+
+def compare(ref, event_image, faces=None):
+    started = time.time()
+    faces = embed(event_image) if faces is None else faces
+    # the closest face of the event picture, as DeepFace.verify
+    distance = min(cosine_distance(ref, face) for face in faces)
+    return result(distance, started)
+
+
+def verify(people, event_image, using='default'):
+    "verification of an event picture against the default image of the people"
+    ref = reference(people, using, stored([people.id], using).get(people.id))
+    return compare(ref, event_image)
+
+
+def verify_many(punches, using='default'):
+    '''
+    verifications of [(people, event_image)], each item is (result, None)
+    or (None, error) so that a punch without a face does not fail the batch
+    '''
+    rows = stored({people.id for people, _ in punches}, using)
+    refs, faces, results = {}, {}, []
+    for people, event_image in punches:
+        if people.id not in refs:
+            try:
+                refs[people.id] = reference(people, using, rows.get(people.id))
+            except Exception as e:
+                refs[people.id] = e
+        if isinstance(refs[people.id], Exception):
+            results.append((None, refs[people.id]))
+            continue
+        try:
+            if event_image not in faces:
+                faces[event_image] = embed(event_image)
+            results.append((compare(refs[people.id], event_image, faces[event_image]), None))
+        except Exception as e:
+            results.append((None, e))
+    return results
@@ -0,0 +1,208 @@
+'''
+Geofence evaluation engine.
+
+Checks of punches and tracking points against geofences used to parse the
+WKT of every location with a regex, build a GEOS Point per check and query
+the people's GEOFENCE job and its GeofenceMaster again for every punch.
+
+- Geofences are loaded once per process and kept with their prepared
+  geometry and their rings as numpy arrays. A save of a GeofenceMaster
+  bumps its version in the shared cache and every process reloads it.
+- The geofence assigned to a people (their GEOFENCE job) is cached in the
+  shared cache, a save of the job drops it.
+- contains_many() evaluates arrays of points at once: a bounding box
+  prefilter and a vectorized ray casting for polygons, a vectorized
+  haversine for circles (center lat, center lon, radius in km).
+'''
+import logging
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+log = logging.getLogger('django')
+
+EARTH_RADIUS_KM = 6371
+ASSIGNMENT_TIMEOUT = getattr(settings, 'GEOFENCE_ASSIGNMENT_TIMEOUT', 60 * 60)
+NOT_ASSIGNED = 0
+
+_geofences = {}
+
+
+class Circle:
+    "circular geofence, radius in km"
+
+    def __init__(self, lat, lon, radius_km):
+        self.lat, self.lon, self.radius_km = float(lat), float(lon), float(radius_km)
+
+    def contains_many(self, lats, lons):
+        lats, lons = np.radians(np.asarray(lats, dtype=float)), np.radians(np.asarray(lons, dtype=float))
+        lat, lon = np.radians(self.lat), np.radians(self.lon)
+        a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+        distance_km = 2 * EARTH_RADIUS_KM * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+        return distance_km <= self.radius_km
+
+    def contains(self, lat, lon):
+        return bool(self.contains_many([lat], [lon])[0])
+
+
+class Polygon:
+    "polygon geofence with its prepared geometry"
+
+    def __init__(self, polygon):
+        self.polygon = polygon
+        self.rings = [np.asarray(ring.coords, dtype=float) for ring in polygon]
+        self.xmin, self.ymin, self.xmax, self.ymax = polygon.extent
+        self._prepared = None
+
+    @property
+    def prepared(self):
+        if self._prepared is None:
+            self._prepared = self.polygon.prepared
+        return self._prepared
+
+    def contains(self, lat, lon):
+        from django.contrib.gis.geos import Point
+        if not (self.xmin <= lon <= self.xmax and self.ymin <= lat <= self.ymax):
+            return False
+        return self.prepared.contains(Point(lon, lat, srid=self.polygon.srid))
+
+    def contains_many(self, lats, lons):
+        lats, lons = np.asarray(lats, dtype=float), np.asarray(lons, dtype=float)
+        inside = (lons >= self.xmin) & (lons <= self.xmax) & (lats >= self.ymin) & (lats <= self.ymax)
+        if inside.any():
+            candidates = np.flatnonzero(inside)
+            x, y = lons[candidates], lats[candidates]
+            within = ring_contains(self.rings[0], x, y)
+            for hole in self.rings[1:]:
+                within &= ~ring_contains(hole, x, y)
+            inside[candidates] = within
+        return inside
+
+
+def ring_contains(ring, x, y):
+    "even-odd ray casting of points (x, y) against a closed ring"
+    inside = np.zeros(x.shape, dtype=bool)
+    x1, y1 = ring[:-1, 0], ring[:-1, 1]
+    x2, y2 = ring[1:, 0], ring[1:, 1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for i in range(len(x1)):
+            crosses = (y1[i] > y) != (y2[i] > y)
+            xcross = (x2[i] - x1[i]) * (y - y1[i]) / (y2[i] - y1[i]) + x1[i]
+            inside ^= crosses & (x < xcross)
+    return inside
+
+
+def as_geofence(geofence):
+    "engine geofence of a GEOS polygon or a (lat, lon, radius_km) tuple, None otherwise"
+    from django.contrib.gis.geos import Polygon as GEOSPolygon
+    if isinstance(geofence, (Polygon, Circle)):
+        return geofence
+    if isinstance(geofence, GEOSPolygon):
+        return Polygon(geofence)
+    if isinstance(geofence, tuple) and len(geofence) == 3:
+        return Circle(*geofence)
+    return None
+
+
+def version_key(geofence_id, using):
+    return f"geofence_version:{using}:{geofence_id}"
+
+
+def invalidate(geofence_id, using='default'):
+    "called on save of a GeofenceMaster, every process reloads it"
+    _geofences.pop((using, geofence_id), None)
+    try:
+        cache.incr(version_key(geofence_id, using))
+    except ValueError:
+        cache.set(version_key(geofence_id, using), 1, None)
+
+
+def get_many(geofence_ids, using='default'):
+    "{id: Polygon} of the enabled geofences, loaded once per process and version"
+    from apps.onboarding.models import GeofenceMaster
+    geofence_ids = set(geofence_ids) - {None, 1}
+    versions = cache.get_many([version_key(pk, using) for pk in geofence_ids])
+    result, missing = {}, {}
+    for pk in geofence_ids:
+        version = versions.get(version_key(pk, using), 0)
+        cached = _geofences.get((using, pk))
+        if cached and cached[0] == version:
+            if cached[1] is not None:
+                result[pk] = cached[1]
+        else:
+            missing[pk] = version
+    if missing:
+        loaded = dict(GeofenceMaster.objects.using(using).filter(
+            id__in=list(missing), enable=True, geofence__isnull=False).values_list('id', 'geofence'))
+        for pk, version in missing.items():
+            geofence = Polygon(loaded[pk]) if pk in loaded else None
+            # disabled and deleted geofences are cached as None
+            _geofences[(using, pk)] = (version, geofence)
+            if geofence is not None:
+                result[pk] = geofence
+    return result
+
+
+def get(geofence_id, using='default'):
+    return get_many([geofence_id], using).get(geofence_id)
+
+
+def assignment_key(people_id, using):
+    return f"people_geofence:{using}:{people_id}"
+
+
+def get_people_geofence(people_id, using='default'):
+    "geofence of the people's GEOFENCE job, None when they have none"
+    from apps.activity.models.job_model import Job
+    key = assignment_key(people_id, using)
+    geofence_id = cache.get(key)
+    if geofence_id is None:
+        geofence_id = Job.objects.using(using).filter(
+            people_id=people_id, identifier='GEOFENCE').values_list('geofence_id', flat=True).first()
+        geofence_id = geofence_id or NOT_ASSIGNED
+        cache.set(key, geofence_id, ASSIGNMENT_TIMEOUT)
+    return get(geofence_id, using) if geofence_id != NOT_ASSIGNED else None
+
+
+def forget_people_geofence(people_id, using='default'):
+    "called on save of a GEOFENCE job"
+    cache.delete(assignment_key(people_id, using))
+
+
+def point_lat_lon(point):
+    "(lat, lon) of a GEOS point, None when missing"
+    if point is None or not hasattr(point, 'coords'):
+        return None
+    lon, lat = point.coords[:2]
+    return lat, lon
+
+
+def contains_points(geofence, points):
+    '''
+    [bool] for GEOS points, None for missing points, evaluated in one call
+    '''
+    coords = [point_lat_lon(point) for point in points]
+    present = [i for i, coord in enumerate(coords) if coord is not None]
+    result = [None] * len(points)
+    if present:
+        lats, lons = zip(*(coords[i] for i in present))
+        for i, inside in zip(present, geofence.contains_many(lats, lons)):
+            result[i] = bool(inside)
+    return result
+
+
+def evaluate(geofence_ids, lats, lons, using='default'):
+    '''
+    bool array, point i against the geofence geofence_ids[i], for the
+    points of many people and geofences at once. Points without an
+    enabled geofence are outside.
+    '''
+    geofence_ids = np.asarray(geofence_ids)
+    lats, lons = np.asarray(lats, dtype=float), np.asarray(lons, dtype=float)
+    inside = np.zeros(len(geofence_ids), dtype=bool)
+    geofences = get_many(set(geofence_ids.tolist()), using)
+    for pk, geofence in geofences.items():
+        rows = geofence_ids == pk
+        inside[rows] = geofence.contains_many(lats[rows], lons[rows])
+    return inside
@@ -0,0 +1,143 @@
+'''
+Journey paths of conveyances (PeopleEventlog) and site tours (Jobneed).
+
+The tracking points of a journey are rows of `tracking` whose reference is
+the uuid of the eventlog or tour. Paths used to be built by loading every
+point as an ORM object and building the LineString in python, a ten hour
+trip has tens of thousands of points. Now a single UPDATE builds the
+paths of many journeys in the database:
+
+- ST_MakeLine of the points ordered by receiveddate, simplified with
+  ST_SimplifyPreserveTopology when JOURNEY_PATH_SIMPLIFY_TOLERANCE (in
+  degrees, 0.00001 is about 1 m) is set,
+- the distance in km is ST_Length of the unsimplified path on geography.
+  The eventlog distance sent by the device is kept, it is only filled in
+  when missing, the tour distance goes to other_info['distance'].
+- the UPDATE bypasses post_save, the updated tours and eventlogs are
+  enqueued on the replication outbox instead.
+
+Journeys whose points arrive after the punch out / tour completion are
+picked up by the periodic task build_journey_paths.
+'''
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import CharField, Exists, OuterRef
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from apps.tenants import registry
+
+log = logging.getLogger('django')
+
+SIMPLIFY_TOLERANCE = getattr(settings, 'JOURNEY_PATH_SIMPLIFY_TOLERANCE', 0)
+BATCH_SIZE = getattr(settings, 'JOURNEY_PATH_BATCH_SIZE', 200)
+WINDOW_DAYS = getattr(settings, 'JOURNEY_PATH_WINDOW_DAYS', 2)
+
+PATHS_SQL = '''
+    WITH paths AS (
+        SELECT reference, ST_MakeLine(gpslocation::geometry ORDER BY receiveddate, id) AS path
+        FROM tracking
+        WHERE reference = ANY(%(references)s) AND gpslocation IS NOT NULL
+        GROUP BY reference
+        HAVING COUNT(*) > 1
+    )
+    UPDATE {table} AS t SET
+        journeypath = (CASE WHEN %(tolerance)s > 0
+            THEN ST_SimplifyPreserveTopology(p.path, %(tolerance)s) ELSE p.path END)::geography,
+        {distance}
+    FROM paths AS p
+    WHERE t.uuid::text = p.reference
+    RETURNING t.id, t.uuid::text
+'''
+
+DISTANCE_KM = 'ROUND((ST_Length(p.path::geography) / 1000)::numeric, 2)'
+
+DISTANCE_SQL = {
+    'peopleeventlog': f'distance = COALESCE(NULLIF(t.distance, 0), {DISTANCE_KM})',
+    'jobneed': f"other_info = jsonb_set(COALESCE(t.other_info, '{{}}'::jsonb), '{{distance}}', to_jsonb({DISTANCE_KM}))",
+}
+
+DELETE_POINTS_SQL = 'DELETE FROM tracking WHERE reference = ANY(%s)'
+
+
+def get_databases():
+    return registry.databases('JOURNEY_PATH_DATABASES')
+
+
+def build_paths(table, references, using='default', tolerance=None):
+    '''
+    builds the journey paths of the rows of table ('peopleeventlog' or
+    'jobneed') whose uuid is in references, in one statement.
+    Returns [(id, uuid)] of the rows updated, rows with less than two
+    points are left as they are.
+    '''
+    references = [str(reference) for reference in references]
+    if not references:
+        return []
+    tolerance = SIMPLIFY_TOLERANCE if tolerance is None else tolerance
+    sql = PATHS_SQL.format(table=table, distance=DISTANCE_SQL[table])
+    with connections[using].cursor() as cursor:
+        cursor.execute(sql, {'references': references, 'tolerance': tolerance})
+        return cursor.fetchall()
+
+
+def build_eventlog_paths(references, using='default', tolerance=None):
+    return build_paths('peopleeventlog', references, using, tolerance)
+
+
+def build_tour_paths(references, using='default', tolerance=None):
+    "tour paths, the tracking points of a tour are deleted once its path is saved"
+    from apps.activity.models.job_model import Jobneed
+    from apps.core import outbox
+    from apps.schedhuler.signals import TOPIC, build_payload
+    with transaction.atomic(using=using):
+        rows = build_paths('jobneed', references, using, tolerance)
+        if rows:
+            with connections[using].cursor() as cursor:
+                cursor.execute(DELETE_POINTS_SQL, [[reference for _, reference in rows]])
+            # the UPDATE bypasses post_save, tours are replicated through the outbox
+            outbox.enqueue_many(TOPIC, Jobneed, [pk for pk, _ in rows], 'JobNeed', build_payload, using)
+    return rows
+
+
+def has_points():
+    from apps.attendance.models import Tracking
+    return Exists(Tracking.objects.filter(reference=Cast(OuterRef('uuid'), CharField())))
+
+
+def pending_eventlogs(using='default', limit=BATCH_SIZE):
+    "uuids of recent conveyances and audits without a path whose points are in"
+    from apps.attendance.models import PeopleEventlog
+    since = timezone.now() - timedelta(days=WINDOW_DAYS)
+    return list(PeopleEventlog.objects.using(using).filter(
+        journeypath__isnull=True, peventtype__tacode__in=('CONVEYANCE', 'AUDIT'),
+        punchintime__isnull=False, punchouttime__gte=since, endlocation__isnull=False,
+    ).filter(has_points()).order_by('id').values_list('uuid', flat=True)[:limit])
+
+
+def pending_tours(using='default', limit=BATCH_SIZE):
+    "uuids of recently completed site tours without a path whose points are in"
+    from apps.activity.models.job_model import Jobneed
+    since = timezone.now() - timedelta(days=WINDOW_DAYS)
+    return list(Jobneed.objects.using(using).filter(
+        journeypath__isnull=True, parent_id=1, jobstatus__in=('COMPLETED', 'PARTIALLYCOMPLETED'),
+        identifier__in=('EXTERNALTOUR', 'INTERNALTOUR'), mdtz__gte=since,
+    ).filter(has_points()).order_by('id').values_list('uuid', flat=True)[:limit])
+
+
+def build_pending_paths(using='default', batch_size=BATCH_SIZE):
+    "builds the paths of pending journeys, returns the number of paths built by table"
+    from apps.attendance.models import PeopleEventlog
+    from apps.attendance.signals import TOPIC, build_payload
+    from apps.core import outbox
+    with transaction.atomic(using=using):
+        eventlogs = build_eventlog_paths(pending_eventlogs(using, batch_size), using)
+        # the UPDATE bypasses post_save, eventlogs are replicated through the outbox
+        outbox.enqueue_many(TOPIC, PeopleEventlog, [pk for pk, _ in eventlogs], 'PeopleEventlog',
+                            build_payload, using)
+    tours = build_tour_paths(pending_tours(using, batch_size), using)
+    log.info(f"journey paths built for {len(eventlogs)} eventlogs and {len(tours)} tours of {using}")
+    return {'peopleeventlog': len(eventlogs), 'jobneed': len(tours)}
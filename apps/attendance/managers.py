@@ -1,11 +1,10 @@
 from datetime import timedelta, datetime, date
 from django.db import models
 from django.contrib.gis.db.models.functions import AsGeoJSON, AsWKT
-from apps.core import utils
+from apps.core import search, utils
 from apps.activity.models.attachment_model import Attachment
-from apps.activity.models.job_model import Job
 from apps.onboarding.models import Shift
-from apps.onboarding.models import GeofenceMaster
+from apps.attendance import geofence as gf
 from django.db.models import F
 from itertools import chain
 import json
@@ -40,11 +39,8 @@ class PELManager(models.Manager):
         )[0] or self.none()
     
     def get_lat_long(self,location):
-        import re
-        match = re.search(r"POINT \(([-\d.]+) ([-\d.]+)\)", str(location))
-        if match:
-            longitude = float(match.group(1))
-            latitude  = float(match.group(2))
+        "[longitude, latitude] of a point"
+        longitude, latitude = location.coords[:2]
         return [longitude,latitude]
     
 
@@ -58,38 +54,8 @@ class PELManager(models.Manager):
         Returns:
             bool: True if the point is inside the geofence, False otherwise.
         """
-        from math import radians, sin, cos, sqrt, atan2
-        from django.contrib.gis.geos import Point, Polygon
-        # Create a Point object from the lat, lon
-        point = Point(lon, lat)  # Note: Point expects (longitude, latitude)
-
-        # Case 1: Geofence is a polygon (Django GEOS Polygon object)
-        if isinstance(geofence, Polygon):
-            return geofence.contains(point)
-
-        # Case 2: Geofence is circular (tuple with center lat, lon, and radius in km)
-        elif isinstance(geofence, tuple) and len(geofence) == 3:
-            geofence_lat, geofence_lon, radius_km = geofence
-            
-            # Calculate distance using Haversine formula
-            # Convert lat/lon from degrees to radians
-            lat1 = radians(lat)
-            lon1 = radians(lon)
-            lat2 = radians(geofence_lat)
-            lon2 = radians(geofence_lon)
-
-            # Haversine formula
-            dlat = lat2 - lat1
-            dlon = lon2 - lon1
-            a = sin(dlat / 2)**2 + cos(lat1) * cos(lat2) * sin(dlon / 2)**2
-            c = 2 * atan2(sqrt(a), sqrt(1 - a))
-            distance_km = 6371 * c  # Radius of Earth in kilometers
-
-            # Check if the distance is within the geofence radius
-            return distance_km <= radius_km
-
-        # If geofence is neither a polygon nor a circular geofence, return False
-        return False
+        geofence = gf.as_geofence(geofence)
+        return geofence.contains(lat, lon) if geofence else False
 
     def update_fr_results(self, result, uuid, peopleid, db):
     
@@ -109,31 +75,19 @@ class PELManager(models.Manager):
                 extras['distance_out'] = result['distance']
 
             #geofenc_marked_in_or_out_updating
-            get_people = Job.objects.filter(people_id = peopleid, identifier = 'GEOFENCE').values()
-            if get_people:
-                get_geofence_data = GeofenceMaster.objects.filter(id = get_people[0]['geofence_id'], enable=True).exclude(id=1).values()
-                geofence_data = get_geofence_data[0]['geofence']
-                if geofence_data :    
-                    start_location = obj[0].startlocation
-                    end_location   = obj[0].endlocation
+            if people_geofence := gf.get_people_geofence(peopleid, db):
+                start_location = obj[0].startlocation
+                end_location   = obj[0].endlocation
+                isStartLocationInGeofence, isEndLocationInGeofence = gf.contains_points(
+                    people_geofence, [start_location, end_location])
+                logger.info(f'Is Start Location Inside of the geofence: {isStartLocationInGeofence}')
+                logger.info(f'Is End Location Inside of the geofence: {isEndLocationInGeofence}')
 
-                    if start_location:
-                        start_location_arr = self.get_lat_long(start_location)
-                        longitude,latitude = start_location_arr[0],start_location_arr[1]
-                        isStartLocationInGeofence = self.is_point_in_geofence(latitude,longitude,geofence_data)
-                        logger.info(f'Is Start Location Inside of the geofence: {isStartLocationInGeofence}')
+                if start_location:
+                    obj[0].peventlogextras['isStartLocationInGeofence'] = isStartLocationInGeofence
 
-                    if end_location:
-                        end_location_arr = self.get_lat_long(end_location)
-                        longitude,latitude = end_location_arr[0],end_location_arr[1]
-                        isEndLocationInGeofence = self.is_point_in_geofence(latitude,longitude,geofence_data)
-                        logger.info(f'Is End Location Inside of the geofence: {isEndLocationInGeofence}')
-                    
-                    if start_location:
-                        obj[0].peventlogextras['isStartLocationInGeofence'] = isStartLocationInGeofence
-
-                    if end_location:
-                        obj[0].peventlogextras['isEndLocationInGeofence'] = isEndLocationInGeofence
+                if end_location:
+                    obj[0].peventlogextras['isEndLocationInGeofence'] = isEndLocationInGeofence
             if obj[0].punchintime and obj[0].shift_id == 1:
                 logger.info(f'records punchintime {obj[0].punchintime}')
                 punchintime = obj[0].punchintime
@@ -212,7 +166,7 @@ class PELManager(models.Manager):
     
     def get_geofencetracking(self, request):
         "List View"
-        qobjs, dir,  fields, length, start = utils.get_qobjs_dir_fields_start_length(request.GET)
+        qobjs, dir,  fields, length, start = utils.get_qobjs_dir_fields_start_length(request.GET, self.model)
         last8days = date.today() - timedelta(days=8)
         qset = self.annotate(
             slocation = AsWKT('startlocation'),
@@ -223,14 +177,35 @@ class PELManager(models.Manager):
             bu_id = request.session['bu_id']
         ).select_related(
             'people', 'peventtype', 'geofence').values(*fields).order_by(dir)
-        total = qset.count()
+        total = search.count(qset)
         if qobjs:
             filteredqset = qset.filter(qobjs)
-            fcount = filteredqset.count()
-            filteredqset = filteredqset[start:start+length]
+            fcount = search.count(filteredqset)
+            filteredqset = self.with_geofence_status(filteredqset[start:start+length])
             return total, fcount, filteredqset
-        qset = qset[start:start+length]
+        qset = self.with_geofence_status(qset[start:start+length])
         return total, total, qset
+
+    def with_geofence_status(self, rows):
+        "adds start_in_geofence and end_in_geofence to rows, evaluated for the whole page at once"
+        rows = list(rows)
+        ids = [row['id'] for row in rows if 'id' in row]
+        if not ids:
+            return rows
+        geofence_ids, lats, lons, keys = [], [], [], []
+        for id, geofence_id, startlocation, endlocation in self.filter(id__in=ids).values_list(
+                'id', 'geofence_id', 'startlocation', 'endlocation'):
+            for field, point in (('start_in_geofence', startlocation), ('end_in_geofence', endlocation)):
+                if coords := gf.point_lat_lon(point):
+                    geofence_ids.append(geofence_id)
+                    lats.append(coords[0])
+                    lons.append(coords[1])
+                    keys.append((id, field))
+        status = dict(zip(keys, gf.evaluate(geofence_ids, lats, lons, self.db).tolist())) if keys else {}
+        for row in rows:
+            row['start_in_geofence'] = status.get((row.get('id'), 'start_in_geofence'))
+            row['end_in_geofence'] = status.get((row.get('id'), 'end_in_geofence'))
+        return rows
     
     
     def get_sos_count_forcard(self, request):
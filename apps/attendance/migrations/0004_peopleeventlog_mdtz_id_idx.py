@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0003_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='peopleeventlog',
+            index=models.Index(fields=['mdtz', 'id'], name='peopleeventlog_mdtz_id_idx'),
+        ),
+    ]
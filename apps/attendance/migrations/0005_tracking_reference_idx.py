@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0004_peopleeventlog_mdtz_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tracking',
+            index=models.Index(fields=['reference', 'receiveddate'], name='tracking_reference_idx'),
+        ),
+    ]
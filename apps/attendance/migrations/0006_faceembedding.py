@@ -0,0 +1,32 @@
+import django.contrib.postgres.fields
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0005_tracking_reference_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FaceEmbedding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_name', models.CharField(max_length=50)),
+                ('detector', models.CharField(max_length=50)),
+                ('image', models.CharField(max_length=255)),
+                ('checksum', models.CharField(max_length=40)),
+                ('embedding', django.contrib.postgres.fields.ArrayField(base_field=models.FloatField(), size=None)),
+                ('mdtz', models.DateTimeField(auto_now=True)),
+                ('people', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='People')),
+            ],
+            options={
+                'db_table': 'face_embedding',
+                'constraints': [models.UniqueConstraint(fields=('people', 'model_name', 'detector'), name='face_embedding_people_model_uk')],
+            },
+        ),
+    ]
@@ -77,6 +77,10 @@ class PeopleEventlog(BaseModel, TenantAwareModel):
 
     class Meta(BaseModel.Meta):
         db_table = 'peopleeventlog'
+        indexes = [
+            # keyset pagination of the sync api
+            models.Index(fields=['mdtz', 'id'], name='peopleeventlog_mdtz_id_idx'),
+        ]
 
 # temporary table
 class Tracking(models.Model):
@@ -100,6 +104,35 @@ class Tracking(models.Model):
 
     class Meta:
         db_table = 'tracking'
+        indexes = [
+            # points of a journey in order, see apps.attendance.journey
+            models.Index(fields=['reference', 'receiveddate'], name='tracking_reference_idx'),
+        ]
+
+
+class FaceEmbedding(models.Model):
+    """
+    Embedding of the default image of a people, computed once per model and
+    detector and reused by the face verification of every punch
+    (apps.attendance.face_verification). checksum is the sha1 of the image
+    it was computed from, a changed image is embedded again.
+    """
+    people     = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete = models.CASCADE, verbose_name='People')
+    model_name = models.CharField(max_length = 50)
+    detector   = models.CharField(max_length = 50)
+    image      = models.CharField(max_length = 255)
+    checksum   = models.CharField(max_length = 40)
+    embedding  = ArrayField(models.FloatField())
+    mdtz       = models.DateTimeField(auto_now = True)
+
+    class Meta:
+        db_table = 'face_embedding'
+        constraints = [
+            models.UniqueConstraint(fields=['people', 'model_name', 'detector'], name='face_embedding_people_model_uk'),
+        ]
+
+    def __str__(self):
+        return f"{self.people_id} {self.model_name} {self.image}"
 
 
 class TestGeo(models.Model):
@@ -1,9 +1,12 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from apps.attendance.models import PeopleEventlog
+from apps.attendance import geofence
+from apps.activity.models.job_model import Job
+from apps.onboarding.models import GeofenceMaster
 from apps.attendance.serializers import PeopleEventlogSerializer
 import json
-from background_tasks.tasks import publish_mqtt
+from apps.core import outbox
 TOPIC="redmine_to_noc"
 
 
@@ -21,6 +24,17 @@ def build_payload(instance, model_name, created):
 
 @receiver(post_save, sender=PeopleEventlog)
 def peopleeventlog_post_save(sender, instance, created, **kwargs):
-    payload = build_payload(instance, "PeopleEventlog", created)
-    publish_mqtt.delay(TOPIC, payload)
+    outbox.enqueue(TOPIC, instance, "PeopleEventlog", created, build_payload)
 
+
+
+@receiver([post_save, post_delete], sender=GeofenceMaster)
+def geofencemaster_changed(sender, instance, **kwargs):
+    # cached geometries are reloaded by every process
+    geofence.invalidate(instance.id, instance._state.db or 'default')
+
+
+@receiver([post_save, post_delete], sender=Job)
+def geofence_job_changed(sender, instance, **kwargs):
+    if instance.identifier == 'GEOFENCE' and instance.people_id:
+        geofence.forget_people_geofence(instance.people_id, instance._state.db or 'default')
@@ -0,0 +1,81 @@
+"""
+Tests for the queue of the punches waiting for face verification
+"""
+from unittest.mock import patch
+
+import pytest
+
+from apps.attendance import face_queue
+
+
+class FakeCache(dict):
+
+    def add(self, key, value, timeout=None):
+        if key in self:
+            return False
+        self[key] = value
+        return True
+
+    def set(self, key, value, timeout=None):
+        self[key] = value
+
+    def incr(self, key):
+        self[key] += 1
+        return self[key]
+
+    def get_many(self, keys):
+        return {key: self[key] for key in keys if key in self}
+
+    def delete(self, key):
+        self.pop(key, None)
+
+    def delete_many(self, keys):
+        for key in keys:
+            self.pop(key, None)
+
+
+@pytest.fixture
+def cache():
+    fake = FakeCache()
+    with patch('apps.attendance.face_queue.cache', fake):
+        yield fake
+
+
+@pytest.fixture
+def batch_task():
+    with patch('background_tasks.tasks.perform_facerecognition_batch_bgt') as task:
+        yield task
+
+
+def test_punches_of_a_burst_share_one_batch(cache, batch_task):
+    assert [face_queue.push(f'pel-{i}', 7, 'sps') for i in range(3)] == [1, 2, 3]
+    batch_task.apply_async.assert_called_once_with(args=['sps'], countdown=face_queue.BATCH_DELAY)
+
+
+def test_punches_are_popped_in_order_once(cache, batch_task):
+    for i in range(5):
+        face_queue.push(f'pel-{i}', i, 'sps')
+    face_queue.push('other', 1, 'default')
+    assert face_queue.pop('sps', size=3) == [('pel-0', 0), ('pel-1', 1), ('pel-2', 2)]
+    assert face_queue.pop('sps', size=3) == [('pel-3', 3), ('pel-4', 4)]
+    assert face_queue.pop('sps') == []
+    assert face_queue.pop('default') == [('other', 1)]
+    # the items of the popped punches are dropped
+    assert all(face_queue.ITEM_KEY.format('sps', position) not in cache for position in range(1, 6))
+
+
+@patch('apps.attendance.face_queue.time.sleep')
+def test_expired_punch_does_not_stop_the_queue(mock_sleep, cache, batch_task):
+    face_queue.push('gone', 1, 'sps')
+    face_queue.push('kept', 2, 'sps')
+    del cache[face_queue.ITEM_KEY.format('sps', 1)]
+    assert face_queue.pop('sps') == [('kept', 2)]
+    assert face_queue.pop('sps') == []
+
+
+def test_one_batch_runs_per_database(cache):
+    assert face_queue.acquire('sps') is True
+    assert face_queue.acquire('sps') is False
+    assert face_queue.acquire('default') is True
+    face_queue.release('sps')
+    assert face_queue.acquire('sps') is True
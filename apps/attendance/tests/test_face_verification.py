@@ -0,0 +1,110 @@
+"""
+Tests for the face verification of the attendance punches
+"""
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from apps.attendance import face_verification
+
+
+def people(id, name='master/client_1/people/p1_guard__face.jpg'):
+    return SimpleNamespace(id=id, peopleimg=SimpleNamespace(name=name, url=f'/youtility4_media/{name}'))
+
+
+@pytest.fixture
+def image(tmp_path):
+    path = tmp_path / 'face.jpg'
+    path.write_bytes(b'reference face')
+    return path
+
+
+@pytest.fixture
+def embeddings():
+    "embed() of the tests: the reference image and the event pictures by name"
+    vectors = {'reference': [np.array([1.0, 0.0])], 'same.jpg': [np.array([2.0, 0.0])],
+               'other.jpg': [np.array([0.0, 1.0])], 'group.jpg': [np.array([0.0, 1.0]), np.array([1.0, 0.1])]}
+    def embed(img):
+        if img == 'noface.jpg':
+            raise ValueError('Face could not be detected')
+        return vectors.get(img, vectors['reference'])
+    with patch('apps.attendance.face_verification.embed', side_effect=embed) as mock_embed:
+        yield mock_embed
+
+
+@pytest.fixture
+def faceembedding():
+    with patch('apps.attendance.models.FaceEmbedding') as model:
+        yield model
+
+
+def test_cosine_distance():
+    assert face_verification.cosine_distance(np.array([1.0, 0.0]), np.array([3.0, 0.0])) == pytest.approx(0.0)
+    assert face_verification.cosine_distance(np.array([1.0, 0.0]), np.array([0.0, 2.0])) == pytest.approx(1.0)
+
+
+def test_people_without_image_is_rejected():
+    with pytest.raises(ValueError):
+        face_verification.image_path(people(1, 'master/people/blank.png'))
+
+
+class TestReference:
+
+    def test_stored_embedding_of_the_same_image_is_reused(self, image, embeddings, faceembedding):
+        row = SimpleNamespace(checksum=face_verification.checksum(image), embedding=[0.5, 0.5])
+        with patch('apps.attendance.face_verification.image_path', return_value=str(image)):
+            ref = face_verification.reference(people(1), 'default', row)
+        assert ref.tolist() == [0.5, 0.5]
+        embeddings.assert_not_called()
+        faceembedding.objects.using.assert_not_called()
+
+    def test_changed_image_is_embedded_and_stored_again(self, image, embeddings, faceembedding):
+        row = SimpleNamespace(checksum='previous image', embedding=[0.5, 0.5])
+        with patch('apps.attendance.face_verification.image_path', return_value=str(image)):
+            ref = face_verification.reference(people(1), 'sps', row)
+        assert ref.tolist() == [1.0, 0.0]
+        faceembedding.objects.using.assert_called_with('sps')
+        kwargs = faceembedding.objects.using.return_value.update_or_create.call_args.kwargs
+        assert kwargs['people_id'] == 1
+        assert kwargs['defaults']['checksum'] == face_verification.checksum(image)
+        assert kwargs['defaults']['embedding'] == [1.0, 0.0]
+
+    def test_missing_image_file_is_a_value_error(self, tmp_path, embeddings, faceembedding):
+        with patch('apps.attendance.face_verification.image_path', return_value=str(tmp_path / 'gone.jpg')):
+            with pytest.raises(ValueError):
+                face_verification.reference(people(1))
+
+
+class TestVerify:
+
+    @pytest.fixture(autouse=True)
+    def references(self, embeddings):
+        with patch('apps.attendance.face_verification.stored', return_value={}) as mock_stored, \
+                patch('apps.attendance.face_verification.reference', return_value=np.array([1.0, 0.0])) as mock_ref:
+            yield mock_stored, mock_ref
+
+    def test_result_has_the_keys_of_deepface_verify(self):
+        fr_results = face_verification.verify(people(1), 'same.jpg')
+        assert fr_results['verified'] is True
+        assert fr_results['distance'] == pytest.approx(0.0)
+        assert fr_results['model'] == face_verification.MODEL_NAME
+        assert fr_results['similarity_metric'] == 'cosine'
+        assert face_verification.verify(people(1), 'other.jpg')['verified'] is False
+
+    def test_closest_face_of_the_event_picture_is_compared(self):
+        assert face_verification.verify(people(1), 'group.jpg')['verified'] is True
+
+    def test_batch_reads_each_reference_once(self, references, embeddings):
+        mock_stored, mock_ref = references
+        results = face_verification.verify_many(
+            [(people(1), 'same.jpg'), (people(1), 'other.jpg'), (people(2), 'noface.jpg'),
+             (people(2), 'same.jpg')], using='sps')
+        mock_stored.assert_called_once_with({1, 2}, 'sps')
+        assert mock_ref.call_count == 2
+        # each event picture is embedded once
+        assert sorted(c.args[0] for c in embeddings.call_args_list) == ['noface.jpg', 'other.jpg', 'same.jpg']
+        assert [fr_results['verified'] for fr_results, _ in results[:2]] == [True, False]
+        assert results[2][0] is None and isinstance(results[2][1], ValueError)
+        assert results[3][0]['verified'] is True
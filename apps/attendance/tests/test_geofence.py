@@ -0,0 +1,62 @@
+"""
+Tests for the geofence evaluation engine
+"""
+from math import atan2, cos, radians, sin, sqrt
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+
+from apps.attendance import geofence as gf
+
+
+def ring(*coords):
+    return SimpleNamespace(coords=coords + coords[:1])
+
+
+class FakePolygon(list):
+    "GEOS polygon stand-in, a list of rings"
+    extent = (0, 0, 10, 10)
+    srid = 4326
+
+
+def polygon():
+    # 0..10 square around a 4..6 hole, (lon, lat)
+    outer = ring((0, 0), (10, 0), (10, 10), (0, 10))
+    hole = ring((4, 4), (6, 4), (6, 6), (4, 6))
+    return gf.Polygon(FakePolygon([outer, hole]))
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(radians, (lat1, lon1, lat2, lon2))
+    a = sin((lat2 - lat1) / 2)**2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2)**2
+    return 6371 * 2 * atan2(sqrt(a), sqrt(1 - a))
+
+
+def test_polygon_points_are_evaluated_at_once():
+    lats = [5, 2, 5, 11, -1, 8]
+    lons = [5, 2, 8, 5, 5, 1]
+    assert polygon().contains_many(lats, lons).tolist() == [False, True, True, False, False, True]
+
+
+def test_circle_matches_the_scalar_haversine():
+    circle = gf.Circle(28.6139, 77.2090, 0.5)
+    rng = np.random.default_rng(7)
+    lats = 28.6139 + rng.uniform(-0.01, 0.01, 1000)
+    lons = 77.2090 + rng.uniform(-0.01, 0.01, 1000)
+    expected = [haversine(lat, lon, 28.6139, 77.2090) <= 0.5 for lat, lon in zip(lats, lons)]
+    assert circle.contains_many(lats, lons).tolist() == expected
+    assert gf.as_geofence((28.6139, 77.2090, 0.5)).contains(28.6139, 77.2090)
+
+
+def test_missing_points_are_not_evaluated():
+    points = [SimpleNamespace(coords=(2, 2)), None, SimpleNamespace(coords=(5, 5))]
+    assert gf.contains_points(polygon(), points) == [True, None, False]
+
+
+@patch('apps.attendance.geofence.get_many')
+def test_points_of_many_geofences(mock_get_many):
+    mock_get_many.return_value = {3: polygon()}
+    inside = gf.evaluate([3, 3, 9, None], [2, 5, 2, 2], [2, 5, 2, 2])
+    assert inside.tolist() == [True, False, False, False]
+    assert mock_get_many.call_args.args[0] == {3, 9, None}
@@ -0,0 +1,45 @@
+"""
+Tests for the journey path builder
+"""
+from unittest.mock import patch
+
+from apps.attendance import journey
+
+
+def executed(mock_connections):
+    cursor = mock_connections.__getitem__.return_value.cursor.return_value.__enter__.return_value
+    return cursor, [call.args for call in cursor.execute.call_args_list]
+
+
+@patch('apps.attendance.journey.connections')
+def test_paths_of_many_journeys_are_built_in_one_statement(mock_connections):
+    cursor, _ = executed(mock_connections)
+    cursor.fetchall.return_value = [(1, 'a'), (2, 'b')]
+    assert journey.build_eventlog_paths(['a', 'b', 'c'], tolerance=0.00001) == [(1, 'a'), (2, 'b')]
+    _, calls = executed(mock_connections)
+    (sql, params), = calls
+    assert 'ST_MakeLine(gpslocation::geometry ORDER BY receiveddate, id)' in sql
+    assert 'UPDATE peopleeventlog' in sql
+    assert 'COALESCE(NULLIF(t.distance, 0)' in sql
+    assert params == {'references': ['a', 'b', 'c'], 'tolerance': 0.00001}
+
+
+@patch('apps.attendance.journey.connections')
+def test_no_references_no_query(mock_connections):
+    assert journey.build_eventlog_paths([]) == []
+    mock_connections.__getitem__.assert_not_called()
+
+
+@patch('apps.core.outbox.enqueue_many')
+@patch('apps.attendance.journey.transaction')
+@patch('apps.attendance.journey.connections')
+def test_points_of_built_tours_are_deleted(mock_connections, mock_transaction, mock_enqueue):
+    cursor, _ = executed(mock_connections)
+    cursor.fetchall.return_value = [(7, 'a')]
+    journey.build_tour_paths(['a', 'b'], using='sps')
+    _, calls = executed(mock_connections)
+    assert "jsonb_set(COALESCE(t.other_info, '{}'::jsonb), '{distance}'" in calls[0][0]
+    assert calls[1] == (journey.DELETE_POINTS_SQL, [['a']])
+    # updated tours are replicated as a save would
+    topic, model, pks, name, builder, using = mock_enqueue.call_args.args
+    assert (topic, pks, name, using) == ('redmine_to_noc', [7], 'JobNeed', 'sps')
@@ -0,0 +1,211 @@
+'''
+Daily rollup of the counters shown by the dashboard (DashboardView).
+
+Every dashboard refresh used to run one aggregate per card over jobneed,
+peopleeventlog, ticket and wom for the whole date range. The counts are
+now kept per client, site, day, kind and status in DashboardDailyCount:
+
+- refresh() rebuilds the rollup of a database for the days whose rows
+  changed since its last run plus a trailing window of closed days. The
+  periodic task refresh_dashboard_counts runs it for every tenant database
+  (DASHBOARD_COUNTS_DATABASES), refresh(days=N) backfills N days.
+- get_counts() answers closed days from the rollup with one query and
+  only aggregates the raw tables from today onwards.
+
+Enabled with settings.DASHBOARD_COUNTS_ROLLUP.
+'''
+import logging
+from datetime import date, timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import BooleanField, Case, Count, F, Q, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from apps.core.models import DashboardDailyCount
+from apps.tenants import registry
+
+log = logging.getLogger('django')
+
+ROLLUP_WINDOW_DAYS = getattr(settings, 'DASHBOARD_ROLLUP_WINDOW_DAYS', 7)
+LAST_REFRESH_KEY = 'dashboard_counts_last_refresh:{}'
+
+FR_EVENTS = ['SELF', 'SELFATTENDANCE', 'MARKATTENDANCE', 'MARK']
+NOT_WORKPERMIT = ['NOT_REQUIRED', 'NOTREQUIRED']
+
+
+def flag(condition):
+    return Case(When(condition, then=Value(True)), default=Value(False), output_field=BooleanField())
+
+
+# how every source is grouped: day, kind, status and flag of the rollup rows
+SOURCES = {
+    'jobneed': dict(
+        model=('activity', 'Jobneed'), date='plandatetime__date', day=TruncDate('plandatetime'),
+        filter=Q(parent_id__in=[1, -1, None]),
+        kind='identifier', status='jobstatus', flag=Coalesce('alerts', Value(False))),
+    'eventlog': dict(
+        model=('attendance', 'PeopleEventlog'), date='datefor', day=F('datefor'),
+        filter=~Q(id=1),
+        kind='peventtype__tacode', status=None, flag=flag(Q(startlocation__isnull=False))),
+    'ticket': dict(
+        model=('y_helpdesk', 'Ticket'), date='cdtz__date', day=TruncDate('cdtz'),
+        filter=Q(),
+        kind='ticketsource', status='status', flag=Value(False)),
+    'wom': dict(
+        model=('work_order_management', 'Wom'), date='cdtz__date', day=TruncDate('cdtz'),
+        filter=Q(),
+        kind='workpermit', status='workstatus', flag=flag(Q(parent_id=1) & ~Q(identifier='SLA'))),
+}
+
+
+def get_databases():
+    return registry.databases('DASHBOARD_COUNTS_DATABASES')
+
+
+def get_manager(spec, using=None):
+    model = apps.get_model(*spec['model'])
+    return model.objects.using(using) if using else model.objects
+
+
+def get_queryset(source, day_from, day_to, using=None, **filters):
+    spec = SOURCES[source]
+    return get_manager(spec, using).filter(
+        spec['filter'], **{f"{spec['date']}__gte": day_from, f"{spec['date']}__lte": day_to}, **filters)
+
+
+def aggregate(source, day_from, day_to, using=None, **filters):
+    "counts of source between day_from and day_to grouped like the rollup rows"
+    spec = SOURCES[source]
+    text = lambda field: Coalesce(field, Value('')) if field else Value('')
+    qset = get_queryset(source, day_from, day_to, using, **filters).values(
+        'client_id', 'bu_id', rollup_day=spec['day'], rollup_kind=text(spec['kind']),
+        rollup_status=text(spec['status']), rollup_flag=spec['flag'],
+    ).annotate(rollup_count=Count('id')).order_by()
+    return [dict(
+        source=source, client_id=row['client_id'], bu_id=row['bu_id'], day=row['rollup_day'],
+        kind=row['rollup_kind'], status=row['rollup_status'], flag=row['rollup_flag'],
+        count=row['rollup_count']) for row in qset]
+
+
+def rebuild_day(source, day, using='default'):
+    rows = [DashboardDailyCount(**row) for row in aggregate(source, day, day, using)
+            if row['client_id'] is not None and row['bu_id'] is not None]
+    with transaction.atomic(using=using):
+        DashboardDailyCount.objects.using(using).filter(source=source, day=day).delete()
+        DashboardDailyCount.objects.using(using).bulk_create(rows)
+    return len(rows)
+
+
+def touched_days(source, since, today, using=None):
+    "closed days having rows of source modified since"
+    spec = SOURCES[source]
+    return set(get_manager(spec, using).filter(
+        spec['filter'], mdtz__gte=since, **{f"{spec['date']}__lt": today},
+    ).annotate(rollup_day=spec['day']).values_list('rollup_day', flat=True).distinct().order_by())
+
+
+def refresh(days=ROLLUP_WINDOW_DAYS, using='default'):
+    '''
+    Rebuilds the closed days of the database which changed since its last
+    refresh and the
+    last `days` days, statuses of recent jobs and tickets keep changing
+    (autoclose, resolution) after their day is over.
+    Returns the number of days rebuilt.
+    '''
+    started, today = timezone.now(), timezone.localdate()
+    last_refresh_key = LAST_REFRESH_KEY.format(using)
+    since = cache.get(last_refresh_key) or started - timedelta(days=days)
+    window = {today - timedelta(days=i) for i in range(1, days + 1)}
+    rebuilt = 0
+    for source in SOURCES:
+        for day in sorted(window | touched_days(source, since, today, using)):
+            if day is None:
+                continue
+            rebuild_day(source, day, using)
+            rebuilt += 1
+    cache.set(last_refresh_key, started, None)
+    log.info(f"dashboard counts of {using} rebuilt for {rebuilt} source days since {since}")
+    return rebuilt
+
+
+def to_date(value):
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+
+def get_rows(client_id, sites, day_from, day_to):
+    '''
+    rollup rows of sites between day_from and day_to, closed days come
+    from DashboardDailyCount and the days from today from the raw tables.
+    '''
+    today, rows = timezone.localdate(), []
+    if day_from < today:
+        qset = DashboardDailyCount.objects.filter(
+            client_id=client_id, bu_id__in=sites, day__gte=day_from,
+            day__lte=min(day_to, today - timedelta(days=1)),
+        ).values('source', 'bu_id', 'kind', 'status', 'flag').annotate(total=Sum('count')).order_by()
+        rows.extend(dict(row, count=row.pop('total')) for row in qset)
+    if day_to >= today:
+        for source in SOURCES:
+            rows.extend(aggregate(source, max(day_from, today), day_to, client_id=client_id, bu_id__in=sites))
+    return rows
+
+
+def build_counts(rows, assignedsites, bu_id, sitecrisis_types=()):
+    '''
+    folds rollup rows into the counters of the dashboard, in the shape
+    the manager methods (get_taskchart_data, get_ticket_stats_for_dashboard ...)
+    return them.
+    '''
+    assignedsites, bu_id = {int(site) for site in assignedsites}, int(bu_id)
+    totals = {}
+    workpermit_count = 0
+    for row in rows:
+        if row['source'] == 'wom' and row['flag'] and row['kind'] not in NOT_WORKPERMIT and row['bu_id'] == bu_id:
+            workpermit_count += row['count']
+        if row['bu_id'] not in assignedsites:
+            continue
+        key = (row['source'], row['kind'], row['status'], row['flag'])
+        totals[key] = totals.get(key, 0) + row['count']
+
+    def count(source, kinds=None, statuses=None, flagged=None):
+        return sum(value for (src, kind, status, flg), value in totals.items()
+                   if src == source and (kinds is None or kind in kinds)
+                   and (statuses is None or status in statuses)
+                   and (flagged is None or flg == flagged))
+
+    def statuses(source, kinds, values):
+        return [count(source, kinds, [value]) for value in values]
+
+    alerts = [count('jobneed', ['TASK'], flagged=True), count('jobneed', ['INTERNALTOUR'], flagged=True),
+              count('jobneed', ['PPM'], flagged=True), count('jobneed', flagged=True)]
+    tickets = statuses('ticket', ['USERDEFINED'], ['NEW', 'RESOLVED', 'OPEN', 'CANCELLED', 'CLOSED', 'ONHOLD'])
+    tickets.append(count('ticket', ['SYSTEMGENERATED']))
+    wom = statuses('wom', ['NOT_REQUIRED'], ['ASSIGNED', 'RE_ASSIGNED', 'COMPLETED', 'CANCELLED', 'INPROGRESS', 'CLOSED'])
+    return {
+        'task': statuses('jobneed', ['TASK'], ['ASSIGNED', 'COMPLETED', 'AUTOCLOSED']) + [count('jobneed', ['TASK'])],
+        'tour': statuses('jobneed', ['INTERNALTOUR'], ['COMPLETED', 'AUTOCLOSED', 'PARTIALLYCOMPLETED'])
+                + [count('jobneed', ['INTERNALTOUR'])],
+        'ppm': statuses('jobneed', ['PPM'], ['ASSIGNED', 'COMPLETED', 'AUTOCLOSED']) + [count('jobneed', ['PPM'])],
+        'IR_count': count('jobneed', ['INCIDENTREPORT']),
+        'sos_count': count('eventlog', ['SOS']),
+        'FR_fail_count': count('eventlog', FR_EVENTS),
+        'diversion_count': count('eventlog', ['DIVERSION'], flagged=True),
+        'sitecrisis_count': count('eventlog', list(sitecrisis_types), flagged=True),
+        'workpermit_count': workpermit_count,
+        'alertchart': (alerts, sum(alerts)),
+        'ticketchart': (tickets, sum(tickets)),
+        'womchart': (wom, sum(wom)),
+    }
+
+
+def get_counts(request):
+    "dashboard counters of the session's sites for the from/upto range of the request"
+    R, S = request.GET, request.session
+    PeopleEventlog = apps.get_model('attendance', 'PeopleEventlog')
+    sites = set(S['assignedsites']) | {S['bu_id']}
+    rows = get_rows(S['client_id'], sites, to_date(R['from']), to_date(R['upto']))
+    return build_counts(rows, S['assignedsites'], S['bu_id'], PeopleEventlog.objects.get_sitecrisis_types())
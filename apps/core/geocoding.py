@@ -0,0 +1,197 @@
+'''
+Reverse geocoding service.
+
+Addresses of points (punch in/out gps, tour start/end, geofence centroids)
+used to be fetched with a new googlemaps.Client and a synchronous call per
+point, inside the mobile sync transaction. Guards punch in from the same
+gate every day, so addresses are now:
+
+- cached in the shared django cache per geohash cell (precision 8, a cell
+  of about 38 x 19 m), every worker reuses an address once it is known,
+- memoized for the duration of a `memoize()` block (a sync batch, a view),
+- filled in after commit by the task enrich_geojson_addresses when they are
+  not cached yet, see fill_addresses(). Sync transactions never wait on the
+  provider.
+
+The provider is the class named by GEOCODING_PROVIDER, any object with a
+reverse(lat, lon) method returning the formatted address or "".
+'''
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+log = logging.getLogger('django')
+
+GEOHASH_PRECISION = getattr(settings, 'GEOCODING_GEOHASH_PRECISION', 8)
+CACHE_TIMEOUT = getattr(settings, 'GEOCODING_CACHE_TIMEOUT', 60 * 60 * 24 * 30)
+# failed lookups are retried after this many seconds instead of hitting the provider on every call
+MISS_TIMEOUT = getattr(settings, 'GEOCODING_MISS_TIMEOUT', 60 * 10)
+MISS = '\x00'
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+_memo = ContextVar('geocoding_memo', default=None)
+
+
+def geohash(lat, lon, precision=GEOHASH_PRECISION):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, ch, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        ch <<= 1
+        if value >= mid:
+            ch |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even, bits = not even, bits + 1
+        if bits == 5:
+            chars.append(BASE32[ch])
+            bits, ch = 0, 0
+    return ''.join(chars)
+
+
+def cache_key(lat, lon):
+    return f"geocode:{geohash(lat, lon)}"
+
+
+class GoogleMapsProvider:
+    "reverse geocoding with the google maps api, one client per process"
+
+    def __init__(self, key=None):
+        import googlemaps
+        self.client = googlemaps.Client(key=key or settings.GOOGLE_MAP_SECRET_KEY)
+
+    def reverse(self, lat, lon):
+        result = self.client.reverse_geocode((lat, lon))
+        return result[0]['formatted_address'] if result else ""
+
+
+class NominatimProvider:
+    "reverse geocoding with openstreetmap nominatim"
+
+    def __init__(self, user_agent='my_geocoder_app'):
+        from geopy.geocoders import Nominatim
+        self.geolocator = Nominatim(user_agent=user_agent)
+
+    def reverse(self, lat, lon):
+        location = self.geolocator.reverse((lat, lon), language='en')
+        return location.address if location else ""
+
+
+@lru_cache(maxsize=None)
+def get_provider():
+    return import_string(getattr(settings, 'GEOCODING_PROVIDER', 'apps.core.geocoding.GoogleMapsProvider'))()
+
+
+def is_valid(lat, lon):
+    return lat is not None and lon is not None and not (float(lat) == 0.0 and float(lon) == 0.0)
+
+
+@contextmanager
+def memoize():
+    "addresses looked up inside the block are kept in memory until it exits"
+    token = _memo.set({}) if _memo.get() is None else None
+    try:
+        yield
+    finally:
+        if token is not None:
+            _memo.reset(token)
+
+
+def cached(lat, lon):
+    "address of the point's cell if it was looked up, None otherwise"
+    if not is_valid(lat, lon):
+        return ""
+    key, memo = cache_key(lat, lon), _memo.get()
+    if memo is not None and key in memo:
+        address = memo[key]
+    else:
+        address = cache.get(key)
+        if address is not None and memo is not None:
+            memo[key] = address
+    # a recent failed lookup reads as no address
+    return "" if address == MISS else address
+
+
+def reverse(lat, lon):
+    "address of the point, from the cache or the provider, '' when not found"
+    address = cached(lat, lon)
+    if address is not None:
+        return address
+    key = cache_key(lat, lon)
+    try:
+        address = get_provider().reverse(float(lat), float(lon))
+    except Exception:
+        log.critical("something went wrong while reverse geocoding", exc_info=True)
+        address = ""
+    cache.set(key, address or MISS, CACHE_TIMEOUT if address else MISS_TIMEOUT)
+    if (memo := _memo.get()) is not None:
+        memo[key] = address or MISS
+    return address
+
+
+def point_coords(point):
+    "(lat, lon) of a geos point, None for missing or 0,0 points"
+    if not hasattr(point, 'coords') or point.coords[0] in (0.0, "0.0"):
+        return None
+    lon, lat = point.coords[:2]
+    return lat, lon
+
+
+def reverse_point(point):
+    coords = point_coords(point)
+    return reverse(*coords) if coords else ""
+
+
+def fill_addresses(obj, fields):
+    '''
+    sets obj.geojson[field] to the address of the point in each field.
+    Cached addresses are set right away, the others are looked up after
+    the transaction commits and saved by enrich_geojson_addresses.
+    Returns the fields left for the task.
+    '''
+    deferred = []
+    for field in fields:
+        coords = point_coords(getattr(obj, field, None))
+        if coords is None:
+            obj.geojson[field] = ""
+            continue
+        address = cached(*coords)
+        if address is None:
+            deferred.append(field)
+        else:
+            obj.geojson[field] = address
+    if deferred:
+        defer(obj, deferred)
+    return deferred
+
+
+def defer(obj, fields):
+    from background_tasks.tasks import enrich_geojson_addresses
+    db = obj._state.db or 'default'
+    label, pk = obj._meta.label, obj.pk
+    transaction.on_commit(lambda: enrich_geojson_addresses.delay(label, pk, fields, db), using=db)
+
+
+def enrich(model, pk, fields, using='default'):
+    "looks up the addresses of fields of the row and saves them in its geojson"
+    obj = model.objects.using(using).filter(pk=pk).only(*fields).first()
+    if obj is None:
+        return {}
+    # the provider is called before the row is locked
+    with memoize():
+        addresses = {field: reverse_point(getattr(obj, field, None)) for field in fields}
+    with transaction.atomic(using=using):
+        obj = model.objects.using(using).select_for_update().filter(pk=pk).first()
+        if obj is None:
+            return {}
+        obj.geojson.update(addresses)
+        obj.save(update_fields=['geojson'])
+    return addresses
@@ -14,6 +14,7 @@ from django.conf import settings
 from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
+from django.contrib.admin.views.decorators import staff_member_required
 
 logger = logging.getLogger(__name__)
 
@@ -366,6 +367,10 @@ def detailed_health_check(request):
             'environment': getattr(settings, 'ENVIRONMENT', 'unknown')
         }
         
+        # totals only, the hosts and pools of each tenant are served to staff by tenant_metrics
+        from apps.tenants import registry
+        result['tenants'] = registry.summary()
+        
         return JsonResponse(result, status=200)
     except Exception as e:
         logger.exception("Detailed health check failed")
@@ -373,4 +378,15 @@ def detailed_health_check(request):
             'status': 'error',
             'message': f'Detailed health check failed: {str(e)}',
             'timestamp': timezone.now().isoformat()
-        }, status=503)
\ No newline at end of file
+        }, status=503)
+
+
+@staff_member_required
+@require_http_methods(["GET"])
+def tenant_metrics(request):
+    """
+    Hosts, requests and connection pool of each tenant database
+    Staff only, the hostnames and aliases of the tenants are not public
+    """
+    from apps.tenants import registry
+    return JsonResponse(registry.metrics(), status=200)
@@ -0,0 +1,31 @@
+"""
+Django management command running the outbox relay worker
+Usage: python manage.py run_outbox_relay [--once] [--batch-size 500]
+"""
+
+from django.core.management.base import BaseCommand
+from apps.core import outbox
+
+
+class Command(BaseCommand):
+    help = 'Publish the pending replication events of the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Relay the pending events and exit')
+        parser.add_argument('--batch-size', type=int, default=outbox.OUTBOX_BATCH_SIZE)
+        parser.add_argument('--poll-interval', type=float, default=outbox.OUTBOX_POLL_INTERVAL)
+        parser.add_argument('--purge-days', type=int, help='Delete events published more than N days ago and exit')
+
+    def handle(self, *args, **options):
+        if options['purge_days'] is not None:
+            for db in outbox.get_databases():
+                deleted = outbox.purge(options['purge_days'], using=db)
+                self.stdout.write(self.style.SUCCESS(f'{db}: deleted {deleted} published events'))
+            return
+        if options['once']:
+            for db in outbox.get_databases():
+                relayed = outbox.relay(options['batch_size'], using=db)
+                self.stdout.write(self.style.SUCCESS(f'{db}: relayed {relayed} events'))
+            return
+        self.stdout.write('Outbox relay started')
+        outbox.relay_forever(options['poll_interval'], options['batch_size'])
@@ -3,6 +3,8 @@ from django.core.cache import cache
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import never_cache
 from django.conf import settings
+from django.db import router
+from apps.core import rate_limits
 import json
 import logging
 
@@ -11,7 +13,9 @@ logger = logging.getLogger(__name__)
 class PostgreSQLRateLimitMiddleware:
     """
     PostgreSQL-based rate limiting middleware
-    Replaces Redis-based rate limiting with database storage
+    Replaces Redis-based rate limiting with database storage, the limits
+    are checked in process memory and the attempts written in batches
+    (apps.core.rate_limits)
     """
     
     def __init__(self, get_response):
@@ -25,9 +29,14 @@ class PostgreSQLRateLimitMiddleware:
             '/reset-password/',
         ])
         
-        self.time_window_minutes = getattr(settings, 'RATE_LIMIT_WINDOW_MINUTES', 15)
-        self.max_attempts = getattr(settings, 'RATE_LIMIT_MAX_ATTEMPTS', 5)
+        self.time_window_minutes = rate_limits.WINDOW_MINUTES
+        self.max_attempts = rate_limits.MAX_ATTEMPTS
         self.enable_rate_limiting = getattr(settings, 'ENABLE_RATE_LIMITING', True)
+        self.login_paths = set(getattr(settings, 'RATE_LIMIT_LOGIN_PATHS', ['/', '/login/', '/accounts/login/']))
+        
+        # Attempts are counted in process memory and written in batches
+        if self.enable_rate_limiting:
+            rate_limits.start()
     
     def __call__(self, request):
         # Check if rate limiting is enabled and path should be rate limited
@@ -39,7 +48,7 @@ class PostgreSQLRateLimitMiddleware:
             return self.get_response(request)
         
         # Debug logging
-        logger.info(f"Rate limiting middleware processing: {request.method} {request.path}")
+        logger.debug(f"Rate limiting middleware processing: {request.method} {request.path}")
         
         # Get client information
         ip_address = self.get_client_ip(request)
@@ -47,8 +56,10 @@ class PostgreSQLRateLimitMiddleware:
         user_agent = request.META.get('HTTP_USER_AGENT', '')
         
         # Check rate limit before processing request
+        using = 'default'
         try:
             from apps.core.models import RateLimitAttempt  # Adjust import path
+            using = router.db_for_write(RateLimitAttempt)
             
             # For GET requests, we don't have username yet, so skip blocking
             # Rate limiting should only apply to POST (actual login attempts)
@@ -60,12 +71,11 @@ class PostgreSQLRateLimitMiddleware:
                 attempted_username = request.POST.get('username') or request.POST.get('loginid')
                 
                 if attempted_username:
-                    # Check rate limit for this specific username (not IP)
-                    rate_limit_result = RateLimitAttempt.check_rate_limit(
+                    # Check rate limit for this specific username (not IP), in process memory
+                    rate_limit_result = rate_limits.check(
                         ip_address=ip_address,  # Still log IP for security records
                         username=attempted_username,  # But rate limit by username
-                        time_window_minutes=self.time_window_minutes,
-                        max_attempts=self.max_attempts
+                        using=using
                     )
                 else:
                     # No username provided, allow request to proceed (will fail validation anyway)
@@ -75,14 +85,15 @@ class PostgreSQLRateLimitMiddleware:
                 # Get the attempted username for blocking
                 attempted_username = request.POST.get('username') or request.POST.get('loginid') or username
                 
-                # Log the blocked attempt
-                RateLimitAttempt.log_attempt(
+                # Record the blocked attempt, written by the next flush
+                rate_limits.record(
                     ip_address=ip_address,
                     username=attempted_username,
                     user_agent=user_agent,
                     attempt_type='blocked_request',
                     success=False,
-                    failure_reason=rate_limit_result.get('block_reason', 'Rate limit exceeded')
+                    failure_reason=rate_limit_result.get('block_reason', 'Rate limit exceeded'),
+                    using=using
                 )
                 
                 blocking_strategy = rate_limit_result.get('blocking_strategy', 'unknown')
@@ -131,60 +142,43 @@ class PostgreSQLRateLimitMiddleware:
         # Process the request
         response = self.get_response(request)
         
-        # Log the attempt after processing (for login attempts)
-        if request.method == 'POST' and any(request.path.startswith(path) for path in ['/', '/login/', '/accounts/login/']):
+        # Record the attempt after processing, the outcome is read from the status code
+        if request.method == 'POST':
             try:
-                # Better detection of login success/failure
-                # Successful login redirects (302) OR contains no form errors
-                is_redirect = response.status_code == 302
-                
-                # Check if response contains login form errors (indicates failure)
-                has_form_errors = False
-                if hasattr(response, 'content') and response.content:
-                    content_str = response.content.decode('utf-8', errors='ignore')
-                    # Look for common error indicators in your login form
-                    error_indicators = [
-                        'alert-danger',
-                        'Sorry that didn\'t work',
-                        'please try again',
-                        'invalid-details',
-                        'Authentication failed'
-                    ]
-                    has_form_errors = any(indicator in content_str for indicator in error_indicators)
-                
-                # Login is successful if it redirects AND no form errors
-                success = is_redirect and not has_form_errors
-                
-                if not success:
-                    if has_form_errors:
-                        failure_reason = "Invalid credentials"
-                    elif response.status_code != 302:
-                        failure_reason = f"HTTP {response.status_code}"
-                    else:
-                        failure_reason = "Login failed"
-                else:
-                    failure_reason = None
-                
-                username_attempted = request.POST.get('username') or request.POST.get('loginid') or username
-                
-                logger.info(f"Logging login attempt: IP={ip_address}, Username={username_attempted}, Success={success}")
-                
-                attempt = RateLimitAttempt.log_attempt(
-                    ip_address=ip_address,
-                    username=username_attempted,
-                    user_agent=user_agent,
-                    attempt_type='login',
-                    success=success,
-                    failure_reason=failure_reason
-                )
-                
-                logger.info(f"Logged attempt with ID: {attempt.id}")
-                
+                attempt = self.classify(request, response)
+                if attempt is not None:
+                    attempt_type, success, failure_reason = attempt
+                    username_attempted = request.POST.get('username') or request.POST.get('loginid') or username
+                    rate_limits.record(
+                        ip_address=ip_address,
+                        username=username_attempted,
+                        user_agent=user_agent,
+                        attempt_type=attempt_type,
+                        success=success,
+                        failure_reason=failure_reason,
+                        using=using
+                    )
             except Exception as e:
                 logger.error(f"Error logging rate limit attempt: {str(e)}")
         
         return response
     
+    def classify(self, request, response):
+        """
+        (attempt_type, success, failure_reason) of a POST, None when it is not
+        an authentication attempt. The login view redirects on success and
+        renders the form again on failure, other paths count their 401, 403
+        and 429 responses as failures.
+        """
+        status = response.status_code
+        if request.path in self.login_paths:
+            if 300 <= status < 400:
+                return 'login', True, None
+            return 'login', False, "Invalid credentials" if status == 200 else f"HTTP {status}"
+        if status in (401, 403, 429):
+            return 'api_access', False, f"HTTP {status}"
+        return None
+    
     def get_client_ip(self, request):
         """Get the real client IP address"""
         x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
@@ -0,0 +1,37 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_postgresql_functions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardDailyCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('client_id', models.BigIntegerField()),
+                ('bu_id', models.BigIntegerField()),
+                ('day', models.DateField()),
+                ('source', models.CharField(help_text='jobneed, eventlog, ticket or wom', max_length=20)),
+                ('kind', models.CharField(default='', help_text='identifier, event type or ticket source', max_length=60)),
+                ('status', models.CharField(default='', max_length=60)),
+                ('flag', models.BooleanField(default=False, help_text='alerts, located event or work permit')),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'dashboard_daily_count',
+                'indexes': [
+                    models.Index(fields=['client_id', 'day'], name='dashboard_count_client_day'),
+                    models.Index(fields=['source', 'day'], name='dashboard_count_source_day'),
+                ],
+                'constraints': [
+                    models.UniqueConstraint(
+                        fields=('client_id', 'bu_id', 'day', 'source', 'kind', 'status', 'flag'),
+                        name='dashboard_daily_count_key'),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_dashboarddailycount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic', models.CharField(max_length=100)),
+                ('model', models.CharField(help_text='app_label.ModelName of the object', max_length=100)),
+                ('name', models.CharField(help_text='model name used in the payload', max_length=50)),
+                ('builder', models.CharField(help_text='dotted path of the payload builder', max_length=200)),
+                ('object_pk', models.CharField(max_length=64)),
+                ('created', models.BooleanField(default=False)),
+                ('version', models.IntegerField(default=1, help_text='saves coalesced into this event')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('published_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'outbox_event',
+                'indexes': [
+                    models.Index(condition=models.Q(('published_at__isnull', True)), fields=['id'],
+                                 name='outbox_event_pending_idx'),
+                ],
+                'constraints': [
+                    models.UniqueConstraint(condition=models.Q(('published_at__isnull', True)),
+                                            fields=('topic', 'model', 'name', 'object_pk'),
+                                            name='outbox_event_pending_key'),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name='OutboxOffset',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic', models.CharField(max_length=100, unique=True)),
+                ('offset', models.BigIntegerField(default=0)),
+                ('published', models.BigIntegerField(default=0, help_text='events published so far')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'outbox_offset',
+            },
+        ),
+    ]
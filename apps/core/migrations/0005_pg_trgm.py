@@ -0,0 +1,14 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_outbox'),
+    ]
+
+    operations = [
+        # trigram indexes of the list view search, see apps.core.search
+        TrigramExtension(),
+    ]
@@ -142,3 +142,89 @@ class RateLimitAttempt(models.Model):
         ).delete()
         return deleted_count
         
+
+
+class DashboardDailyCount(models.Model):
+    """
+    Daily rollup of the dashboard counters per client, site and status.
+    Rows are rebuilt per source and day by apps.core.dashboard_counts,
+    only closed days (before today) are stored.
+    """
+
+    client_id = models.BigIntegerField()
+    bu_id = models.BigIntegerField()
+    day = models.DateField()
+    source = models.CharField(max_length=20, help_text="jobneed, eventlog, ticket or wom")
+    kind = models.CharField(max_length=60, default='', help_text="identifier, event type or ticket source")
+    status = models.CharField(max_length=60, default='')
+    flag = models.BooleanField(default=False, help_text="alerts, located event or work permit")
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'dashboard_daily_count'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['client_id', 'bu_id', 'day', 'source', 'kind', 'status', 'flag'],
+                name='dashboard_daily_count_key'),
+        ]
+        indexes = [
+            models.Index(fields=['client_id', 'day'], name='dashboard_count_client_day'),
+            models.Index(fields=['source', 'day'], name='dashboard_count_source_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.source} {self.kind} {self.status} {self.count}"
+
+
+class OutboxEvent(models.Model):
+    """
+    Replication event written in the transaction of the change it
+    describes, published by the outbox relay (apps.core.outbox).
+    An object has at most one pending event per topic, later saves
+    only bump its version.
+    """
+
+    topic = models.CharField(max_length=100)
+    model = models.CharField(max_length=100, help_text="app_label.ModelName of the object")
+    name = models.CharField(max_length=50, help_text="model name used in the payload")
+    builder = models.CharField(max_length=200, help_text="dotted path of the payload builder")
+    object_pk = models.CharField(max_length=64)
+    created = models.BooleanField(default=False)
+    version = models.IntegerField(default=1, help_text="saves coalesced into this event")
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(default=timezone.now)
+    published_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'outbox_event'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['topic', 'model', 'name', 'object_pk'],
+                condition=models.Q(published_at__isnull=True),
+                name='outbox_event_pending_key'),
+        ]
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(published_at__isnull=True),
+                         name='outbox_event_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.topic} {self.model}:{self.object_pk} v{self.version}"
+
+
+class OutboxOffset(models.Model):
+    """
+    Delivery offset of the outbox relay per topic, the id of
+    the last event acknowledged by the broker.
+    """
+
+    topic = models.CharField(max_length=100, unique=True)
+    offset = models.BigIntegerField(default=0)
+    published = models.BigIntegerField(default=0, help_text="events published so far")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'outbox_offset'
+
+    def __str__(self):
+        return f"{self.topic}@{self.offset}"
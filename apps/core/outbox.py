@@ -0,0 +1,256 @@
+'''
+Transactional outbox of the replication events (redmine_to_noc).
+
+The post_save receivers used to serialize the instance and queue one
+publish_mqtt task per save, each opening its own broker connection, and
+events of rolled back transactions were published anyway. Now:
+
+- enqueue() writes an OutboxEvent in the saving transaction. There is at
+  most one pending event per object, later saves of the same object are
+  coalesced into it (ON CONFLICT on the pending key bumps its version).
+- relay() reads pending events in batches, one relay per database at a
+  time (a cache lock), builds the payloads from the current rows and
+  publishes the batch over the shared MQTT connection. No transaction is
+  open while the broker acknowledges the messages of the batch; the
+  events are then marked published in a short transaction, except those
+  saved again meanwhile (their version changed), which are relayed again
+  with the new row. The delivery offset per topic is kept in
+  OutboxOffset. A failed batch stays pending and is retried by the next
+  run.
+
+enqueue() kicks the relay_outbox task once the transaction commits. The
+kicks are debounced: the first one takes a cache lock for
+OUTBOX_KICK_DELAY seconds and delays the task by as long, so events
+committed while the lock is held are relayed by that run. The relay also
+purges the events published more than OUTBOX_RETENTION_DAYS ago, once per
+OUTBOX_PURGE_INTERVAL. `python manage.py run_outbox_relay` polls instead
+of waiting for kicks.
+'''
+import logging
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from apps.core.models import OutboxEvent, OutboxOffset
+from apps.tenants import registry
+
+log = logging.getLogger('django')
+
+OUTBOX_BATCH_SIZE = getattr(settings, 'OUTBOX_BATCH_SIZE', 500)
+OUTBOX_ACK_TIMEOUT = getattr(settings, 'OUTBOX_ACK_TIMEOUT', 30)
+OUTBOX_POLL_INTERVAL = getattr(settings, 'OUTBOX_POLL_INTERVAL', 2)
+OUTBOX_KICK_DELAY = getattr(settings, 'OUTBOX_KICK_DELAY', 2)
+OUTBOX_RETENTION_DAYS = getattr(settings, 'OUTBOX_RETENTION_DAYS', 7)
+OUTBOX_PURGE_INTERVAL = getattr(settings, 'OUTBOX_PURGE_INTERVAL', 3600)
+# a relay holding the lock of its database longer than this is assumed dead
+OUTBOX_RELAY_LOCK_TIMEOUT = getattr(settings, 'OUTBOX_RELAY_LOCK_TIMEOUT', OUTBOX_ACK_TIMEOUT + 60)
+KICK_KEY = 'outbox:relay-kick'
+RELAY_KEY = 'outbox:relay:{}'
+PURGE_KEY = 'outbox:purge:{}'
+
+
+def get_databases():
+    "databases whose outbox is relayed, every tenant database by default"
+    return registry.databases('OUTBOX_DATABASES')
+
+
+COALESCE_PENDING = '''
+    ON CONFLICT (topic, model, name, object_pk) WHERE published_at IS NULL
+    DO UPDATE SET version = outbox_event.version + 1, updated_at = EXCLUDED.updated_at
+'''
+
+ENQUEUE_SQL = '''
+    INSERT INTO outbox_event (topic, model, name, builder, object_pk, created, version, created_at, updated_at)
+    VALUES (%s, %s, %s, %s, %s, %s, 1, now(), now())
+''' + COALESCE_PENDING
+
+ENQUEUE_MANY_SQL = '''
+    INSERT INTO outbox_event (topic, model, name, builder, object_pk, created, version, created_at, updated_at)
+    SELECT %s, %s, %s, %s, pk, false, 1, now(), now() FROM (SELECT DISTINCT unnest(%s::text[]) AS pk) AS pks
+''' + COALESCE_PENDING
+
+
+class RelayError(Exception):
+    pass
+
+
+def enqueue(topic, instance, name, created, builder):
+    '''
+    records that instance changed, in the transaction of the change.
+    builder(instance, name, created) returns the payload, it is called by
+    the relay with the row as it is when the event is published.
+    '''
+    db = instance._state.db or 'default'
+    with connections[db].cursor() as cursor:
+        cursor.execute(ENQUEUE_SQL, [
+            topic, instance._meta.label, name, f"{builder.__module__}.{builder.__qualname__}",
+            str(instance.pk), created])
+    transaction.on_commit(kick, using=db)
+
+
+def kick():
+    "queues relay_outbox unless a run is already queued, see the module docstring"
+    if not cache.add(KICK_KEY, 1, OUTBOX_KICK_DELAY):
+        return
+    from background_tasks.tasks import relay_outbox
+    try:
+        relay_outbox.apply_async(countdown=OUTBOX_KICK_DELAY)
+    except Exception:
+        cache.delete(KICK_KEY)
+        log.error("could not queue the outbox relay, events stay pending", exc_info=True)
+
+
+def enqueue_many(topic, model, pks, name, builder, using='default'):
+    "records updates of rows written without save(), e.g. by a bulk UPDATE"
+    if not pks:
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(ENQUEUE_MANY_SQL, [
+            topic, model._meta.label, name, f"{builder.__module__}.{builder.__qualname__}",
+            [str(pk) for pk in pks]])
+    transaction.on_commit(kick, using=using)
+
+
+def build_messages(events, using='default'):
+    '''
+    (event, topic, payload) of events in id order, objects are fetched
+    with one query per model. Events of deleted objects are dropped.
+    '''
+    pks = defaultdict(set)
+    for event in events:
+        pks[event.model].add(event.object_pk)
+    objects = {}
+    for label, model_pks in pks.items():
+        model = apps.get_model(label)
+        for obj in model.objects.using(using).filter(pk__in=model_pks):
+            objects[(label, str(obj.pk))] = obj
+    builders, messages = {}, []
+    for event in events:
+        instance = objects.get((event.model, event.object_pk))
+        if instance is None:
+            log.warning(f"outbox event {event.id}: {event.model} {event.object_pk} no longer exists")
+            continue
+        if event.builder not in builders:
+            builders[event.builder] = import_string(event.builder)
+        messages.append((event, event.topic, builders[event.builder](instance, event.name, event.created)))
+    return messages
+
+
+def acknowledged(infos, timeout):
+    "waits until the broker acknowledged the MQTTMessageInfo of infos, False after timeout"
+    deadline = time.monotonic() + timeout
+    while not all(info.is_published() for info in infos):
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+def publish(messages, timeout=OUTBOX_ACK_TIMEOUT):
+    """
+    publishes (topic, payload) pairs over the shared connection and waits
+    for their acknowledgements, not for the other messages of the process
+    """
+    from mqtt_utils import get_publisher
+    import paho.mqtt.client as mqtt
+    infos = get_publisher().publish_many(messages)
+    if any(info.rc not in (mqtt.MQTT_ERR_SUCCESS, mqtt.MQTT_ERR_NO_CONN) for info in infos):
+        raise RelayError("broker refused messages of the batch")
+    if not acknowledged(infos, timeout):
+        raise RelayError(f"batch not acknowledged within {timeout}s")
+
+
+def update_offsets(events, using='default'):
+    last = {}
+    for event in events:
+        last[event.topic] = max(last.get(event.topic, 0), event.id)
+    for topic, offset in last.items():
+        count = sum(1 for event in events if event.topic == topic)
+        OutboxOffset.objects.using(using).get_or_create(topic=topic)
+        OutboxOffset.objects.using(using).filter(topic=topic).update(offset=offset, published=F('published') + count)
+
+
+def mark_published(events, using='default'):
+    "marks the events published unless saved again since they were read, returns those marked"
+    with transaction.atomic(using=using):
+        versions = dict(OutboxEvent.objects.using(using).select_for_update().filter(
+            id__in=[event.id for event in events]).values_list('id', 'version'))
+        published = [event for event in events if versions.get(event.id) == event.version]
+        OutboxEvent.objects.using(using).filter(id__in=[event.id for event in published]).update(
+            published_at=timezone.now())
+        update_offsets(published, using)
+    return published
+
+
+def relay_batch(batch_size=OUTBOX_BATCH_SIZE, using='default'):
+    "publishes one batch of pending events, returns the number of events relayed"
+    key = RELAY_KEY.format(using)
+    if not cache.add(key, 1, OUTBOX_RELAY_LOCK_TIMEOUT):
+        # the running relay may have read its batch before our events, relay again after it
+        kick()
+        return 0
+    try:
+        events = list(OutboxEvent.objects.using(using).filter(
+            published_at__isnull=True).order_by('id')[:batch_size])
+        if not events:
+            return 0
+        messages = build_messages(events, using)
+        if messages:
+            publish([(topic, payload) for _, topic, payload in messages])
+        published = mark_published(events, using)
+    finally:
+        cache.delete(key)
+    coalesced = sum(event.version for event in published)
+    log.info(f"outbox relayed {len(messages)} messages for {coalesced} saves")
+    if len(published) < len(events):
+        log.info(f"outbox: {len(events) - len(published)} events saved again while relayed stay pending")
+    return len(events)
+
+
+def relay(batch_size=OUTBOX_BATCH_SIZE, max_batches=100, using='default'):
+    "drains pending events batch by batch, returns the number of events relayed"
+    total = 0
+    for _ in range(max_batches):
+        relayed = relay_batch(batch_size, using)
+        total += relayed
+        if relayed < batch_size:
+            break
+    return total
+
+
+def relay_forever(poll_interval=OUTBOX_POLL_INTERVAL, batch_size=OUTBOX_BATCH_SIZE):
+    while True:
+        relayed = 0
+        for db in get_databases():
+            try:
+                relayed += relay(batch_size, using=db)
+                purge_if_due(using=db)
+            except Exception:
+                log.error(f"outbox relay of {db} failed, retrying", exc_info=True)
+        if not relayed:
+            time.sleep(poll_interval)
+
+
+def purge(days=OUTBOX_RETENTION_DAYS, using='default'):
+    "deletes events published more than days ago"
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = OutboxEvent.objects.using(using).filter(published_at__lt=cutoff).delete()
+    return deleted
+
+
+def purge_if_due(using='default'):
+    "purge() at most once per OUTBOX_PURGE_INTERVAL and database, returns the rows deleted"
+    if not cache.add(PURGE_KEY.format(using), 1, OUTBOX_PURGE_INTERVAL):
+        return 0
+    deleted = purge(using=using)
+    if deleted:
+        log.info(f"outbox of {using}: {deleted} published events purged")
+    return deleted
@@ -0,0 +1,235 @@
+'''
+In-process rate limiting of the authentication attempts.
+
+PostgreSQLRateLimitMiddleware used to call the check_rate_limit SQL function
+and insert a RateLimitAttempt row on every POST of the limited paths, a
+mobile sync storm wrote more rows than the sync itself.
+
+The limits are now token buckets kept in the memory of the process:
+
+- a username may fail RATE_LIMIT_MAX_ATTEMPTS times and an ip address
+  three times as much, a bucket refills its capacity over
+  RATE_LIMIT_WINDOW_MINUTES, as the sliding window of check_rate_limit,
+- an attempt is blocked when the bucket of its username is empty, else
+  when the bucket of its ip address is empty (username first, as
+  check_rate_limit),
+- attempts are buffered and written with one bulk insert every
+  RATE_LIMIT_FLUSH_INTERVAL seconds by a thread of the process, which then
+  reads the failures of the window written by the other processes and
+  drains the buckets accordingly. A lockout reaches the other processes
+  within a flush interval.
+
+check() and record() do not touch the database, their cost is a dict
+lookup under a lock.
+'''
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connections
+from django.db.models import Count
+from django.utils import timezone
+
+log = logging.getLogger('django')
+
+WINDOW_MINUTES = getattr(settings, 'RATE_LIMIT_WINDOW_MINUTES', 15)
+MAX_ATTEMPTS = getattr(settings, 'RATE_LIMIT_MAX_ATTEMPTS', 5)
+IP_FACTOR = 3
+FLUSH_INTERVAL = getattr(settings, 'RATE_LIMIT_FLUSH_INTERVAL', 5)
+# attempts kept in memory when the database is unreachable
+MAX_PENDING = getattr(settings, 'RATE_LIMIT_MAX_PENDING', 10000)
+
+USER_BLOCKED = 'Account temporarily locked due to too many failed login attempts'
+IP_BLOCKED = 'IP address temporarily blocked due to excessive failed attempts'
+
+_lock = threading.Lock()
+_buckets = {}
+_pending = []
+_state = {'pid': None, 'thread': None}
+
+
+class Bucket:
+    __slots__ = ('tokens', 'updated')
+
+    def __init__(self, tokens, updated):
+        self.tokens, self.updated = tokens, updated
+
+
+def capacity(kind):
+    return MAX_ATTEMPTS * IP_FACTOR if kind == 'ip' else MAX_ATTEMPTS
+
+
+def refill(bucket, size, now):
+    bucket.tokens = min(size, bucket.tokens + (now - bucket.updated) * size / (WINDOW_MINUTES * 60))
+    bucket.updated = now
+
+
+def tokens(using, kind, value, now):
+    "tokens left in a bucket, must be called under the lock"
+    bucket = _buckets.get((using, kind, value))
+    if bucket is None:
+        return capacity(kind)
+    refill(bucket, capacity(kind), now)
+    return bucket.tokens
+
+
+def consume(using, kind, value, now, count=1):
+    "takes count tokens, must be called under the lock"
+    size = capacity(kind)
+    bucket = _buckets.get((using, kind, value))
+    if bucket is None:
+        bucket = _buckets[(using, kind, value)] = Bucket(size, now)
+    refill(bucket, size, now)
+    bucket.tokens = max(0.0, bucket.tokens - count)
+
+
+def check(ip_address, username=None, using='default'):
+    "blocking decision in the format of check_rate_limit"
+    now = time.monotonic()
+    with _lock:
+        user_left = tokens(using, 'user', username, now) if username else MAX_ATTEMPTS
+        ip_left = tokens(using, 'ip', ip_address, now)
+    user_attempts = round(MAX_ATTEMPTS - user_left)
+    ip_attempts = round(MAX_ATTEMPTS * IP_FACTOR - ip_left)
+    strategy, reason = 'none', ''
+    if username and user_left < 1:
+        strategy, reason = 'username', USER_BLOCKED
+    elif ip_left < 1:
+        strategy, reason = 'ip', IP_BLOCKED
+    return {
+        'is_blocked': strategy != 'none',
+        'ip_attempts': ip_attempts,
+        'user_attempts': user_attempts,
+        'total_attempts': max(ip_attempts, user_attempts),
+        'max_attempts': MAX_ATTEMPTS,
+        'block_reason': reason,
+        'time_window_minutes': WINDOW_MINUTES,
+        'blocking_strategy': strategy,
+    }
+
+
+def record(ip_address, username=None, user_agent=None, attempt_type='login', success=False,
+           failure_reason=None, using='default'):
+    "counts a failed attempt in the buckets and buffers the attempt for the next flush"
+    now = time.monotonic()
+    attempt = (using, dict(
+        ip_address=ip_address, username=username, user_agent=user_agent, attempt_type=attempt_type,
+        success=success, failure_reason=failure_reason, attempt_time=timezone.now()))
+    with _lock:
+        if not success:
+            consume(using, 'ip', ip_address, now)
+            if username:
+                consume(using, 'user', username, now)
+        if len(_pending) < MAX_PENDING:
+            _pending.append(attempt)
+
+
+def write(attempts):
+    "bulk inserts the buffered attempts, returns those not written"
+    from apps.core.models import RateLimitAttempt
+    by_db, failed = defaultdict(list), []
+    for using, fields in attempts:
+        by_db[using].append(fields)
+    for using, rows in by_db.items():
+        try:
+            RateLimitAttempt.objects.using(using).bulk_create([RateLimitAttempt(**fields) for fields in rows])
+        except DatabaseError:
+            log.error(f"{len(rows)} rate limit attempts of {using} not written", exc_info=True)
+            failed.extend((using, fields) for fields in rows)
+    return failed
+
+
+def failures(using):
+    "{(kind, value): failed attempts} of the window written by every process"
+    from apps.core.models import RateLimitAttempt
+    since = timezone.now() - timedelta(minutes=WINDOW_MINUTES)
+    qset = RateLimitAttempt.objects.using(using).filter(success=False, attempt_time__gt=since).order_by()
+    counts = Counter()
+    for username, count in qset.exclude(username=None).values('username').annotate(
+            count=Count('id')).values_list('username', 'count'):
+        counts[('user', username)] = count
+    for ip_address, count in qset.values('ip_address').annotate(
+            count=Count('id')).values_list('ip_address', 'count'):
+        counts[('ip', ip_address)] = count
+    return counts
+
+
+def sync(using):
+    "drains the buckets of the failures written by the other processes"
+    counts = failures(using)
+    now = time.monotonic()
+    with _lock:
+        for (kind, value), count in counts.items():
+            left = capacity(kind) - count
+            if tokens(using, kind, value, now) > left:
+                _buckets[(using, kind, value)] = Bucket(max(0.0, left), now)
+        # full buckets carry no state
+        for key in [key for key in _buckets if key[0] == using
+                    and key[1:] not in counts and tokens(*key, now) >= capacity(key[1])]:
+            del _buckets[key]
+
+
+def flush():
+    "writes the buffered attempts and syncs the buckets, returns the attempts written"
+    with _lock:
+        attempts = _pending[:]
+        del _pending[:]
+    failed = write(attempts) if attempts else []
+    if failed:
+        with _lock:
+            _pending[:0] = failed[:max(0, MAX_PENDING - len(_pending))]
+    for using in {using for using, _ in attempts} | {key[0] for key in list(_buckets)}:
+        try:
+            sync(using)
+        except DatabaseError:
+            log.error(f"rate limit buckets of {using} not synced", exc_info=True)
+    return len(attempts) - len(failed)
+
+
+def flush_safely():
+    try:
+        flush()
+    except Exception:
+        log.error("rate limit flush failed", exc_info=True)
+        return False
+    return True
+
+
+def flush_in_thread():
+    """
+    flush of the flush thread, no request wraps it: the connections of the
+    thread are recycled as the request signals do, and closed after a failure
+    """
+    close_old_connections()
+    if not flush_safely():
+        connections.close_all()
+
+
+def run():
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        flush_in_thread()
+
+
+def start():
+    "starts the flush thread of the process, again after a fork"
+    with _lock:
+        if _state['pid'] == os.getpid() and _state['thread'].is_alive():
+            return
+        _state['pid'] = os.getpid()
+        _state['thread'] = threading.Thread(target=run, name='rate-limit-flush', daemon=True)
+        _state['thread'].start()
+    # attempts buffered since the last flush
+    atexit.register(flush_safely)
+
+
+def reset():
+    "forgets the buckets and the buffered attempts of the process"
+    with _lock:
+        _buckets.clear()
+        del _pending[:]
@@ -12,14 +12,13 @@ def get_query(q):
                                                 order by xpath
                                             ''',
         'get_childrens_of_bt':              '''
-                                                WITH RECURSIVE cap(id, bucode, parent_id, butree, depth, path, xpath) AS (
-                                                SELECT id,  bucode, parent_id, butree, 1::INT AS depth, bt.bucode::TEXT AS path, bt.id::text as xpath
-                                                FROM bt
-                                                WHERE id = %s
-                                                UNION ALL
-                                                SELECT ch.id, ch.bucode, ch.parent_id, ch.butree,  rt.depth + 1 AS depth, (rt.path || '->' || ch.bucode::TEXT), (xpath||'>'||ch.id||rt.depth + 1)
-                                                FROM bt ch INNER JOIN cap rt ON rt.id = ch.parent_id)
-                                                select * from cap
+                                                SELECT bt.id, bt.bucode, bt.parent_id, bt.butree, c.depth + 1 AS depth,
+                                                (SELECT string_agg(a.bucode::TEXT, '->' ORDER BY p.depth DESC) FROM bt_closure p JOIN bt a ON a.id = p.ancestor
+                                                 WHERE p.descendant = c.descendant AND p.depth <= c.depth) AS path,
+                                                (SELECT string_agg(p.ancestor::TEXT, '>' ORDER BY p.depth DESC) FROM bt_closure p
+                                                 WHERE p.descendant = c.descendant AND p.depth <= c.depth) AS xpath
+                                                FROM bt_closure c INNER JOIN bt ON bt.id = c.descendant
+                                                WHERE c.ancestor = %s
                                                 order by xpath
                                             ''',
         'tsitereportdetails':               '''
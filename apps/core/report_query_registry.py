@@ -0,0 +1,182 @@
+'''
+Compiled, parameterized forms of the named report queries.
+
+The report designs used to interpolate their arguments into the SQL of
+apps.core.report_queries with str.format, so every run was a new statement
+for PostgreSQL. Each named query is compiled once into a bind parameter
+form: quoted '{name}' placeholders become parameters and comma separated id
+lists parsed with string_to_array become a single bigint[] parameter. A
+compiled query can also run as a server side prepared statement which is
+prepared once per database connection, and every run is bounded by a
+statement timeout.
+'''
+import logging
+import re
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections, transaction, DatabaseError
+
+from apps.core.report_queries import get_query
+
+logger = logging.getLogger('django')
+
+# seconds a report query may run, overridable per report
+DEFAULT_STATEMENT_TIMEOUT = getattr(settings, 'REPORT_STATEMENT_TIMEOUT', 300)
+STATEMENT_TIMEOUTS = getattr(settings, 'REPORT_STATEMENT_TIMEOUTS', {})
+# named prepared statements do not survive transaction pooling (pgbouncer)
+USE_PREPARED_STATEMENTS = getattr(settings, 'REPORT_PREPARED_STATEMENTS', False)
+# rows fetched per round trip by streaming exports
+STREAM_CHUNK_SIZE = getattr(settings, 'REPORT_STREAM_CHUNK_SIZE', 2000)
+
+ARRAY_PARAM = re.compile(
+    r"IN\s*\(\s*SELECT\s+unnest\(\s*string_to_array\(\s*'\{(\w+)\}'\s*,\s*','\s*\)::integer\[\]\s*\)\s*\)",
+    re.IGNORECASE)
+PARAM = re.compile(r"'\{(\w+)\}'|\{(\w+)\}")
+
+
+class ReportQuery:
+    '''
+    A named report query compiled into bind parameter form.
+    '''
+
+    def __init__(self, name, raw_sql):
+        self.name = name
+        self.statement = 'report_' + re.sub(r'\W', '_', name).lower()
+        self.array_params = set(ARRAY_PARAM.findall(raw_sql))
+        sql = ARRAY_PARAM.sub(lambda m: "= ANY({%s})" % m.group(1), raw_sql)
+        self.params = list(dict.fromkeys(a or b for a, b in PARAM.findall(sql)))
+        positions = {param: i for i, param in enumerate(self.params, start=1)}
+        # client side binding needs literal % doubled, PREPARE sends the text as is
+        self.sql = PARAM.sub(lambda m: self._bind(m, '%({})s'), sql.replace('%', '%%'))
+        self.prepare_sql = PARAM.sub(
+            lambda m: self._bind(m, '${}', positions), sql)
+
+    def _bind(self, match, style, positions=None):
+        param = match.group(1) or match.group(2)
+        placeholder = style.format(positions[param] if positions else param)
+        return f'{placeholder}::bigint[]' if param in self.array_params else placeholder
+
+    def bind(self, args):
+        '''
+        returns the query parameters from the report args, id lists
+        may be comma separated strings or sequences.
+        '''
+        missing = [param for param in self.params if param not in args]
+        if missing:
+            raise KeyError(f"{self.name} is missing query args {missing}")
+        return {param: to_id_list(args[param]) if param in self.array_params else args[param]
+                for param in self.params}
+
+
+def to_id_list(value):
+    if isinstance(value, str):
+        return [int(v) for v in value.split(',') if v.strip()]
+    if isinstance(value, (list, tuple, set)):
+        return [int(v) for v in value]
+    return [int(value)]
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def get_report_query(name):
+    "Returns the compiled ReportQuery of a named report query"
+    if name not in _registry:
+        raw_sql = get_query(name)
+        if raw_sql is None:
+            raise KeyError(f"Report query {name} does not exist")
+        with _registry_lock:
+            _registry.setdefault(name, ReportQuery(name, raw_sql))
+    return _registry[name]
+
+
+def get_statement_timeout(name):
+    return STATEMENT_TIMEOUTS.get(name, DEFAULT_STATEMENT_TIMEOUT)
+
+
+def _prepared_statements(connection):
+    '''
+    names prepared on the current physical connection, forgotten
+    whenever django reconnects.
+    '''
+    raw = connection.connection
+    state = getattr(connection, '_report_statements', None)
+    if state is None or state[0] is not raw:
+        state = connection._report_statements = (raw, set())
+    return state[1]
+
+
+def _execute_prepared(cursor, connection, query, params):
+    prepared = _prepared_statements(connection)
+    if query.statement not in prepared:
+        try:
+            with transaction.atomic(using=connection.alias):
+                cursor.execute(f'PREPARE {query.statement} AS {query.prepare_sql}')
+        except DatabaseError as e:
+            logger.warning(f"Could not prepare {query.name}, running it unprepared: {e}")
+            return cursor.execute(query.sql, params)
+        prepared.add(query.statement)
+    placeholders = ', '.join(['%s'] * len(query.params))
+    args = [params[param] for param in query.params]
+    return cursor.execute(
+        f'EXECUTE {query.statement}({placeholders})' if args else f'EXECUTE {query.statement}', args)
+
+
+def run_report_query(name, args, db='default', timeout=None, prepared=None):
+    '''
+    Runs a named report query with bind parameters and returns the rows
+    as dicts, the way runrawsql(get_query(name), args, named_params=True) did.
+    '''
+    from apps.core.utils import dictfetchall
+
+    query = get_report_query(name)
+    params = query.bind(args)
+    timeout = get_statement_timeout(name) if timeout is None else timeout
+    prepared = USE_PREPARED_STATEMENTS if prepared is None else prepared
+    connection = connections[db]
+    logger.debug(f"\n\nREPORT QUERY: {name} | PARAMS: {params}\n")
+    with transaction.atomic(using=db), connection.cursor() as cursor:
+        if timeout:
+            cursor.execute("SELECT set_config('statement_timeout', %s, true)", [str(int(timeout * 1000))])
+        if prepared:
+            _execute_prepared(cursor, connection, query, params)
+        else:
+            cursor.execute(query.sql, params)
+        return dictfetchall(cursor)
+
+
+@contextmanager
+def stream_report_query(name, args, db='default', chunk_size=STREAM_CHUNK_SIZE, timeout=None):
+    '''
+    Runs a named report query through a server side (named) cursor and
+    yields (columns, rows) where rows iterates over row tuples fetched
+    chunk_size at a time, so the result never sits in memory at once.
+    '''
+    query = get_report_query(name)
+    params = query.bind(args)
+    timeout = get_statement_timeout(name) if timeout is None else timeout
+    connection = connections[db]
+    logger.debug(f"\n\nSTREAMING REPORT QUERY: {name} | PARAMS: {params}\n")
+    with transaction.atomic(using=db):
+        if timeout:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT set_config('statement_timeout', %s, true)", [str(int(timeout * 1000))])
+        cursor = connection.chunked_cursor()
+        try:
+            cursor.execute(query.sql, params)
+            # named cursors only describe the result once rows are fetched
+            first = cursor.fetchmany(chunk_size)
+            columns = [col[0] for col in cursor.description]
+
+            def rows():
+                chunk = first
+                while chunk:
+                    yield from chunk
+                    chunk = cursor.fetchmany(chunk_size)
+
+            yield columns, rows()
+        finally:
+            cursor.close()
@@ -0,0 +1,139 @@
+'''
+Server side search of the DataTables list views.
+
+The search box used to become an OR of icontains over every column of the
+grid, across joins, followed by a count(). An OR mixing columns of several
+tables, or any column without a suitable index, is a sequential scan of
+jobneed, people ... on every keystroke.
+
+search_q() builds the search condition from the model and the searched
+columns:
+
+- text columns are searched with icontains, a trigram index (GinIndex with
+  the gin_trgm_ops opclass in Meta.indexes) serves ILIKE '%term%' for terms
+  of 3 characters and more,
+- columns with choices are searched by the choices matching the term,
+- integer columns only match a numeric term exactly,
+- date and time columns are matched as text (plandatetime::text ILIKE
+  '%2024-05%') when the term has a digit, annotations of the list
+  queryset are matched as text too, as the icontains OR did,
+- columns of related models become `fk IN (SELECT id FROM related WHERE
+  ...)`, evaluated once against the related table,
+- every requested column stays searchable, a text column without trigram
+  index is kept in the OR, the search then falls back to a scan of the
+  table. The columns the grids send are the ones to index.
+
+count() returns the planner estimate instead of an exact count when it is
+above SEARCH_ESTIMATE_THRESHOLD rows.
+'''
+import json
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections, models
+from django.db.models import Q
+
+ESTIMATE_THRESHOLD = getattr(settings, 'SEARCH_ESTIMATE_THRESHOLD', 100000)
+
+
+def resolve(model, path):
+    '''
+    (relation, related model, field) of a lookup path, relation is the path
+    of the foreign keys followed ('' for a field of model). None for
+    annotations and reverse or many to many relations.
+    '''
+    parts, relation = path.split('__'), []
+    for part in parts[:-1]:
+        try:
+            field = model._meta.get_field(part)
+        except Exception:
+            return None
+        if not (field.many_to_one or field.one_to_one) or not field.concrete:
+            return None
+        relation.append(part)
+        model = field.related_model
+    try:
+        field = model._meta.get_field(parts[-1])
+    except Exception:
+        return None
+    if field.is_relation:
+        return None
+    return '__'.join(relation), model, field
+
+
+def field_q(field, term):
+    "condition of one field, None when the field is not searched"
+    name = field.name
+    if field.choices:
+        term = term.lower()
+        values = [value for value, label in field.flatchoices
+                  if term in str(value).lower() or term in str(label).lower()]
+        return Q(**{f'{name}__in': values}) if values else None
+    if isinstance(field, models.IntegerField):
+        return Q(**{name: int(term)}) if term.isdigit() and len(term) < 19 else None
+    if isinstance(field, (models.CharField, models.TextField)):
+        return Q(**{f'{name}__icontains': term})
+    if isinstance(field, (models.DateField, models.TimeField)):
+        return Q(**{f'{name}__icontains': term}) if any(c.isdigit() for c in term) else None
+    return None
+
+
+def is_field(model, name):
+    try:
+        model._meta.get_field(name)
+    except Exception:
+        return False
+    return True
+
+
+def search_q(model, fields, term):
+    '''
+    Q searching term in the fields of model, fields are lookup paths as
+    passed to values(). None when nothing is searched, callers skip
+    the filter then.
+    '''
+    term = (term or '').strip()
+    if not term:
+        return None
+    conditions, related_models = defaultdict(Q), {}
+    for path in fields:
+        resolved = resolve(model, path)
+        if resolved is None:
+            if '__' not in path and not is_field(model, path):
+                # an annotation of the list queryset
+                conditions[''] |= Q(**{f'{path}__icontains': term})
+            continue
+        relation, related, field = resolved
+        if (condition := field_q(field, term)) is not None:
+            conditions[relation] |= condition
+            related_models[relation] = related
+    if not conditions:
+        return None
+    qobjs = Q()
+    for relation, condition in conditions.items():
+        if not relation:
+            qobjs |= condition
+        else:
+            subquery = related_models[relation]._base_manager.filter(condition).values('pk')
+            qobjs |= Q(**{f'{relation}__in': subquery})
+    return qobjs
+
+
+def estimated_count(qset):
+    "rows estimated by the planner for qset"
+    sql, params = qset.order_by().query.sql_with_params()
+    with connections[qset.db].cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def count(qset, threshold=ESTIMATE_THRESHOLD):
+    "exact count of qset, the planner estimate when it is above threshold"
+    if threshold:
+        estimate = estimated_count(qset)
+        if estimate >= threshold:
+            return estimate
+    return qset.count()
@@ -0,0 +1,99 @@
+'''
+Registry of the NONE sentinel rows.
+
+Nullable relations point to a NONE row per table (people, jobneed, ticket,
+qsetblng ...) created by the get_or_create_none_* helpers of
+apps.core.utils. Those ran a get_or_create on every call, Jobneed.save()
+alone calls one on every save and the scheduler calls them inside loops.
+
+The helpers are registered here with @sentinel(name) and resolve each
+NONE row once per process and database, callers get a copy of the cached
+instance. A row resolved outside a transaction is cached at once. Inside
+a transaction it is only cached once the transaction commits, even a row
+found rather than created may come from that transaction, a rolled back
+NONE row is never handed out again.
+
+invalidate() drops cached rows, it runs on post_migrate (also sent by
+flush). warmup() resolves every NONE row of a database, celery workers
+run it when they start.
+'''
+import copy
+import logging
+from functools import wraps
+
+from django.db import connections, transaction
+from django.db.models.signals import post_migrate
+
+log = logging.getLogger('django')
+
+FACTORIES = {}
+_sentinels = {}
+
+
+def get_db(using=None):
+    from apps.core.utils import get_current_db_name
+    return using or get_current_db_name()
+
+
+def remember(db, name, obj):
+    _sentinels[(db, name)] = obj
+
+
+def resolve(name, using=None):
+    "NONE row of name in the database, created when missing"
+    db = get_db(using)
+    obj = _sentinels.get((db, name))
+    if obj is not None:
+        return copy.copy(obj), False
+    obj, created = FACTORIES[name](db)
+    # a row found inside a transaction may have been created earlier in it
+    if connections[db].in_atomic_block:
+        transaction.on_commit(lambda: remember(db, name, obj), using=db)
+    else:
+        remember(db, name, obj)
+    return copy.copy(obj), created
+
+
+def get_id(name, using=None):
+    return resolve(name, using)[0].id
+
+
+def sentinel(name, returns_created=False):
+    '''
+    registers a factory returning (obj, created) for the NONE row of name.
+    The decorated helper returns the instance, or (obj, created) when
+    returns_created is set.
+    '''
+    def decorator(factory):
+        FACTORIES[name] = factory
+
+        @wraps(factory)
+        def helper(using=None):
+            obj, created = resolve(name, using)
+            return (obj, created) if returns_created else obj
+        helper.factory = factory
+        return helper
+    return decorator
+
+
+def invalidate(name=None, using=None):
+    "drops the cached NONE rows, of every database and name by default"
+    for db, cached in list(_sentinels):
+        if (using is None or db == using) and (name is None or cached == name):
+            del _sentinels[(db, cached)]
+
+
+def warmup(using=None):
+    "resolves every NONE row of the database, returns the names resolved"
+    db = get_db(using)
+    for name in FACTORIES:
+        resolve(name, db)
+    log.info(f"{len(FACTORIES)} NONE rows of {db} resolved")
+    return list(FACTORIES)
+
+
+def invalidate_on_migrate(sender, using=None, **kwargs):
+    invalidate(using=using)
+
+
+post_migrate.connect(invalidate_on_migrate, dispatch_uid='sentinels_invalidate_on_migrate')
@@ -0,0 +1,93 @@
+"""
+Tests for the daily rollup of the dashboard counters
+"""
+from datetime import date, timedelta
+from unittest.mock import patch
+
+from apps.core import dashboard_counts
+
+
+def row(source, kind, status='', flag=False, count=1, bu_id=4):
+    return dict(source=source, bu_id=bu_id, kind=kind, status=status, flag=flag, count=count)
+
+
+ROWS = [
+    row('jobneed', 'TASK', 'ASSIGNED', count=3),
+    row('jobneed', 'TASK', 'COMPLETED', flag=True, count=2),
+    row('jobneed', 'TASK', 'COMPLETED', count=1, bu_id=5),
+    row('jobneed', 'INTERNALTOUR', 'PARTIALLYCOMPLETED', flag=True),
+    row('jobneed', 'PPM', 'AUTOCLOSED', count=4),
+    row('jobneed', 'INCIDENTREPORT', 'COMPLETED', count=2),
+    row('eventlog', 'SOS', count=2),
+    row('eventlog', 'MARK', count=5),
+    row('eventlog', 'DIVERSION'),
+    row('eventlog', 'DIVERSION', flag=True),
+    row('eventlog', 'FIRE', flag=True),
+    row('ticket', 'USERDEFINED', 'OPEN', count=2),
+    row('ticket', 'SYSTEMGENERATED', 'NEW', count=3),
+    row('wom', 'NOT_REQUIRED', 'COMPLETED', flag=True),
+    row('wom', 'APPROVED', 'ASSIGNED', flag=True, count=2, bu_id=9),
+    row('jobneed', 'TASK', 'ASSIGNED', count=7, bu_id=6),
+]
+
+
+class TestBuildCounts:
+
+    def test_counters_match_manager_shapes(self):
+        counts = dashboard_counts.build_counts(ROWS, [4, 5], 9, ['FIRE'])
+        assert counts['task'] == [3, 3, 0, 6]
+        assert counts['tour'] == [0, 0, 1, 1]
+        assert counts['ppm'] == [0, 0, 4, 4]
+        assert counts['IR_count'] == 2
+        assert counts['sos_count'] == 2
+        assert counts['FR_fail_count'] == 5
+        assert counts['diversion_count'] == 1
+        assert counts['sitecrisis_count'] == 1
+        assert counts['alertchart'] == ([2, 1, 0, 3], 6)
+        assert counts['ticketchart'] == ([0, 0, 2, 0, 0, 0, 3], 5)
+        assert counts['womchart'] == ([0, 0, 1, 0, 0, 0], 1)
+
+    def test_workpermits_are_counted_for_the_session_site(self):
+        counts = dashboard_counts.build_counts(ROWS, ['4', '5'], '9')
+        assert counts['workpermit_count'] == 2
+        assert counts['task'][-1] == 6
+
+
+class TestGetRows:
+
+    @patch('apps.core.dashboard_counts.aggregate', return_value=[])
+    @patch('apps.core.dashboard_counts.DashboardDailyCount')
+    @patch('apps.core.dashboard_counts.timezone.localdate', return_value=date(2025, 3, 10))
+    def test_closed_days_are_not_aggregated(self, mock_today, mock_model, mock_aggregate):
+        mock_model.objects.filter.return_value.values.return_value.annotate.return_value.order_by.return_value = [
+            dict(row('jobneed', 'TASK', 'ASSIGNED'), total=3)]
+        rows = dashboard_counts.get_rows(1, {4}, date(2025, 3, 1), date(2025, 3, 9))
+        assert rows[0]['count'] == 3
+        assert mock_model.objects.filter.call_args.kwargs['day__lte'] == date(2025, 3, 9)
+        mock_aggregate.assert_not_called()
+
+    @patch('apps.core.dashboard_counts.aggregate', return_value=[])
+    @patch('apps.core.dashboard_counts.DashboardDailyCount')
+    @patch('apps.core.dashboard_counts.timezone.localdate', return_value=date(2025, 3, 10))
+    def test_only_today_is_aggregated(self, mock_today, mock_model, mock_aggregate):
+        dashboard_counts.get_rows(1, {4}, date(2025, 3, 1), date(2025, 3, 10))
+        assert mock_model.objects.filter.call_args.kwargs['day__lte'] == date(2025, 3, 10) - timedelta(days=1)
+        assert mock_aggregate.call_count == len(dashboard_counts.SOURCES)
+        for call in mock_aggregate.call_args_list:
+            assert call.args[1:] == (date(2025, 3, 10), date(2025, 3, 10))
+
+
+class TestRefresh:
+
+    @patch('apps.core.dashboard_counts.rebuild_day')
+    @patch('apps.core.dashboard_counts.touched_days', return_value={date(2025, 2, 1)})
+    @patch('apps.core.dashboard_counts.cache')
+    @patch('apps.core.dashboard_counts.timezone.localdate', return_value=date(2025, 3, 10))
+    def test_each_database_keeps_its_own_rollup(self, mock_today, mock_cache, mock_touched, mock_rebuild):
+        mock_cache.get.return_value = None
+        rebuilt = dashboard_counts.refresh(days=2, using='sps')
+        assert rebuilt == 3 * len(dashboard_counts.SOURCES)
+        mock_cache.get.assert_called_once_with('dashboard_counts_last_refresh:sps')
+        assert mock_cache.set.call_args.args[0] == 'dashboard_counts_last_refresh:sps'
+        assert {call.args[2] for call in mock_rebuild.call_args_list} == {'sps'}
+        assert {call.args[3] for call in mock_touched.call_args_list} == {'sps'}
@@ -0,0 +1,85 @@
+"""
+Tests for the reverse geocoding service
+"""
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from apps.core import geocoding
+
+
+class FakeProvider:
+    "local provider counting its lookups"
+
+    def __init__(self, address='Gate 1, Sector 5'):
+        self.address, self.calls = address, []
+
+    def reverse(self, lat, lon):
+        self.calls.append((lat, lon))
+        return self.address
+
+
+class FakeCache(dict):
+
+    def get(self, key, default=None):
+        return super().get(key, default)
+
+    def set(self, key, value, timeout=None):
+        self[key] = value
+
+
+@pytest.fixture
+def provider():
+    fake, cache = FakeProvider(), FakeCache()
+    with patch('apps.core.geocoding.get_provider', return_value=fake), patch('apps.core.geocoding.cache', cache):
+        fake.cache = cache
+        yield fake
+
+
+def point(lat, lon):
+    return SimpleNamespace(coords=(lon, lat))
+
+
+def test_geohash():
+    assert geocoding.geohash(57.64911, 10.40744, precision=11) == 'u4pruydqqvj'
+
+
+def test_points_of_the_same_cell_share_the_address(provider):
+    assert geocoding.reverse(28.61390, 77.20900) == 'Gate 1, Sector 5'
+    # about 5 m away
+    assert geocoding.reverse(28.61393, 77.20903) == 'Gate 1, Sector 5'
+    assert len(provider.calls) == 1
+
+
+def test_memoized_lookups_skip_the_cache(provider):
+    geocoding.reverse(28.6139, 77.2090)
+    with geocoding.memoize():
+        geocoding.cached(28.6139, 77.2090)
+        provider.cache.clear()
+        assert geocoding.cached(28.6139, 77.2090) == 'Gate 1, Sector 5'
+    assert geocoding.cached(28.6139, 77.2090) is None
+
+
+def test_failed_lookup_is_not_repeated(provider):
+    provider.reverse = MagicMock(side_effect=IOError('quota exceeded'))
+    assert geocoding.reverse(28.6139, 77.2090) == ''
+    assert geocoding.reverse(28.6139, 77.2090) == ''
+    assert provider.reverse.call_count == 1
+
+
+def test_invalid_points_are_not_looked_up(provider):
+    assert geocoding.reverse_point(point(0.0, 0.0)) == ''
+    assert geocoding.reverse_point(None) == ''
+    assert provider.calls == []
+
+
+@patch('apps.core.geocoding.defer')
+def test_fill_addresses_defers_uncached_points(mock_defer, provider):
+    geocoding.reverse(28.6139, 77.2090)
+    obj = SimpleNamespace(geojson={}, startlocation=point(28.6139, 77.2090),
+                          endlocation=point(19.0760, 72.8777), gpslocation=None)
+    assert geocoding.fill_addresses(obj, ['startlocation', 'endlocation', 'gpslocation']) == ['endlocation']
+    assert obj.geojson == {'startlocation': 'Gate 1, Sector 5', 'gpslocation': ''}
+    mock_defer.assert_called_once_with(obj, ['endlocation'])
+    assert len(provider.calls) == 1
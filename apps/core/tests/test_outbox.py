@@ -0,0 +1,187 @@
+"""
+Tests for the transactional outbox of the replication events
+"""
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from apps.core import outbox
+
+
+def payload(instance, name, created):
+    return f"{name}:{instance.pk}:{'CREATE' if created else 'UPDATE'}"
+
+
+BUILDER = f"{__name__}.payload"
+
+
+def event(id, pk, model='activity.Asset', name='Asset', created=False, version=1, topic='redmine_to_noc'):
+    return SimpleNamespace(id=id, topic=topic, model=model, name=name, builder=BUILDER,
+                           object_pk=str(pk), created=created, version=version)
+
+
+class TestEnqueue:
+
+    @patch('apps.core.outbox.transaction')
+    @patch('apps.core.outbox.connections')
+    def test_pending_event_is_upserted_in_the_saving_connection(self, mock_connections, mock_transaction):
+        instance = MagicMock(pk=7)
+        instance._state.db = 'tenant'
+        instance._meta.label = 'activity.Asset'
+        outbox.enqueue('redmine_to_noc', instance, 'Asset', True, payload)
+        mock_connections.__getitem__.assert_called_with('tenant')
+        cursor = mock_connections.__getitem__.return_value.cursor.return_value.__enter__.return_value
+        sql, params = cursor.execute.call_args.args
+        assert 'ON CONFLICT (topic, model, name, object_pk) WHERE published_at IS NULL' in sql
+        assert params == ['redmine_to_noc', 'activity.Asset', 'Asset', BUILDER, '7', True]
+        mock_transaction.on_commit.assert_called_once_with(outbox.kick, using='tenant')
+
+
+class TestKick:
+
+    @patch('background_tasks.tasks.relay_outbox')
+    @patch('apps.core.outbox.cache')
+    def test_relay_is_queued_once_per_delay(self, mock_cache, mock_relay):
+        mock_cache.add.side_effect = [True, False]
+        outbox.kick()
+        outbox.kick()
+        mock_cache.add.assert_called_with(outbox.KICK_KEY, 1, outbox.OUTBOX_KICK_DELAY)
+        mock_relay.apply_async.assert_called_once_with(countdown=outbox.OUTBOX_KICK_DELAY)
+
+    @patch('background_tasks.tasks.relay_outbox')
+    @patch('apps.core.outbox.cache')
+    def test_lock_is_released_when_the_broker_is_down(self, mock_cache, mock_relay):
+        mock_cache.add.return_value = True
+        mock_relay.apply_async.side_effect = ConnectionError('broker down')
+        outbox.kick()
+        mock_cache.delete.assert_called_once_with(outbox.KICK_KEY)
+
+
+class TestPurge:
+
+    @patch('apps.core.outbox.purge', return_value=3)
+    @patch('apps.core.outbox.cache')
+    def test_purge_runs_once_per_interval(self, mock_cache, mock_purge):
+        mock_cache.add.side_effect = [True, False]
+        assert outbox.purge_if_due(using='tenant') == 3
+        assert outbox.purge_if_due(using='tenant') == 0
+        mock_purge.assert_called_once_with(using='tenant')
+
+
+class TestBuildMessages:
+
+    @patch('apps.core.outbox.apps')
+    def test_rows_are_fetched_once_per_model(self, mock_apps):
+        rows = {'activity.Asset': [SimpleNamespace(pk=1), SimpleNamespace(pk=2)],
+                'peoples.People': [SimpleNamespace(pk=1)]}
+        def get_model(label):
+            model = MagicMock()
+            model.objects.using.return_value.filter.return_value = rows[label]
+            return model
+        mock_apps.get_model.side_effect = get_model
+        events = [event(1, 2), event(2, 1, 'peoples.People', 'People', created=True), event(3, 1), event(4, 3)]
+        messages = outbox.build_messages(events)
+        assert [payload for _, _, payload in messages] == ['Asset:2:UPDATE', 'People:1:CREATE', 'Asset:1:UPDATE']
+        assert mock_apps.get_model.call_count == 2
+
+
+class TestRelayBatch:
+
+    @patch('apps.core.outbox.cache')
+    @patch('apps.core.outbox.update_offsets')
+    @patch('apps.core.outbox.publish')
+    @patch('apps.core.outbox.build_messages')
+    @patch('apps.core.outbox.OutboxEvent')
+    @patch('apps.core.outbox.transaction')
+    def test_batch_is_marked_published_after_the_broker_acknowledged(
+            self, mock_transaction, mock_event, mock_build, mock_publish, mock_offsets, mock_cache):
+        events = [event(1, 1, version=40), event(2, 2)]
+        manager = mock_event.objects.using.return_value
+        manager.filter.return_value.order_by.return_value.__getitem__.return_value = events
+        manager.select_for_update.return_value.filter.return_value.values_list.return_value = [(1, 40), (2, 1)]
+        mock_build.return_value = [(e, e.topic, 'x') for e in events]
+        mock_publish.side_effect = lambda messages: mock_transaction.atomic.assert_not_called()
+        assert outbox.relay_batch(batch_size=10) == 2
+        mock_publish.assert_called_once_with([('redmine_to_noc', 'x'), ('redmine_to_noc', 'x')])
+        manager.filter.assert_called_with(id__in=[1, 2])
+        mock_offsets.assert_called_once_with(events, 'default')
+        mock_cache.delete.assert_called_once_with(outbox.RELAY_KEY.format('default'))
+
+    @patch('apps.core.outbox.cache')
+    @patch('apps.core.outbox.update_offsets')
+    @patch('apps.core.outbox.publish')
+    @patch('apps.core.outbox.build_messages')
+    @patch('apps.core.outbox.OutboxEvent')
+    @patch('apps.core.outbox.transaction')
+    def test_event_saved_while_relayed_stays_pending(
+            self, mock_transaction, mock_event, mock_build, mock_publish, mock_offsets, mock_cache):
+        events = [event(1, 1), event(2, 2)]
+        manager = mock_event.objects.using.return_value
+        manager.filter.return_value.order_by.return_value.__getitem__.return_value = events
+        manager.select_for_update.return_value.filter.return_value.values_list.return_value = [(1, 1), (2, 2)]
+        mock_build.return_value = [(e, e.topic, 'x') for e in events]
+        outbox.relay_batch()
+        manager.filter.assert_called_with(id__in=[1])
+        mock_offsets.assert_called_once_with(events[:1], 'default')
+
+    @patch('apps.core.outbox.cache')
+    @patch('apps.core.outbox.update_offsets')
+    @patch('apps.core.outbox.publish', side_effect=outbox.RelayError('not acknowledged'))
+    @patch('apps.core.outbox.build_messages')
+    @patch('apps.core.outbox.OutboxEvent')
+    @patch('apps.core.outbox.transaction')
+    def test_failed_batch_stays_pending(
+            self, mock_transaction, mock_event, mock_build, mock_publish, mock_offsets, mock_cache):
+        events = [event(1, 1)]
+        manager = mock_event.objects.using.return_value
+        manager.filter.return_value.order_by.return_value.__getitem__.return_value = events
+        mock_build.return_value = [(events[0], 'redmine_to_noc', 'x')]
+        with pytest.raises(outbox.RelayError):
+            outbox.relay_batch()
+        manager.filter.return_value.update.assert_not_called()
+        mock_offsets.assert_not_called()
+        mock_cache.delete.assert_called_once_with(outbox.RELAY_KEY.format('default'))
+
+    @patch('apps.core.outbox.kick')
+    @patch('apps.core.outbox.OutboxEvent')
+    @patch('apps.core.outbox.cache')
+    def test_one_relay_runs_per_database(self, mock_cache, mock_event, mock_kick):
+        mock_cache.add.return_value = False
+        assert outbox.relay_batch(using='tenant') == 0
+        mock_cache.add.assert_called_once_with(
+            outbox.RELAY_KEY.format('tenant'), 1, outbox.OUTBOX_RELAY_LOCK_TIMEOUT)
+        mock_event.objects.using.assert_not_called()
+        mock_kick.assert_called_once_with()
+
+    @patch('apps.core.outbox.time.sleep')
+    def test_only_the_messages_of_the_batch_are_awaited(self, mock_sleep):
+        infos = [MagicMock(**{'is_published.side_effect': [False, True]}),
+                 MagicMock(**{'is_published.return_value': True})]
+        assert outbox.acknowledged(infos, timeout=5) is True
+        late = MagicMock(**{'is_published.return_value': False})
+        assert outbox.acknowledged([late], timeout=0) is False
+
+    @patch('apps.core.outbox.relay_batch', side_effect=[500, 500, 12])
+    def test_relay_drains_batches(self, mock_batch):
+        assert outbox.relay(batch_size=500) == 1012
+
+
+class TestEnqueueMany:
+
+    @patch('apps.core.outbox.transaction')
+    @patch('apps.core.outbox.connections')
+    def test_rows_are_enqueued_in_one_statement(self, mock_connections, mock_transaction):
+        model = MagicMock()
+        model._meta.label = 'attendance.PeopleEventlog'
+        outbox.enqueue_many('redmine_to_noc', model, [1, 2], 'PeopleEventlog', payload, using='tenant')
+        cursor = mock_connections.__getitem__.return_value.cursor.return_value.__enter__.return_value
+        sql, params = cursor.execute.call_args.args
+        assert 'unnest(%s::text[])' in sql
+        assert params == ['redmine_to_noc', 'attendance.PeopleEventlog', 'PeopleEventlog', BUILDER, ['1', '2']]
+        mock_transaction.on_commit.assert_called_once_with(outbox.kick, using='tenant')
+
+    @patch('apps.core.outbox.connections')
+    def test_nothing_to_enqueue(self, mock_connections):
+        outbox.enqueue_many('redmine_to_noc', MagicMock(), [], 'PeopleEventlog', payload)
+        mock_connections.__getitem__.assert_not_called()
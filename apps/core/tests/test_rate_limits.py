@@ -0,0 +1,133 @@
+"""
+Tests for the in-process rate limiting of the authentication attempts
+"""
+from collections import Counter
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from apps.core import rate_limits
+from apps.core.middleware.rate_limiting import PostgreSQLRateLimitMiddleware
+
+
+@pytest.fixture(autouse=True)
+def clean_buckets():
+    rate_limits.reset()
+    yield
+    rate_limits.reset()
+
+
+def fail(times, username='guard1', ip_address='10.0.0.1'):
+    for _ in range(times):
+        rate_limits.record(ip_address, username, success=False, failure_reason='Invalid credentials')
+
+
+class TestCheck:
+
+    def test_username_is_blocked_after_max_attempts(self):
+        fail(rate_limits.MAX_ATTEMPTS - 1)
+        assert rate_limits.check('10.0.0.1', 'guard1')['is_blocked'] is False
+        fail(1)
+        result = rate_limits.check('10.0.0.1', 'guard1')
+        assert result['is_blocked'] is True
+        assert result['blocking_strategy'] == 'username'
+        assert result['user_attempts'] == rate_limits.MAX_ATTEMPTS
+        # another username of the same address is not locked
+        assert rate_limits.check('10.0.0.1', 'guard2')['is_blocked'] is False
+
+    def test_ip_is_blocked_after_three_times_max_attempts(self):
+        for n in range(rate_limits.MAX_ATTEMPTS * rate_limits.IP_FACTOR):
+            rate_limits.record('10.0.0.9', f'guard{n}', success=False)
+        result = rate_limits.check('10.0.0.9', 'newguard')
+        assert result['is_blocked'] is True
+        assert result['blocking_strategy'] == 'ip'
+
+    def test_successful_attempts_take_no_token(self):
+        for _ in range(rate_limits.MAX_ATTEMPTS * 2):
+            rate_limits.record('10.0.0.1', 'guard1', success=True)
+        assert rate_limits.check('10.0.0.1', 'guard1')['is_blocked'] is False
+
+    def test_bucket_refills_over_the_window(self):
+        with patch('apps.core.rate_limits.time.monotonic', return_value=1000.0):
+            fail(rate_limits.MAX_ATTEMPTS)
+            assert rate_limits.check('10.0.0.1', 'guard1')['is_blocked'] is True
+        later = 1000.0 + rate_limits.WINDOW_MINUTES * 60 / rate_limits.MAX_ATTEMPTS
+        with patch('apps.core.rate_limits.time.monotonic', return_value=later):
+            assert rate_limits.check('10.0.0.1', 'guard1')['is_blocked'] is False
+
+    def test_buckets_are_kept_per_database(self):
+        fail(rate_limits.MAX_ATTEMPTS)
+        assert rate_limits.check('10.0.0.1', 'guard1', using='sps')['is_blocked'] is False
+
+
+class TestFlush:
+
+    @patch('apps.core.rate_limits.failures', return_value=Counter())
+    @patch('apps.core.rate_limits.write', return_value=[])
+    def test_buffered_attempts_are_written_in_one_batch(self, mock_write, mock_failures):
+        fail(3)
+        rate_limits.record('10.0.0.2', 'guard2', success=True, using='sps')
+        assert rate_limits.flush() == 4
+        attempts = mock_write.call_args.args[0]
+        assert [using for using, _ in attempts] == ['default'] * 3 + ['sps']
+        assert attempts[0][1]['failure_reason'] == 'Invalid credentials'
+        assert rate_limits.flush() == 0
+
+    @patch('apps.core.rate_limits.failures', return_value=Counter())
+    def test_attempts_not_written_are_kept(self, mock_failures):
+        fail(2)
+        with patch('apps.core.rate_limits.write', side_effect=lambda attempts: attempts):
+            assert rate_limits.flush() == 0
+        with patch('apps.core.rate_limits.write', return_value=[]) as mock_write:
+            assert rate_limits.flush() == 2
+            assert len(mock_write.call_args.args[0]) == 2
+
+    @patch('apps.core.rate_limits.connections')
+    @patch('apps.core.rate_limits.close_old_connections')
+    def test_thread_recycles_its_connections(self, mock_close_old, mock_connections):
+        with patch('apps.core.rate_limits.flush', return_value=0):
+            rate_limits.flush_in_thread()
+        mock_close_old.assert_called_once_with()
+        mock_connections.close_all.assert_not_called()
+        with patch('apps.core.rate_limits.flush', side_effect=RuntimeError):
+            rate_limits.flush_in_thread()
+        mock_connections.close_all.assert_called_once_with()
+
+    def test_failures_of_other_processes_drain_the_buckets(self):
+        counts = Counter({('user', 'guard1'): rate_limits.MAX_ATTEMPTS})
+        with patch('apps.core.rate_limits.failures', return_value=counts):
+            rate_limits.sync('default')
+        assert rate_limits.check('10.0.0.1', 'guard1')['is_blocked'] is True
+
+    def test_full_buckets_are_dropped(self):
+        with patch('apps.core.rate_limits.time.monotonic', return_value=1000.0):
+            fail(1)
+        assert rate_limits._buckets
+        later = 1000.0 + rate_limits.WINDOW_MINUTES * 60
+        with patch('apps.core.rate_limits.time.monotonic', return_value=later), \
+                patch('apps.core.rate_limits.failures', return_value=Counter()):
+            rate_limits.sync('default')
+        assert not rate_limits._buckets
+
+
+class TestClassify:
+
+    def middleware(self):
+        with patch('apps.core.rate_limits.start'):
+            return PostgreSQLRateLimitMiddleware(MagicMock())
+
+    @pytest.mark.parametrize('status, expected', [
+        (302, ('login', True, None)),
+        (200, ('login', False, 'Invalid credentials')),
+        (500, ('login', False, 'HTTP 500')),
+    ])
+    def test_login_outcome_is_read_from_the_status(self, status, expected):
+        request = SimpleNamespace(path='/login/')
+        assert self.middleware().classify(request, SimpleNamespace(status_code=status)) == expected
+
+    def test_api_posts_count_only_rejections(self):
+        middleware = self.middleware()
+        request = SimpleNamespace(path='/api/sync/')
+        assert middleware.classify(request, SimpleNamespace(status_code=200)) is None
+        assert middleware.classify(request, SimpleNamespace(status_code=401)) == ('api_access', False, 'HTTP 401')
@@ -0,0 +1,53 @@
+"""
+Tests for the compiled report query registry
+"""
+import pytest
+
+from apps.core import report_query_registry as registry
+
+
+SQL = '''
+    WITH timezone_setting AS (SELECT '{timezone}'::text AS timezone)
+    SELECT * FROM jobneed CROSS JOIN timezone_setting tz
+    WHERE jobneed.bu_id IN (SELECT unnest(string_to_array('{siteids}', ',')::integer[]))
+    AND jobneed.client_id = {clientid}
+    AND jobneed.jobdesc LIKE '%tour%'
+    AND (jobneed.plandatetime AT TIME ZONE tz.timezone) BETWEEN '{from}' AND '{upto}'
+'''
+
+
+class TestReportQuery:
+
+    def test_placeholders_become_bind_parameters(self):
+        query = registry.ReportQuery('TEST', SQL)
+        assert query.params == ['timezone', 'siteids', 'clientid', 'from', 'upto']
+        assert "SELECT %(timezone)s::text" in query.sql
+        assert "jobneed.bu_id = ANY(%(siteids)s::bigint[])" in query.sql
+        assert "BETWEEN %(from)s AND %(upto)s" in query.sql
+        assert "LIKE '%%tour%%'" in query.sql
+        assert "string_to_array" not in query.sql
+
+    def test_prepared_form_uses_positional_parameters(self):
+        query = registry.ReportQuery('TEST', SQL)
+        assert "jobneed.bu_id = ANY($2::bigint[])" in query.prepare_sql
+        assert "jobneed.client_id = $3" in query.prepare_sql
+        assert "LIKE '%tour%'" in query.prepare_sql
+        assert query.statement == 'report_test'
+
+    def test_bind_converts_id_lists(self):
+        query = registry.ReportQuery('TEST', SQL)
+        params = query.bind({'timezone': 'Asia/Kolkata', 'siteids': '4,5', 'clientid': 1,
+                             'from': '01/01/2025 00:00:00', 'upto': '31/01/2025 23:59:59', 'extra': 1})
+        assert params['siteids'] == [4, 5]
+        assert 'extra' not in params
+
+    def test_bind_reports_missing_args(self):
+        query = registry.ReportQuery('TEST', SQL)
+        with pytest.raises(KeyError):
+            query.bind({'timezone': 'Asia/Kolkata'})
+
+    @pytest.mark.parametrize('name', ['TASKSUMMARY', 'TOURSUMMARY', 'LISTOFTASKS', 'SITEREPORT'])
+    def test_report_designs_compile(self, name):
+        query = registry.get_report_query(name)
+        assert '{' not in query.sql
+        assert registry.get_report_query(name) is query
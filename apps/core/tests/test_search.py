@@ -0,0 +1,98 @@
+"""
+Tests for the search of the DataTables list views
+"""
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from django.contrib.postgres.indexes import GinIndex
+from django.db import models
+from django.db.models import Q
+
+from apps.core import search
+
+
+def field(cls, name, **kwargs):
+    instance = cls(**kwargs)
+    instance.set_attributes_from_name(name)
+    return instance
+
+
+def fake_model(label, fields, indexed=(), relations=None):
+    relations = relations or {}
+    def get_field(name):
+        if name in relations:
+            return SimpleNamespace(name=name, many_to_one=True, one_to_one=False, concrete=True,
+                                   is_relation=True, related_model=relations[name])
+        if name not in fields:
+            raise LookupError(name)
+        return fields[name]
+    indexes = [GinIndex(fields=[name], name=f'{name}_trgm_idx', opclasses=['gin_trgm_ops']) for name in indexed]
+    return SimpleNamespace(_meta=SimpleNamespace(label=label, indexes=indexes, get_field=get_field),
+                           _base_manager=MagicMock())
+
+
+BT = fake_model('onboarding.Bt', {'buname': field(models.CharField, 'buname', max_length=200)})
+JOBNEED = fake_model(
+    'activity.Jobneed',
+    {'jobdesc': field(models.CharField, 'jobdesc', max_length=200),
+     'remarks': field(models.TextField, 'remarks'),
+     'id': field(models.BigIntegerField, 'id'),
+     'plandatetime': field(models.DateTimeField, 'plandatetime'),
+     'jobstatus': field(models.CharField, 'jobstatus', max_length=60,
+                        choices=[('ASSIGNED', 'Assigned'), ('COMPLETED', 'Completed')])},
+    indexed=['jobdesc'], relations={'bu': BT})
+
+
+class TestSearchQ:
+
+    def test_unindexed_text_columns_are_kept(self):
+        qobjs = search.search_q(JOBNEED, ['jobdesc', 'remarks', 'plandatetime'], 'pump')
+        assert qobjs == Q() | (Q(jobdesc__icontains='pump') | Q(remarks__icontains='pump'))
+        assert search.search_q(JOBNEED, ['remarks'], 'pump') == Q() | Q(remarks__icontains='pump')
+
+    def test_choices_and_numbers(self):
+        assert search.search_q(JOBNEED, ['jobstatus'], 'comp') == Q() | Q(jobstatus__in=['COMPLETED'])
+        assert search.search_q(JOBNEED, ['id', 'jobdesc'], '42') == Q() | (Q(id=42) | Q(jobdesc__icontains='42'))
+        assert search.search_q(JOBNEED, ['id'], 'pump') is None
+
+    def test_related_columns_become_subqueries(self):
+        qobjs = search.search_q(JOBNEED, ['bu__buname'], 'gate')
+        BT._base_manager.filter.assert_called_with(Q(buname__icontains='gate'))
+        assert qobjs == Q() | Q(bu__in=BT._base_manager.filter.return_value.values.return_value)
+
+    def test_models_without_trigram_index_are_searched_as_before(self):
+        assert search.search_q(BT, ['buname'], 'gate') == Q() | Q(buname__icontains='gate')
+
+    def test_dates_and_annotations_are_matched_as_text(self):
+        assert search.search_q(JOBNEED, ['plandatetime'], '2024-05') == Q() | Q(plandatetime__icontains='2024-05')
+        assert search.search_q(JOBNEED, ['plandatetime'], 'pump') is None
+        assert search.search_q(JOBNEED, ['assignedto'], 'ravi') == Q() | Q(assignedto__icontains='ravi')
+        # reverse and many to many paths are not searched
+        assert search.search_q(JOBNEED, ['bu__children__buname'], 'gate') is None
+
+    def test_empty_term(self):
+        assert search.search_q(JOBNEED, ['jobdesc'], '  ') is None
+
+
+class TestCount:
+
+    @patch('apps.core.search.estimated_count', return_value=5000000)
+    def test_large_tables_are_estimated(self, mock_estimate):
+        qset = MagicMock()
+        assert search.count(qset) == 5000000
+        qset.count.assert_not_called()
+
+    @patch('apps.core.search.estimated_count', return_value=120)
+    def test_small_results_are_counted(self, mock_estimate):
+        qset = MagicMock()
+        qset.count.return_value = 97
+        assert search.count(qset) == 97
+
+    @patch('apps.core.search.connections')
+    def test_estimate_of_the_plan(self, mock_connections):
+        qset = MagicMock(db='default')
+        qset.order_by.return_value.query.sql_with_params.return_value = ('SELECT 1', ())
+        cursor = mock_connections.__getitem__.return_value.cursor.return_value.__enter__.return_value
+        cursor.fetchone.return_value = ['[{"Plan": {"Plan Rows": 812}}]']
+        assert search.estimated_count(qset) == 812
+        assert cursor.execute.call_args.args[0] == 'EXPLAIN (FORMAT JSON) SELECT 1'
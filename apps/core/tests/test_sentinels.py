@@ -0,0 +1,99 @@
+"""
+Tests for the registry of the NONE sentinel rows
+"""
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from apps.core import sentinels
+
+
+@pytest.fixture
+def registry():
+    calls = []
+
+    def factory(using=None):
+        calls.append(using)
+        return SimpleNamespace(id=7, db=using), len(calls) == 1
+
+    factories = {'widget': factory}
+    with patch.dict(sentinels.FACTORIES, factories, clear=True), patch.dict(sentinels._sentinels, clear=True), \
+            patch('apps.core.sentinels.connections') as mock_connections:
+        mock_connections.__getitem__.return_value.in_atomic_block = True
+        helper = sentinels.sentinel('widget', returns_created=True)(factory)
+        yield helper, calls
+
+
+@patch('apps.core.sentinels.transaction')
+def test_none_row_is_resolved_once_per_database(mock_transaction, registry):
+    mock_transaction.on_commit.side_effect = lambda fn, using: fn()
+    helper, calls = registry
+    assert helper(using='default')[1] is True
+    obj, created = helper(using='default')
+    assert (obj.id, created) == (7, False)
+    assert sentinels.get_id('widget', using='default') == 7
+    helper(using='tenant')
+    assert calls == ['default', 'tenant']
+
+
+@patch('apps.core.sentinels.transaction')
+def test_created_none_row_is_cached_on_commit(mock_transaction, registry):
+    helper, calls = registry
+    assert helper(using='default')[1] is True
+    assert sentinels._sentinels == {}
+    callback = mock_transaction.on_commit.call_args.args[0]
+    callback()
+    helper(using='default')
+    assert len(calls) == 1
+
+
+@patch('apps.core.sentinels.transaction')
+def test_none_row_found_in_a_transaction_is_cached_on_commit(mock_transaction, registry):
+    helper, calls = registry
+    helper(using='default')
+    # found, but possibly created earlier in the same transaction
+    assert helper(using='default')[1] is False
+    assert sentinels._sentinels == {}
+    assert mock_transaction.on_commit.call_count == 2
+
+
+@patch('apps.core.sentinels.transaction')
+def test_none_row_outside_a_transaction_is_cached_at_once(mock_transaction, registry):
+    helper, calls = registry
+    with patch('apps.core.sentinels.connections') as mock_connections:
+        mock_connections.__getitem__.return_value.in_atomic_block = False
+        helper(using='default')
+        helper(using='default')
+    assert len(calls) == 1
+    mock_transaction.on_commit.assert_not_called()
+
+
+@patch('apps.core.sentinels.transaction')
+def test_callers_get_copies(mock_transaction, registry):
+    mock_transaction.on_commit.side_effect = lambda fn, using: fn()
+    helper, _ = registry
+    helper(using='default')
+    obj, _ = helper(using='default')
+    obj.id = 99
+    assert helper(using='default')[0].id == 7
+
+
+@patch('apps.core.sentinels.transaction')
+def test_invalidate(mock_transaction, registry):
+    mock_transaction.on_commit.side_effect = lambda fn, using: fn()
+    helper, calls = registry
+    helper(using='default')
+    helper(using='tenant')
+    sentinels.invalidate(using='tenant')
+    helper(using='default')
+    helper(using='tenant')
+    assert calls == ['default', 'tenant', 'tenant']
+    sentinels.invalidate()
+    assert sentinels._sentinels == {}
+
+
+@patch('apps.core.sentinels.resolve')
+def test_warmup_resolves_every_registered_row(mock_resolve, registry):
+    assert sentinels.warmup('tenant') == ['widget']
+    mock_resolve.assert_called_once_with('widget', 'tenant')
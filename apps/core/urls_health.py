@@ -7,7 +7,8 @@ from .health_checks import (
     health_check,
     readiness_check, 
     liveness_check,
-    detailed_health_check
+    detailed_health_check,
+    tenant_metrics
 )
 
 urlpatterns = [
@@ -20,4 +21,7 @@ urlpatterns = [
     
     # Detailed health check - for monitoring systems
     path('health/detailed/', detailed_health_check, name='detailed_health_check'),
+
+    # Tenant hosts and connection pools - staff only
+    path('health/tenants/', tenant_metrics, name='tenant_metrics'),
 ]
\ No newline at end of file
@@ -32,7 +32,9 @@ from apps.peoples import models as pm
 from apps.work_order_management.models  import Wom
 from apps.work_order_management import models as wom
 from apps.tenants.models import Tenant
+from apps.tenants import registry
 from apps.core import exceptions as excp
+from apps.core import sentinels
 from django.db import transaction
 from django.db.models import RestrictedError
 from apps.work_order_management.models import Approver
@@ -310,15 +312,15 @@ def local_to_utc(data, offset, mobile_web):
             return newdata
 
 
+@sentinels.sentinel('people')
 def get_or_create_none_people(using=None):
-    obj, _ = pm.People.objects.get_or_create(
+    return pm.People.objects.using(using).get_or_create(
         peoplecode='NONE', peoplename = 'NONE',
         defaults={
             'email': "none@youtility.in", 'dateofbirth': '1111-1-1',
             'dateofjoin': "1111-1-1",
         }
     )
-    return obj
 
 def get_none_typeassist():
     try:
@@ -328,30 +330,30 @@ def get_none_typeassist():
         return o
 
 
-def get_or_create_none_pgroup():
-    obj, _ = pm.Pgroup.objects.get_or_create(
+@sentinels.sentinel('pgroup')
+def get_or_create_none_pgroup(using=None):
+    return pm.Pgroup.objects.using(using).get_or_create(
         groupname="NONE",
         defaults={},
     )
-    return obj
 
 
-def get_or_create_none_location():
-    obj, _ = Location.objects.get_or_create(
+@sentinels.sentinel('location')
+def get_or_create_none_location(using=None):
+    return Location.objects.using(using).get_or_create(
         loccode= "NONE", locname = 'NONE',
         defaults={
             'locstatus':'SCRAPPED'
             }
     )
-    return obj
 
 
-def get_or_create_none_cap():
-    obj, _ = pm.Capability.objects.get_or_create(
+@sentinels.sentinel('cap')
+def get_or_create_none_cap(using=None):
+    return pm.Capability.objects.using(using).get_or_create(
         capscode = "NONE", capsname = 'NONE',
         defaults={}
     )
-    return obj
 
 
 def encrypt(data: bytes) -> bytes:
@@ -370,78 +372,28 @@ def decrypt(obscured: bytes) -> bytes:
 
 def save_capsinfo_inside_session(people, request,admin):
     logger.info('save_capsinfo_inside_session... STARTED')
-    from apps.core.raw_queries import get_query
-    from apps.peoples.models import Capability,People
-
-    if admin :
-        #extracting the capabilities from client
-        web, mob, portlet, report,noc = putils.create_caps_choices_for_peopleform(request.user.client)
-        request.session['client_webcaps'] = list(web)
-        request.session['client_mobcaps'] = list(mob)
-        request.session['client_portletcaps'] = list(portlet)
-        request.session['client_reportcaps'] = list(report)
-        request.session['client_noccaps'] = list(noc)
-        request.session['people_webcaps'] = []
-        request.session['people_mobcaps'] = []
-        request.session['people_reportcaps'] = []
-        request.session['people_portletcaps'] = []
-        request.session['people_noccaps'] = []
-    else :
-        caps = Capability.objects.raw(get_query('get_web_caps_for_client'))
-        #extracting capabilities from people details
-        request.session['client_webcaps'] = []
-        request.session['client_mobcaps'] = []
-        request.session['client_portletcaps'] = []
-        request.session['client_reportcaps'] = []
-        request.session['people_webcaps'] = list(Capability.objects.filter(capscode__in = people.people_extras['webcapability'], cfor='WEB').values_list('capscode', 'capsname')) 
-        request.session['people_mobcaps'] = list(Capability.objects.filter(capscode__in = people.people_extras['mobilecapability'], cfor='MOB').values_list('capscode', 'capsname')) 
-        request.session['people_reportcaps'] = list(Capability.objects.filter(capscode__in = people.people_extras['reportcapability'], cfor='REPORT').values_list('capscode', 'capsname')) 
-        request.session['people_portletcaps'] = list(Capability.objects.filter(capscode__in = people.people_extras['portletcapability'], cfor='PORTLET').values_list('capscode', 'capsname'))
-        request.session['people_noccaps'] = list(Capability.objects.filter(capscode__in = people.people_extras.get('noccapability',''), cfor='NOC').values_list('capscode', 'capsname'))
-        logger.info('save_capsinfo_inside_session... DONE')
-    
-    
-
+    from apps.peoples import session_bundle
+    # admins get the capabilities of their client, others their own
+    bundle = session_bundle.get(session_bundle.prepare(people.id, get_current_db_name()))
+    for key in session_bundle.SESSION_CAPS:
+        request.session[key] = bundle.get(key, [])
+    logger.info('save_capsinfo_inside_session... DONE')
 
 
 def save_user_session(request, people, ctzoffset=None):
     '''save user info in session'''
-    from django.conf import settings
     from django.core.exceptions import ObjectDoesNotExist
-    from apps.onboarding import models as Bt
+    from apps.peoples import session_bundle
     try:
         logger.info('saving user data into the session ... STARTED')
         if ctzoffset: request.session['ctzoffset'] = ctzoffset
-        if people.is_superuser is True:
-            request.session['is_superadmin'] = True
-            session = request.session
-            session['people_webcaps'] = session['client_webcaps'] = session['people_mobcaps'] = \
-            session['people_reportcaps'] = session['people_portletcaps'] = session['client_mobcaps'] = \
-            session['client_reportcaps'] = session['client_portletcaps'] = False
-            logger.info(request.session['is_superadmin'])
-            putils.save_tenant_client_info(request)
+        # capabilities, sites and approver flags are built once per people and version
+        ref = session_bundle.prepare(people.id, get_current_db_name())
+        if isinstance(request.session, session_bundle.SessionStore):
+            request.session[session_bundle.BUNDLE_KEY] = ref
         else:
-            putils.save_tenant_client_info(request)
-            request.session['is_superadmin'] = people.peoplecode == 'SUPERADMIN'
-            request.session['is_admin'] = people.isadmin
-            save_capsinfo_inside_session(people, request, people.isadmin)
-            logger.info('saving user data into the session ... DONE')
-        request.session['assignedsites'] = list(pm.Pgbelonging.objects.get_assigned_sites_to_people(people.id))
-        request.session['people_id'] = request.user.id
-        request.session['assignedsitegroups'] = people.people_extras['assignsitegroup']
-        request.session['clientcode'] = request.user.client.bucode
-        request.session['clientname'] = request.user.client.buname
-        request.session['sitename'] = request.user.bu.buname
-        request.session['sitecode'] = request.user.bu.bucode
-        request.session['google_maps_secret_key'] = settings.GOOGLE_MAP_SECRET_KEY
-        request.session['is_workpermit_approver'] = request.user.people_extras['isworkpermit_approver']
-        # Check if the user is an approver
-        client_id = request.user.client.id
-        site_id = request.user.bu.id
-        is_wp_approver = Approver.objects.filter(client_id=client_id, people=request.user.id,approverfor__contains = ['WORKPERMIT']).exists()
-        is_sla_approver = Approver.objects.filter(client_id=client_id, people=request.user.id,approverfor__contains = ['SLA_TEMPLATE']).exists()
-        request.session['is_wp_approver'] = is_wp_approver
-        request.session['is_sla_approver'] = is_sla_approver
+            request.session.update(session_bundle.get(ref))
+        logger.info('saving user data into the session ... DONE')
     except ObjectDoesNotExist:
         error_logger.error('object not found...', exc_info=True)
         raise
@@ -675,18 +627,7 @@ def to_utc(date, format=None):
 
 
 def get_tenants_map():
-    return {
-        'intelliwiz.youtility.local': 'intelliwiz_django',
-        'sps.youtility.local'       : 'sps',
-        'capgemini.youtility.local' : 'capgemini',
-        'dell.youtility.local'      : 'dell',
-        'icicibank.youtility.local' : 'icicibank',
-        'redmine.youtility.in' : 'sps',
-        'django-local.youtility.in' : 'default',
-        'barfi.youtility.in'        : 'icicibank',
-        'intelliwiz.youtility.in'   : 'default',
-        'testdb.youtility.local'    : 'testDB'
-    }
+    return registry.get_hosts()
 
 # RETURN HOSTNAME FROM REQUEST
 
@@ -695,28 +636,26 @@ def hostname_from_request(request):
     return request.get_host().split(':')[0].lower()
 
 
-def get_or_create_none_bv():
-    obj, _ = ob.Bt.objects.get_or_create(
+@sentinels.sentinel('bv')
+def get_or_create_none_bv(using=None):
+    return ob.Bt.objects.using(using).get_or_create(
         bucode = "NONE", buname = "NONE",
         defaults={}
     )
-    return obj
 
 
-def get_or_create_none_typeassist():
-    obj, iscreated = ob.TypeAssist.objects.get_or_create(
+@sentinels.sentinel('typeassist', returns_created=True)
+def get_or_create_none_typeassist(using=None):
+    return ob.TypeAssist.objects.using(using).get_or_create(
         tacode= "NONE", taname= "NONE",
         defaults={}
     )
-    return obj, iscreated
 
 # RETURNS DB ALIAS FROM REQUEST
 
 
 def tenant_db_from_request(request):
-    hostname = hostname_from_request(request)
-    tenants_map = get_tenants_map()
-    return tenants_map.get(hostname, 'default')
+    return registry.database_for_host(hostname_from_request(request))
 
 
 def get_client_from_hostname(request):
@@ -724,14 +663,16 @@ def get_client_from_hostname(request):
     return hostname.split('.')[0]
 
 
-def get_or_create_none_tenant():
-    return Tenant.objects.get_or_create(tenantname = 'Intelliwiz', subdomain_prefix = 'intelliwiz',defaults={})[0]
+@sentinels.sentinel('tenant')
+def get_or_create_none_tenant(using=None):
+    return Tenant.objects.using(using).get_or_create(tenantname = 'Intelliwiz', subdomain_prefix = 'intelliwiz',defaults={})
 
 
-def get_or_create_none_job():
+@sentinels.sentinel('job')
+def get_or_create_none_job(using=None):
     from datetime import datetime, timezone
     date = datetime(1970, 1, 1, 00, 00, 00).replace(tzinfo=timezone.utc)
-    obj, _ = Job.objects.get_or_create(
+    return Job.objects.using(using).get_or_create(
         jobname= 'NONE',    jobdesc= 'NONE',
         defaults={
             'fromdate': date,      'uptodate': date,
@@ -741,23 +682,23 @@ def get_or_create_none_job():
             'seqno': -1,        'scantype': 'SKIP',
         }
     )
-    return obj
 
 
-def get_or_create_none_gf():
-    obj, _ = ob.GeofenceMaster.objects.get_or_create(
+@sentinels.sentinel('gf')
+def get_or_create_none_gf(using=None):
+    return ob.GeofenceMaster.objects.using(using).get_or_create(
         gfcode= 'NONE', gfname= 'NONE',
         defaults={
             'alerttext': 'NONE', 'enable': False
         }
     )
-    return obj
 
 
-def get_or_create_none_jobneed():
+@sentinels.sentinel('jobneed')
+def get_or_create_none_jobneed(using=None):
     from datetime import datetime, timezone
     date = datetime(1970, 1, 1, 00, 00, 00).replace(tzinfo=timezone.utc)
-    obj, _ = Jobneed.objects.get_or_create(
+    return Jobneed.objects.using(using).get_or_create(
         jobdesc= "NONE",  scantype= "NONE", seqno= -1,
         defaults={
             'plandatetime': date,
@@ -765,65 +706,64 @@ def get_or_create_none_jobneed():
             'receivedonserver': date,  
         }
     )
-    return obj
 
-def get_or_create_none_wom():
+@sentinels.sentinel('wom')
+def get_or_create_none_wom(using=None):
     from datetime import datetime, timezone
     date = datetime(1970, 1, 1, 00, 00, 00).replace(tzinfo=timezone.utc)
-    obj, _ = Wom.objects.get_or_create(
+    return Wom.objects.using(using).get_or_create(
         description= "NONE", expirydatetime= date, plandatetime =  date,
         defaults={
             'workpermit':Wom.WorkPermitStatus.NOTNEED,
             'attachmentcount':0, 'priority':Wom.Priority.LOW,
         }
     )
-    return obj
 
 
-def get_or_create_none_qset():
-    obj, _ = QuestionSet.objects.get_or_create(
+@sentinels.sentinel('qset')
+def get_or_create_none_qset(using=None):
+    return QuestionSet.objects.using(using).get_or_create(
         qsetname = "NONE",
         defaults={}
     )
-    return obj
 
 
-def get_or_create_none_question():
-    obj, _ = Question.objects.get_or_create(
+@sentinels.sentinel('question')
+def get_or_create_none_question(using=None):
+    return Question.objects.using(using).get_or_create(
         quesname = "NONE", 
         defaults={}
     )
-    return obj
 
 
-def get_or_create_none_qsetblng():
+@sentinels.sentinel('qsetblng')
+def get_or_create_none_qsetblng(using=None):
     'A None qsetblng with seqno -1'
-    obj, _ = QuestionSetBelonging.objects.get_or_create(
+    return QuestionSetBelonging.objects.using(using).get_or_create(
        answertype = 'NONE', 
         ismandatory =  False, seqno = -1,
     defaults={
-            'qset': get_or_create_none_qset(),
-            'question': get_or_create_none_question(),
+            'qset': get_or_create_none_qset(using),
+            'question': get_or_create_none_question(using),
             }
     )
-    return obj
 
 
-def get_or_create_none_asset():
-    obj, _ = Asset.objects.get_or_create(
+@sentinels.sentinel('asset')
+def get_or_create_none_asset(using=None):
+    return Asset.objects.using(using).get_or_create(
         assetcode = "NONE", assetname = 'NONE',
         identifier = 'NONE',
         defaults={'iscritical': False}
     )
-    return obj
 
-def get_or_create_none_ticket():
+@sentinels.sentinel('ticket')
+def get_or_create_none_ticket(using=None):
     from apps.y_helpdesk.models import Ticket
-    obj, _ = Ticket.objects.get_or_create(
+    return Ticket.objects.using(using).get_or_create(
         ticketdesc = 'NONE',
         defaults = {}
     )
-    return obj
 
 
 
@@ -919,15 +859,19 @@ def getFilters():
 
 
 def searchValue(objects, fields, related, model,  ST):
-    q_objs = Q()
-    for field in fields:
-        q_objs |= get_filter(field, 'contains', ST)
+    q_objs = searchValue2(fields, ST, model)
     return model.objects.filter(
         q_objs).select_related(
             *related).values(*fields)
 
 
-def searchValue2(fields,  ST):
+def searchValue2(fields,  ST, model=None):
+    if model is not None:
+        # indexed predicates of apps.core.search
+        from apps.core import search
+        q_objs = search.search_q(model, fields, ST)
+        if q_objs is not None:
+            return q_objs
     q_objs = Q()
     for field in fields:
         q_objs |= get_filter(field, 'contains', ST)
@@ -978,7 +922,8 @@ def get_paginated_results(requestData, objects, count,
     if requestData['search[value]'] != "":
         objects = searchValue(
             objects, fields, related, model, requestData["search[value]"])
-        filtered = objects.count()
+        from apps.core import search
+        filtered = search.count(objects)
     else:
         filtered = count
     length, start = int(requestData['length']), int(requestData['start'])
@@ -1130,10 +1075,10 @@ def get_select_output(objs):
     return records, count, msg
 
 
-def get_qobjs_dir_fields_start_length(R):
+def get_qobjs_dir_fields_start_length(R, model=None):
     qobjs = None
     if R.get('search[value]'):
-        qobjs = searchValue2(R.getlist('fields[]'), R['search[value]'])
+        qobjs = searchValue2(R.getlist('fields[]'), R['search[value]'], model)
 
     orderby, fields = R.getlist('order[0][column]'), R.getlist('fields[]')
     orderby = [orderby] if not isinstance(orderby, list) else orderby
@@ -15,7 +15,7 @@ from pprint import pformat
 log = logging.getLogger('mobile_service_log')
 from django.conf import settings
 from background_tasks.tasks import process_graphql_mutation_async
-from celery.result import AsyncResult
+from background_tasks.task_status import get_task_statuses
 MQTT_CONFIG = settings.MQTT_CONFIG 
 
 # MQTT broker settings
@@ -27,14 +27,6 @@ MUTATION_STATUS_TOPIC = "graphql/mutation/status"
 RESPONSE_TOPIC        = "response/acknowledgement"
 STATUS_TOPIC          = "response/status"
 
-def get_task_status(item):
-    """
-    Get status of a task
-    """
-    status = AsyncResult(item.get('taskId')).status
-    item.update({'status':status})
-    return item
-
 
 class MqttClient:
     """
@@ -84,7 +76,7 @@ class MqttClient:
             payload = json.loads(payload)
             log.info(f"Received taskIds payload: {payload}")
             taskids = payload.get('taskIds', [])
-            taskids_with_status = list(map(get_task_status, taskids))
+            taskids_with_status = get_task_statuses(taskids)
             response = json.dumps(taskids_with_status)
             log.info(f"Response published to {STATUS_TOPIC}: {response}")
             client.publish(STATUS_TOPIC, response)
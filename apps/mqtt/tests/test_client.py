@@ -6,46 +6,7 @@ from django.test import TestCase
 from django.conf import settings
 from paho.mqtt.enums import CallbackAPIVersion
 
-from apps.mqtt.client import MqttClient, get_task_status
-
-
-class TestGetTaskStatus(TestCase):
-
-    @patch('apps.mqtt.client.AsyncResult')
-    def test_get_task_status_success(self, mock_async_result):
-        mock_result = Mock()
-        mock_result.status = 'SUCCESS'
-        mock_async_result.return_value = mock_result
-        
-        item = {'taskId': 'test-task-id'}
-        result = get_task_status(item)
-        
-        self.assertEqual(result['status'], 'SUCCESS')
-        self.assertEqual(result['taskId'], 'test-task-id')
-        mock_async_result.assert_called_once_with('test-task-id')
-
-    @patch('apps.mqtt.client.AsyncResult')
-    def test_get_task_status_pending(self, mock_async_result):
-        mock_result = Mock()
-        mock_result.status = 'PENDING'
-        mock_async_result.return_value = mock_result
-        
-        item = {'taskId': 'pending-task-id'}
-        result = get_task_status(item)
-        
-        self.assertEqual(result['status'], 'PENDING')
-        self.assertEqual(result['taskId'], 'pending-task-id')
-
-    @patch('apps.mqtt.client.AsyncResult')
-    def test_get_task_status_failure(self, mock_async_result):
-        mock_result = Mock()
-        mock_result.status = 'FAILURE'
-        mock_async_result.return_value = mock_result
-        
-        item = {'taskId': 'failed-task-id'}
-        result = get_task_status(item)
-        
-        self.assertEqual(result['status'], 'FAILURE')
+from apps.mqtt.client import MqttClient
 
 
 class TestMqttClient(TestCase):
@@ -119,10 +80,10 @@ class TestMqttClient(TestCase):
         self.assertEqual(published_data['uuids'], ['uuid1', 'uuid2'])
         self.assertEqual(published_data['serviceName'], 'test-service')
 
-    @patch('apps.mqtt.client.get_task_status')
+    @patch('apps.mqtt.client.get_task_statuses')
     @patch('apps.mqtt.client.log')
-    def test_on_message_status_topic(self, mock_log, mock_get_task_status):
-        mock_get_task_status.side_effect = lambda x: {**x, 'status': 'SUCCESS'}
+    def test_on_message_status_topic(self, mock_log, mock_get_task_statuses):
+        mock_get_task_statuses.side_effect = lambda items: [{**x, 'status': 'SUCCESS'} for x in items]
         
         client_mock = Mock()
         msg_mock = Mock()
@@ -137,7 +98,7 @@ class TestMqttClient(TestCase):
         
         self.mqtt_client.on_message(client_mock, None, msg_mock)
         
-        self.assertEqual(mock_get_task_status.call_count, 2)
+        mock_get_task_statuses.assert_called_once()
         client_mock.publish.assert_called_once()
         
         publish_call = client_mock.publish.call_args
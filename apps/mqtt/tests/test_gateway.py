@@ -0,0 +1,79 @@
+import threading
+from unittest.mock import Mock
+from django.test import TestCase
+
+from mqtt_gateway import IngestionGateway
+
+
+SUBSCRIPTIONS = [("graphql/django5mutation", 1), ("graphql/mutation/django5status", 1)]
+
+
+def make_msg(topic="graphql/django5mutation", payload=b"{}", mid=1):
+    return Mock(topic=topic, payload=payload, mid=mid, qos=1)
+
+
+class TestIngestionGateway(TestCase):
+
+    def test_messages_are_handled_off_the_callback_thread(self):
+        threads, done = [], threading.Event()
+
+        def handler(client, topic, payload):
+            threads.append(threading.current_thread())
+            done.set()
+
+        gateway = IngestionGateway(handler, SUBSCRIPTIONS, workers=1)
+        gateway.submit(Mock(), make_msg())
+        self.assertTrue(done.wait(5))
+        gateway.stop()
+        self.assertIsNot(threads[0], threading.current_thread())
+        self.assertEqual(gateway.metrics()['processed'], 1)
+
+    def test_queue_pauses_at_the_mark_and_drained_queue_resumes_subscriptions(self):
+        gateway = IngestionGateway(Mock(), SUBSCRIPTIONS, workers=0, queue_size=4, pause_ratio=0.5)
+        client = Mock()
+        gateway.submit(client, make_msg())
+        client.unsubscribe.assert_not_called()
+        gateway.submit(client, make_msg())
+        client.unsubscribe.assert_called_once_with([topic for topic, _ in SUBSCRIPTIONS])
+        self.assertTrue(gateway.metrics()['paused'])
+
+        worker = threading.Thread(target=gateway._work, daemon=True)
+        gateway._workers.append(worker)
+        worker.start()
+        gateway.stop()
+        client.subscribe.assert_called_with(SUBSCRIPTIONS)
+        metrics = gateway.metrics()
+        self.assertFalse(metrics['paused'])
+        self.assertEqual(metrics['processed'], 2)
+
+    def test_on_message_returns_when_the_queue_is_full(self):
+        gateway = IngestionGateway(Mock(), SUBSCRIPTIONS, workers=0, queue_size=2)
+        client = Mock()
+        gateway.submit(client, make_msg(mid=1))
+        gateway.submit(client, make_msg(mid=2))
+        on_message = threading.Thread(target=gateway.submit, args=(client, make_msg(mid=3)), daemon=True)
+        on_message.start()
+        on_message.join(1)
+        self.assertFalse(on_message.is_alive())
+        metrics = gateway.metrics()
+        self.assertEqual((metrics['received'], metrics['rejected']), (2, 1))
+        self.assertTrue(metrics['paused'])
+        # the rejected message is not acked, the broker delivers it again
+        self.assertEqual([c.args for c in client.ack.call_args_list], [(1, 1), (2, 1)])
+
+    def test_handler_errors_are_counted(self):
+        def handler(client, topic, payload):
+            raise ValueError("bad payload")
+
+        gateway = IngestionGateway(handler, SUBSCRIPTIONS, workers=1)
+        gateway.submit(Mock(), make_msg())
+        gateway.stop()
+        self.assertEqual(gateway.metrics()['failed'], 1)
+
+    def test_subscribe_is_skipped_while_paused(self):
+        gateway = IngestionGateway(Mock(), SUBSCRIPTIONS, workers=1)
+        client = Mock()
+        gateway.paused = True
+        gateway.subscribe(client)
+        client.subscribe.assert_not_called()
+        gateway.stop()
@@ -0,0 +1,115 @@
+'''
+Bu hierarchy backed by the bt_closure table.
+
+The bu lists of a client used to be walked by the recursive function
+fn_get_bulist (fn_mendownbt, fn_menupbt, fn_menallbt) on nearly every list
+view, report filter and login. bt_closure holds every (ancestor,
+descendant, depth) pair of the tree, each bu being its own ancestor at
+depth 0, so a subtree or the ancestors of a bu are one index lookup.
+
+The table is kept by triggers on bt (migration onboarding 0004): an insert
+links the new bu and the bus already pointing to it, a change of parent_id
+moves the whole subtree, a delete removes its pairs. Cycles in parent_id
+are not followed. check() compares the table with a recursive walk of bt
+and rebuild() fills it again, see the check_bt_hierarchy command.
+
+The functions return the same bus as fn_get_bulist:
+
+- descendants(buid): the bu and its subtree (p_up false, p_dn true),
+- ancestors(buid):   the bu and its parents, NONE (1) and -1 excluded
+  (p_up true, p_dn false),
+- tree(buid):        both of them ordered by id (p_up true, p_dn true).
+'''
+import logging
+
+from django.db import connections, transaction
+from django.db.models import Q
+
+log = logging.getLogger('django')
+
+# ancestors not listed by fn_menupbt
+ROOTS = (1, -1)
+
+EXPECTED_SQL = '''
+    WITH RECURSIVE tree(ancestor, descendant, depth, path) AS (
+        SELECT id, id, 0, ARRAY[id] FROM bt
+        UNION ALL
+        SELECT t.ancestor, b.id, t.depth + 1, t.path || b.id
+        FROM tree t JOIN bt b ON b.parent_id = t.descendant
+        WHERE b.id <> ALL(t.path)
+    )
+    SELECT ancestor, descendant, MIN(depth) AS depth FROM tree GROUP BY ancestor, descendant
+'''
+
+REBUILD_SQL = f'''
+    DELETE FROM bt_closure;
+    INSERT INTO bt_closure (ancestor, descendant, depth) {EXPECTED_SQL};
+'''
+
+CHECK_SQL = f'''
+    WITH expected AS ({EXPECTED_SQL})
+    SELECT 'missing', e.ancestor, e.descendant FROM expected e
+    LEFT JOIN bt_closure c ON c.ancestor = e.ancestor AND c.descendant = e.descendant AND c.depth = e.depth
+    WHERE c.ancestor IS NULL
+    UNION ALL
+    SELECT 'extra', c.ancestor, c.descendant FROM bt_closure c
+    LEFT JOIN expected e ON e.ancestor = c.ancestor AND e.descendant = c.descendant AND e.depth = c.depth
+    WHERE e.ancestor IS NULL
+'''
+
+
+def closure(using=None):
+    from apps.onboarding.models import BtClosure
+    return BtClosure.objects.using(using) if using else BtClosure.objects
+
+
+def descendants(buid, include_self=True, using=None):
+    "ids of the subtree of buid, usable as a subquery"
+    qset = closure(using).filter(ancestor=buid)
+    if not include_self:
+        qset = qset.filter(depth__gt=0)
+    return qset.values_list('descendant', flat=True)
+
+
+def ancestors(buid, include_self=True, using=None):
+    "ids of the parents of buid up to the client, usable as a subquery"
+    qset = closure(using).filter(descendant=buid).exclude(Q(ancestor__in=ROOTS) & Q(depth__gt=0))
+    if not include_self:
+        qset = qset.filter(depth__gt=0)
+    return qset.values_list('ancestor', flat=True)
+
+
+def tree_q(buid, field='id', using=None):
+    "Q of the bus of the tree of buid, its parents and its subtree"
+    return Q(**{f'{field}__in': descendants(buid, using=using)}) | Q(**{f'{field}__in': ancestors(buid, using=using)})
+
+
+def tree(buid, using=None):
+    "sorted ids of the parents and the subtree of buid"
+    return sorted(set(descendants(buid, using=using)) | set(ancestors(buid, using=using)))
+
+
+def check(using='default', limit=20):
+    '''
+    differences between bt_closure and a recursive walk of bt,
+    {'missing': n, 'extra': n, 'samples': [(kind, ancestor, descendant)]}
+    '''
+    result = {'missing': 0, 'extra': 0, 'samples': []}
+    with connections[using].cursor() as cursor:
+        cursor.execute(CHECK_SQL)
+        for kind, ancestor, descendant in cursor.fetchall():
+            result[kind] += 1
+            if len(result['samples']) < limit:
+                result['samples'].append((kind, ancestor, descendant))
+    return result
+
+
+def rebuild(using='default'):
+    "fills bt_closure again from bt, returns the number of pairs"
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        cursor.execute('LOCK TABLE bt_closure IN EXCLUSIVE MODE')
+        cursor.execute(REBUILD_SQL)
+        cursor.execute('SELECT COUNT(*) FROM bt_closure')
+        count = cursor.fetchone()[0]
+    log.info(f"bt_closure of {using} rebuilt with {count} pairs")
+    return count
@@ -0,0 +1,30 @@
+"""
+Django management command comparing bt_closure with the bu tree of bt
+Usage: python manage.py check_bt_hierarchy [--database default] [--fix]
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from apps.onboarding import hierarchy
+
+
+class Command(BaseCommand):
+    help = 'Check the bu hierarchy kept in bt_closure against bt, rebuild it with --fix'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', action='append', help='Database alias, every database by default')
+        parser.add_argument('--fix', action='store_true', help='Rebuild bt_closure of the databases out of sync')
+
+    def handle(self, *args, **options):
+        for db in options['database'] or list(settings.DATABASES):
+            result = hierarchy.check(using=db)
+            if not result['missing'] and not result['extra']:
+                self.stdout.write(self.style.SUCCESS(f'{db}: bt_closure in sync'))
+                continue
+            self.stdout.write(self.style.WARNING(
+                f"{db}: {result['missing']} missing and {result['extra']} extra pairs in bt_closure"))
+            for kind, ancestor, descendant in result['samples']:
+                self.stdout.write(f'  {kind}: ancestor {ancestor} descendant {descendant}')
+            if options['fix']:
+                count = hierarchy.rebuild(using=db)
+                self.stdout.write(self.style.SUCCESS(f'{db}: bt_closure rebuilt with {count} pairs'))
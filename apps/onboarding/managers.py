@@ -7,6 +7,7 @@ import apps.peoples.models as pm
 from django.db.models.functions import Concat, Cast
 from django.db.models import Value as V
 from apps.core import utils
+from apps.onboarding import hierarchy
 
 class BtManager(models.Manager):
     use_in_migrations = True
@@ -31,16 +32,20 @@ class BtManager(models.Manager):
         """
         Returns all BU's on given client_id
         """
-        rtype = 'bigint[]' if type == "array" else 'jsonb'
-        qset = self.raw(
-            f"select fn_get_bulist({clientid}, false, true, '{type}'::text, null::{rtype}) as id;")
-        return qset[0].id if qset else self.none()
+        buids = hierarchy.descendants(clientid, using=self.db)
+        if type == 'jsonb':
+            return {
+                str(bu.pop('id')): bu for bu in self.filter(id__in=buids).values('id', 'bucode', 'buname', 'parent_id')
+            } or None
+        if type == 'text':
+            return ' '.join(str(buid) for buid in sorted(buids))
+        return list(buids)
     
     def get_all_sites_of_client(self, clientid):
         """
         Returns all sites of a given clientid
         """
-        all_buids = self.get_all_bu_of_client(clientid)
+        all_buids = hierarchy.descendants(clientid, using=self.db)
         return self.select_related().filter(id__in = all_buids, identifier__tacode = 'SITE') or self.none()
     
 
@@ -50,7 +55,7 @@ class BtManager(models.Manager):
         """
         qset = self.filter(
             Q(identifier__tacode = 'SITE') & Q(bucode = sitecode) 
-            & ~Q(parent__id = -1) & Q(id__in = self.get_all_bu_of_client(clientid))
+            & ~Q(parent__id = -1) & Q(id__in = hierarchy.descendants(clientid, using=self.db))
         )
         return qset[0] if qset else  self.none()
 
@@ -66,11 +71,7 @@ class BtManager(models.Manager):
         """
         Returns bu tree 
         """
-        import json
-        rtype = 'bigint[]'
-        qset_json = self.raw(
-            f"select fn_get_bulist({clientid}, true, true, 'array'::text, null::{rtype}) as id;")
-        return qset_json[0].id if qset_json else  []
+        return hierarchy.tree(clientid, using=self.db)
 
     def getsitelist(self, clientid, peopleid):
         # check if people is admin or not
@@ -80,7 +81,7 @@ class BtManager(models.Manager):
             return self.none()
         else:
             if p.isadmin:
-                bulist = self.get_all_bu_of_client(clientid)
+                bulist = hierarchy.descendants(clientid, using=self.db)
                 bus = self.filter(id__in = bulist)
                 qset = bus.annotate(bu_id = F('id')).filter(identifier__tacode = 'SITE').values(
                     'bu_id', 'bucode', 'butype_id', 'enable', 'cdtz', 'mdtz', 'skipsiteaudit',
@@ -92,8 +93,7 @@ class BtManager(models.Manager):
     def load_parent_choices(self, request):
         search_term = request.GET.get('search')
         parentid = -1 if request.GET.get('parentid') == 'None' else request.GET.get('parentid')
-        buids = utils.runrawsql("select fn_get_bulist(%s, true, true, 'array'::text, null::bigint[]) as buids", [parentid])
-        qset = self.filter(id__in=buids[0]['buids']).select_related('identifier', 'parent')
+        qset = self.filter(hierarchy.tree_q(parentid, using=self.db)).select_related('identifier', 'parent')
         qset = qset.filter(buname__icontains = search_term) if search_term else qset
         qset = qset.annotate(
             text = Concat(F('buname'), V(" ("), F('identifier__tacode'), V(")"))).exclude(
@@ -231,8 +231,7 @@ class BtManager(models.Manager):
             clientid = request.GET.get('client_id')
             idf = request.GET.get('identifier')
         if clientid not in (None, 'None'):
-            buids = utils.runrawsql("select fn_get_bulist(%s, true, true, 'array'::text, null::bigint[]) as buids", [clientid])
-            qset = self.filter(id__in=buids[0]['buids']).select_related('identifier', 'parent', 'butype')
+            qset = self.filter(hierarchy.tree_q(clientid, using=self.db)).select_related('identifier', 'parent', 'butype')
             qset = qset.filter(identifier__tacode=idf).exclude(
                     bucode__in=['NONE', 'YTPL']).distinct().values(*fields)
             return qset or self.none()
@@ -0,0 +1,25 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    # indexes of large tables are built without locking writes
+    atomic = False
+
+    dependencies = [
+        ('onboarding', '0002_initial'),
+        ('core', '0005_pg_trgm'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='bt',
+            index=GinIndex(fields=['buname'], name='bt_buname_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        AddIndexConcurrently(
+            model_name='bt',
+            index=GinIndex(fields=['bucode'], name='bt_bucode_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
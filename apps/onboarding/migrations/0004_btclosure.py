@@ -0,0 +1,106 @@
+from django.db import migrations, models
+
+
+CLOSURE_FUNCTIONS_SQL = """
+CREATE OR REPLACE FUNCTION fn_bt_closure_attach(p_id bigint, p_parent bigint) RETURNS void AS $$
+BEGIN
+    -- detaches the subtree of p_id from its former ancestors
+    DELETE FROM bt_closure c
+    USING bt_closure s
+    WHERE s.ancestor = p_id AND c.descendant = s.descendant
+      AND c.ancestor NOT IN (SELECT descendant FROM bt_closure WHERE ancestor = p_id);
+    -- a parent inside the subtree is a cycle, it is not followed
+    IF p_parent IS NULL OR EXISTS (
+        SELECT 1 FROM bt_closure WHERE ancestor = p_id AND descendant = p_parent) THEN
+        RETURN;
+    END IF;
+    INSERT INTO bt_closure (ancestor, descendant, depth)
+    SELECT a.ancestor, s.descendant, a.depth + s.depth + 1
+    FROM bt_closure a, bt_closure s
+    WHERE a.descendant = p_parent AND s.ancestor = p_id
+    ON CONFLICT DO NOTHING;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION fn_bt_closure_insert() RETURNS trigger AS $$
+DECLARE
+    child bigint;
+BEGIN
+    INSERT INTO bt_closure (ancestor, descendant, depth) VALUES (NEW.id, NEW.id, 0) ON CONFLICT DO NOTHING;
+    -- foreign keys are deferred, children may be inserted before their parent
+    FOR child IN SELECT id FROM bt WHERE parent_id = NEW.id AND id <> NEW.id LOOP
+        PERFORM fn_bt_closure_attach(child, NEW.id);
+    END LOOP;
+    PERFORM fn_bt_closure_attach(NEW.id, NEW.parent_id);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION fn_bt_closure_move() RETURNS trigger AS $$
+BEGIN
+    PERFORM fn_bt_closure_attach(NEW.id, NEW.parent_id);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION fn_bt_closure_delete() RETURNS trigger AS $$
+BEGIN
+    DELETE FROM bt_closure WHERE descendant = OLD.id OR ancestor = OLD.id;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER bt_closure_insert AFTER INSERT ON bt
+    FOR EACH ROW EXECUTE FUNCTION fn_bt_closure_insert();
+CREATE TRIGGER bt_closure_move AFTER UPDATE OF parent_id ON bt
+    FOR EACH ROW WHEN (OLD.parent_id IS DISTINCT FROM NEW.parent_id) EXECUTE FUNCTION fn_bt_closure_move();
+CREATE TRIGGER bt_closure_delete AFTER DELETE ON bt
+    FOR EACH ROW EXECUTE FUNCTION fn_bt_closure_delete();
+"""
+
+DROP_CLOSURE_FUNCTIONS_SQL = """
+DROP TRIGGER IF EXISTS bt_closure_insert ON bt;
+DROP TRIGGER IF EXISTS bt_closure_move ON bt;
+DROP TRIGGER IF EXISTS bt_closure_delete ON bt;
+DROP FUNCTION IF EXISTS fn_bt_closure_insert();
+DROP FUNCTION IF EXISTS fn_bt_closure_move();
+DROP FUNCTION IF EXISTS fn_bt_closure_delete();
+DROP FUNCTION IF EXISTS fn_bt_closure_attach(bigint, bigint);
+"""
+
+FILL_CLOSURE_SQL = """
+INSERT INTO bt_closure (ancestor, descendant, depth)
+WITH RECURSIVE tree(ancestor, descendant, depth, path) AS (
+    SELECT id, id, 0, ARRAY[id] FROM bt
+    UNION ALL
+    SELECT t.ancestor, b.id, t.depth + 1, t.path || b.id
+    FROM tree t JOIN bt b ON b.parent_id = t.descendant
+    WHERE b.id <> ALL(t.path)
+)
+SELECT ancestor, descendant, MIN(depth) FROM tree GROUP BY ancestor, descendant;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('onboarding', '0003_trgm_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BtClosure',
+            fields=[
+                ('pk', models.CompositePrimaryKey('ancestor', 'descendant', blank=True, editable=False, primary_key=True, serialize=False)),
+                ('ancestor', models.BigIntegerField(verbose_name='Ancestor')),
+                ('descendant', models.BigIntegerField(verbose_name='Descendant')),
+                ('depth', models.IntegerField(verbose_name='Depth')),
+            ],
+            options={
+                'db_table': 'bt_closure',
+                'indexes': [models.Index(fields=['descendant', 'ancestor'], name='bt_closure_descendant_idx')],
+            },
+        ),
+        migrations.RunSQL(sql=FILL_CLOSURE_SQL, reverse_sql=migrations.RunSQL.noop),
+        migrations.RunSQL(sql=CLOSURE_FUNCTIONS_SQL, reverse_sql=DROP_CLOSURE_FUNCTIONS_SQL),
+    ]
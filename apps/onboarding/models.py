@@ -2,6 +2,7 @@ from django.conf import settings
 from django.urls import reverse
 from django.contrib.gis.db.models import PolygonField
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
 from apps.tenants.models import TenantAwareModel
 from apps.peoples.models import BaseModel
 from .managers import BtManager, TypeAssistManager, GeofenceManager,ShiftManager, DeviceManager, SubscriptionManger
@@ -89,6 +90,11 @@ class Bt(BaseModel, TenantAwareModel):
         constraints = [models.UniqueConstraint(
             fields=['bucode', 'parent', 'identifier'],
             name='bu_bucode_parent_identifier_uk')]
+        indexes = [
+            # search of the list views, see apps.core.search
+            GinIndex(fields=['buname'], name='bt_buname_trgm_idx', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['bucode'], name='bt_bucode_trgm_idx', opclasses=['gin_trgm_ops']),
+        ]
         get_latest_by = ["mdtz", 'cdtz']
 
     def __str__(self) -> str:
@@ -103,6 +109,26 @@ class Bt(BaseModel, TenantAwareModel):
         if self.siteincharge is None: self.siteincharge= utils.get_or_create_none_people()
         if self.butype is None: self.butype = utils.get_none_typeassist()
 
+class BtClosure(models.Model):
+    """
+    ancestor -> descendant pairs of the bu tree, every bu is its own
+    ancestor at depth 0. Kept up to date by the triggers on bt, read
+    through apps.onboarding.hierarchy
+    """
+    pk         = models.CompositePrimaryKey('ancestor', 'descendant')
+    ancestor   = models.BigIntegerField(_("Ancestor"))
+    descendant = models.BigIntegerField(_("Descendant"))
+    depth      = models.IntegerField(_("Depth"))
+
+    class Meta:
+        db_table = 'bt_closure'
+        indexes = [
+            models.Index(fields=['descendant', 'ancestor'], name='bt_closure_descendant_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.ancestor} -> {self.descendant} ({self.depth})'
+
 def shiftdata_json():
     return{
     }
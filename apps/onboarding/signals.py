@@ -4,7 +4,7 @@ from apps.onboarding.serializers import GeofenceMasterSerializers,BtSerializers,
 from django.dispatch import receiver
 import json
 
-from background_tasks.tasks import publish_mqtt
+from apps.core import outbox
 TOPIC = "redmine_to_noc"
 
 
@@ -25,24 +25,20 @@ def build_payload(instance, model_name, created):
 
 @receiver(post_save, sender=Bt)
 def bt_post_save(sender, instance, created, **kwargs):
-    payload = build_payload(instance, "Bt", created)
-    publish_mqtt.delay(TOPIC, payload)
+    outbox.enqueue(TOPIC, instance, "Bt", created, build_payload)
 
 
 @receiver(post_save, sender=TypeAssist)
 def typeassist_post_save(sender, instance, created, **kwargs):
-    payload = build_payload(instance, "TypeAssist", created)
-    publish_mqtt.delay(TOPIC, payload)
+    outbox.enqueue(TOPIC, instance, "TypeAssist", created, build_payload)
 
 
 @receiver(post_save, sender=Shift)
 def shift_post_save(sender, instance, created, **kwargs):
-    payload = build_payload(instance, "Shift", created)
-    publish_mqtt.delay(TOPIC, payload)
+    outbox.enqueue(TOPIC, instance, "Shift", created, build_payload)
 
 
 @receiver(post_save, sender=GeofenceMaster)
 def geofencemaster_post_save(sender, instance, created, **kwargs):
-    payload = build_payload(instance, "GeofenceMaster", created)
-    publish_mqtt.delay(TOPIC, payload)
+    outbox.enqueue(TOPIC, instance, "GeofenceMaster", created, build_payload)
 
@@ -0,0 +1,80 @@
+"""
+Tests for the bt_closure hierarchy kept by the triggers on bt
+"""
+import pytest
+from apps.onboarding import hierarchy
+from apps.onboarding.models import Bt
+
+
+@pytest.mark.django_db
+class TestBtHierarchy:
+    """Test suite for apps.onboarding.hierarchy"""
+
+    def test_descendants_of_new_bus(self, bt_factory):
+        """Test a new bu is added to the subtree of its parents"""
+        client = bt_factory(bucode='HCLIENT')
+        site = bt_factory(bucode='HSITE', parent=client)
+        post = bt_factory(bucode='HPOST', parent=site)
+
+        assert set(hierarchy.descendants(client.id)) == {client.id, site.id, post.id}
+        assert set(hierarchy.descendants(client.id, include_self=False)) == {site.id, post.id}
+        assert set(hierarchy.ancestors(post.id)) >= {client.id, site.id, post.id}
+
+    def test_tree_of_a_site(self, bt_factory):
+        """Test tree lists the parents and the subtree ordered by id"""
+        client = bt_factory(bucode='TCLIENT')
+        site = bt_factory(bucode='TSITE', parent=client)
+        other = bt_factory(bucode='TOTHER', parent=client)
+        post = bt_factory(bucode='TPOST', parent=site)
+
+        tree = hierarchy.tree(site.id)
+        assert tree == sorted(tree)
+        assert {client.id, site.id, post.id} <= set(tree)
+        assert other.id not in tree
+
+    def test_move_of_a_subtree(self, bt_factory):
+        """Test a change of parent moves the whole subtree"""
+        first = bt_factory(bucode='MFIRST')
+        second = bt_factory(bucode='MSECOND')
+        site = bt_factory(bucode='MSITE', parent=first)
+        post = bt_factory(bucode='MPOST', parent=site)
+
+        site.parent = second
+        site.save()
+
+        assert set(hierarchy.descendants(first.id)) == {first.id}
+        assert set(hierarchy.descendants(second.id)) == {second.id, site.id, post.id}
+        assert hierarchy.check()['missing'] == 0
+
+    def test_delete_of_a_bu(self, bt_factory):
+        """Test a deleted bu leaves the closure"""
+        client = bt_factory(bucode='DCLIENT')
+        site = bt_factory(bucode='DSITE', parent=client)
+        site_id = site.id
+
+        Bt.objects.filter(id=site_id).delete()
+
+        assert set(hierarchy.descendants(client.id)) == {client.id}
+        assert not hierarchy.closure().filter(descendant=site_id).exists()
+
+    def test_check_and_rebuild(self, bt_factory):
+        """Test check reports a damaged closure and rebuild repairs it"""
+        client = bt_factory(bucode='RCLIENT')
+        bt_factory(bucode='RSITE', parent=client)
+        hierarchy.closure().filter(ancestor=client.id).delete()
+
+        result = hierarchy.check()
+        assert result['missing'] == 2
+        assert ('missing', client.id, client.id) in result['samples']
+
+        hierarchy.rebuild()
+        assert hierarchy.check() == {'missing': 0, 'extra': 0, 'samples': []}
+
+    def test_get_all_bu_of_client(self, bt_factory):
+        """Test the manager lists the subtree in every format"""
+        client = bt_factory(bucode='BCLIENT')
+        site = bt_factory(bucode='BSITE', parent=client)
+
+        assert set(Bt.objects.get_all_bu_of_client(client.id)) == {client.id, site.id}
+        assert set(Bt.objects.get_all_bu_of_client(client.id, 'jsonb')) == {str(client.id), str(site.id)}
+        assert set(Bt.objects.get_all_bu_of_client(client.id, 'text').split()) == {str(client.id), str(site.id)}
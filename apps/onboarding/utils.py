@@ -6,15 +6,12 @@ import requests
 import pandas as pd
 from tablib import Dataset
 import logging
-from intelliwiz_config.settings import BULK_IMPORT_GOOGLE_DRIVE_API_KEY as api_key,MEDIA_ROOT, GOOGLE_MAP_SECRET_KEY as google_map_key
+from intelliwiz_config.settings import BULK_IMPORT_GOOGLE_DRIVE_API_KEY as api_key,MEDIA_ROOT
 from apps.onboarding.models import Bt, TypeAssist
 from apps.peoples.models import People
-from apps.core import utils
+from apps.core import geocoding, utils
 import json 
 from django.http import response as rp
-import googlemaps
-from math import radians, sin, cos, sqrt, atan2
-from django.contrib.gis.geos import Point, Polygon
 
 
 logger = logging.getLogger('django')
@@ -612,27 +609,16 @@ def handle_shift_data_edit(request,self):
 
 def polygon_to_address(polygon):
     """
-    Convert a polygon object to a human-readable address using Google Maps Geocoding API.
+    Convert a polygon object to a human-readable address of its centroid.
     Args:
         polygon: Django GEOS Polygon object
     Returns:
         str: Human-readable address
     """
     try:
-        # Get the centroid of the polygon
         centroid = polygon.centroid
-        # Extract latitude and longitude
-        lat = centroid.y
-        lon = centroid.x
-        
-        # Your Google Maps API key
-        gmaps = googlemaps.Client(key=google_map_key)
-        
-        # Perform reverse geocoding
-        reverse_geocode_result = gmaps.reverse_geocode((lat, lon))
-        if reverse_geocode_result:
-            return reverse_geocode_result[0]['formatted_address']
-        return "Address not found"
+        # addresses are cached per geohash cell, see apps.core.geocoding
+        return geocoding.reverse(centroid.y, centroid.x) or "Address not found"
     except Exception as e:
         return f"Error getting address: {str(e)}"
 
@@ -646,36 +632,9 @@ def is_point_in_geofence(lat, lon, geofence):
     Returns:
         bool: True if the point is inside the geofence, False otherwise.
     """
-    # Create a Point object from the lat, lon
-    point = Point(lon, lat)  # Note: Point expects (longitude, latitude)
-
-    # Case 1: Geofence is a polygon (Django GEOS Polygon object)
-    if isinstance(geofence, Polygon):
-        return geofence.contains(point)
-
-    # Case 2: Geofence is circular (tuple with center lat, lon, and radius in km)
-    elif isinstance(geofence, tuple) and len(geofence) == 3:
-        geofence_lat, geofence_lon, radius_km = geofence
-        
-        # Calculate distance using Haversine formula
-        # Convert lat/lon from degrees to radians
-        lat1 = radians(lat)
-        lon1 = radians(lon)
-        lat2 = radians(geofence_lat)
-        lon2 = radians(geofence_lon)
-
-        # Haversine formula
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        a = sin(dlat / 2)**2 + cos(lat1) * cos(lat2) * sin(dlon / 2)**2
-        c = 2 * atan2(sqrt(a), sqrt(1 - a))
-        distance_km = 6371 * c  # Radius of Earth in kilometers
-
-        # Check if the distance is within the geofence radius
-        return distance_km <= radius_km
-
-    # If geofence is neither a polygon nor a circular geofence, return False
-    return False
+    from apps.attendance import geofence as gf
+    geofence = gf.as_geofence(geofence)
+    return geofence.contains(lat, lon) if geofence else False
 
 # create a geofence from the gpslocation and radius
 def bulk_create_geofence(gpslocation, radius):
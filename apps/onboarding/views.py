@@ -15,6 +15,7 @@ from django.http.request import QueryDict
 from .models import Shift,  TypeAssist, Bt, GeofenceMaster, Device, Subscription
 from apps.peoples.utils import save_userinfo
 from apps.core import utils
+from apps.core.search import search_q
 from apps.activity.models.asset_model import Asset
 from apps.activity.models.job_model import Job,Jobneed
 from apps.peoples.models import Pgbelonging
@@ -847,8 +848,8 @@ class BtView(LoginRequiredMixin, View):
                     id__in=buids
             ).exclude(identifier__tacode='CLIENT').values(*self.params['fields']).order_by('buname')
 
-            if search:
-                objs = objs.filter(Q(buname__icontains=search) | Q(bucode__icontains=search))
+            if search and (q := search_q(self.params['model'], ['buname', 'bucode'], search)) is not None:
+                objs = objs.filter(q)
 
             if column_name:
                 order_prefix = '' if order_dir == 'asc' else '-'
@@ -955,6 +956,8 @@ class DashboardView(LoginRequiredMixin, View):
 
     def get_all_dashboard_counts(self, request, P):
         R, S = request.GET, request.session
+        if R['from'] and R['upto'] and getattr(settings, 'DASHBOARD_COUNTS_ROLLUP', False):
+            return {'counts': self.rollup_counts(P, request)}
         if R['from'] and R['upto']:
             ppmtask_arr = Jobneed.objects.get_ppmchart_data(request)
             task_arr = Jobneed.objects.get_taskchart_data(request)
@@ -970,6 +973,33 @@ class DashboardView(LoginRequiredMixin, View):
                 )
             }
     
+    def rollup_counts(self, P, request):
+        '''
+        counts of closed days come from the daily rollup, only today's
+        rows and the counters which are not per day are queried here.
+        '''
+        from apps.core.dashboard_counts import get_counts
+        counts = get_counts(request)
+        asset_chart_arr, asset_chart_total = Asset.objects.get_assetchart_data(request)
+        return dict(
+            **self.task_portlet(counts['task']),
+            **self.tour_portlet(counts['tour']),
+            **self.ppm_portlet(counts['ppm']),
+            **{key: counts[key] for key in [
+                'sos_count', 'IR_count', 'FR_fail_count', 'diversion_count',
+                'sitecrisis_count', 'workpermit_count']},
+            route_count = P['jn_model'].objects.get_schdroutes_count_forcard(request),
+            dynamic_tour_count = P['jn_model'].objects.get_dynamic_tour_count(request),
+            assetchartdata = asset_chart_arr,
+            alertchartdata = counts['alertchart'][0],
+            ticketchartdata = counts['ticketchart'][0],
+            womchartdata = counts['womchart'][0],
+            assetchart_total_count = asset_chart_total,
+            alertchart_total_count = counts['alertchart'][1],
+            ticketchart_total_count = counts['ticketchart'][1],
+            wom_total_count = counts['womchart'][1],
+        )
+
     def task_portlet(self, task_arr):
         return {
             'totalschd_tasks_count': task_arr[-1],
@@ -2,6 +2,7 @@ from django.contrib.auth.base_user import BaseUserManager
 from django.db import models
 from django.db.models import Q, F, Value as V
 from django.db.models.functions import Concat, Cast
+from apps.core import search
 from django.contrib.gis.db.models.functions import  AsGeoJSON
 from django.utils.translation import gettext_lazy as _
 import logging
@@ -362,17 +363,17 @@ class PgroupManager(models.Manager):
     def list_view_sitegrp(self, R, request):
         S = request.session
         from apps.core import utils
-        qobjs, dir,  fields, length, start = utils.get_qobjs_dir_fields_start_length(R)
+        qobjs, dir,  fields, length, start = utils.get_qobjs_dir_fields_start_length(R, self.model)
         qset = self.filter(
             ~Q(groupname = 'NONE'), 
             identifier__tacode = 'SITEGROUP',
             client_id = S['client_id'],
         ).select_related('identifier').values(*fields).order_by(dir)
 
-        total = qset.count()
+        total = search.count(qset)
         if qobjs:
             filteredqset = qset.filter(qobjs)
-            fcount = filteredqset.count()
+            fcount = search.count(filteredqset)
             filteredqset = filteredqset[start:start+length]
             return total, fcount, filteredqset
         qset = qset[start:start+length]
@@ -0,0 +1,29 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    # indexes of large tables are built without locking writes
+    atomic = False
+
+    dependencies = [
+        ('peoples', '0001_initial'),
+        ('core', '0005_pg_trgm'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='people',
+            index=GinIndex(fields=['peoplename'], name='people_peoplename_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        AddIndexConcurrently(
+            model_name='people',
+            index=GinIndex(fields=['peoplecode'], name='people_peoplecode_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        AddIndexConcurrently(
+            model_name='people',
+            index=GinIndex(fields=['loginid'], name='people_loginid_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -3,6 +3,7 @@ from django.db.models import CharField
 from django.urls import reverse
 from django.conf import settings
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
 from django.utils import timezone
 import uuid
 from django.utils.translation import gettext_lazy as _
@@ -147,6 +148,12 @@ class People(AbstractBaseUser, PermissionsMixin, TenantAwareModel, BaseModel):
             models.UniqueConstraint(
                 fields=['loginid', 'mobno', 'email', 'bu'], name='loginid_mobno_email_bu_uk'),
         ]
+        indexes = [
+            # search of the list views, see apps.core.search
+            GinIndex(fields=['peoplename'], name='people_peoplename_trgm_idx', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['peoplecode'], name='people_peoplecode_trgm_idx', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['loginid'], name='people_loginid_trgm_idx', opclasses=['gin_trgm_ops']),
+        ]
 
     def __str__(self) -> str:
         return f'{self.peoplename} ({self.peoplecode})'
@@ -0,0 +1,214 @@
+'''
+Session bundle of a people: capabilities, assigned sites, approver flags,
+client and site names saved in the session at login.
+
+save_user_session used to run a capability query per capability type, the
+assigned sites query, two approver checks and the client and site lookups,
+then write about 25 keys in the database session, at every login. At a
+shift change thousands of guards log in within minutes.
+
+The bundle is built once per (database, people) and version and kept in
+the cache, logins of the same people share it:
+
+- a save of a Capability, Bt or Pgbelonging bumps the version of the
+  database, a save of a People or Approver the version of the people, the
+  bundle is built again at the next read,
+- with SESSION_ENGINE = 'apps.peoples.session_bundle' the session keeps
+  only a reference to the bundle, the bundled keys are read from the
+  current bundle of the people on first access in a request, changes of
+  capabilities reach sessions already open. Keys written in the session
+  afterwards (the site switch of the client dashboard) win over the
+  bundle.
+'''
+import logging
+
+from django.conf import settings
+from django.contrib.sessions.backends import db
+from django.core.cache import cache
+from django.db.models import Q
+
+log = logging.getLogger('django')
+
+BUNDLE_KEY = 'session_bundle'
+TIMEOUT = getattr(settings, 'SESSION_BUNDLE_TIMEOUT', 12 * 60 * 60)
+
+# people_extras / bupreferences key of each capability type
+CAPABILITIES = {
+    'WEB': 'webcapability',
+    'MOB': 'mobilecapability',
+    'REPORT': 'reportcapability',
+    'PORTLET': 'portletcapability',
+    'NOC': 'noccapability',
+}
+CAPS_KEYS = {
+    'WEB': 'webcaps', 'MOB': 'mobcaps', 'REPORT': 'reportcaps', 'PORTLET': 'portletcaps', 'NOC': 'noccaps',
+}
+SESSION_CAPS = [f"{prefix}_{caps}" for prefix in ('client', 'people') for caps in CAPS_KEYS.values()]
+
+MISSING = object()
+
+
+def db_version_key(using):
+    return f"session_bundle_version:{using}"
+
+
+def people_version_key(using, people_id):
+    return f"session_bundle_version:{using}:{people_id}"
+
+
+def bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def invalidate(using, people_id=None):
+    "bundles of the people, of every people of the database by default"
+    bump(db_version_key(using) if people_id is None else people_version_key(using, people_id))
+
+
+def bundle_key(people_id, using):
+    versions = cache.get_many([db_version_key(using), people_version_key(using, people_id)])
+    return (f"session_bundle:{using}:{people_id}:{versions.get(db_version_key(using), 0)}"
+            f".{versions.get(people_version_key(using, people_id), 0)}")
+
+
+def bundle_ref(people_id, using):
+    return f"{using}:{people_id}"
+
+
+def parse_ref(ref):
+    "(people_id, using) of a bundle reference"
+    using, people_id = ref.rsplit(':', 1)
+    return int(people_id), using
+
+
+def get_capabilities(wanted, using, enabled_only=False):
+    '''
+    {cfor: [[capscode, capsname]]} of wanted {cfor: capscodes} in one
+    query, a capscodes of None takes every capability of the type
+    '''
+    from apps.peoples.models import Capability
+    condition = Q(pk__in=[])
+    for cfor, codes in wanted.items():
+        condition |= Q(cfor=cfor) if codes is None else Q(cfor=cfor, capscode__in=list(codes or []))
+    qset = Capability.objects.using(using).filter(condition)
+    if enabled_only:
+        qset = qset.filter(enable=True)
+    caps = {cfor: [] for cfor in wanted}
+    for cfor, code, name in qset.values_list('cfor', 'capscode', 'capsname'):
+        caps[cfor].append([code, name])
+    return caps
+
+
+def caps_entries(prefix, caps):
+    return {f"{prefix}_{CAPS_KEYS[cfor]}": caps.get(cfor, []) for cfor in CAPS_KEYS}
+
+
+def build(people_id, using):
+    "the session keys saved at login of the people"
+    from apps.peoples.models import People, Pgbelonging
+    from apps.work_order_management.models import Approver
+    people = People.objects.using(using).select_related('client', 'bu').get(id=people_id)
+    extras = people.people_extras or {}
+    bundle = {
+        'client_id': people.client_id,
+        'bu_id': people.bu_id,
+        'people_id': people.id,
+        'assignedsitegroups': extras.get('assignsitegroup'),
+        'clientcode': people.client.bucode,
+        'clientname': people.client.buname,
+        'sitename': people.bu.buname,
+        'sitecode': people.bu.bucode,
+        'google_maps_secret_key': settings.GOOGLE_MAP_SECRET_KEY,
+        'is_workpermit_approver': extras.get('isworkpermit_approver'),
+        'assignedsites': list(Pgbelonging.objects.get_assigned_sites_to_people(people.id)),
+    }
+    if people.is_superuser:
+        bundle['is_superadmin'] = True
+        bundle.update(dict.fromkeys(
+            ['people_webcaps', 'client_webcaps', 'people_mobcaps', 'people_reportcaps', 'people_portletcaps',
+             'client_mobcaps', 'client_reportcaps', 'client_portletcaps'], False))
+    else:
+        bundle['is_superadmin'] = people.peoplecode == 'SUPERADMIN'
+        bundle['is_admin'] = people.isadmin
+        if people.isadmin:
+            preferences = people.client.bupreferences or {}
+            wanted = {cfor: preferences.get(key) for cfor, key in CAPABILITIES.items() if cfor != 'NOC'}
+            # every NOC capability is offered to the clients
+            wanted['NOC'] = None
+            bundle.update(caps_entries('client', get_capabilities(wanted, using, enabled_only=True)))
+            bundle.update(caps_entries('people', {}))
+        else:
+            wanted = {cfor: extras.get(key) for cfor, key in CAPABILITIES.items()}
+            bundle.update(caps_entries('client', {}))
+            bundle.update(caps_entries('people', get_capabilities(wanted, using)))
+    approverfor = Approver.objects.using(using).filter(
+        client_id=people.client_id, people_id=people.id).values_list('approverfor', flat=True)
+    approverfor = {value for values in approverfor for value in values or []}
+    bundle['is_wp_approver'] = 'WORKPERMIT' in approverfor
+    bundle['is_sla_approver'] = 'SLA_TEMPLATE' in approverfor
+    return bundle
+
+
+def get(ref):
+    "current bundle of a reference, built when it is not in the cache"
+    people_id, using = parse_ref(ref)
+    key = bundle_key(people_id, using)
+    bundle = cache.get(key)
+    if bundle is None:
+        bundle = build(people_id, using)
+        cache.set(key, bundle, TIMEOUT)
+    return bundle
+
+
+def prepare(people_id, using):
+    "reference of the bundle of the people, built when missing"
+    ref = bundle_ref(people_id, using)
+    get(ref)
+    return ref
+
+
+class SessionStore(db.SessionStore):
+    '''
+    database session whose bundled keys are read from the session bundle,
+    the session row keeps only the bundle reference
+    '''
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._bundle = None
+
+    def bundle_value(self, key, default=MISSING):
+        ref = self._session.get(BUNDLE_KEY)
+        if ref is None or key == BUNDLE_KEY:
+            return default
+        if self._bundle is None:
+            self._bundle = get(ref)
+        return self._bundle.get(key, default)
+
+    def __getitem__(self, key):
+        try:
+            return super().__getitem__(key)
+        except KeyError:
+            value = self.bundle_value(key)
+            if value is MISSING:
+                raise
+            return value
+
+    def __contains__(self, key):
+        return super().__contains__(key) or self.bundle_value(key) is not MISSING
+
+    def get(self, key, default=None):
+        value = super().get(key, MISSING)
+        return self.bundle_value(key, default) if value is MISSING else value
+
+    def __setitem__(self, key, value):
+        if key == BUNDLE_KEY:
+            self._bundle = None
+        super().__setitem__(key, value)
+
+    def flush(self):
+        self._bundle = None
+        super().flush()
@@ -1,10 +1,14 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from apps.peoples.models import People
+from apps.peoples.models import Capability, People, Pgbelonging
+from apps.onboarding.models import Bt
+from apps.work_order_management.models import Approver
+from apps.peoples import session_bundle
 from apps.peoples.serializers import PeopleSerializer
 import json
 
-from background_tasks.tasks import publish_mqtt
+from apps.core import outbox
 TOPIC = "redmine_to_noc"
 
 
@@ -23,5 +27,25 @@ def build_payload(instance, model_name, created):
 
 @receiver(post_save, sender=People)
 def people_post_save(sender, instance, created, **kwargs):
-    payload = build_payload(instance, "People", created)
-    publish_mqtt.delay(TOPIC, payload)
+    outbox.enqueue(TOPIC, instance, "People", created, build_payload)
+
+
+def invalidate_session_bundles(using, people_id=None):
+    transaction.on_commit(lambda: session_bundle.invalidate(using, people_id), using=using)
+
+
+@receiver([post_save, post_delete], sender=People)
+@receiver([post_save, post_delete], sender=Approver)
+def people_session_bundle_changed(sender, instance, update_fields=None, **kwargs):
+    # login saves last_login, the bundle stays
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    people_id = instance.id if sender is People else instance.people_id
+    invalidate_session_bundles(instance._state.db, people_id)
+
+
+@receiver([post_save, post_delete], sender=Capability)
+@receiver([post_save, post_delete], sender=Pgbelonging)
+@receiver([post_save, post_delete], sender=Bt)
+def session_bundles_changed(sender, instance, **kwargs):
+    invalidate_session_bundles(instance._state.db)
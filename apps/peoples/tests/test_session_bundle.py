@@ -0,0 +1,72 @@
+"""
+Tests for the session bundle saved at login
+"""
+from unittest.mock import patch
+
+from apps.peoples import session_bundle
+
+
+class FakeCache(dict):
+
+    def get_many(self, keys):
+        return {key: self[key] for key in keys if key in self}
+
+    def set(self, key, value, timeout=None):
+        self[key] = value
+
+    def incr(self, key):
+        if key not in self:
+            raise ValueError(key)
+        self[key] += 1
+
+
+class TestBundle:
+
+    @patch('apps.peoples.session_bundle.build', return_value={'clientcode': 'SPS'})
+    @patch('apps.peoples.session_bundle.cache', new_callable=FakeCache)
+    def test_bundle_is_built_once_per_version(self, mock_cache, mock_build):
+        ref = session_bundle.prepare(7, 'sps')
+        assert ref == 'sps:7'
+        assert session_bundle.get(ref) == {'clientcode': 'SPS'}
+        mock_build.assert_called_once_with(7, 'sps')
+
+        session_bundle.invalidate('sps', 7)
+        session_bundle.get(ref)
+        session_bundle.invalidate('sps')
+        session_bundle.get(ref)
+        assert mock_build.call_count == 3
+        assert 'session_bundle:sps:7:1.1' in mock_cache
+
+    @patch('apps.peoples.session_bundle.build', return_value={})
+    @patch('apps.peoples.session_bundle.cache', new_callable=FakeCache)
+    def test_people_version_does_not_touch_other_people(self, mock_cache, mock_build):
+        session_bundle.prepare(7, 'sps')
+        session_bundle.prepare(8, 'sps')
+        session_bundle.invalidate('sps', 7)
+        session_bundle.get('sps:8')
+        assert mock_build.call_count == 2
+
+
+class TestSessionStore:
+
+    def make_session(self, data):
+        session = session_bundle.SessionStore()
+        session._session_cache = dict(data)
+        return session
+
+    @patch('apps.peoples.session_bundle.get', return_value={'clientcode': 'SPS', 'sitecode': 'HQ'})
+    def test_bundled_keys_are_read_from_the_bundle(self, mock_get):
+        session = self.make_session({session_bundle.BUNDLE_KEY: 'sps:7', 'sitecode': 'GATE'})
+        assert session['clientcode'] == 'SPS'
+        # keys written in the session win
+        assert session['sitecode'] == 'GATE'
+        assert session.get('missing', 1) == 1
+        assert 'clientcode' in session
+        mock_get.assert_called_once_with('sps:7')
+
+    @patch('apps.peoples.session_bundle.get')
+    def test_session_without_bundle(self, mock_get):
+        session = self.make_session({'ctzoffset': 330})
+        assert session.get('clientcode') is None
+        assert 'clientcode' not in session
+        mock_get.assert_not_called()
@@ -15,7 +15,7 @@ from apps.onboarding.models import  Bt
 # Rate limiting now handled by PostgreSQLRateLimitMiddleware
 # from apps.core.rate_limiting import rate_limit_login, record_failed_login, is_ip_blocked, is_username_blocked
 from apps.peoples.filters import CapabilityFilter
-from apps.core import utils
+from apps.core import search, utils
 import apps.peoples.filters as pft
 import apps.peoples.forms as pf  
 import apps.peoples.models as pm  
@@ -306,19 +306,16 @@ class PeopleView(LoginRequiredMixin, View):
             objs = self.params["model"].objects.people_list_view(
                 request, self.params["fields"], self.params["related"]
             )
-            if search_value:
-                objs = objs.filter(
-                    Q(peoplename__icontains=search_value) |
-                    Q(peoplecode__icontains=search_value) |
-                    Q(department__taname__icontains=search_value) |
-                    Q(bu__buname__icontains=search_value)
-                )
+            if search_value and (q := search.search_q(
+                    self.params["model"], ["peoplename", "peoplecode", "department__taname", "bu__buname"],
+                    search_value)) is not None:
+                objs = objs.filter(q)
 
             if column_name:
                 order_prefix = '' if order_dir == 'asc' else '-'
                 objs = objs.order_by(f'{order_prefix}{column_name}')
 
-            total = objs.count()
+            total = search.count(objs)
             paginated = objs[start:start + length]
             data = list(paginated)        
             return rp.JsonResponse({
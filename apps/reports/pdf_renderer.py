@@ -0,0 +1,108 @@
+'''
+WeasyPrint rendering service for the pdf reports.
+
+Every report used to look up and parse reports.css again, build a new
+FontConfiguration and fetch the client logo and static images over HTTP,
+then lay out the document. Here the font configuration and parsed
+stylesheets are cached per process and fetched assets (logos, images,
+fonts) are kept in a small LRU, for ASSET_TTL seconds and, for local
+files, as long as their mtime is unchanged, so a replaced client logo
+shows up in the next reports.
+
+Documents are laid out in one pass: rendering groups of rows apart
+repeats the title and totals of the report and restarts the page
+counters, so the pdf would not be the same.
+'''
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from urllib.parse import urlsplit
+from urllib.request import url2pathname
+
+from weasyprint import CSS, HTML, default_url_fetcher
+from weasyprint.text.fonts import FontConfiguration
+
+log = logging.getLogger('django')
+
+ASSET_CACHE_SIZE = 64
+ASSET_MAX_BYTES = 5 * 1024 * 1024
+ASSET_TTL = 300
+
+_font_config = None
+_font_config_pid = None
+
+
+def get_font_config():
+    "FontConfiguration of this process, shared by every render"
+    global _font_config, _font_config_pid
+    if _font_config is None or _font_config_pid != os.getpid():
+        _font_config, _font_config_pid = FontConfiguration(), os.getpid()
+        get_stylesheet.cache_clear()
+    return _font_config
+
+
+@lru_cache(maxsize=16)
+def get_stylesheet(path):
+    "reports.css and friends are parsed once per process"
+    return CSS(filename=path, font_config=get_font_config())
+
+
+def file_version(url):
+    "mtime of the file of a file: url, None for the other urls"
+    if not url.startswith('file:'):
+        return None
+    try:
+        return os.stat(url2pathname(urlsplit(url).path)).st_mtime_ns
+    except OSError:
+        return None
+
+
+class AssetCache:
+    '''
+    LRU of fetched client logos, images and fonts
+    used as weasyprint's url_fetcher, keyed on the url
+    and the mtime of local files, entries expire after ttl.
+    '''
+
+    def __init__(self, size=ASSET_CACHE_SIZE, max_bytes=ASSET_MAX_BYTES, ttl=ASSET_TTL):
+        self.size, self.max_bytes, self.ttl = size, max_bytes, ttl
+        self._assets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __call__(self, url, timeout=10, ssl_context=None):
+        if url.startswith('data:'):
+            return default_url_fetcher(url, timeout, ssl_context)
+        key, now = (url, file_version(url)), time.monotonic()
+        with self._lock:
+            entry = self._assets.get(key)
+            if entry is not None and now - entry[0] < self.ttl:
+                self._assets.move_to_end(key)
+                return dict(entry[1])
+        result = default_url_fetcher(url, timeout, ssl_context)
+        if 'file_obj' in result:
+            with result.pop('file_obj') as file_obj:
+                result['string'] = file_obj.read()
+        if len(result.get('string') or b'') <= self.max_bytes:
+            with self._lock:
+                self._assets[key] = (now, dict(result))
+                self._assets.move_to_end(key)
+                while len(self._assets) > self.size:
+                    self._assets.popitem(last=False)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._assets.clear()
+
+
+asset_cache = AssetCache()
+
+
+def render_pdf(html_string, base_url=None, stylesheets=(), presentational_hints=False):
+    "pdf bytes of html_string rendered with the cached fonts, stylesheets and assets"
+    return HTML(string=html_string, base_url=base_url, url_fetcher=asset_cache).write_pdf(
+        stylesheets=[get_stylesheet(path) for path in stylesheets],
+        font_config=get_font_config(), presentational_hints=presentational_hints)
@@ -1,6 +1,6 @@
 from apps.reports.utils import BaseReportsExport
-from apps.core.utils import runrawsql, get_timezone
-from apps.core.report_queries import get_query
+from apps.core.utils import get_timezone
+from apps.core.report_query_registry import run_report_query
 from apps.onboarding.models import Bt
 from apps.peoples.models import Pgroup
 from django.conf import settings
@@ -30,7 +30,7 @@ class RP_SITEVISITREPORT(BaseReportsExport):
         self.set_args_required_for_query()
         self.context = { 
             'base_path':settings.BASE_DIR,
-            'data': runrawsql(get_query(self.report_name),args= self.args, named_params=True),
+            'data': run_report_query(self.report_name, self.args),
             'report_title':self.report_title,
             'client_logo':self.get_client_logo(),
             'app_logo':self.ytpl_applogo,
@@ -50,7 +50,7 @@ class RP_SITEVISITREPORT(BaseReportsExport):
     def set_extra_data(self):
         from decimal import Decimal
         from collections import defaultdict
-        self.data = runrawsql(get_query(self.report_name),args=self.args,named_params=True)
+        self.data = run_report_query(self.report_name, self.args)
         site_times = defaultdict(list)
 
         #Adding Site Name as a key and value as a day and time in list of tuple. 
@@ -139,7 +139,7 @@ class RP_SITEVISITREPORT(BaseReportsExport):
         setting the data which is shown on report
         '''
         self.set_args_required_for_query()
-        self.data = runrawsql(get_query(self.report_name),args=self.args,named_params=True)
+        self.data = run_report_query(self.report_name, self.args)
         Data2 = self.set_extra_data()
         data3 = self.merge_data(self.data,Data2)
         self.data = data3
@@ -1,6 +1,6 @@
 from apps.reports.utils import BaseReportsExport
-from apps.core.utils import runrawsql, get_timezone
-from apps.core.report_queries import get_query
+from apps.core.utils import get_timezone
+from apps.core.report_query_registry import run_report_query
 from apps.onboarding.models import Bt
 from django.conf import settings
 
@@ -27,7 +27,7 @@ class DynamicDetailedTourSummaryReport(BaseReportsExport):
         self.set_args_required_for_query()
         self.context = {
             'base_path': settings.BASE_DIR,
-            'data' : runrawsql(get_query(self.report_name), args=self.args,named_params=True),
+            'data' : run_report_query(self.report_name, self.args),
             'report_title': self.report_title,
             'client_logo':self.get_client_logo(),
             'app_logo':self.ytpl_applogo,
@@ -49,7 +49,7 @@ class DynamicDetailedTourSummaryReport(BaseReportsExport):
         setting the data which is shown on report
         '''
         self.set_args_required_for_query()
-        self.data = runrawsql(get_query(self.report_name), args=self.args,named_params=True)
+        self.data = run_report_query(self.report_name, self.args)
         for i in self.data:
             i['Start Time'] = i['Start Time'].strftime('%d/%m/%Y')
             i['End Time'] = i['End Time'].strftime('%d/%m/%Y')
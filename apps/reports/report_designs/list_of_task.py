@@ -1,6 +1,6 @@
 from apps.reports.utils import BaseReportsExport
-from apps.core.utils import runrawsql, get_timezone
-from apps.core.report_queries import get_query
+from apps.core.utils import get_timezone
+from apps.core.report_query_registry import run_report_query
 from apps.onboarding.models import Bt
 from django.conf import settings
 
@@ -10,6 +10,7 @@ class ListofTaskReport(BaseReportsExport):
     design_file = "reports/pdf_reports/list_of_task.html"
     ytpl_applogo =  'frontend/static/assets/media/images/logo.png'
     report_name = 'LISTOFTASKS'
+    streamable = True
     fields = ['site*', 'fromdatetime*', 'uptodatetime*', 'peoplegroup', 'people']
     unsupported_formats = ['None']
 
@@ -28,7 +29,7 @@ class ListofTaskReport(BaseReportsExport):
         uptodatetime = self.formdata.get('uptodatetime').strftime('%d/%m/%Y %H:%M:%S')
         self.context = {
             'base_path': settings.BASE_DIR,
-            'data' : runrawsql(get_query(self.report_name), args=self.args,named_params=True),
+            'data' : run_report_query(self.report_name, self.args),
             'report_title': self.report_title,
             'client_logo':self.get_client_logo(),
             'app_logo':self.ytpl_applogo,
@@ -51,7 +52,7 @@ class ListofTaskReport(BaseReportsExport):
         setting the data which is shown on report
         '''
         self.set_args_required_for_query()
-        self.data = runrawsql(get_query(self.report_name), args=self.args, named_params= True)
+        self.data = run_report_query(self.report_name, self.args)
         return len(self.data) > 0
 
 
@@ -118,6 +119,8 @@ class ListofTaskReport(BaseReportsExport):
             has_data = self.set_context_data()
         else:
             self.set_additional_content()
+            if self.use_streaming(export_format):
+                return self.get_streaming_output(export_format)
             has_data = self.set_data()
         if not has_data:
             return None
@@ -1,6 +1,6 @@
 from apps.reports.utils import BaseReportsExport, format_data, get_day_header
-from apps.core.utils import runrawsql, get_timezone
-from apps.core.report_queries import get_query
+from apps.core.utils import get_timezone
+from apps.core.report_query_registry import run_report_query
 from apps.onboarding.models import Bt
 from django.conf import settings
 
@@ -30,13 +30,13 @@ class PeopleAttendanceSummaryReport(BaseReportsExport):
         
         self.context = {
             'base_path': settings.BASE_DIR,
-            'data' : format_data(runrawsql(get_query(self.report_name), args=self.args,named_params=True)),
+            'data' : format_data(run_report_query(self.report_name, self.args)),
             'report_title': self.report_title,
             'client_logo':self.get_client_logo(),
             'app_logo':self.ytpl_applogo,
             'report_subtitle_site':f"Site: {sitename}",
             'report_subtitle_date':f"From: {fromdatetime} To {uptodatetime}",
-            'header': get_day_header(runrawsql(get_query(self.report_name), args=self.args,named_params=True), fromdatetime, uptodatetime),
+            'header': get_day_header(run_report_query(self.report_name, self.args), fromdatetime, uptodatetime),
         }
         
         return len(self.context['data']) > 0
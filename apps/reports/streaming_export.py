@@ -0,0 +1,113 @@
+'''
+Incremental writers used by the streaming export mode of BaseReportsExport.
+
+Rows come from a server side cursor (stream_report_query) and are written
+one by one to a temporary file, so memory stays flat whatever the number
+of rows: CSV and JSON are written record by record, XLSX through
+xlsxwriter's constant_memory mode which flushes every finished row.
+'''
+import csv
+import io
+import json
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import xlsxwriter
+
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def select(columns, wanted):
+    '''
+    returns the wanted columns and a function picking their
+    values out of a row tuple of columns.
+    '''
+    index = [columns.index(col) for col in wanted]
+    return list(wanted), lambda row: [row[i] for i in index]
+
+
+def csv_value(value):
+    if isinstance(value, datetime):
+        return value.strftime(DATETIME_FORMAT)
+    return value
+
+
+def json_value(value):
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            return value.astimezone(timezone.utc).replace(tzinfo=None).isoformat(timespec='milliseconds') + 'Z'
+        return value.isoformat(timespec='milliseconds')
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def excel_value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if value is None or isinstance(value, (str, int, float, bool, date)):
+        return value
+    return str(value)
+
+
+def write_csv(rows, columns, output):
+    "writes a header and the rows to the binary file output, returns the row count"
+    text = io.TextIOWrapper(output, encoding='utf-8', newline='', write_through=True)
+    writer = csv.writer(text)
+    writer.writerow(columns)
+    count = 0
+    for row in rows:
+        writer.writerow([csv_value(value) for value in row])
+        count += 1
+    text.detach()
+    return count
+
+
+def write_json(rows, columns, output):
+    "writes the rows as a json array of records to the binary file output, returns the row count"
+    count = 0
+    output.write(b'[')
+    for row in rows:
+        if count:
+            output.write(b',')
+        output.write(json.dumps(dict(zip(columns, row)), default=json_value).encode('utf-8'))
+        count += 1
+    output.write(b']')
+    return count
+
+
+def write_xlsx(rows, columns, output, title=None):
+    '''
+    writes the rows as a table with a title row and a header row,
+    the layout the list report designs use. Returns the row count.
+    '''
+    workbook = xlsxwriter.Workbook(output, {
+        'constant_memory': True, 'remove_timezone': True,
+        'default_date_format': 'yyyy-mm-dd hh:mm:ss'})
+    worksheet = workbook.add_worksheet('Sheet1')
+    header_format = workbook.add_format({"valign": "middle", "fg_color": "#01579b", 'font_color': 'white'})
+    merge_format = workbook.add_format({'bg_color': '#E2F4FF'})
+    worksheet.set_column(0, max(len(columns) - 1, 0), 12)
+    # constant_memory only accepts rows in order
+    if title:
+        worksheet.merge_range("A1:F1", title, merge_format)
+    for col, name in enumerate(columns):
+        worksheet.write(1, col, name, header_format)
+    count = 0
+    for count, row in enumerate(rows, start=1):
+        for col, value in enumerate(row):
+            worksheet.write(count + 1, col, excel_value(value))
+    if count:
+        worksheet.autofilter(1, 0, count + 1, len(columns) - 1)
+    workbook.close()
+    return count
+
+
+WRITERS = {
+    'csv': (write_csv, 'text/csv'),
+    'json': (write_json, 'application/json'),
+    'xlsx': (write_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'xls': (write_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
@@ -0,0 +1,68 @@
+"""
+Tests for the pdf rendering service
+"""
+import os
+from unittest.mock import patch
+
+from apps.reports import pdf_renderer
+
+
+class TestAssetCache:
+
+    @patch('apps.reports.pdf_renderer.default_url_fetcher')
+    def test_assets_are_fetched_once(self, mock_fetcher):
+        mock_fetcher.return_value = {'string': b'png', 'mime_type': 'image/png'}
+        cache = pdf_renderer.AssetCache(size=2)
+        cache('https://example.com/logo.png')
+        result = cache('https://example.com/logo.png')
+        assert result['string'] == b'png'
+        assert mock_fetcher.call_count == 1
+
+    @patch('apps.reports.pdf_renderer.default_url_fetcher')
+    def test_least_recently_used_asset_is_evicted(self, mock_fetcher):
+        mock_fetcher.return_value = {'string': b'png', 'mime_type': 'image/png'}
+        cache = pdf_renderer.AssetCache(size=1)
+        cache('https://example.com/a.png')
+        cache('https://example.com/b.png')
+        cache('https://example.com/a.png')
+        assert mock_fetcher.call_count == 3
+
+    @patch('apps.reports.pdf_renderer.default_url_fetcher')
+    def test_replaced_file_is_fetched_again(self, mock_fetcher, tmp_path):
+        logo = tmp_path / 'logo.png'
+        logo.write_bytes(b'old')
+        mock_fetcher.side_effect = lambda url, *args: {'file_obj': open(logo, 'rb')}
+        cache = pdf_renderer.AssetCache()
+        assert cache(logo.as_uri())['string'] == b'old'
+        logo.write_bytes(b'new')
+        stat = logo.stat()
+        os.utime(logo, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        assert cache(logo.as_uri())['string'] == b'new'
+        assert mock_fetcher.call_count == 2
+
+    @patch('apps.reports.pdf_renderer.default_url_fetcher')
+    def test_assets_expire_after_the_ttl(self, mock_fetcher):
+        mock_fetcher.return_value = {'string': b'png', 'mime_type': 'image/png'}
+        cache = pdf_renderer.AssetCache(ttl=60)
+        with patch('apps.reports.pdf_renderer.time.monotonic', return_value=1000.0):
+            cache('https://example.com/logo.png')
+        with patch('apps.reports.pdf_renderer.time.monotonic', return_value=1030.0):
+            cache('https://example.com/logo.png')
+        assert mock_fetcher.call_count == 1
+        with patch('apps.reports.pdf_renderer.time.monotonic', return_value=1060.0):
+            cache('https://example.com/logo.png')
+        assert mock_fetcher.call_count == 2
+
+
+class TestRenderPdf:
+
+    @patch('apps.reports.pdf_renderer.get_stylesheet')
+    @patch('apps.reports.pdf_renderer.HTML')
+    def test_long_tables_are_laid_out_in_one_document(self, mock_html, mock_stylesheet):
+        body = ''.join(f'<tr><td>{i}</td></tr>' for i in range(5000))
+        html = f'<html><body><header>Title</header><table><tbody>{body}</tbody></table></body></html>'
+        mock_html.return_value.write_pdf.return_value = b'%PDF'
+        assert pdf_renderer.render_pdf(html, stylesheets=['reports.css']) == b'%PDF'
+        mock_html.assert_called_once_with(string=html, base_url=None, url_fetcher=pdf_renderer.asset_cache)
+        # weasyprint's default unless the caller asks for the hints
+        assert mock_html.return_value.write_pdf.call_args.kwargs['presentational_hints'] is False
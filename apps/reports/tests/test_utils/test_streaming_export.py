@@ -0,0 +1,57 @@
+"""
+Tests for the incremental writers of streaming report exports
+"""
+import json
+import tempfile
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pandas as pd
+
+from apps.reports import streaming_export
+
+
+COLUMNS = ['Site', 'Planned Datetime', 'Score']
+ROWS = [
+    ('Gate', datetime(2025, 1, 1, 8, 0), Decimal('12.50')),
+    ('Lobby', datetime(2025, 1, 1, 9, 30, tzinfo=timezone.utc), None),
+]
+
+
+def written(write, *args, **kwargs):
+    with tempfile.TemporaryFile() as output:
+        count = write(iter(ROWS), COLUMNS, output, *args, **kwargs)
+        output.seek(0)
+        return count, output.read()
+
+
+class TestStreamingWriters:
+
+    def test_select_picks_wanted_columns(self):
+        wanted, pick = streaming_export.select(COLUMNS, ['Score', 'Site'])
+        assert wanted == ['Score', 'Site']
+        assert pick(ROWS[0]) == [Decimal('12.50'), 'Gate']
+
+    def test_csv(self):
+        count, content = written(streaming_export.write_csv)
+        lines = content.decode().splitlines()
+        assert count == 2
+        assert lines[0] == 'Site,Planned Datetime,Score'
+        assert lines[1] == 'Gate,2025-01-01 08:00:00,12.50'
+        assert lines[2] == 'Lobby,2025-01-01 09:30:00,'
+
+    def test_json(self):
+        count, content = written(streaming_export.write_json)
+        records = json.loads(content)
+        assert count == 2
+        assert records[0] == {'Site': 'Gate', 'Planned Datetime': '2025-01-01T08:00:00.000', 'Score': 12.5}
+        assert records[1]['Planned Datetime'] == '2025-01-01T09:30:00.000Z'
+
+    def test_xlsx(self):
+        with tempfile.TemporaryFile() as output:
+            count = streaming_export.write_xlsx(iter(ROWS), COLUMNS, output, title='Client: X')
+            output.seek(0)
+            df = pd.read_excel(output, header=1)
+        assert count == 2
+        assert list(df.columns) == COLUMNS
+        assert df['Score'].iloc[0] == 12.5
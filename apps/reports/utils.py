@@ -13,16 +13,27 @@ from apps.onboarding.models import Bt
 from django.shortcuts import render
 from .forms import ReportForm
 from .models import ReportHistory
+from . import streaming_export
+from .pdf_renderer import render_pdf
 import logging, json
 from decimal import Decimal
 from datetime import datetime, timedelta
 import os
+import tempfile
+from functools import lru_cache
 import xlsxwriter
+from django.http import FileResponse
 
 log = logging.getLogger('django')
 error_log = logging.getLogger('error_logger')
 
 
+@lru_cache(maxsize=32)
+def find_static(path):
+    "staticfiles lookups walk every finder, report assets do not move at runtime"
+    return finders.find(path)
+
+
 class BaseReportsExport(WeasyTemplateResponseMixin):
     '''
     A class which contains logic for Report Exports
@@ -34,6 +45,8 @@ class BaseReportsExport(WeasyTemplateResponseMixin):
     ]
     no_data_error = "No Data"
     report_export_form = ReportForm
+    # list reports whose rows are exported as queried can be streamed
+    streamable = False
     
     def __init__(self, filename, client_id, design_file=None, request=None, context=None,
                  data=None, additional_content=None,
@@ -52,11 +65,8 @@ class BaseReportsExport(WeasyTemplateResponseMixin):
     def get_pdf_output(self):
         try:
             html_string = render_to_string(self.design_file, context=self.context)
-            html = HTML(string=html_string, base_url=settings.HOST)
-            css_path = finders.find('assets/css/local/reports.css')
-            css = CSS(filename=css_path)
-            font_config = FontConfiguration()
-            pdf_output = html.write_pdf(stylesheets=[css], font_config=font_config, presentational_hints=True)
+            css_path = find_static('assets/css/local/reports.css')
+            pdf_output = render_pdf(html_string, base_url=settings.HOST, stylesheets=[css_path], presentational_hints=True)
             if self.returnfile: return pdf_output
             response = HttpResponse(
                 pdf_output, content_type='application/pdf'
@@ -204,6 +214,50 @@ class BaseReportsExport(WeasyTemplateResponseMixin):
 
         return worksheet, workbook, df, writer, output
     
+    def use_streaming(self, export_format):
+        '''
+        streaming exports read rows through a server side cursor and
+        write them incrementally instead of building a DataFrame
+        '''
+        return (self.streamable and export_format in streaming_export.WRITERS
+                and self.formdata.get('preview') != 'true'
+                and bool(self.formdata.get('stream') or getattr(settings, 'REPORT_STREAMING_EXPORT', False)))
+
+    def streaming_columns(self, export_format, columns):
+        if export_format == 'json':
+            return columns
+        try:
+            return list(self.excel_columns(pd.DataFrame(columns=columns)).columns)
+        except Exception:
+            log.warning("excel_columns could not select from %s, exporting all columns", columns)
+            return columns
+
+    def get_streaming_output(self, export_format):
+        '''
+        exports the report query of the design with bounded memory,
+        returns None when the query has no rows
+        '''
+        from apps.core.report_query_registry import stream_report_query
+        log.info(f"streaming {export_format} is executing")
+        write, content_type = streaming_export.WRITERS[export_format]
+        self.set_args_required_for_query()
+        output = tempfile.TemporaryFile()
+        with stream_report_query(self.report_name, self.args) as (columns, rows):
+            wanted, pick = streaming_export.select(columns, self.streaming_columns(export_format, columns))
+            rows = (pick(row) for row in rows)
+            if write is streaming_export.write_xlsx:
+                count = write(rows, wanted, output, title=self.additional_content)
+            else:
+                count = write(rows, wanted, output)
+        log.info(f"{count} rows streamed")
+        if not count:
+            output.close()
+            return None
+        output.seek(0)
+        if self.returnfile: return output
+        return FileResponse(output, as_attachment=True, filename=f"{self.filename}.{export_format}",
+                            content_type=content_type)
+
     def write_custom_mergerange(self, worksheet, workbook, custom_merge_ranges):
         for merge_item in custom_merge_ranges:
             format = workbook.add_format = merge_item['format']
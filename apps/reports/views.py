@@ -11,6 +11,7 @@ from io import BytesIO
 from django.template.loader import render_to_string
 from weasyprint import HTML, CSS
 from weasyprint.text.fonts import FontConfiguration
+from apps.reports.pdf_renderer import render_pdf
 from django.urls import reverse
 from apps.onboarding import models as on
 from apps.activity  import models as am
@@ -681,11 +682,8 @@ class DesignReport(LoginRequiredMixin, View):
         return self.render_using_weasyprint(html_string)
 
     def render_using_weasyprint(self, html_string):
-        html = HTML(string=html_string)
         # Specify the path to your local CSS file
-        css = CSS(filename='frontend/static/assets/css/local/reports.css')
-        font_config = FontConfiguration()
-        pdf = html.write_pdf(stylesheets=[css], font_config=font_config)
+        pdf = render_pdf(html_string, stylesheets=['frontend/static/assets/css/local/reports.css'])
         response = HttpResponse(pdf, content_type='application/pdf')
         response['Content-Disposition'] = 'filename="report.pdf"'
         return response
@@ -0,0 +1,97 @@
+"""
+Cached cron occurrence generator shared by the schedulers.
+
+Thousands of jobs share a handful of cron expressions, so every distinct
+expression is parsed once (bounded LRU) into its expanded minute, hour,
+day-of-month, month and day-of-week sets. Occurrences inside a window are
+then produced day by day: a day either matches the date fields or not, and
+a matching day yields every (hour, minute) pair of the expression at once.
+
+Occurrences are wall-clock times in the timezone of the window start, which
+is how croniter behaves for the fixed-offset timezones the schedulers use.
+Expressions using seconds, years or the L / # extensions, and windows with
+non fixed-offset timezones, fall back to plain croniter iteration.
+"""
+import bisect
+from datetime import datetime, time, timedelta, timezone
+from functools import lru_cache
+
+from croniter import croniter
+
+CRON_CACHE_SIZE = 1024
+
+
+class CronSpec:
+    """
+    expanded fields of a cron expression; None means any value.
+    """
+
+    def __init__(self, cron_exp):
+        itr = croniter(cron_exp)
+        expanded = itr.expanded
+        self.cron_exp = cron_exp
+        self.iterate = len(expanded) != 5 or bool(itr.nth_weekday_of_month) or any(
+            isinstance(v, str) and v != '*' for field in expanded for v in field)
+        if self.iterate:
+            return
+        minutes, hours, doms, months, dows = (
+            None if field == ['*'] else frozenset(field) for field in expanded)
+        self.months = months
+        self.doms = doms
+        self.dows = None if dows is None else frozenset(d % 7 for d in dows)
+        self.times = tuple(
+            time(h, m) for h in sorted(hours or range(24)) for m in sorted(minutes or range(60)))
+
+    def matches(self, day):
+        if self.months is not None and day.month not in self.months:
+            return False
+        dom_ok = self.doms is None or day.day in self.doms
+        dow_ok = self.dows is None or (day.weekday() + 1) % 7 in self.dows
+        if self.doms is not None and self.dows is not None:
+            # when both day fields are restricted either one may match
+            return dom_ok or dow_ok
+        return dom_ok and dow_ok
+
+
+@lru_cache(maxsize=CRON_CACHE_SIZE)
+def parse_cron(cron_exp):
+    "Returns the CronSpec of cron_exp, raises croniter errors for a bad expression"
+    return CronSpec(cron_exp)
+
+
+def _iterate(cron_exp, start, end):
+    DT, itr = [], croniter(cron_exp, start)
+    while (dt := itr.get_next(datetime)) < end:
+        DT.append(dt)
+    return DT
+
+
+def get_occurrences(cron_exp, start, end):
+    """
+    returns every occurrence of cron_exp after start and before end,
+    in the timezone of start.
+    """
+    spec = parse_cron(cron_exp)
+    tz = start.tzinfo
+    if spec.iterate or not (tz is None or isinstance(tz, timezone)):
+        return _iterate(cron_exp, start, end)
+    if tz is not None:
+        end = end.astimezone(tz)
+    if end <= start:
+        return []
+    DT, day, times = [], start.date(), spec.times
+    while day <= end.date():
+        if spec.matches(day):
+            lo = bisect.bisect_right(times, start.time().replace(tzinfo=None)) if day == start.date() else 0
+            hi = bisect.bisect_left(times, end.time().replace(tzinfo=None)) if day == end.date() else len(times)
+            DT.extend(datetime.combine(day, t, tzinfo=tz) for t in times[lo:hi])
+        day += timedelta(days=1)
+    return DT
+
+
+def cache_info():
+    return parse_cron.cache_info()
+
+
+def clear_cache():
+    parse_cron.cache_clear()
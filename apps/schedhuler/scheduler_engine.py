@@ -0,0 +1,289 @@
+"""
+Set-based scheduling engine for create_job.
+
+The classic path in apps.schedhuler.utils schedules one job at a time and
+issues several queries for every cron datetime of that job. This engine
+expands the cron datetimes of a whole batch of jobs in memory, preloads
+everything the rows depend on (assets, checklists, tour checkpoints and
+NONE sentinels) once per batch and writes parents, checkpoints and
+jobneed details with bulk inserts.
+
+Rows are built with the same field builders as the classic path so both
+produce identical jobneed/jobneeddetails rows. A parent is identified by
+(job, plandatetime), its expirydatetime moves with the checkpoints of a
+randomized tour; parents that already exist are left untouched so that
+re-running the scheduler is idempotent.
+
+The celery task create_job_bulk is defined in background_tasks.tasks.
+"""
+import time
+import traceback
+from collections import defaultdict
+
+from celery.utils.log import get_task_logger
+from django.core.mail import mail_admins
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_save
+
+from apps.activity.models.asset_model import Asset
+from apps.activity.models.job_model import Job, Jobneed, JobneedDetails
+from apps.activity.models.question_model import QuestionSetBelonging
+from apps.core import utils
+from apps.schedhuler import utils as sutils
+
+log = get_task_logger('__main__')
+
+# number of jobs expanded and written per transaction
+JOBS_PER_BATCH = 200
+# rows per INSERT statement
+INSERT_BATCH_SIZE = 1000
+
+TOUR_IDENTIFIERS = (Job.Identifier.INTERNALTOUR.value, Job.Identifier.EXTERNALTOUR.value)
+
+QSB_FIELDS = ('qset_id', 'seqno', 'question_id', 'answertype', 'max', 'min',
+              'alerton', 'options', 'isavpt', 'avpttype')
+
+
+class SchedulingContext:
+    """
+    lookups shared by every job of a batch, loaded with one query each.
+    """
+
+    def __init__(self, jobs):
+        self.NONE_JN = utils.get_or_create_none_jobneed()
+        self.NONE_P = utils.get_or_create_none_people()
+        self.NONE_QSB = utils.get_or_create_none_qsetblng()
+        self.NONE_TKT = utils.get_or_create_none_ticket()
+
+        tour_ids = [job['id'] for job in jobs if job['identifier'] in TOUR_IDENTIFIERS]
+        self.checkpoints = defaultdict(list)
+        if tour_ids:
+            for cp in Job.objects.annotate(
+                cplocation = F('bu__gpslocation')
+            ).filter(parent_id__in = tour_ids).order_by('parent_id', 'seqno').values(
+                *utils.JobFields.fields, 'cplocation', 'sgroup__groupname', 'bu__solid', 'bu__buname'):
+                self.checkpoints[cp['parent_id']].append(cp)
+
+        all_jobs = list(jobs) + [cp for cps in self.checkpoints.values() for cp in cps]
+        self.assets = dict(
+            Asset.objects.filter(id__in = {j['asset_id'] for j in all_jobs}).values_list('id', 'asset_json'))
+
+        self.checklists = defaultdict(list)
+        for qsb in QuestionSetBelonging.objects.filter(
+            qset_id__in = {j['qset_id'] for j in all_jobs}).order_by('seqno').values_list(*QSB_FIELDS, named=True):
+            self.checklists[qsb.qset_id].append(qsb)
+
+    def multifactor(self, asset_id):
+        # an unknown asset fails the job just like Asset.objects.get would
+        if asset_id not in self.assets:
+            raise Asset.DoesNotExist(f"Asset {asset_id} does not exist")
+        return self.assets[asset_id]['multifactor']
+
+
+class PlannedTask:
+    """
+    an unsaved parent jobneed along with its checkpoints and details.
+    """
+
+    def __init__(self, job, jobneed, details):
+        self.job = job
+        self.jobneed = jobneed
+        self.details = details
+        self.children = []
+
+    @property
+    def key(self):
+        return (self.job['id'], self.jobneed.plandatetime)
+
+
+def details_for(ctx, job, parent=False):
+    """
+    returns the checklist rows a jobneed generated from the job gets.
+    """
+    return [ctx.NONE_QSB] if parent else ctx.checklists.get(job['qset_id'], [])
+
+
+def plan_job(job, DT, ctx):
+    """
+    builds unsaved jobneeds for every cron datetime of the job,
+    mirroring insert_into_jn_and_jnd().
+    """
+    crontype = job['identifier']
+    istour = crontype in TOUR_IDENTIFIERS
+    params = {
+        'jobstatus':'ASSIGNED', 'jobtype':'SCHEDULE', 'route_name':job['sgroup__groupname'],
+        'm_factor':ctx.multifactor(job['asset_id']), 'people':job['people_id'], 'qset_id':job['qset_id'],
+        'NONE_P':ctx.NONE_P, 'jobdesc':f'{job["jobname"]}', 'NONE_JN':ctx.NONE_JN, 'sgroup_id':job['sgroup_id'],
+        'pdtz':None, 'edtz':None}
+    planned, pdtz = [], None
+    for pdtz, edtz in sutils.plan_parent_tasks(job, DT):
+        params['pdtz'], params['edtz'] = pdtz, edtz
+        jn = Jobneed(
+            job_id = job['id'], jobtype = params['jobtype'], plandatetime = pdtz,
+            expirydatetime = edtz, ticket_id = ctx.NONE_TKT.id,
+            **sutils.parent_jobneed_fields(job, params))
+        task = PlannedTask(job, jn, details_for(ctx, job, parent = istour))
+        if istour:
+            plan_checkpoints(task, ctx)
+        planned.append(task)
+    return planned, pdtz
+
+
+def plan_checkpoints(task, ctx):
+    """
+    builds unsaved checkpoints of a tour, mirroring create_child_tasks().
+    The parent expires with its last checkpoint.
+    """
+    job, jn = task.job, task.jobneed
+    params = {'_jobdesc': "", 'jnid':None, 'pdtz':None, 'edtz':None,
+              '_people':job['people_id'], '_jobstatus':jn.jobstatus, '_jobtype':jn.jobtype,
+              'm_factor':None, 'idx':None, 'NONE_P':ctx.NONE_P, 'parent_other_info':jn.other_info}
+    # every parent works on its own copy as route planning mutates checkpoints
+    R, tour_freq = sutils.prepare_checkpoints(job, [dict(cp) for cp in ctx.checkpoints.get(job['id'], [])])
+    edtz = None
+    for idx, r, pdtz, edtz in sutils.plan_child_tasks(job, R, tour_freq, jn.plandatetime):
+        params['m_factor'] = ctx.multifactor(r['asset_id'])
+        params['_people'] = r['people_id']
+        params['_jobdesc'] = sutils.child_jobdesc(job, r)
+        params['pdtz'], params['edtz'], params['idx'] = pdtz, edtz, idx
+        child = Jobneed(ticket_id = ctx.NONE_TKT.id, **sutils.child_jobneed_fields(job, params, r))
+        task.children.append((child, r, details_for(ctx, r)))
+    if edtz is not None:
+        jn.expirydatetime = edtz
+
+
+def existing_keys(planned, ctx):
+    """
+    returns the keys of the planned parents which are already scheduled,
+    resolved with a single query.
+    """
+    if not planned:
+        return set()
+    pdtzs = [task.jobneed.plandatetime for task in planned]
+    return set(Jobneed.objects.filter(
+        job_id__in = {task.job['id'] for task in planned},
+        parent_id = ctx.NONE_JN.id, jobtype = 'SCHEDULE',
+        plandatetime__gte = min(pdtzs), plandatetime__lte = max(pdtzs)
+    ).values_list('job_id', 'plandatetime'))
+
+
+def send_post_save(model, objs, db):
+    # bulk_create skips the post_save receivers which replicate rows to NOC
+    for obj in objs:
+        post_save.send(sender = model, instance = obj, created = True,
+                       raw = False, using = db, update_fields = None)
+
+
+def write_planned(planned, lastgenerated, ctx, db):
+    """
+    inserts the new parents, then their checkpoints, then all details
+    and moves lastgeneratedon of the scheduled jobs.
+    """
+    skip, new = existing_keys(planned, ctx), []
+    for task in planned:
+        if task.key in skip:
+            log.info(f"Job {task.job['id']}: record already exists for {task.jobneed.plandatetime}")
+            continue
+        skip.add(task.key)
+        new.append(task)
+
+    parents = Jobneed.objects.using(db).bulk_create(
+        [task.jobneed for task in new], batch_size = INSERT_BATCH_SIZE)
+
+    children = []
+    for task in new:
+        for child, _, _ in task.children:
+            child.parent_id = task.jobneed.id
+            children.append(child)
+    children = Jobneed.objects.using(db).bulk_create(children, batch_size = INSERT_BATCH_SIZE)
+
+    details = []
+    for task in new:
+        istour = task.job['identifier'] in TOUR_IDENTIFIERS
+        details.extend(
+            JobneedDetails(**sutils.jobneeddetails_fields(qsb, task.job, task.jobneed.id, istour))
+            for qsb in task.details)
+        for child, r, checklist in task.children:
+            details.extend(
+                JobneedDetails(**sutils.jobneeddetails_fields(qsb, r, child.id))
+                for qsb in checklist)
+    details = JobneedDetails.objects.using(db).bulk_create(details, batch_size = INSERT_BATCH_SIZE)
+
+    Job.objects.using(db).bulk_update(
+        [Job(id = id, lastgeneratedon = pdtz) for id, pdtz in lastgenerated.items()],
+        ['lastgeneratedon'], batch_size = INSERT_BATCH_SIZE)
+
+    send_post_save(Jobneed, parents + children, db)
+    send_post_save(JobneedDetails, details, db)
+    return new
+
+
+def schedule_batch(jobs, result):
+    """
+    expands and writes one batch of jobs inside a single transaction.
+    A job whose expansion fails is reported and left out of the batch.
+    """
+    ctx = SchedulingContext(jobs)
+    planned, lastgenerated, counts = [], {}, {}
+    for job in jobs:
+        try:
+            startdtz, enddtz = sutils.calculate_startdtz_enddtz(job)
+            DT, is_cron, resp = sutils.get_datetime_list(job['cron'], startdtz, enddtz, {})
+            if not is_cron:
+                log.warning(f"Invalid cron expression for job {job['id']}: {job['cron']}")
+                result['story'].append({'msg': f"Invalid cron expression for job {job['id']}: {job['cron']}"})
+                continue
+            if not DT:
+                result['story'].append({'msg': f" Jobs are scheduled between {startdtz} and {enddtz} "})
+                continue
+            tasks, pdtz = plan_job(job, DT, ctx)
+        except Exception:
+            log.error(f"Failed to plan job {job['id']}", exc_info=True)
+            mail_admins(
+                subject=f"[ALERT] Job {job['id']} failed in bulk scheduler",
+                message=f"Job ID: {job['id']} failed.\n\nTraceback:\n{traceback.format_exc()}",
+                fail_silently=True
+            )
+            result['story'].append({'msg': f"Failed to process job {job['id']}"})
+            continue
+        planned.extend(tasks)
+        lastgenerated[job['id']] = pdtz
+        counts[job['id']] = len(DT)
+
+    db = utils.get_current_db_name()
+    with transaction.atomic(using=db):
+        write_planned(planned, lastgenerated, ctx, db)
+    for jobid, count in counts.items():
+        result['story'].append({'msg': f'{count} tasks scheduled successfully!', 'count':count, 'job_id':jobid, 'traceback':None})
+
+
+def create_job_bulk(jobids=None):
+    """
+    set-based equivalent of apps.schedhuler.utils.create_job
+    """
+    resp, result = None, {'story': []}
+    start_time = time.time()
+    jobs = sutils.filter_jobs(jobids)
+    if not jobs:
+        msg = "No jobs found schedhuling terminated"
+        resp = {'msg':f"{msg}"}
+        log.warning(f"{msg}")
+        return resp, result
+    log.info(f"Total jobs: {len(jobs)}")
+    for i in range(0, len(jobs), JOBS_PER_BATCH):
+        batch = jobs[i:i + JOBS_PER_BATCH]
+        try:
+            schedule_batch(batch, result)
+        except Exception:
+            log.critical(f"Failed to schedule batch of jobs {[job['id'] for job in batch]}", exc_info=True)
+            mail_admins(
+                subject="[ALERT] Bulk scheduling batch failed",
+                message=f"Job IDs: {[job['id'] for job in batch]}\n\nTraceback:\n{traceback.format_exc()}",
+                fail_silently=True
+            )
+            result['story'].append({'msg': f"Failed to process jobs {[job['id'] for job in batch]}"})
+    if result['story']:
+        resp = result['story'][-1]
+    log.info(f"Time Taken: {time.time() - start_time}")
+    return resp, result
@@ -5,7 +5,7 @@ from apps.activity.models.job_model import Job,Jobneed,JobneedDetails
 from apps.schedhuler.serializers import JobSerializers,JobneedSerializers,JobneedDetailsSerializers
 import json
 
-from background_tasks.tasks import publish_mqtt
+from apps.core import outbox
 
 TOPIC = "redmine_to_noc"
 
@@ -27,17 +27,14 @@ def build_payload(instance, model_name, created):
 
 @receiver(post_save, sender=Job)
 def job_post_save(sender, instance, created, **kwargs):
-    payload = build_payload(instance, "Job", created)
-    publish_mqtt.delay(TOPIC, payload)
+    outbox.enqueue(TOPIC, instance, "Job", created, build_payload)
 
 
 @receiver(post_save, sender=Jobneed)
 def jobneed_post_save(sender, instance, created, **kwargs):
-    payload = build_payload(instance, "JobNeed", created)
-    publish_mqtt.delay(TOPIC, payload)
+    outbox.enqueue(TOPIC, instance, "JobNeed", created, build_payload)
 
 
 @receiver(post_save, sender=JobneedDetails)
 def jobneeddetails_post_save(sender, instance, created, **kwargs):
-    payload = build_payload(instance, "JobneedDetails", created)
-    publish_mqtt.delay(TOPIC, payload)
+    outbox.enqueue(TOPIC, instance, "JobneedDetails", created, build_payload)
@@ -0,0 +1,47 @@
+from django.test import SimpleTestCase
+from datetime import datetime, timedelta, timezone
+
+from croniter import croniter, CroniterBadCronError
+
+from apps.schedhuler import cron_occurrences as co
+
+
+def croniter_list(cron, start, end):
+    DT, itr = [], croniter(cron, start)
+    while (dt := itr.get_next(datetime)) < end:
+        DT.append(dt)
+    return DT
+
+
+class GetOccurrencesTestCase(SimpleTestCase):
+
+    CRONS = ['0 */2 * * *', '*/15 8-18 * * 1-5', '30 6 1,15 * 1', '0 0 * * 7',
+             '0 0 31 * *', '0 0 L * *', '0 0 * * 5#2', '0 9 * * 0,6']
+
+    def test_matches_croniter(self):
+        tz = timezone(timedelta(minutes=330))
+        start = datetime(2025, 1, 30, 7, 12, 45, tzinfo=tz)
+        for cron in self.CRONS:
+            for days in (1, 2, 45):
+                end = start + timedelta(days=days)
+                with self.subTest(cron=cron, days=days):
+                    self.assertEqual(co.get_occurrences(cron, start, end), croniter_list(cron, start, end))
+
+    def test_occurrence_at_start_is_excluded(self):
+        tz = timezone.utc
+        start = datetime(2025, 1, 1, 8, 0, tzinfo=tz)
+        DT = co.get_occurrences('0 8 * * *', start, start + timedelta(days=2))
+        self.assertEqual(DT, [start + timedelta(days=1)])
+
+    def test_expression_is_parsed_once(self):
+        co.clear_cache()
+        start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        for _ in range(10):
+            co.get_occurrences('0 */2 * * *', start, start + timedelta(days=2))
+        info = co.cache_info()
+        self.assertEqual((info.misses, info.hits), (1, 9))
+
+    def test_bad_cron_raises(self):
+        start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        with self.assertRaises(CroniterBadCronError):
+            co.get_occurrences('61 * * * *', start, start + timedelta(days=1))
@@ -0,0 +1,165 @@
+from django.test import TestCase
+from unittest.mock import patch, Mock
+from datetime import datetime, timedelta, timezone
+
+from apps.schedhuler import scheduler_engine as engine
+from apps.schedhuler import utils as sutils
+
+
+def make_job(**kwargs):
+    job = {
+        'id': 10, 'jobname': 'Pump Check', 'identifier': 'TASK', 'asset_id': 5,
+        'qset_id': 7, 'people_id': 3, 'pgroup_id': 1, 'sgroup_id': 1,
+        'sgroup__groupname': 'NONE', 'gracetime': 5, 'planduration': 15,
+        'expirytime': 10, 'ctzoffset': 330, 'priority': 'LOW', 'client_id': 1,
+        'bu_id': 2, 'cuser_id': 1, 'muser_id': 1, 'ticketcategory_id': 1,
+        'scantype': 'QR', 'other_info': {'tour_frequency': 1, 'is_randomized': False, 'breaktime': 0},
+    }
+    job.update(kwargs)
+    return job
+
+
+def make_ctx(checkpoints=None):
+    ctx = Mock()
+    ctx.NONE_JN, ctx.NONE_P, ctx.NONE_TKT, ctx.NONE_QSB = Mock(id=1), Mock(id=1), Mock(id=1), Mock()
+    ctx.multifactor.return_value = 1
+    ctx.checkpoints = checkpoints or {}
+    ctx.checklists = {7: ['q1', 'q2']}
+    return ctx
+
+
+class PlanParentTasksTestCase(TestCase):
+
+    def test_truncates_to_minute_and_applies_grace_and_expiry(self):
+        job = make_job()
+        dt = datetime(2025, 1, 1, 8, 0, 42, tzinfo=timezone.utc)
+        [(pdtz, edtz)] = list(sutils.plan_parent_tasks(job, [dt]))
+        self.assertEqual(pdtz, datetime(2025, 1, 1, 7, 55, tzinfo=timezone.utc))
+        self.assertEqual(edtz, datetime(2025, 1, 1, 8, 25, tzinfo=timezone.utc))
+
+
+class PlanJobTestCase(TestCase):
+
+    @patch('apps.schedhuler.scheduler_engine.Jobneed')
+    def test_task_gets_checklist_of_its_qset(self, mock_jobneed):
+        job = make_job()
+        DT = [datetime(2025, 1, 1, h, 0, tzinfo=timezone.utc) for h in (8, 10)]
+        planned, pdtz = engine.plan_job(job, DT, make_ctx())
+        self.assertEqual(len(planned), 2)
+        self.assertEqual(planned[0].details, ['q1', 'q2'])
+        self.assertEqual(pdtz, datetime(2025, 1, 1, 9, 55, tzinfo=timezone.utc))
+
+    def test_tour_expires_with_last_checkpoint(self):
+        checkpoints = [
+            make_job(id=11, parent_id=10, identifier='INTERNALTOUR', expirytime=5, cplocation=None,
+                     asset__assetname='Gate', jobname='cp1', bu__solid='', bu__buname=''),
+            make_job(id=12, parent_id=10, identifier='INTERNALTOUR', expirytime=5, cplocation=None,
+                     asset__assetname='Lobby', jobname='cp2', bu__solid='', bu__buname=''),
+        ]
+        job = make_job(identifier='INTERNALTOUR', gracetime=0, planduration=10)
+        ctx = make_ctx({10: checkpoints})
+        [task], _ = engine.plan_job(job, [datetime(2025, 1, 1, 8, 0, tzinfo=timezone.utc)], ctx)
+        self.assertEqual(task.details, [ctx.NONE_QSB])
+        self.assertEqual(len(task.children), 2)
+        last = task.children[-1][0]
+        self.assertEqual(last.plandatetime, datetime(2025, 1, 1, 8, 20, tzinfo=timezone.utc))
+        self.assertEqual(task.jobneed.expirydatetime, last.expirydatetime)
+
+
+class WritePlannedTestCase(TestCase):
+
+    @patch('apps.schedhuler.scheduler_engine.send_post_save')
+    @patch('apps.schedhuler.scheduler_engine.Job')
+    @patch('apps.schedhuler.scheduler_engine.JobneedDetails')
+    @patch('apps.schedhuler.scheduler_engine.Jobneed')
+    @patch('apps.schedhuler.scheduler_engine.existing_keys')
+    def test_existing_parents_are_skipped(self, mock_keys, mock_jobneed, mock_jnd, mock_job, mock_signal):
+        job = make_job()
+        start = datetime(2025, 1, 1, 8, 0, tzinfo=timezone.utc)
+        tasks = [
+            engine.PlannedTask(job, Mock(plandatetime=start, expirydatetime=start + timedelta(minutes=30)), []),
+            engine.PlannedTask(job, Mock(plandatetime=start + timedelta(hours=2), expirydatetime=start + timedelta(hours=3)), []),
+        ]
+        mock_keys.return_value = {tasks[0].key}
+        mock_jobneed.objects.using.return_value.bulk_create.side_effect = lambda objs, **kw: list(objs)
+        mock_jnd.objects.using.return_value.bulk_create.side_effect = lambda objs, **kw: list(objs)
+
+        new = engine.write_planned(tasks, {job['id']: start}, make_ctx(), 'default')
+
+        self.assertEqual(new, [tasks[1]])
+
+
+class BulkEngineRowsTestCase(TestCase):
+    """the classic and the bulk paths write the same rows for the same jobs"""
+
+    PARENT = ('id', 'uuid', 'cdtz', 'mdtz', 'receivedonserver', 'parent_id')
+    DETAIL = ('id', 'uuid', 'cdtz', 'mdtz', 'jobneed_id')
+
+    def setUp(self):
+        from apps.activity.models.asset_model import Asset
+        from apps.activity.models.job_model import Job
+        from apps.activity.models.question_model import Question, QuestionSet, QuestionSetBelonging
+        from apps.onboarding.models import Bt
+        self.client_bt = Bt.objects.create(bucode='SCHCLIENT', buname='Scheduler Client', enable=True)
+        self.site = Bt.objects.create(bucode='SCHSITE', buname='Scheduler Site', enable=True, parent=self.client_bt)
+        common = {'client': self.client_bt, 'bu': self.site}
+        asset = Asset.objects.create(assetcode='SCHPUMP', assetname='Pump', enable=True, iscritical=False,
+                                     identifier='ASSET', runningstatus='WORKING', capacity=1,
+                                     gpslocation='POINT(77.5946 12.9716)', **common)
+        qset = QuestionSet.objects.create(qsetname='Pump checklist', enable=True, seqno=1, **common)
+        for seqno, answertype in enumerate(['NUMERIC', 'CHECKBOX'], 1):
+            question = Question.objects.create(quesname=f'Question {seqno}', enable=True, answertype=answertype, **common)
+            QuestionSetBelonging.objects.create(qset=qset, question=question, answertype=answertype, seqno=seqno,
+                                                enable=True, options='Yes,No', alerton='No', **common)
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+        job = {'jobdesc': '', 'fromdate': now - timedelta(days=1), 'uptodate': now + timedelta(days=5),
+               'cron': '0 */6 * * *', 'planduration': 15, 'gracetime': 5, 'expirytime': 10, 'asset': asset,
+               'qset': qset, 'priority': 'LOW', 'scantype': 'QR', 'seqno': 1, 'ctzoffset': 330, **common}
+        self.task = Job.objects.create(jobname='Pump check', identifier='TASK', **job)
+        self.tour = Job.objects.create(jobname='Night round', identifier='INTERNALTOUR', **job)
+        for seqno in (1, 2):
+            Job.objects.create(jobname=f'Checkpoint {seqno}', identifier='INTERNALTOUR',
+                               parent=self.tour, **{**job, 'seqno': seqno})
+        # same cdtz and mdtz, an edited job would delete its future jobneeds first
+        Job.objects.filter(id__in=[self.task.id, self.tour.id]).update(
+            cdtz=now - timedelta(days=1), mdtz=now - timedelta(days=1), lastgeneratedon=now - timedelta(days=1))
+        self.jobids = [self.task.id, self.tour.id]
+
+    def rows(self):
+        from apps.activity.models.job_model import Jobneed, JobneedDetails
+        jobneeds = Jobneed.objects.filter(job_id__in=self.jobids)
+        parent = [f.attname for f in Jobneed._meta.concrete_fields if f.attname not in self.PARENT]
+        detail = [f.attname for f in JobneedDetails._meta.concrete_fields if f.attname not in self.DETAIL]
+        return (
+            list(jobneeds.order_by('job_id', 'plandatetime', 'seqno').values(
+                *parent, 'parent__job_id', 'parent__plandatetime')),
+            list(JobneedDetails.objects.filter(jobneed__in=jobneeds).order_by(
+                'jobneed__job_id', 'jobneed__plandatetime', 'seqno').values(
+                *detail, 'jobneed__job_id', 'jobneed__plandatetime')))
+
+    def reset(self, delete=True):
+        from apps.activity.models.job_model import Job, Jobneed, JobneedDetails
+        if delete:
+            jobneeds = Jobneed.objects.filter(job_id__in=self.jobids)
+            JobneedDetails.objects.filter(jobneed__in=jobneeds).delete()
+            jobneeds.delete()
+        Job.objects.filter(id__in=self.jobids).update(lastgeneratedon=datetime.now(timezone.utc) - timedelta(days=1))
+
+    def test_classic_and_bulk_paths_write_the_same_rows(self):
+        with self.settings(SCHEDULER_BULK_ENGINE=False):
+            sutils.create_job(self.jobids)
+        classic = self.rows()
+        self.assertTrue(classic[0] and classic[1])
+
+        self.reset()
+        engine.create_job_bulk(self.jobids)
+        bulk = self.rows()
+        self.assertEqual(classic[0], bulk[0])
+        self.assertEqual(classic[1], bulk[1])
+
+    def test_rerun_does_not_duplicate_tours(self):
+        engine.create_job_bulk(self.jobids)
+        first = self.rows()
+        self.reset(delete=False)
+        engine.create_job_bulk(self.jobids)
+        self.assertEqual(self.rows(), first)
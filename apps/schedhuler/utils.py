@@ -109,6 +109,10 @@ def process_job(job,result):
 @shared_task(name="create_job")
 def create_job(jobids=None):
     import time
+    from django.conf import settings
+    if getattr(settings, 'SCHEDULER_BULK_ENGINE', False):
+        from apps.schedhuler.scheduler_engine import create_job_bulk
+        return create_job_bulk(jobids)
     msg = resp = None
     result = {'story': []}
     start_time = time.time()
@@ -200,18 +204,12 @@ def get_datetime_list(cron_exp, startdtz, enddtz, resp):
 
     log.info("get_datetime_list(cron_exp, startdtz, enddtz) [start]")
     log.info("getting datetime list for cron:=%s, starttime:= '%s' and endtime:= '%s'", cron_exp, startdtz, enddtz)
-    from croniter import croniter, CroniterBadCronError
+    from croniter import CroniterBadCronError
+    from apps.schedhuler.cron_occurrences import get_occurrences
     DT = []
     isValidCron = True
-    cronDateTime = itr = None
     try:
-        itr = croniter(cron_exp, startdtz)
-        while True:
-            cronDateTime = itr.get_next(datetime)
-            if cronDateTime < enddtz:
-                DT.append(cronDateTime)
-            else:
-                break
+        DT = get_occurrences(cron_exp, startdtz, enddtz)
     except CroniterBadCronError as ex:
         isValidCron = False
         log.warning('Bad Cron error', exc_info = True)
@@ -226,13 +224,24 @@ def get_datetime_list(cron_exp, startdtz, enddtz, resp):
             'get_datetime_list(cron_exp, startdtz, enddtz) ERROR: ', exc_info = True)
         raise ex from ex
     if DT:
-        log.info(f'Datetime list calculated are as follows:= {pformat(DT, compact = True)}')
+        log.info(f'Datetime list calculated: {len(DT)} datetimes from {DT[0]} to {DT[-1]}')
     else: resp = {"errors": "Unable to schedule task, check your 'Valid From' and 'Valid To'"}
 
     log.info("get_datetime_list(cron_exp, startdtz, enddtz) [end]")
     return DT, isValidCron, resp
 
 
+def plan_parent_tasks(job, DT):
+    """
+    yields (plandatetime, expirydatetime) in utc, truncated to the
+    minute, for every cron datetime in 'DT'.
+    """
+    for dt in utils.to_utc(DT):
+        dt = dt.replace(second = 0, microsecond = 0, tzinfo = timezone.utc)
+        yield (dt - timedelta(minutes=job['gracetime']),
+               dt + timedelta(minutes=job['planduration'] + job['expirytime']))
+
+
 def insert_into_jn_and_jnd(job, DT, resp):
     """
         calculates expirydatetime for every dt in 'DT' list and
@@ -258,19 +267,13 @@ def insert_into_jn_and_jnd(job, DT, resp):
 
             #mins = job['planduration'] + job['expirytime'] + job['gracetime']
             people = job['people_id']
-            UTC_DT = utils.to_utc(DT)
-            for dt in UTC_DT:
-                dt = dt.strftime("%Y-%m-%d %H:%M")
-                dt = datetime.strptime(dt, '%Y-%m-%d %H:%M').replace(tzinfo = timezone.utc)
+            for pdtz, edtz in plan_parent_tasks(job, DT):
                 log.info(f'Gracetime:= {job["gracetime"]}, expirytime:= {job["expirytime"]}, planduration:= {job["planduration"]}')
                 params   = {
                 'jobstatus':jobstatus, 'jobtype':jobtype, 'route_name':job['sgroup__groupname'],
                 'm_factor':multiplication_factor, 'people':people, 'qset_id':job['qset_id'],
                 'NONE_P':NONE_P, 'jobdesc':jobdesc, 'NONE_JN':NONE_JN, 'sgroup_id':job['sgroup_id'],
-                'pdtz':None, 'edtz':None}
-                
-                pdtz = params['pdtz'] = dt - timedelta(minutes=job['gracetime'])
-                edtz = params['edtz'] = dt + timedelta(minutes=job['planduration'] + job['expirytime'])
+                'pdtz':pdtz, 'edtz':edtz}
                 log.info(f'pdtz:={pdtz} edtz:={edtz}')
                 log.info(f'Params: {params}')
                 jn = insert_into_jn_for_parent(job, params)
@@ -303,33 +306,7 @@ def insert_into_jn_and_jnd(job, DT, resp):
     return status, resp
 
 def insert_into_jn_dynamic_for_parent(job, params):
-    defaults={
-            'ctzoffset'        : job['ctzoffset'],
-            'priority'         : job['priority'],
-            'identifier'       : job['identifier'],
-            'gpslocation'      : 'POINT(0.0 0.0)',
-            'remarks'          : '',
-            'multifactor'      : params['m_factor'],
-            'client_id'        : job['client_id'],
-            'other_info'       : job['other_info'],
-            'cuser_id'         : job['cuser_id'],
-            'muser_id'         : job['muser_id'],
-            'ticketcategory_id': job['ticketcategory_id'],
-            'frequency'        : 'NONE',
-            'bu_id'            : job['bu_id'],
-            'seqno'            : 0,
-            'scantype'         : job['scantype'],
-            'gracetime'    : job['gracetime'],
-            'performedby'    : params['NONE_P'],
-            'jobstatus'      : params['jobstatus'],
-            'jobdesc' : params['jobdesc'],
-            'qset_id' : params['qset_id'],
-            'sgroup_id' : params['sgroup_id'],
-            'asset_id' : job['asset_id'],
-            'people_id' : job['people_id'],
-            'pgroup_id' : job['pgroup_id'],
-            'parent' : params['NONE_JN'],
-        }
+    defaults = parent_jobneed_fields(job, params)
     obj = Jobneed.objects.create(
         job_id         = job['id'],
         jobtype        = params['jobtype'],
@@ -338,35 +315,42 @@ def insert_into_jn_dynamic_for_parent(job, params):
     return obj
 
 
-    
+def parent_jobneed_fields(job, params):
+    """
+    returns the jobneed fields of a parent (or standalone) task
+    generated from the job for the given params.
+    """
+    return {
+        'ctzoffset'        : job['ctzoffset'],
+        'priority'         : job['priority'],
+        'identifier'       : job['identifier'],
+        'gpslocation'      : 'POINT(0.0 0.0)',
+        'remarks'          : '',
+        'multifactor'      : params['m_factor'],
+        'client_id'        : job['client_id'],
+        'other_info'       : job['other_info'],
+        'cuser_id'         : job['cuser_id'],
+        'muser_id'         : job['muser_id'],
+        'ticketcategory_id': job['ticketcategory_id'],
+        'frequency'        : 'NONE',
+        'bu_id'            : job['bu_id'],
+        'seqno'            : 0,
+        'scantype'         : job['scantype'],
+        'gracetime'    : job['gracetime'],
+        'performedby'    : params['NONE_P'],
+        'jobstatus'      : params['jobstatus'],
+        'jobdesc' : params['jobdesc'],
+        'qset_id' : params['qset_id'],
+        'sgroup_id' : params['sgroup_id'],
+        'asset_id' : job['asset_id'],
+        'people_id' : job['people_id'],
+        'pgroup_id' : job['pgroup_id'],
+        'parent' : params['NONE_JN'],
+    }
+
+
 def insert_into_jn_for_parent(job, params):
-    defaults={
-            'ctzoffset'        : job['ctzoffset'],
-            'priority'         : job['priority'],
-            'identifier'       : job['identifier'],
-            'gpslocation'      : 'POINT(0.0 0.0)',
-            'remarks'          : '',
-            'multifactor'      : params['m_factor'],
-            'client_id'        : job['client_id'],
-            'other_info'       : job['other_info'],
-            'cuser_id'         : job['cuser_id'],
-            'muser_id'         : job['muser_id'],
-            'ticketcategory_id': job['ticketcategory_id'],
-            'frequency'        : 'NONE',
-            'bu_id'            : job['bu_id'],
-            'seqno'            : 0,
-            'scantype'         : job['scantype'],
-            'gracetime'    : job['gracetime'],
-            'performedby'    : params['NONE_P'],
-            'jobstatus'      : params['jobstatus'],
-            'jobdesc' : params['jobdesc'],
-            'qset_id' : params['qset_id'],
-            'sgroup_id' : params['sgroup_id'],
-            'asset_id' : job['asset_id'],
-            'people_id' : job['people_id'],
-            'pgroup_id' : job['pgroup_id'],
-            'parent' : params['NONE_JN'],
-        }
+    defaults = parent_jobneed_fields(job, params)
     try:
         obj, iscreated = Jobneed.objects.get_or_create(
             defaults=defaults,
@@ -415,56 +399,72 @@ def insert_update_jobneeddetails(jnid, job, parent=False):
     log.info("insert_update_jobneeddetails() [END]")
     
 
+def get_child_jobs(job):
+    return Job.objects.annotate(
+        cplocation = F('bu__gpslocation')
+        ).filter(
+        parent_id = job['id']).order_by(
+            'seqno').values(*utils.JobFields.fields, 'cplocation', 'sgroup__groupname', 'bu__solid', 'bu__buname')
+
+
+def prepare_checkpoints(job, R):
+    """
+    returns the checkpoints of a tour in the order they are to be
+    scheduled along with the tour frequency.
+    """
+    tour_freq = 1
+    L = list(R)
+    if job['other_info']['is_randomized'] in ['True', True] and len(R) > 1:
+        random.shuffle(L)
+        R = calculate_route_details(L, job)
+        tour_freq = int(job['other_info']['tour_frequency'])
+    elif job['other_info']['tour_frequency'] and int(job['other_info']['tour_frequency']) > 1:
+        tour_freq = int(job['other_info']['tour_frequency'])
+        R = calculate_route_details(L, job)
+    return R, tour_freq
+
+
+def child_jobdesc(job, r):
+    if r['identifier'] == 'EXTERNALTOUR':
+        return f"{job['sgroup__groupname']} - {r['bu__solid']} - {r['bu__buname']}"
+    return f"{r['asset__assetname']} - {r['jobname']}"
+
+
+def plan_child_tasks(job, R, tour_freq, _pdtz):
+    """
+    yields (idx, checkpoint, pdtz, edtz) for every checkpoint of a tour
+    whose parent is planned at _pdtz.
+    """
+    prev_edtz = _pdtz
+    brektime_idx = len(R)//tour_freq
+    for idx, r in enumerate(R):
+        if job['other_info']['tour_frequency'] and int(job['other_info']['tour_frequency']) > 1 and job['other_info']['breaktime'] and brektime_idx == idx:
+            pdtz = prev_edtz + timedelta(minutes=int(job['other_info']['breaktime']) + r['expirytime'])
+        else:
+            pdtz = prev_edtz + timedelta(minutes=r['expirytime'])
+        edtz = pdtz + timedelta(minutes=job['planduration'] + job['gracetime'])
+        prev_edtz = edtz
+        yield idx, r, pdtz, edtz
+
+
 def create_child_tasks(job, _pdtz, _people, jnid, _jobstatus, _jobtype, parent_other_info):
     try:
-        prev_edtz, tour_freq = None, 1
         NONE_P  = utils.get_or_create_none_people()
-        from django.utils.timezone import get_current_timezone
-        tz = get_current_timezone()
-        mins = pdtz = edtz = None
-        R = Job.objects.annotate(
-            cplocation = F('bu__gpslocation')
-            ).filter(
-            parent_id = job['id']).order_by(
-                'seqno').values(*utils.JobFields.fields, 'cplocation', 'sgroup__groupname', 'bu__solid', 'bu__buname')
+        edtz = None
+        R = get_child_jobs(job)
 
         log.info(f"create_child_tasks() total child job:={len(R)}")
         
         params = {'_jobdesc': "", 'jnid':jnid, 'pdtz':None, 'edtz':None,
                   '_people':_people, '_jobstatus':_jobstatus, '_jobtype':_jobtype,
                   'm_factor':None, 'idx':None, 'NONE_P':NONE_P, 'parent_other_info':parent_other_info}
-        L = list(R)
-        if job['other_info']['is_randomized'] in ['True', True] and len(R) > 1:
-            random.shuffle(L)
-            R = calculate_route_details(L, job)
-            tour_freq = int(job['other_info']['tour_frequency'])
-        elif job['other_info']['tour_frequency'] and int(job['other_info']['tour_frequency']) > 1:
-            tour_freq = int(job['other_info']['tour_frequency'])
-            R = calculate_route_details(L, job)
-            
-        prev_edtz = _pdtz
-        brektime_idx = len(R)//tour_freq
-        for idx, r in enumerate(R):
+        R, tour_freq = prepare_checkpoints(job, R)
+        for idx, r, pdtz, edtz in plan_child_tasks(job, R, tour_freq, _pdtz):
             asset = Asset.objects.get(id = r['asset_id'])
             params['m_factor'] = asset.asset_json['multifactor']
-            jobdescription = f"{r['asset__assetname']} - {r['jobname']}" 
-            
-            if r['identifier'] == 'EXTERNALTOUR':
-                jobdescription = f"{job['sgroup__groupname']} - {r['bu__solid']} - {r['bu__buname']}" 
-
-            mins = job['planduration'] + r['expirytime'] + job['gracetime']
             params['_people'] = r['people_id']
-            params['_jobdesc'] = jobdescription
-            
-            
-            if job['other_info']['tour_frequency'] and int(job['other_info']['tour_frequency']) > 1 and job['other_info']['breaktime'] and brektime_idx == idx:
-                pdtz = params['pdtz'] = prev_edtz + timedelta(minutes=int(job['other_info']['breaktime']) + r['expirytime'])
-            else:
-                pdtz = params['pdtz'] = prev_edtz + timedelta(minutes=r['expirytime'])
-            edtz = params['edtz'] = pdtz + timedelta(minutes=job['planduration'] + job['gracetime'])
-            prev_edtz = edtz
-
-            
+            params['_jobdesc'] = child_jobdesc(job, r)
+            params['pdtz'], params['edtz'] = pdtz, edtz
             params['idx'] = idx
             jn = insert_into_jn_for_child(job, params, r)
             insert_update_jobneeddetails(jn.id, r)
@@ -893,42 +893,57 @@ def get_readable_dates(dt_list):
     
     
 
+def jobneeddetails_fields(obj, job, jnid, parent=False):
+    """
+    returns the jobneeddetails fields of a question (qsetbelonging) of
+    the jobneed jnid generated from the job.
+    """
+    return dict(
+        seqno      = obj.seqno,      question_id = obj.question_id,
+        answertype = obj.answertype, max         = obj.max,
+        min        = obj.min,        alerton     = obj.alerton,
+        options    = obj.options,    jobneed_id  = jnid,
+        cuser_id   = job['cuser_id'],   muser_id    = job['muser_id'],
+        ctzoffset  = job['ctzoffset'], answer = 'NONE' if parent else None,
+        isavpt = obj.isavpt, avpttype = obj.avpttype)
+
+
 def insert_into_jnd(qsb, job, jnid, parent=False):
     log.info("insert_into_jnd() [START]")
     qset = qsb if isinstance(qsb, QuerySet) else [qsb]
     for obj in qset:
-        answer = 'NONE' if parent else None
-        JobneedDetails.objects.create(
-            seqno      = obj.seqno,      question_id = obj.question_id,
-            answertype = obj.answertype, max         = obj.max,
-            min        = obj.min,        alerton     = obj.alerton,
-            options    = obj.options,    jobneed_id  = jnid,
-            cuser_id   = job['cuser_id'],   muser_id    = job['muser_id'],
-            ctzoffset  = job['ctzoffset'], answer = answer,
-            isavpt = obj.isavpt, avpttype = obj.avpttype)
+        JobneedDetails.objects.create(**jobneeddetails_fields(obj, job, jnid, parent))
     log.info("insert_into_jnd() [END]")
     
 
 
+def child_jobneed_fields(job, params, r):
+    """
+    returns the jobneed fields of a tour checkpoint r
+    scheduled under the parent jobneed params['jnid'].
+    """
+    return dict(
+        job_id         = job['id'],                  parent_id         = params['jnid'],
+        jobdesc        = params['_jobdesc'],         plandatetime      = params['pdtz'],
+        expirydatetime = params['edtz'],             gracetime         = job['gracetime'],
+        asset_id       = r['asset_id'],              qset_id           = r['qset_id'],
+        pgroup_id      = job['pgroup_id'],           frequency         = 'NONE',
+        priority       = r['priority'],              jobstatus         = params['_jobstatus'],
+        client_id      = r['client_id'],             jobtype           = params['_jobtype'],
+        scantype       = job['scantype'],            identifier        = job['identifier'],
+        cuser_id       = r['cuser_id'],              muser_id          = r['muser_id'],
+        bu_id          = r['bu_id'],                 ticketcategory_id = r['ticketcategory_id'],
+        gpslocation    = r['cplocation'],            remarks           = '',
+        seqno          = params['idx'],              multifactor       = params['m_factor'],
+        performedby    = params['NONE_P'],           ctzoffset         = r['ctzoffset'],
+        people_id      = params['_people'],          other_info = params['parent_other_info'],
+        sgroup_id = job['sgroup_id']
+    )
+
+
 def  insert_into_jn_for_child(job, params, r):
     try:
-        jn = Jobneed.objects.create(
-                job_id         = job['id'],                  parent_id         = params['jnid'],
-                jobdesc        = params['_jobdesc'],         plandatetime      = params['pdtz'],
-                expirydatetime = params['edtz'],             gracetime         = job['gracetime'],
-                asset_id       = r['asset_id'],              qset_id           = r['qset_id'],
-                pgroup_id      = job['pgroup_id'],           frequency         = 'NONE',
-                priority       = r['priority'],              jobstatus         = params['_jobstatus'],
-                client_id      = r['client_id'],             jobtype           = params['_jobtype'],
-                scantype       = job['scantype'],            identifier        = job['identifier'],
-                cuser_id       = r['cuser_id'],              muser_id          = r['muser_id'],
-                bu_id          = r['bu_id'],                 ticketcategory_id = r['ticketcategory_id'],
-                gpslocation    = r['cplocation'],            remarks           = '',
-                seqno          = params['idx'],              multifactor       = params['m_factor'],
-                performedby    = params['NONE_P'],           ctzoffset         = r['ctzoffset'],
-                people_id      = params['_people'],          other_info = params['parent_other_info'],
-                sgroup_id = job['sgroup_id']
-            )
+        jn = Jobneed.objects.create(**child_jobneed_fields(job, params, r))
     except Exception:
         log.error("insert_into_jn_for_child[]", exc_info=True)
         raise
@@ -11,6 +11,7 @@ from django.http import Http404, QueryDict, response as rp
 from django.shortcuts import redirect, render
 from django.views import View
 from apps.core import  utils 
+from apps.core.search import search_q, count as search_count
 from pprint import pformat
 from apps.activity.models.job_model import Job, Jobneed, JobneedDetails
 import apps.peoples.models as pm
@@ -686,18 +687,12 @@ def get_cron_datetime(request):
     logger.info("get_cron_datetime [start]")
     cron = request.GET.get('cron')
     logger.info(f"get_cron_datetime cron:{cron}")
-    cronDateTime= itr= None
     startdtz= datetime.now()
-    enddtz= datetime.now() + timedelta(days = 1)
-    DT, res= [], None
+    enddtz= startdtz + timedelta(days = 1)
+    res = None
     try:
-        from croniter import croniter
-        itr= croniter(cron, startdtz)
-        while True:
-            cronDateTime = itr.get_next(datetime)
-            if cronDateTime < enddtz:
-                DT.append(cronDateTime)
-            else: break
+        from apps.schedhuler.cron_occurrences import get_occurrences
+        DT = get_occurrences(cron, startdtz, enddtz)
         res = rp.JsonResponse({'rows':DT}, status = 200)
     except Exception as ex:
         msg = "croniter bad cron error"
@@ -1027,18 +1022,14 @@ class JobneedTours(LoginRequiredMixin, View):
 
             objs = P['model'].objects.get_internaltourlist_jobneed(request, P['related'], P['fields'])
 
-            if search:
-                objs = objs.filter(
-                    Q(bu__buname=search) |
-                    Q(bu__bucode=search) |
-                    Q(jobdesc__contains = search)
-                )
+            if search and (q := search_q(P['model'], ['bu__buname', 'bu__bucode', 'jobdesc'], search)) is not None:
+                objs = objs.filter(q)
 
             if column_name:
                 order_prefix = '' if order_dir == 'asc' else '-'
                 objs = objs.order_by(f'{order_prefix}{column_name}')
 
-            total = objs.count()
+            total = search_count(objs)
             paginated = objs[start:start+length]
             return rp.JsonResponse({
                 "draw": int(R.get('draw', 1)),
@@ -1209,20 +1200,15 @@ class JobneedTasks(LoginRequiredMixin, View):
             objs = P['model'].objects.get_task_list_jobneed(
                 P['related'], P['fields'], request)
             
-            if search_value:
-                objs = objs.filter(
-                    Q(jobdesc__icontains=search_value)|
-                    Q(jobstatus__icontains=search_value)|
-                    Q(bu__buname__icontains = search_value)|
-                    Q(bu__bucode__icontains = search_value)|
-                    Q(qset__qsetname__icontains = search_value)|
-                    Q(asset__assetname__icontains = search_value)
-                )
+            if search_value and (q := search_q(
+                    P['model'], ['jobdesc', 'jobstatus', 'bu__buname', 'bu__bucode', 'qset__qsetname',
+                                 'asset__assetname'], search_value)) is not None:
+                objs = objs.filter(q)
             if column_name:
                 order_prefix = '' if order_dir == 'asc' else '-'
                 objs = objs.order_by(f'{order_prefix}{column_name}')
 
-            total = objs.count()
+            total = search_count(objs)
             paginated = objs[start:start+length]
             data = list(paginated)
             return rp.JsonResponse({
@@ -0,0 +1,224 @@
+"""
+Batched upsert pipeline for mobile sync ingestion.
+
+A device syncing offline data sends thousands of records at once. Instead
+of an exists()/update()/create() round trip per record, records are
+grouped by table, existing uuids of a table are resolved with a single
+uuid__in query and rows are written with one INSERT ... ON CONFLICT (uuid)
+DO UPDATE per table. People needed by side effects are loaded once per
+batch, and side effects (ticket history, work order notification, journey
+path, site crisis) only run for the rows which need them.
+
+Tables whose model has create-time hooks (a custom save() or pre_save
+receivers, e.g. ticket and work order serial numbers) still create new
+rows one by one so that those hooks run; their existing rows are updated
+in bulk, which like the old queryset update() bypasses the hooks.
+"""
+import json
+from collections import defaultdict
+from logging import getLogger
+
+from django.apps import apps
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from django.db.models.signals import post_save, pre_save
+
+from apps.core import geocoding
+from apps.service.validators import clean_record
+
+log = getLogger('message_q')
+
+BATCH_SIZE = 500
+
+
+def decode_records(records, times=1):
+    "json decodes every record 'times' times, mobile json records are double encoded"
+    data = []
+    for record in records:
+        for _ in range(times):
+            record = json.loads(record)
+        data.append(record)
+    return data
+
+
+def group_by_table(data):
+    """
+    returns {tablename: [cleaned records]} in the order tables first appear
+    and the number of records consumed. When a uuid is sent more than once
+    its latest record wins.
+    """
+    tables, count = {}, 0
+    for record in data:
+        if not record:
+            continue
+        tablename = record.pop('tablename')
+        rows = tables.setdefault(tablename, {})
+        record = clean_record(record)
+        rows.pop(record.get('uuid'), None)
+        rows[record.get('uuid')] = record
+        count += 1
+    return {tablename: list(rows.values()) for tablename, rows in tables.items()}, count
+
+
+def has_unique_uuid(model):
+    try:
+        return model._meta.get_field('uuid').unique
+    except FieldDoesNotExist:
+        return False
+
+
+def has_create_hooks(model):
+    return model.save is not models.Model.save or pre_save.has_listeners(model)
+
+
+def existing_uuids(model, uuids, db):
+    return {
+        str(uuid) for uuid in
+        model.objects.using(db).filter(uuid__in = uuids).values_list('uuid', flat = True)}
+
+
+def in_bulk_by_uuid(queryset, records):
+    return {str(obj.uuid): obj for obj in queryset.filter(uuid__in = [r['uuid'] for r in records])}
+
+
+def bulk_upsert(model, records, db):
+    """
+    inserts or updates records with INSERT ... ON CONFLICT (uuid) DO UPDATE.
+    Only the fields present in a record are updated, so records are
+    written in groups of the same shape. Returns the saved instances.
+    """
+    shapes = defaultdict(list)
+    for record in records:
+        shapes[tuple(sorted(record))].append(record)
+    objs = []
+    for fields, rows in shapes.items():
+        update_fields = [f for f in fields if f not in ('id', 'uuid')]
+        batch = [model(**row) for row in rows]
+        if update_fields:
+            model.objects.using(db).bulk_create(
+                batch, batch_size = BATCH_SIZE, update_conflicts = True,
+                unique_fields = ['uuid'], update_fields = update_fields)
+        else:
+            model.objects.using(db).bulk_create(batch, batch_size = BATCH_SIZE, ignore_conflicts = True)
+        objs.extend(batch)
+    return objs
+
+
+def upsert_table(model, records, db):
+    """
+    writes all records of one table, returns the set of uuids
+    which were created by this batch.
+    """
+    created = {str(r['uuid']) for r in records} - existing_uuids(model, [r['uuid'] for r in records], db)
+    if has_create_hooks(model):
+        bulk_upsert(model, [r for r in records if str(r['uuid']) not in created], db)
+        new = [model.objects.using(db).create(**r) for r in records if str(r['uuid']) in created]
+    else:
+        saved = bulk_upsert(model, records, db)
+        new = [obj for obj in saved if str(obj.uuid) in created]
+        # bulk_create skips post_save, the replication receivers still need the new rows
+        for obj in new:
+            post_save.send(sender = model, instance = obj, created = True,
+                           raw = False, using = db, update_fields = None)
+    log.info(f"{model.__name__}: {len(created)} records created, {len(records) - len(created)} updated")
+    return created
+
+
+class PeopleCache:
+    """
+    People referenced by the side effects of a batch, loaded with a single query.
+    """
+    TABLES = ('ticket', 'peopleeventlog')
+
+    def __init__(self, tables, db):
+        People = apps.get_model('peoples', 'People')
+        ids = {people_id(record) for tablename in self.TABLES
+               for record in tables.get(tablename, [])} - {None}
+        self.people = People.objects.using(db).select_related('bu', 'client').in_bulk(ids)
+
+    def get(self, id):
+        if int(id) not in self.people:
+            from apps.service.utils import get_user_instance
+            self.people[int(id)] = get_user_instance(id)
+        return self.people[int(id)]
+
+
+def people_id(record):
+    id = record.get('muser_id') if record.get('people_id') is None else record.get('people_id')
+    return int(id) if id is not None else None
+
+
+def run_side_effects(tablename, model, records, people, db):
+    """
+    runs the per record work of perform_insertrecord only for
+    the rows which need it.
+    """
+    from apps.core import utils
+    from apps.service import utils as sutils
+    from apps.work_order_management import utils as wutils
+
+    if tablename == 'ticket':
+        tickets = in_bulk_by_uuid(model.objects.using(db).select_related(
+            'assignedtopeople', 'assignedtogroup', 'location'), records)
+        for record in records:
+            utils.store_ticket_history(
+                instance = tickets[str(record['uuid'])], user = people.get(people_id(record)))
+
+    elif tablename == 'wom':
+        for id in model.objects.using(db).filter(
+            uuid__in = [r['uuid'] for r in records]).values_list('id', flat = True):
+            wutils.notify_wo_creation(id = id)
+
+    elif tablename == 'peopleeventlog':
+        sitecrisis_types = set(model.objects.get_sitecrisis_types())
+        byuuid = {str(r['uuid']): r for r in records}
+        tracks, crises = [], []
+        for uuid, tacode, endlocation, punchintime, punchouttime in model.objects.using(db).filter(
+            uuid__in = list(byuuid)).values_list(
+                'uuid', 'peventtype__tacode', 'endlocation', 'punchintime', 'punchouttime'):
+            record = byuuid[str(uuid)]
+            if tacode in ('CONVEYANCE', 'AUDIT') and endlocation and punchintime and punchouttime:
+                tracks.append(record)
+            if tacode in sitecrisis_types:
+                crises.append(record)
+        if not (tracks or crises):
+            return
+        pels = in_bulk_by_uuid(model.objects.using(db).select_related('peventtype'), tracks + crises)
+        for record in tracks:
+            log.info("save line string is started")
+            sutils.save_linestring_and_update_pelrecord(pels[str(record['uuid'])])
+        for record in crises:
+            sutils.check_for_sitecrisis(pels[str(record['uuid'])], tablename, people.get(people_id(record)))
+
+
+def write_table(tablename, model, records, db):
+    """
+    writes the records of one table, upserted in bulk when the uuid of
+    model is unique. Returns True when they were upserted in bulk.
+    """
+    from apps.service.utils import insert_or_update_record
+
+    if model is None or not has_unique_uuid(model):
+        # tables without a unique uuid cannot be upserted in bulk
+        for record in records:
+            insert_or_update_record(record, tablename)
+        return False
+    upsert_table(model, records, db)
+    return True
+
+
+def ingest(data, db):
+    """
+    upserts decoded mobile records of any tables and runs their side
+    effects, returns the number of records written.
+    """
+    from apps.service.utils import get_model_or_form
+
+    tables, recordcount = group_by_table(data)
+    people = PeopleCache(tables, db)
+    with geocoding.memoize():
+        for tablename, records in tables.items():
+            model = get_model_or_form(tablename)
+            if write_table(tablename, model, records, db):
+                run_side_effects(tablename, model, records, people, db)
+    return recordcount
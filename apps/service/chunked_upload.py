@@ -0,0 +1,197 @@
+'''
+Resumable, chunked attachment uploads.
+
+Mobile clients used to send a file as a list of ints (one JSON number per
+byte) to UploadAttMutaion. Here a file is staged on disk instead:
+
+    upload = ChunkedUpload.create(record, biodata, filesize, checksum, chunksize)
+    upload.write_chunk(index, chunk)      # any order, resent chunks overwrite
+    upload.missing()                      # chunks still to send after a reconnect
+    path = upload.commit(relative_path)   # checks size and sha256, stores the file
+
+Chunks are streamed into a preallocated file at their offset and every
+received chunk leaves a marker file, so parallel and repeated chunk
+uploads are safe. The staging directory keeps the record and biodata
+so the Attachment row is only written once the last chunk is in.
+'''
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+from logging import getLogger
+
+from django.conf import settings
+
+log = getLogger('message_q')
+
+DEFAULT_CHUNK_SIZE = 512 * 1024
+MAX_CHUNK_SIZE = getattr(settings, 'UPLOAD_MAX_CHUNK_SIZE', 8 * 1024 * 1024)
+MAX_FILE_SIZE = getattr(settings, 'UPLOAD_MAX_FILE_SIZE', 200 * 1024 * 1024)
+# staged uploads untouched for longer are removed by cleanup_stale_uploads
+UPLOAD_EXPIRY = getattr(settings, 'UPLOAD_EXPIRY_HOURS', 24) * 3600
+COPY_BUFFER = 64 * 1024
+UPLOAD_ID = re.compile(r'[A-Za-z0-9_-]{8,64}')
+
+
+class UploadError(ValueError):
+    pass
+
+
+def get_staging_root():
+    return getattr(settings, 'UPLOAD_STAGING_ROOT', None) or os.path.join(settings.MEDIA_ROOT, 'uploads', 'partial')
+
+
+def copy_stream(source, target, limit):
+    '''
+    copies file-like source (or bytes) into target, never more than limit
+    bytes. Returns the size of source, which is above limit when it is too long.
+    '''
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        if len(source) <= limit:
+            target.write(source)
+        return len(source)
+    copied = 0
+    while copied < limit:
+        block = source.read(min(COPY_BUFFER, limit - copied))
+        if not block:
+            return copied
+        target.write(block)
+        copied += len(block)
+    return copied + len(source.read(1))
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ChunkedUpload:
+    '''
+    A staged upload, identified by uploadid, in its own
+    directory under the staging root.
+    '''
+
+    def __init__(self, uploadid, root=None):
+        if not UPLOAD_ID.fullmatch(uploadid or ''):
+            raise UploadError(f"invalid upload id {uploadid!r}")
+        self.uploadid = uploadid
+        self.dir = os.path.join(root or get_staging_root(), uploadid)
+        self.data_path = os.path.join(self.dir, 'data')
+        self.chunks_dir = os.path.join(self.dir, 'chunks')
+        try:
+            with open(os.path.join(self.dir, 'meta.json')) as f:
+                self.meta = json.load(f)
+        except FileNotFoundError:
+            raise UploadError(f"upload {uploadid} does not exist or has expired") from None
+
+    @classmethod
+    def create(cls, record, biodata, filesize, checksum=None, chunksize=DEFAULT_CHUNK_SIZE,
+               uploadid=None, root=None):
+        '''
+        stages a new upload, an existing upload with the same uploadid is
+        returned as it is so the client can resume it.
+        '''
+        if not 0 <= filesize <= MAX_FILE_SIZE:
+            raise UploadError(f"file size {filesize} is not allowed")
+        if not 0 < chunksize <= MAX_CHUNK_SIZE:
+            raise UploadError(f"chunk size {chunksize} is not allowed")
+        uploadid = uploadid or uuid.uuid4().hex
+        directory = os.path.join(root or get_staging_root(), uploadid)
+        if os.path.exists(os.path.join(directory, 'meta.json')):
+            return cls(uploadid, root)
+        os.makedirs(os.path.join(directory, 'chunks'), exist_ok=True)
+        with open(os.path.join(directory, 'data'), 'wb') as f:
+            f.truncate(filesize)
+        meta = {'record': record, 'biodata': biodata, 'filesize': filesize,
+                'checksum': checksum.lower() if checksum else None, 'chunksize': chunksize}
+        # written last and renamed, an upload without meta.json does not exist yet
+        with open(os.path.join(directory, 'meta.tmp'), 'w') as f:
+            json.dump(meta, f)
+        os.replace(os.path.join(directory, 'meta.tmp'), os.path.join(directory, 'meta.json'))
+        log.info(f"upload {uploadid} started: {filesize} bytes in chunks of {chunksize}")
+        return cls(uploadid, root)
+
+    @property
+    def total_chunks(self):
+        size, chunksize = self.meta['filesize'], self.meta['chunksize']
+        return max(1, -(-size // chunksize))
+
+    def chunk_length(self, index):
+        if index == self.total_chunks - 1:
+            return self.meta['filesize'] - index * self.meta['chunksize']
+        return self.meta['chunksize']
+
+    def received(self):
+        return sorted(int(name) for name in os.listdir(self.chunks_dir) if name.isdigit())
+
+    def missing(self):
+        received = set(self.received())
+        return [index for index in range(self.total_chunks) if index not in received]
+
+    def write_chunk(self, index, chunk):
+        "writes chunk (bytes or file-like) at its offset and marks it received"
+        if not 0 <= index < self.total_chunks:
+            raise UploadError(f"chunk {index} is out of range 0-{self.total_chunks - 1}")
+        expected = self.chunk_length(index)
+        with open(self.data_path, 'r+b') as f:
+            f.seek(index * self.meta['chunksize'])
+            written = copy_stream(chunk, f, limit=expected)
+        if written != expected:
+            raise UploadError(f"chunk {index} has {written} bytes, expected {expected}")
+        open(os.path.join(self.chunks_dir, str(index)), 'w').close()
+        return written
+
+    def write_stream(self, source):
+        "writes a whole file-like source, used when the file arrives in one request"
+        with open(self.data_path, 'r+b') as f:
+            written = copy_stream(source, f, limit=self.meta['filesize'])
+        if written != self.meta['filesize']:
+            raise UploadError(f"file has {written} bytes, expected {self.meta['filesize']}")
+        for index in range(self.total_chunks):
+            open(os.path.join(self.chunks_dir, str(index)), 'w').close()
+
+    def commit(self, relative_path):
+        '''
+        checks that every chunk is in and the sha256 matches, then saves
+        the file to default_storage at relative_path and removes the staging
+        directory. Returns the stored path.
+        '''
+        from django.core.files import File
+        from django.core.files.storage import default_storage
+        if missing := self.missing():
+            raise UploadError(f"upload {self.uploadid} is missing chunks {missing[:20]}")
+        checksum = file_checksum(self.data_path)
+        if self.meta['checksum'] and checksum != self.meta['checksum']:
+            self.discard()
+            raise UploadError(f"checksum mismatch for upload {self.uploadid}, upload the file again")
+        with open(self.data_path, 'rb') as f:
+            path = default_storage.save(os.path.normpath(relative_path), File(f))
+        self.discard()
+        log.info(f"upload {self.uploadid} stored to {path}")
+        return path
+
+    def discard(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+def cleanup_stale_uploads(root=None, expiry=UPLOAD_EXPIRY):
+    "removes staged uploads which got no chunk for expiry seconds, returns how many"
+    root, removed = root or get_staging_root(), 0
+    if not os.path.isdir(root):
+        return removed
+    cutoff = time.time() - expiry
+    for entry in os.scandir(root):
+        if not entry.is_dir():
+            continue
+        # a new chunk touches the chunks directory and the data file
+        paths = [entry.path, os.path.join(entry.path, 'chunks'), os.path.join(entry.path, 'data')]
+        if max(os.path.getmtime(path) for path in paths if os.path.exists(path)) < cutoff:
+            shutil.rmtree(entry.path, ignore_errors=True)
+            removed += 1
+    return removed
@@ -190,24 +190,33 @@ class ReportMutation(graphene.Mutation):
         return ReportMutation(output = o)
 
 class UploadAttMutaion(graphene.Mutation):
+    """
+    Uploads an attachment in one request. New clients send the file as
+    a multipart upload, bytes (one int per byte) is kept for old builds.
+    Large files should use start_upload/upload_chunk/complete_upload.
+    """
     output = graphene.Field(ty.ServiceOutputType)
 
     class Arguments:
-        bytes    = graphene.List(graphene.Int, required=True)
+        bytes    = graphene.List(graphene.Int, deprecation_reason="send the file with 'file'")
+        file    = Upload()
         biodata = graphene.String(required = True)
         record  = graphene.String(required = True)
 
     @classmethod
-    def mutate(cls,root, info, bytes,  record, biodata):
+    def mutate(cls,root, info, record, biodata, bytes=None, file=None):
         log.info("\n\nupload-attachment mutations start [+]")
         try:
             recordcount=0
-            log.info(f"type of file is {type(bytes)}")
+            content = file if file is not None else bytes
+            if content is None:
+                raise ValueError("either file or bytes is required")
+            log.info(f"type of file is {type(content)}")
             record = json.loads(record)
             biodata = json.loads(biodata)
             log.info(f"Record: {record}")
             log.info(f"Bio Data: {biodata}")
-            o = sutils.perform_uploadattachment(bytes, record, biodata)
+            o = sutils.perform_uploadattachment(content, record, biodata)
             recordcount += o.recordcount
             log.info(f"Response: {o.recordcount}, {o.msg}, {o.rc}, {o.traceback}")
             o.recordcount = recordcount
@@ -217,6 +226,66 @@ class UploadAttMutaion(graphene.Mutation):
             return UploadAttMutaion(output = ty.ServiceOutputType(rc = 1, recordcount = 0, msg = 'Upload Failed', traceback = tb.format_exc()))
 
 
+class StartUploadMutation(graphene.Mutation):
+    """
+    Starts a resumable chunked upload of an attachment. Passing the
+    uploadid of an unfinished upload returns its missing chunks.
+    """
+    output = graphene.Field(ty.UploadStatusType)
+
+    class Arguments:
+        biodata   = graphene.String(required = True)
+        record    = graphene.String(required = True)
+        filesize  = graphene.Int(required = True)
+        checksum  = graphene.String(required = True, description = "sha256 of the file, hex encoded")
+        chunksize = graphene.Int()
+        uploadid  = graphene.String()
+
+    @classmethod
+    def mutate(cls, root, info, biodata, record, filesize, checksum, chunksize=None, uploadid=None):
+        log.info("start-upload mutations start [+]")
+        o = sutils.perform_startupload(
+            json.loads(record), json.loads(biodata), filesize, checksum, chunksize, uploadid)
+        log.info(f"Response: {o.uploadid}, {o.msg}, {o.rc}, missing chunks: {len(o.missing or [])}")
+        return StartUploadMutation(output = o)
+
+
+class UploadChunkMutation(graphene.Mutation):
+    """
+    Writes one chunk (multipart file) of a started upload.
+    """
+    output = graphene.Field(ty.UploadStatusType)
+
+    class Arguments:
+        uploadid = graphene.String(required = True)
+        index    = graphene.Int(required = True)
+        chunk    = Upload(required = True)
+
+    @classmethod
+    def mutate(cls, root, info, uploadid, index, chunk):
+        o = sutils.perform_uploadchunk(uploadid, index, chunk)
+        log.info(f"Response: chunk {index} of {uploadid}, {o.msg}, {o.rc}")
+        return UploadChunkMutation(output = o)
+
+
+class CompleteUploadMutation(graphene.Mutation):
+    """
+    Verifies the checksum of a chunked upload, stores the file
+    and saves its attachment record.
+    """
+    output = graphene.Field(ty.ServiceOutputType)
+
+    class Arguments:
+        uploadid = graphene.String(required = True)
+
+    @classmethod
+    def mutate(cls, root, info, uploadid):
+        log.info("complete-upload mutations start [+]")
+        o = sutils.perform_completeupload(uploadid)
+        log.info(f"Response: {o.recordcount}, {o.msg}, {o.rc}, {o.traceback}")
+        return CompleteUploadMutation(output = o)
+
+
 class UploadFile(APIView):
     parser_classes = [MultiPartParser, FileUploadParser, JSONParser]
     permission_classes = [AllowAny]
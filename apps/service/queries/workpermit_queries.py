@@ -9,6 +9,7 @@ from apps.onboarding.models import Bt
 from apps.work_order_management.views import WorkPermit
 from apps.work_order_management.utils import save_pdf_to_tmp_location
 from apps.work_order_management.utils import reject_workpermit
+from apps.work_order_management import sla_scores
 from apps.activity.models.question_model import QuestionSet
 from apps.work_order_management.models import Vendor
 from apps.peoples.models import People
@@ -108,6 +109,7 @@ class WorkPermitQueries(graphene.ObjectType):
                 if is_all_approved := check_all_approved(validated.wom_uuid, p.peoplecode):
                     log.info(f'Is all approved in side of if: {is_all_approved}')
                     updated = Wom.objects.filter(uuid=validated.wom_uuid).update(workpermit=Wom.WorkPermitStatus.APPROVED.value)
+                    sla_scores.record_approved(utils.get_current_db_name(), uuid=validated.wom_uuid)
                 if is_all_approved:
                     workpermit_status = 'APPROVED'
                     Wom.objects.filter(id=wom.id).update(workstatus=Wom.Workstatus.INPROGRESS.value)
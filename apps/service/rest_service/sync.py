@@ -0,0 +1,173 @@
+'''
+Incremental sync protocol of the REST read viewsets.
+
+A list request returns one page of rows ordered by (mdtz, id) after the
+position given by `cursor`, an opaque token of the last (mdtz, id) the
+client has seen:
+
+    GET /people/?cursor=<token>&page_size=500
+    {"results": [...], "cursor": "<token of the last row>", "has_more": true}
+
+Clients keep requesting with the returned cursor while has_more is true
+and store the cursor for the next sync. `last_update` (the old delta
+parameter) is still accepted as the start of the first page.
+
+Paging is opted in by sending `cursor` or `page_size`. A request with
+neither, as the deployed mobile builds send, gets the bare array of every
+row after `last_update` as before.
+
+Pages are keyset filtered so deep pages cost the same as the first one,
+the page keys give an ETag (304 when the page did not change) and the
+rows are serialized one by one into a streamed response.
+'''
+import base64
+import hashlib
+import json
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+from django.http import HttpResponseNotModified, StreamingHttpResponse
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+SYNC_PAGE_SIZE = getattr(settings, 'SYNC_PAGE_SIZE', 500)
+SYNC_MAX_PAGE_SIZE = getattr(settings, 'SYNC_MAX_PAGE_SIZE', 2000)
+LAST_UPDATE_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+# id of a cursor taken from last_update, after every row modified at that instant
+MAX_ID = 2**63 - 1
+
+
+def encode_cursor(mdtz, pk):
+    token = json.dumps([mdtz.isoformat(), pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(token.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        mdtz, pk = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return datetime.fromisoformat(mdtz), int(pk)
+    except (ValueError, TypeError) as e:
+        raise ValidationError({'cursor': 'invalid cursor'}) from e
+
+
+def get_start(request):
+    "(mdtz, id) after which the page starts, None for a full sync"
+    params = request.query_params
+    if params.get('cursor'):
+        return decode_cursor(params['cursor'])
+    if params.get('last_update'):
+        try:
+            last_update = datetime.strptime(params['last_update'], LAST_UPDATE_FORMAT)
+        except ValueError as e:
+            raise ValidationError({'last_update': f'expected format {LAST_UPDATE_FORMAT}'}) from e
+        return last_update.replace(tzinfo=dt_timezone.utc), MAX_ID
+    return None
+
+
+def get_page_size(request):
+    try:
+        page_size = int(request.query_params.get('page_size', SYNC_PAGE_SIZE))
+    except ValueError as e:
+        raise ValidationError({'page_size': 'must be an integer'}) from e
+    return max(1, min(page_size, SYNC_MAX_PAGE_SIZE))
+
+
+def after(queryset, start):
+    "rows after (mdtz, id) in sync order"
+    queryset = queryset.order_by('mdtz', 'id')
+    if start is None:
+        return queryset
+    mdtz, pk = start
+    return queryset.filter(Q(mdtz__gt=mdtz) | Q(mdtz=mdtz, id__gt=pk))
+
+
+def optimize_queryset(queryset, serializer_class):
+    '''
+    loads only the columns the serializer reads: .only() for its concrete
+    fields, select_related for nested sources and prefetch_related for
+    many to many fields. Serializers reading anything else (properties,
+    methods) get the queryset unchanged.
+    '''
+    model = queryset.model
+    only, select, prefetch = {'id', 'mdtz'}, set(), set()
+    for field in serializer_class().fields.values():
+        if field.source == '*':
+            return queryset
+        name, _, nested = field.source.partition('.')
+        try:
+            model_field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return queryset
+        if model_field.many_to_many or model_field.one_to_many:
+            prefetch.add(name)
+        elif nested:
+            select.add(name)
+            only.add(name)
+        elif model_field.concrete:
+            only.add(name)
+        else:
+            return queryset
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset.only(*only)
+
+
+def get_etag(model, keys, has_more):
+    digest = hashlib.sha1(f"{model._meta.label}:{has_more}:{keys}".encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def stream_page(rows, serializer_class, cursor, has_more):
+    encoder, serializer = JSONEncoder(), serializer_class()
+    yield '{"results":['
+    for i, row in enumerate(rows):
+        yield (',' if i else '') + encoder.encode(serializer.to_representation(row))
+    yield f'],"cursor":{json.dumps(cursor)},"has_more":{json.dumps(has_more)}}}'
+
+
+def is_paged(request):
+    return 'cursor' in request.query_params or 'page_size' in request.query_params
+
+
+def legacy_list(request, queryset, serializer_class):
+    "every row of queryset after last_update as a bare array, the response of the old clients"
+    queryset = optimize_queryset(after(queryset, get_start(request)), serializer_class)
+    return Response(serializer_class(queryset, many=True).data)
+
+
+def sync_list(request, queryset, serializer_class):
+    '''
+    one page of queryset after the request's cursor as a streamed
+    response, 304 when it matches the request's If-None-Match. Requests
+    without cursor and page_size get the legacy array.
+    '''
+    if not is_paged(request):
+        return legacy_list(request, queryset, serializer_class)
+    start, page_size = get_start(request), get_page_size(request)
+    queryset = after(queryset, start)
+    # the keys come from the (mdtz, id) index, rows are only loaded when the page changed
+    keys = list(queryset.values_list('mdtz', 'id')[:page_size + 1])
+    has_more = len(keys) > page_size
+    keys = keys[:page_size]
+    etag = get_etag(queryset.model, keys, has_more)
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+    if keys:
+        cursor = encode_cursor(*keys[-1])
+    else:
+        # nothing new, the client keeps its position
+        cursor = encode_cursor(*start) if start else None
+    rows = optimize_queryset(queryset.model.objects.filter(id__in=[pk for _, pk in keys]), serializer_class)
+    response = StreamingHttpResponse(
+        stream_page(rows.order_by('mdtz', 'id').iterator(chunk_size=page_size),
+                    serializer_class, cursor, has_more),
+        content_type='application/json')
+    response['ETag'] = etag
+    return response
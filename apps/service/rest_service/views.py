@@ -6,17 +6,7 @@ from apps.peoples import models as people_models
 from apps.onboarding import models as ob_models
 from apps.activity import models as act_models
 from apps.attendance.models import PeopleEventlog
-from datetime import datetime
-
-
-def get_queryset(model, request, related_fields=list):
-    last_update = request.query_params.get("last_update")
-    if last_update:
-        last_update = datetime.strptime(last_update, "%Y-%m-%dT%H:%M:%S.%fZ")
-        queryset = model.objects.filter(mdtz__gt=last_update)
-    else:
-        queryset = model.objects.all()
-    return queryset
+from apps.service.rest_service import sync
 
 
 class PeopleViewset(viewsets.ReadOnlyModelViewSet):
@@ -25,9 +15,7 @@ class PeopleViewset(viewsets.ReadOnlyModelViewSet):
     """
 
     def list(self, request):
-        queryset = get_queryset(people_models.People, request)
-        serializer = ytpl_serializers.PeopleSerializer(queryset, many=True)
-        return Response(serializer.data)
+        return sync.sync_list(request, people_models.People.objects.all(), ytpl_serializers.PeopleSerializer)
 
     def retrieve(self, request, *args, **kwargs):
         user = get_object_or_404(people_models.People, pk=kwargs["pk"])
@@ -41,9 +29,7 @@ class PELViewset(viewsets.ReadOnlyModelViewSet):
     """
 
     def list(self, request):
-        queryset = get_queryset(PeopleEventlog, request)
-        serializer = ytpl_serializers.PeopleEventLogSerializer(queryset, many=True)
-        return Response(serializer.data)
+        return sync.sync_list(request, PeopleEventlog.objects.all(), ytpl_serializers.PeopleEventLogSerializer)
 
     def retrieve(self, request, *args, **kwargs):
         event_log = get_object_or_404(PeopleEventlog, pk=kwargs["pk"])
@@ -57,9 +43,7 @@ class PgroupViewset(viewsets.ReadOnlyModelViewSet):
     """
 
     def list(self, request):
-        queryset = get_queryset(people_models.Pgroup, request)
-        serializer = ytpl_serializers.PgroupSerializer(queryset, many=True)
-        return Response(serializer.data)
+        return sync.sync_list(request, people_models.Pgroup.objects.all(), ytpl_serializers.PgroupSerializer)
 
     def retrieve(self, request, *args, **kwargs):
         pgroup = get_object_or_404(people_models.Pgroup, pk=kwargs["pk"])
@@ -73,9 +57,7 @@ class BtViewset(viewsets.ReadOnlyModelViewSet):
     """
 
     def list(self, request):
-        queryset = get_queryset(ob_models.Bt, request)
-        serializer = ytpl_serializers.BtSerializer(queryset, many=True)
-        return Response(serializer.data)
+        return sync.sync_list(request, ob_models.Bt.objects.all(), ytpl_serializers.BtSerializer)
 
     def retrieve(self, request, *args, **kwargs):
         bt = get_object_or_404(ob_models.Bt, pk=kwargs["pk"])
@@ -89,9 +71,7 @@ class ShiftViewset(viewsets.ReadOnlyModelViewSet):
     """
 
     def list(self, request):
-        queryset = get_queryset(ob_models.Shift, request)
-        serializer = ytpl_serializers.ShiftSerializer(queryset, many=True)
-        return Response(serializer.data)
+        return sync.sync_list(request, ob_models.Shift.objects.all(), ytpl_serializers.ShiftSerializer)
 
     def retrieve(self, request, *args, **kwargs):
         shift = get_object_or_404(ob_models.Shift, pk=kwargs["pk"])
@@ -105,9 +85,7 @@ class TypeAssistViewset(viewsets.ReadOnlyModelViewSet):
     """
 
     def list(self, request):
-        queryset = get_queryset(ob_models.TypeAssist, request)
-        serializer = ytpl_serializers.TypeAssistSerializer(queryset, many=True)
-        return Response(serializer.data)
+        return sync.sync_list(request, ob_models.TypeAssist.objects.all(), ytpl_serializers.TypeAssistSerializer)
 
     def retrieve(self, request, *args, **kwargs):
         type_assist = get_object_or_404(ob_models.TypeAssist, pk=kwargs["pk"])
@@ -121,9 +99,7 @@ class PgbelongingViewset(viewsets.ReadOnlyModelViewSet):
     """
 
     def list(self, request):
-        queryset = get_queryset(people_models.Pgbelonging, request)
-        serializer = ytpl_serializers.PgbelongingSerializer(queryset, many=True)
-        return Response(serializer.data)
+        return sync.sync_list(request, people_models.Pgbelonging.objects.all(), ytpl_serializers.PgbelongingSerializer)
 
     def retrieve(self, request, *args, **kwargs):
         belonging = get_object_or_404(people_models.Pgbelonging, pk=kwargs["pk"])
@@ -137,9 +113,7 @@ class JobViewset(viewsets.ReadOnlyModelViewSet):
     """
 
     def list(self, request):
-        queryset = get_queryset(act_models.Job, request)
-        serializer = ytpl_serializers.JobSerializer(queryset, many=True)
-        return Response(serializer.data)
+        return sync.sync_list(request, act_models.Job.objects.all(), ytpl_serializers.JobSerializer)
 
     def retrieve(self, request, *args, **kwargs):
         job = get_object_or_404(act_models.Job, pk=kwargs["pk"])
@@ -153,9 +127,7 @@ class JobneedViewset(viewsets.ReadOnlyModelViewSet):
     """
 
     def list(self, request):
-        queryset = get_queryset(act_models.Jobneed, request)
-        serializer = ytpl_serializers.JobneedSerializer(queryset, many=True)
-        return Response(serializer.data)
+        return sync.sync_list(request, act_models.Jobneed.objects.all(), ytpl_serializers.JobneedSerializer)
 
     def retrieve(self, request, *args, **kwargs):
         jobneed = get_object_or_404(act_models.Jobneed, pk=kwargs["pk"])
@@ -15,7 +15,8 @@ from .mutations import (
   InsertRecord, AdhocMutation,
   LoginUser, LogoutUser,
   ReportMutation,  TaskTourUpdate,
-  UploadAttMutaion, SyncMutation, InsertJsonMutation
+  UploadAttMutaion, SyncMutation, InsertJsonMutation,
+  StartUploadMutation, UploadChunkMutation, CompleteUploadMutation
 )
 from .types import (
     PELogType, TrackingType, TestGeoType, 
@@ -30,6 +31,9 @@ class Mutation(graphene.ObjectType):
     update_task_tour  = TaskTourUpdate.Field()
     upload_report     = ReportMutation.Field()
     upload_attachment = UploadAttMutaion.Field()
+    start_upload      = StartUploadMutation.Field()
+    upload_chunk      = UploadChunkMutation.Field()
+    complete_upload   = CompleteUploadMutation.Field()
     sync_upload       = SyncMutation.Field()
     adhoc_record      = AdhocMutation.Field()
     insert_json       = InsertJsonMutation.Field()
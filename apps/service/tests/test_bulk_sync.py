@@ -0,0 +1,62 @@
+import json
+from unittest.mock import MagicMock, patch
+
+from apps.service import bulk_sync
+
+
+def test_decode_records_double_encoded():
+    record = {'uuid': 'a', 'tablename': 'ticket'}
+    assert bulk_sync.decode_records([json.dumps(json.dumps(record))], times=2) == [record]
+
+
+@patch('apps.service.bulk_sync.clean_record', side_effect=lambda r: r)
+def test_group_by_table_keeps_latest_record_of_a_uuid(mock_clean):
+    data = [
+        {'tablename': 'ticket', 'uuid': 'a', 'status': 'NEW'},
+        {'tablename': 'wom', 'uuid': 'b'},
+        None,
+        {'tablename': 'ticket', 'uuid': 'a', 'status': 'RESOLVED'},
+    ]
+    tables, count = bulk_sync.group_by_table(data)
+    assert count == 3
+    assert list(tables) == ['ticket', 'wom']
+    assert tables['ticket'] == [{'uuid': 'a', 'status': 'RESOLVED'}]
+
+
+def test_bulk_upsert_updates_only_sent_fields():
+    model = MagicMock()
+    records = [
+        {'uuid': 'a', 'status': 'NEW'},
+        {'uuid': 'b', 'status': 'NEW', 'comments': 'x'},
+        {'uuid': 'c', 'status': 'NEW'},
+    ]
+    objs = bulk_sync.bulk_upsert(model, records, 'default')
+    calls = model.objects.using.return_value.bulk_create.call_args_list
+    assert len(objs) == 3
+    assert len(calls) == 2
+    assert sorted(call.kwargs['update_fields'] for call in calls) == [['comments', 'status'], ['status']]
+
+
+@patch('apps.service.bulk_sync.upsert_table')
+@patch('apps.service.utils.insert_or_update_record')
+@patch('apps.service.bulk_sync.has_unique_uuid', side_effect=lambda model: model == 'ticket_model')
+def test_write_table_falls_back_without_a_unique_uuid(mock_unique, mock_insert, mock_upsert):
+    records = [{'uuid': 'a'}, {'uuid': 'b'}]
+    assert bulk_sync.write_table('bt', 'bt_model', records, 'default') is False
+    assert [c.args for c in mock_insert.call_args_list] == [({'uuid': 'a'}, 'bt'), ({'uuid': 'b'}, 'bt')]
+    mock_upsert.assert_not_called()
+    assert bulk_sync.write_table('ticket', 'ticket_model', records, 'default') is True
+    mock_upsert.assert_called_once_with('ticket_model', records, 'default')
+
+
+@patch('apps.service.bulk_sync.run_side_effects')
+@patch('apps.service.bulk_sync.write_table', side_effect=lambda tablename, *args: tablename == 'ticket')
+@patch('apps.service.bulk_sync.PeopleCache')
+@patch('apps.service.utils.get_model_or_form', side_effect=lambda tablename: f'{tablename}_model')
+@patch('apps.service.bulk_sync.clean_record', side_effect=lambda r: r)
+def test_ingest_runs_side_effects_of_bulk_tables_only(mock_clean, mock_model, mock_people, mock_write, mock_effects):
+    data = [{'tablename': 'ticket', 'uuid': 'a'}, {'tablename': 'bt', 'uuid': 'b'}]
+    assert bulk_sync.ingest(data, 'default') == 2
+    assert [c.args[0] for c in mock_write.call_args_list] == ['ticket', 'bt']
+    mock_effects.assert_called_once_with(
+        'ticket', 'ticket_model', [{'uuid': 'a'}], mock_people.return_value, 'default')
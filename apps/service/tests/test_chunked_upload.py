@@ -0,0 +1,98 @@
+import hashlib
+import io
+import os
+from unittest.mock import patch
+
+import pytest
+
+from apps.service import chunked_upload
+from apps.service.chunked_upload import ChunkedUpload, UploadError
+
+CONTENT = os.urandom(2500)
+CHECKSUM = hashlib.sha256(CONTENT).hexdigest()
+RECORD = {'uuid': 'att-1', 'filename': 'photo.jpg'}
+BIODATA = {'filename': 'photo.jpg', 'path': 'transactions/1/', 'people_id': 1, 'owner': 'pel-1', 'ownername': 'peopleeventlog'}
+
+
+def start(tmp_path, checksum=CHECKSUM, **kwargs):
+    return ChunkedUpload.create(RECORD, BIODATA, len(CONTENT), checksum, chunksize=1000, root=str(tmp_path), **kwargs)
+
+
+def send(upload, index):
+    return upload.write_chunk(index, io.BytesIO(CONTENT[index * 1000:(index + 1) * 1000]))
+
+
+def stored():
+    saved = {}
+
+    def save(name, content):
+        saved[name] = content.read()
+        return name
+    return saved, patch('django.core.files.storage.default_storage.save', side_effect=save)
+
+
+def test_chunks_are_written_in_any_order(tmp_path):
+    upload = start(tmp_path)
+    assert upload.total_chunks == 3
+    send(upload, 2)
+    send(upload, 0)
+    assert upload.missing() == [1]
+    send(upload, 1)
+    saved, mock_save = stored()
+    with mock_save:
+        upload.commit('transactions/1/photo.jpg')
+    assert saved['transactions/1/photo.jpg'] == CONTENT
+    assert not os.path.exists(upload.dir)
+
+
+def test_upload_is_resumed_with_the_same_id(tmp_path):
+    upload = start(tmp_path, uploadid='upload-0001')
+    send(upload, 0)
+    resumed = start(tmp_path, uploadid='upload-0001')
+    assert resumed.missing() == [1, 2]
+
+
+def test_commit_needs_every_chunk(tmp_path):
+    upload = start(tmp_path)
+    send(upload, 0)
+    with pytest.raises(UploadError):
+        upload.commit('transactions/1/photo.jpg')
+
+
+def test_chunk_of_wrong_size_is_rejected(tmp_path):
+    upload = start(tmp_path)
+    with pytest.raises(UploadError):
+        upload.write_chunk(0, CONTENT[:1500])
+    with pytest.raises(UploadError):
+        upload.write_chunk(3, CONTENT[:500])
+    assert upload.missing() == [0, 1, 2]
+
+
+def test_checksum_mismatch_discards_the_upload(tmp_path):
+    upload = start(tmp_path, checksum=hashlib.sha256(b'other').hexdigest())
+    for index in range(3):
+        send(upload, index)
+    with pytest.raises(UploadError):
+        upload.commit('transactions/1/photo.jpg')
+    with pytest.raises(UploadError):
+        ChunkedUpload(upload.uploadid, root=str(tmp_path))
+
+
+def test_invalid_upload_id_is_rejected(tmp_path):
+    with pytest.raises(UploadError):
+        ChunkedUpload('../../etc', root=str(tmp_path))
+
+
+def test_whole_file_is_written_as_a_stream(tmp_path):
+    upload = start(tmp_path, checksum=None)
+    upload.write_stream(io.BytesIO(CONTENT))
+    assert upload.missing() == []
+    with pytest.raises(UploadError):
+        start(tmp_path, checksum=None).write_stream(io.BytesIO(CONTENT + b'x'))
+
+
+def test_stale_uploads_are_removed(tmp_path):
+    upload = start(tmp_path)
+    assert chunked_upload.cleanup_stale_uploads(root=str(tmp_path), expiry=3600) == 0
+    assert chunked_upload.cleanup_stale_uploads(root=str(tmp_path), expiry=-1) == 1
+    assert not os.path.exists(upload.dir)
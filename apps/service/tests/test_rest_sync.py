@@ -0,0 +1,48 @@
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+
+import pytest
+from rest_framework.exceptions import ValidationError
+
+from apps.service.rest_service import sync
+
+
+def request(**params):
+    return MagicMock(query_params=params)
+
+
+def test_cursor_round_trip():
+    mdtz = datetime(2025, 3, 1, 10, 30, 15, 123456, tzinfo=timezone.utc)
+    assert sync.decode_cursor(sync.encode_cursor(mdtz, 42)) == (mdtz, 42)
+
+
+def test_invalid_cursor_is_rejected():
+    with pytest.raises(ValidationError):
+        sync.decode_cursor('not-a-cursor')
+
+
+def test_last_update_starts_after_every_row_of_that_instant():
+    mdtz, pk = sync.get_start(request(last_update='2025-03-01T10:30:15.000000Z'))
+    assert mdtz == datetime(2025, 3, 1, 10, 30, 15, tzinfo=timezone.utc)
+    assert pk == sync.MAX_ID
+
+
+def test_page_size_is_bounded():
+    assert sync.get_page_size(request()) == sync.SYNC_PAGE_SIZE
+    assert sync.get_page_size(request(page_size='100000')) == sync.SYNC_MAX_PAGE_SIZE
+    assert sync.get_page_size(request(page_size='0')) == 1
+
+
+def test_etag_changes_with_the_page_keys():
+    model = MagicMock()
+    model._meta.label = 'onboarding.Bt'
+    mdtz = datetime(2025, 3, 1, tzinfo=timezone.utc)
+    etag = sync.get_etag(model, [(mdtz, 1)], False)
+    assert etag == sync.get_etag(model, [(mdtz, 1)], False)
+    assert etag != sync.get_etag(model, [(mdtz, 2)], False)
+
+
+def test_paging_is_opted_in():
+    assert not sync.is_paged(request(last_update='2025-03-01T10:30:15.000000Z'))
+    assert sync.is_paged(request(cursor=''))
+    assert sync.is_paged(request(page_size='100'))
@@ -1,4 +1,6 @@
 import pytest
+from unittest.mock import patch
+from apps.service import utils as service_utils
 from apps.service.utils import  get_or_create_dir
 from apps.service.validators import clean_string, validate_email, clean_array_string, validate_cron
 
@@ -35,3 +37,18 @@ def test_clean_array_string():
 def test_validate_cron():
     assert validate_cron("0 0 * * *") is True
     assert validate_cron("*") is False
+
+
+BIODATA = {'filename': 'face.jpg', 'path': 'transaction/', 'people_id': 3, 'owner': 'abc', 'ownername': 'peopleeventlog'}
+
+
+@pytest.mark.parametrize("fails,saved", [(False, True), (True, False)])
+def test_attachment_row_only_after_the_file_is_stored(fails, saved):
+    with patch.object(service_utils, 'chunked_upload') as mock_upload, \
+            patch.object(service_utils, 'save_attachment_record') as mock_save, \
+            patch.object(service_utils.utils, 'get_current_db_name', return_value='default'):
+        if fails:
+            mock_upload.ChunkedUpload.create.return_value.commit.side_effect = OSError('disk full')
+        result = service_utils.perform_uploadattachment(b'jpeg', {'localfilepath': 'x'}, BIODATA)
+    assert result.rc == (1 if fails else 0)
+    assert mock_save.called is saved
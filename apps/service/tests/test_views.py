@@ -1,7 +1,12 @@
+import json
 import pytest
 from django.urls import reverse
 from django.test import override_settings
 
+
+def streamed_json(resp):
+    return json.loads(b''.join(resp.streaming_content))
+
 @override_settings(ROOT_URLCONF='apps.service.rest_service.urls')
 @pytest.mark.django_db
 def test_people_list(api_client, people_factory):
@@ -19,3 +24,33 @@ def test_people_retrieve(api_client, people_factory):
     resp = api_client.get(url)
     assert resp.status_code == 200
     assert resp.json()['id'] == person.id
+
+@override_settings(ROOT_URLCONF='apps.service.rest_service.urls')
+@pytest.mark.django_db
+def test_bt_list_is_paged_with_a_cursor(api_client, bt_factory):
+    first, second = bt_factory(bucode='BU1'), bt_factory(bucode='BU2')
+    url = reverse('bt-list')
+    page = streamed_json(api_client.get(url, {'page_size': 1}))
+    ids = [row['id'] for row in page['results']]
+    while page['has_more']:
+        page = streamed_json(api_client.get(url, {'page_size': 1, 'cursor': page['cursor']}))
+        ids.extend(row['id'] for row in page['results'])
+    assert first.id in ids and second.id in ids
+    assert len(ids) == len(set(ids))
+    assert streamed_json(api_client.get(url, {'cursor': page['cursor']}))['results'] == []
+
+@override_settings(ROOT_URLCONF='apps.service.rest_service.urls')
+@pytest.mark.django_db
+def test_list_without_cursor_is_the_legacy_array(api_client, bt_factory):
+    bt = bt_factory(bucode='BU1')
+    resp = api_client.get(reverse('bt-list'), {'last_update': '2000-01-01T00:00:00.000000Z'})
+    assert resp.status_code == 200
+    assert bt.id in [row['id'] for row in resp.json()]
+
+@override_settings(ROOT_URLCONF='apps.service.rest_service.urls')
+@pytest.mark.django_db
+def test_unchanged_page_is_not_modified(api_client, bt_factory):
+    bt_factory()
+    url = reverse('bt-list')
+    etag = api_client.get(url, {'page_size': 100})['ETag']
+    assert api_client.get(url, {'page_size': 100}, HTTP_IF_NONE_MATCH=etag).status_code == 304
@@ -228,6 +228,15 @@ class ServiceOutputType(graphene.ObjectType):
     uuids = graphene.List(graphene.String, default_value=(),description="UUIDs")
 
 
+class UploadStatusType(graphene.ObjectType):
+    rc = graphene.Int(default_value=0,description="Response code")
+    msg = graphene.String(description="Message")
+    traceback = graphene.String(default_value="NA",description="Trace back")
+    uploadid = graphene.String(description="Upload id, to resume or complete the upload")
+    chunksize = graphene.Int(description="Chunk size in bytes")
+    missing = graphene.List(graphene.Int, default_value=(),description="Chunks not received yet")
+
+
 class JobType(DjangoObjectType):
     class Meta:
         model = Job
@@ -10,7 +10,7 @@ from django.db.utils import IntegrityError
 from apps.activity.models.asset_model import Asset
 from apps.activity.models.job_model import Jobneed,JobneedDetails
 from apps.work_order_management.models import Wom
-from apps.core import utils
+from apps.core import geocoding, utils
 from apps.core import exceptions as excp
 from apps.service import serializers as sz
 from apps.y_helpdesk.models import Ticket
@@ -18,9 +18,9 @@ from background_tasks.tasks import alert_sendmail,send_email_notification_for_wp
 from intelliwiz_config.celery import app
 from apps.work_order_management.utils import save_approvers_injson,save_verifiers_injson
 from apps.schedhuler.utils import create_dynamic_job
-from intelliwiz_config.settings import GOOGLE_MAP_SECRET_KEY as google_map_key
+from . import bulk_sync, chunked_upload
 from .auth import Messages as AM
-from .types import ServiceOutputType
+from .types import ServiceOutputType, UploadStatusType
 from .validators import clean_record
 
 
@@ -48,6 +48,8 @@ class Messages(AM):
     NODETAILS       = ' Unable to find any details record against site/incident report'
     REPORTSFAILED   = 'Failed to generate jasper reports'
     UPLOAD_SUCCESS  = 'Uploaded Successfully!'
+    UPLOAD_STARTED  = 'Upload Started!'
+    CHUNK_RECEIVED  = 'Chunk Received!'
 
 
 # utility functions
@@ -55,11 +57,7 @@ def insertrecord_json(records, tablename):
     uuids = []
     try:
         if model := get_model_or_form(tablename):
-            for record in records:
-                record = json.loads(record)
-                record = json.loads(record)
-                record = clean_record(record)
-                uuids.append(record['uuid'])
+            uuids = [record['uuid'] for record in bulk_sync.decode_records(records, times = 2)]
             insert_json_records_async.delay(records, tablename)
     except IntegrityError as e:
         tlog.info(f"record already exist in {tablename}")
@@ -184,7 +182,7 @@ def update_record(details, jobneed_record, JnModel, JndModel):
             if jobneed.jobstatus == 'COMPLETED' and jobneed.other_info['isdynamic'] and jobneed.parent_id == 1:
                 create_dynamic_job([jobneed.job_id])
                 log.info("Dynamic job created")
-            jobneed.geojson['gpslocation'] = get_readable_addr_from_point(jobneed.gpslocation)
+            geocoding.fill_addresses(jobneed, ['gpslocation'])
             jobneed.save()
             log.debug(f'after saving the record jobneed_id {jobneed.id} cdtz {jobneed.cdtz} mdtz = {jobneed.mdtz} starttime = {jobneed.starttime} endtime = {jobneed.endtime}')
             log.info("parent jobneed is valid and saved successfully")
@@ -338,28 +336,15 @@ def save_parent_childs(sz, jn_parent_serializer, child, M, tablename, is_return_
 
 
 def save_linestring_and_update_pelrecord(obj):
-    # sourcery skip: identity-comprehension
-    from django.contrib.gis.geos import LineString
-
-    from apps.attendance.models import Tracking
+    from apps.attendance import journey
     try:
-
-        bet_objs = Tracking.objects.filter(reference = obj.uuid).order_by('receiveddate')
-        line = [[coord for coord in obj.gpslocation] for obj in bet_objs]
-        if len(line) > 1:
-            ls = LineString(line, srid = 4326)
-            # transform spherical mercator projection system
-            ls.transform(3857)
-            #d = round(ls.length / 1000)
-            #obj.distance = d
-            ls.transform(4326)
-            obj.journeypath = ls
-            obj.geojson['startlocation'] = get_readable_addr_from_point(obj.startlocation)
-            obj.geojson['endlocation'] = get_readable_addr_from_point(obj.endlocation)
-            obj.save()
-                #bet_objs.delete()
+        # the path and distance are built from the tracking points in the database
+        if journey.build_eventlog_paths([obj.uuid], using=obj._state.db or 'default'):
+            # the UPDATE wrote them, obj is rendered and saved by the callers
+            obj.refresh_from_db(fields=['journeypath', 'distance'])
+            geocoding.fill_addresses(obj, ['startlocation', 'endlocation'])
+            obj.save(update_fields=['geojson'])
             log.info("save linestring is saved..")
-            
     except Exception as e:
         log.critical('ERROR while saving line string', exc_info = True)
         raise
@@ -422,28 +407,17 @@ def insert_adhoc_record(jobneedrecord, details):
 
 
 def get_readable_addr_from_point(point):
-    import googlemaps
-    try:
-        if hasattr(point, 'coords') and point.coords[0] not in [0.0, "0.0"]:
-            gmaps = googlemaps.Client(key=google_map_key)
-            result = gmaps.reverse_geocode(point.coords[::-1])
-            log.info("reverse geocoding complete, results returned")
-            return result[0]['formatted_address']
-        log.info("Not a valid point, returned empty string")
-        return ""
-    except Exception as e:
-        log.critical("something went wrong while reverse geocoding", exc_info=True)
-        return ""
-    
+    "address of a point, cached per geohash cell, see apps.core.geocoding"
+    return geocoding.reverse_point(point)
+
+
 def save_addr_for_point(obj):
-    if hasattr(obj, 'gpslocation'):
-        obj.geojson['gpslocation'] = get_readable_addr_from_point(obj.gpslocation)
-    if hasattr(obj, 'startlocation'):
-        obj.geojson['startlocation'] = get_readable_addr_from_point(obj.startlocation)
-    if hasattr(obj, 'endlocation'):
-        obj.geojson['endlocation'] = get_readable_addr_from_point(obj.endlocation)
+    # addresses which are not cached yet are saved after commit
+    geocoding.fill_addresses(obj, [field for field in ('gpslocation', 'startlocation', 'endlocation')
+                                   if hasattr(obj, field)])
     obj.save()
-    
+
+
 def call_service_based_on_filename(data, filename, db='default', request=None, user=None):
     log.info(f'filename before calling {filename}')
     if filename == 'insertRecord.gz':
@@ -512,28 +486,15 @@ def save_journeypath_field(jobneed):
     if jobneed.get('parent_id') == 1 \
     and jobneed.get('jobstatus') in ('COMPLETED', 'PARTIALLYCOMPLETED') \
     and jobneed.get('identifier') in ('EXTERNALTOUR', 'INTERNALTOUR'):
-        from django.contrib.gis.geos import LineString
-        from apps.attendance.models import Tracking
+        from apps.attendance import journey
         try:
             log.info(f"saving line string started all conditions met")
-            sitetour =  Jobneed.objects.get(uuid=jobneed.get('uuid'))
-            between_latlngs = Tracking.objects.filter(reference = jobneed.get('uuid')).order_by('receiveddate')
-            line = [[coord for coord in obj.gpslocation] for obj in between_latlngs]
-            if len(line) > 1:
-                log.info("between lat lngs found for the tour with uuid %s" % jobneed.get('uuid'))
-                ls = LineString(line, srid = 4326)
-                ls.transform(4326)
-                sitetour.journeypath = ls
-                sitetour.save()
-                info = between_latlngs.delete()
-                log.info(f"Between latlngs are deleted and their info is following\n {info}")
-                log.info("save linestring is saved..")
+            # builds the path in the database and deletes the tour's tracking points
+            if journey.build_tour_paths([jobneed.get('uuid')], using=utils.get_current_db_name()):
+                log.info(f"line string saved for the tour with uuid {jobneed.get('uuid')}")
         except Exception as e:
             log.critical('ERROR while saving line string', exc_info = True)
             raise
-        else:
-            sitetour =  Jobneed.objects.get(uuid=jobneed.get('uuid'))
-            log.info(f"line string saved printing it {pformat(sitetour.journeypath)} for the tour with uuid {jobneed.get('uuid')}")
     else:
         log.info(f"saving line string ended because conditions not met")
         
@@ -562,34 +523,8 @@ def perform_insertrecord(self, records,  db='default', filebased = True, bg=Fals
 
         if len(data) == 0: raise excp.NoRecordsFound
         with transaction.atomic(using = db):
-            for record in data:
-                if record:
-                    tablename = record.pop('tablename')
-                    log.info(f'Table Name: {tablename}')
-                    log.info("Record %s",record)
-                    obj = insert_or_update_record(record, tablename)
-                    if record.get('people_id') == None:
-                        id = record.get('muser_id')
-                    else:
-                        id = record.get('people_id')
-                    user = get_user_instance(id)
-                    
-                    if tablename == 'ticket' and isinstance(obj, Ticket): utils.store_ticket_history(
-                        instance = obj,  user=user)
-                    if tablename == 'wom':
-                        wutils.notify_wo_creation(id = obj.id)
-                    allconditions = [
-                        hasattr(obj, 'peventtype'), hasattr(obj, 'endlocation'), 
-                        hasattr(obj, 'punchintime'), hasattr(obj, 'punchouttime')]
-
-                    if all(allconditions) and all([tablename == 'peopleeventlog',
-                            obj.peventtype.tacode in ('CONVEYANCE', 'AUDIT'),
-                            obj.endlocation,obj.punchouttime, obj.punchintime]):
-                        log.info("save line string is started")
-                        save_linestring_and_update_pelrecord(obj)
-                    check_for_sitecrisis(obj, tablename, user)
-                    recordcount += 1
-                    log.info(f'{recordcount} record inserted successfully')
+            recordcount = bulk_sync.ingest(data, db)
+            log.info(f'{recordcount} records inserted successfully')
         if len(data) == recordcount:
             msg = Messages.INSERT_SUCCESS
             log.info(f'All {recordcount} records are inserted successfully')
@@ -774,48 +709,111 @@ def perform_adhocmutation(self, records, db='default', bg=False):  # sourcery sk
     results = ServiceOutputType(rc = rc, recordcount = recordcount, msg = msg, traceback = traceback)
     return results.__dict__ if bg else results
 
+def get_upload_size(file_buffer):
+    if isinstance(file_buffer, (bytes, bytearray)):
+        return len(file_buffer)
+    if getattr(file_buffer, 'size', None) is not None:
+        return file_buffer.size
+    position = file_buffer.tell()
+    size = file_buffer.seek(0, os.SEEK_END) - position
+    file_buffer.seek(position)
+    return size
+
+
 def perform_uploadattachment(file,  record, biodata):
     rc, traceback, resp = 1,  'NA', 0
     recordcount, msg = None, Messages.UPLOAD_FAILED
     
     
-    file_buffer = file
+    # old mobile builds still send the file as a list of ints
+    file_buffer = bytes(file) if isinstance(file, list) else file
     filename    = biodata['filename']
-    peopleid    = biodata['people_id']
     path        = biodata['path']
-    ownerid     = biodata['owner']
-    onwername   = biodata['ownername']
-    home_dir    = f'{settings.MEDIA_ROOT}/'
-    filepath    = home_dir + path
-    uploadfile  = f'{filepath}/{filename}'
     db          = utils.get_current_db_name()
-    log.info(f"Upload File: {filepath}, {filename}")
-    log.info(f"Length file_buffer: '{len(file_buffer)}' \n'onwername':{onwername}, \nownerid: '{ownerid}' \npeopleid: '{peopleid}' \npath: {path} \nhome_dir: '{home_dir}' \nfilepath: '{filepath}' \nuploadfile: '{uploadfile}'")
+    filesize    = get_upload_size(file_buffer)
+    log.info(f"Upload File: {path}{filename}, size: {filesize}")
     try:
-        with transaction.atomic(using = db):
-            iscreated = get_or_create_dir(filepath)
-            log.info(f'Is FilePath created? {iscreated}')
-            relative_path = path + filename
-            #write_file_to_dir(file_buffer, uploadfile)
-            write_file_to_dir(file_buffer, relative_path)
-            rc, traceback, msg = 0, tb.format_exc(), Messages.UPLOAD_SUCCESS
-            recordcount = 1
-            log.info('file uploaded success')
+        # the file takes the same staged path as the chunked uploads
+        upload = chunked_upload.ChunkedUpload.create(record, biodata, filesize)
+        upload.write_stream(file_buffer)
+        upload.commit(path + filename)
+        rc, traceback, msg = 0, tb.format_exc(), Messages.UPLOAD_SUCCESS
+        recordcount = 1
+        log.info('file uploaded success')
     except Exception as e:
         rc, traceback, msg = 1, tb.format_exc(), Messages.UPLOAD_FAILED
         log.error('something went wrong', exc_info = True)
+    else:
+        # the row points to the stored file, it is not written when the upload failed
+        save_attachment_record(record, biodata, db)
+    return ServiceOutputType(rc = rc, recordcount = recordcount, msg = msg, traceback = traceback)
+
+
+def save_attachment_record(record, biodata, db):
+    "inserts the attachment row and starts face recognition for attendance events"
+    peopleid, ownerid, onwername = biodata['people_id'], biodata['owner'], biodata['ownername']
     try:
         log.info(f'Record Attachment: {record}')
         if record.get('localfilepath'): record.pop('localfilepath')
         obj = insert_or_update_record(record, 'attachment')        
         eobj = log_event_info(onwername, ownerid)
         if hasattr(eobj, 'peventtype') and eobj.peventtype.tacode in ['SELF', 'MARK', 'MARKATTENDANCE', 'SELFATTENDANCE']:
-            from background_tasks.tasks import perform_facerecognition_bgt
-            results = perform_facerecognition_bgt.delay(ownerid, peopleid, db)
-            log.warning(f"face recognition status {results.state} and {results} and task_id={results.task_id}")
+            from apps.attendance import face_queue
+            if face_queue.BATCH_ENABLED:
+                position = face_queue.push(ownerid, peopleid, db)
+                log.info(f"punch {ownerid} queued for face recognition at {position}")
+            else:
+                from background_tasks.tasks import perform_facerecognition_bgt
+                results = perform_facerecognition_bgt.delay(ownerid, peopleid, db)
+                log.warning(f"face recognition status {results.state} and {results} and task_id={results.task_id}")
     except Exception as e:
         log.error('something went wrong while perform_uploadattachment', exc_info = True)
-    return ServiceOutputType(rc = rc, recordcount = recordcount, msg = msg, traceback = traceback)
+
+
+def perform_startupload(record, biodata, filesize, checksum, chunksize=None, uploadid=None):
+    '''
+    stages a chunked upload, or returns the chunks still missing
+    when uploadid is an upload being resumed
+    '''
+    try:
+        upload = chunked_upload.ChunkedUpload.create(
+            record, biodata, filesize, checksum,
+            chunksize or chunked_upload.DEFAULT_CHUNK_SIZE, uploadid)
+        return UploadStatusType(
+            rc = 0, msg = Messages.UPLOAD_STARTED, uploadid = upload.uploadid,
+            chunksize = upload.meta['chunksize'], missing = upload.missing())
+    except Exception as e:
+        log.error('something went wrong while starting upload', exc_info = True)
+        return UploadStatusType(rc = 1, msg = Messages.UPLOAD_FAILED, traceback = tb.format_exc())
+
+
+def perform_uploadchunk(uploadid, index, chunk):
+    try:
+        upload = chunked_upload.ChunkedUpload(uploadid)
+        upload.write_chunk(index, chunk)
+        return UploadStatusType(
+            rc = 0, msg = Messages.CHUNK_RECEIVED, uploadid = uploadid,
+            chunksize = upload.meta['chunksize'], missing = upload.missing())
+    except Exception as e:
+        log.error(f'something went wrong while writing chunk {index} of {uploadid}', exc_info = True)
+        return UploadStatusType(rc = 1, msg = Messages.UPLOAD_FAILED, uploadid = uploadid, traceback = tb.format_exc())
+
+
+def perform_completeupload(uploadid):
+    '''
+    verifies and stores a chunked upload, the attachment row
+    is only written once the whole file is in place
+    '''
+    rc, traceback, recordcount, msg = 1, 'NA', 0, Messages.UPLOAD_FAILED
+    try:
+        upload = chunked_upload.ChunkedUpload(uploadid)
+        record, biodata = upload.meta['record'], upload.meta['biodata']
+        upload.commit(biodata['path'] + biodata['filename'])
+    except Exception as e:
+        log.error(f'something went wrong while completing upload {uploadid}', exc_info = True)
+        return ServiceOutputType(rc = rc, recordcount = recordcount, msg = msg, traceback = tb.format_exc())
+    save_attachment_record(record, biodata, utils.get_current_db_name())
+    return ServiceOutputType(rc = 0, recordcount = 1, msg = Messages.UPLOAD_SUCCESS, traceback = traceback)
 
 
 def log_event_info(onwername, ownerid):
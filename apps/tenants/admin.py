@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Tenant
+from .models import Tenant, TenantHost
 from import_export.admin import ImportExportModelAdmin
 from import_export import resources
 
@@ -17,3 +17,11 @@ class TenantAdmin(ImportExportModelAdmin):
     fields = ('tenantname', 'subdomain_prefix')
     list_display = ('tenantname', 'subdomain_prefix', 'created_at')
     list_display_links =  ('tenantname', 'subdomain_prefix', 'created_at')
+
+
+@admin.register(TenantHost)
+class TenantHostAdmin(admin.ModelAdmin):
+    fields = ('hostname', 'database', 'tenant', 'enable')
+    list_display = ('hostname', 'database', 'tenant', 'enable', 'created_at')
+    list_display_links = ('hostname',)
+    list_filter = ('database', 'enable')
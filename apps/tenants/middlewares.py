@@ -16,11 +16,16 @@ class TenantDbRouter:
     def _multi_db():
         from django.http import Http404
         from django.conf import settings
-        if hasattr(THREAD_LOCAL, 'DB'):
-            if THREAD_LOCAL.DB in settings.DATABASES:
-                return THREAD_LOCAL.DB
-            raise Http404
-        return 'default'
+        db = getattr(THREAD_LOCAL, 'DB', None)
+        if db is None:
+            return 'default'
+        # the alias is checked once when it changes, not for every query
+        if db == getattr(THREAD_LOCAL, 'ROUTED_DB', None):
+            return db
+        if db in settings.DATABASES:
+            THREAD_LOCAL.ROUTED_DB = db
+            return db
+        raise Http404
 
     def db_for_read(self, model, **hints):
         return self._multi_db()
@@ -12,3 +12,15 @@ class TenantAwareModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class TenantHost(models.Model):
+    "hostname served from a database alias, read by apps.tenants.registry"
+    hostname = models.CharField(_("hostname"), max_length = 100, unique = True)
+    database = models.CharField(_("database"), max_length = 50)
+    tenant = models.ForeignKey(Tenant, null = True, blank = True, on_delete = models.SET_NULL)
+    enable = models.BooleanField(_("enable"), default = True)
+    created_at = models.DateTimeField(_("created_at"), auto_now = False, auto_now_add = True)
+
+    def __str__(self):
+        return f"{self.hostname} -> {self.database}"
@@ -0,0 +1,168 @@
+'''
+Registry of the tenants, hostname -> database alias.
+
+The map used to be a dict literal of apps.core.utils rebuilt on every
+request, adding a tenant meant a code change and a deploy. It is now built
+from, later sources winning:
+
+- DEFAULT_HOSTS, the hosts served so far,
+- settings.TENANT_HOSTS, {hostname: alias},
+- the enabled TenantHost rows of the default database, managed in admin.
+
+Hosts pointing to an alias missing from settings.DATABASES are dropped
+with a warning. The map is read only and shared by every thread of the
+process. A save or delete of a TenantHost bumps a version in the shared
+cache, every process checks it at most every TENANT_REGISTRY_CHECK_INTERVAL
+seconds and reloads its map when it changed.
+
+Requests served by each alias are counted per process, metrics() returns
+them with the pool sizing of each alias (staff only), summary() only their
+totals for the public health check. apply_pool_sizes() is meant for the
+settings module, it sets the connection pool of the aliases listed in
+TENANT_POOL_SIZES. databases() returns the aliases a periodic task walks.
+'''
+import logging
+import threading
+import time
+from collections import Counter
+from types import MappingProxyType
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+
+log = logging.getLogger('django')
+
+VERSION_KEY = 'tenant_registry_version'
+INCOMPLETE = object()
+
+DEFAULT_HOSTS = {
+    'intelliwiz.youtility.local': 'intelliwiz_django',
+    'sps.youtility.local'       : 'sps',
+    'capgemini.youtility.local' : 'capgemini',
+    'dell.youtility.local'      : 'dell',
+    'icicibank.youtility.local' : 'icicibank',
+    'redmine.youtility.in'      : 'sps',
+    'django-local.youtility.in' : 'default',
+    'barfi.youtility.in'        : 'icicibank',
+    'intelliwiz.youtility.in'   : 'default',
+    'testdb.youtility.local'    : 'testDB'
+}
+
+_lock = threading.Lock()
+_state = {'hosts': None, 'version': None, 'checked_at': 0.0, 'loaded_at': None}
+_requests = Counter()
+
+
+def check_interval():
+    return getattr(settings, 'TENANT_REGISTRY_CHECK_INTERVAL', 30)
+
+
+def host_rows():
+    "{hostname: alias} of the enabled TenantHost rows, None until the table is migrated"
+    from apps.tenants.models import TenantHost
+    try:
+        return dict(TenantHost.objects.using('default').filter(
+            enable=True).values_list('hostname', 'database'))
+    except DatabaseError as e:
+        log.warning(f"tenant hosts not loaded: {e}")
+        return None
+
+
+def build(rows):
+    hosts = dict(DEFAULT_HOSTS)
+    hosts.update(getattr(settings, 'TENANT_HOSTS', {}))
+    hosts.update(rows or {})
+    hosts = {hostname.lower(): alias for hostname, alias in hosts.items()}
+    unknown = {hostname: alias for hostname, alias in hosts.items() if alias not in settings.DATABASES}
+    if unknown:
+        log.warning(f"tenant hosts without a database ignored: {unknown}")
+    return MappingProxyType({hostname: alias for hostname, alias in hosts.items() if hostname not in unknown})
+
+
+def load(version=None):
+    rows = host_rows()
+    # a map built without the rows is built again at the next check
+    version = version if rows is not None else INCOMPLETE
+    with _lock:
+        _state.update(hosts=build(rows), version=version, checked_at=time.monotonic(), loaded_at=time.time())
+    log.info(f"tenant registry loaded, {len(_state['hosts'])} hosts")
+    return _state['hosts']
+
+
+def get_hosts():
+    "read only {hostname: alias}, reloaded when the shared version changed"
+    hosts = _state['hosts']
+    if hosts is None:
+        return load(cache.get(VERSION_KEY))
+    if time.monotonic() - _state['checked_at'] >= check_interval():
+        _state['checked_at'] = time.monotonic()
+        version = cache.get(VERSION_KEY)
+        if version != _state['version']:
+            return load(version)
+    return hosts
+
+
+def reload():
+    "called on save and delete of a TenantHost, every process reloads its map"
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, None)
+    return load(cache.get(VERSION_KEY))
+
+
+def database_for_host(hostname):
+    alias = get_hosts().get(hostname, 'default')
+    _requests[alias] += 1
+    return alias
+
+
+def pool_options(alias, databases=None):
+    databases = settings.DATABASES if databases is None else databases
+    options = databases.get(alias, {}).get('OPTIONS', {})
+    return options.get('pool')
+
+
+def apply_pool_sizes(databases, sizes):
+    '''
+    sets the psycopg connection pool of the aliases of sizes,
+    {alias: {'min_size': 2, 'max_size': 10}}, in the DATABASES setting
+    '''
+    for alias, size in sizes.items():
+        if alias not in databases:
+            continue
+        pool = databases[alias].setdefault('OPTIONS', {}).get('pool')
+        pool = dict(pool) if isinstance(pool, dict) else {}
+        pool.update(size)
+        databases[alias]['OPTIONS']['pool'] = pool
+        # persistent connections and pooling are exclusive
+        databases[alias]['CONN_MAX_AGE'] = 0
+    return databases
+
+
+def databases(setting_name):
+    "aliases listed in the setting, every database of settings.DATABASES by default"
+    return list(getattr(settings, setting_name, None) or settings.DATABASES)
+
+
+def metrics():
+    "hosts, requests and pool sizing of each alias for the health checks"
+    hosts = get_hosts()
+    aliases = {}
+    for alias in settings.DATABASES:
+        aliases[alias] = {
+            'hosts': sorted(hostname for hostname, db in hosts.items() if db == alias),
+            'requests': _requests.get(alias, 0),
+            'pool': pool_options(alias),
+        }
+    version = None if _state['version'] is INCOMPLETE else _state['version']
+    return {'version': version, 'loaded_at': _state['loaded_at'], 'databases': aliases}
+
+
+def summary():
+    "totals of metrics() for the public health check, no hostname nor alias"
+    hosts = get_hosts()
+    version = None if _state['version'] is INCOMPLETE else _state['version']
+    return {'version': version, 'loaded_at': _state['loaded_at'], 'databases': len(settings.DATABASES),
+            'hosts': len(hosts), 'requests': sum(_requests.values())}
@@ -0,0 +1,12 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.tenants import registry
+from apps.tenants.models import TenantHost
+
+
+@receiver([post_save, post_delete], sender=TenantHost)
+def tenanthost_changed(sender, instance, using, **kwargs):
+    # other processes reload once the row is visible to them
+    transaction.on_commit(registry.reload, using=using)
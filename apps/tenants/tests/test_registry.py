@@ -0,0 +1,80 @@
+from django.test import TestCase, override_settings
+from unittest.mock import patch
+
+from apps.tenants import registry
+from apps.tenants.models import TenantHost
+
+DATABASES = {'default': {}, 'sps': {}, 'acme': {}}
+
+
+@override_settings(TENANT_HOSTS={'acme.youtility.in': 'acme'})
+class TenantRegistryTest(TestCase):
+
+    def setUp(self):
+        registry._state['hosts'] = None
+
+    def tearDown(self):
+        registry._state['hosts'] = None
+
+    def test_hosts_of_settings_and_rows(self):
+        TenantHost.objects.create(hostname='New.youtility.in', database='sps')
+        TenantHost.objects.create(hostname='off.youtility.in', database='sps', enable=False)
+        with patch.object(registry.settings, 'DATABASES', DATABASES):
+            hosts = registry.load()
+        self.assertEqual(hosts['acme.youtility.in'], 'acme')
+        self.assertEqual(hosts['new.youtility.in'], 'sps')
+        self.assertEqual(hosts['redmine.youtility.in'], 'sps')
+        self.assertNotIn('off.youtility.in', hosts)
+        # aliases missing from DATABASES are dropped
+        self.assertNotIn('dell.youtility.local', hosts)
+        with self.assertRaises(TypeError):
+            hosts['x.youtility.in'] = 'sps'
+
+    def test_unknown_host_goes_to_default(self):
+        with patch.object(registry.settings, 'DATABASES', DATABASES):
+            self.assertEqual(registry.database_for_host('unknown.youtility.in'), 'default')
+            self.assertEqual(registry.database_for_host('acme.youtility.in'), 'acme')
+
+    def test_saving_a_host_reloads_the_map(self):
+        with patch.object(registry.settings, 'DATABASES', DATABASES):
+            self.assertNotIn('later.youtility.in', registry.get_hosts())
+            with self.captureOnCommitCallbacks(execute=True):
+                TenantHost.objects.create(hostname='later.youtility.in', database='acme')
+            self.assertEqual(registry.get_hosts()['later.youtility.in'], 'acme')
+
+    def test_map_is_not_rebuilt_between_checks(self):
+        with patch.object(registry.settings, 'DATABASES', DATABASES):
+            registry.get_hosts()
+            with patch.object(registry, 'host_rows') as mock_rows:
+                registry.get_hosts()
+                registry.database_for_host('acme.youtility.in')
+            mock_rows.assert_not_called()
+
+    def test_apply_pool_sizes(self):
+        databases = {'default': {'CONN_MAX_AGE': 60}, 'sps': {'OPTIONS': {'pool': True}}}
+        registry.apply_pool_sizes(databases, {'sps': {'min_size': 2, 'max_size': 20}, 'missing': {}})
+        self.assertEqual(databases['sps']['OPTIONS']['pool'], {'min_size': 2, 'max_size': 20})
+        self.assertEqual(databases['sps']['CONN_MAX_AGE'], 0)
+        self.assertEqual(databases['default'], {'CONN_MAX_AGE': 60})
+        self.assertNotIn('missing', databases)
+
+    @override_settings(OUTBOX_DATABASES=['sps'])
+    def test_databases_of_a_setting(self):
+        with patch.object(registry.settings, 'DATABASES', DATABASES):
+            self.assertEqual(registry.databases('OUTBOX_DATABASES'), ['sps'])
+            self.assertEqual(registry.databases('SLA_SCORE_DATABASES'), ['default', 'sps', 'acme'])
+
+    def test_metrics(self):
+        with patch.object(registry.settings, 'DATABASES', DATABASES):
+            registry.database_for_host('acme.youtility.in')
+            metrics = registry.metrics()
+        self.assertIn('acme.youtility.in', metrics['databases']['acme']['hosts'])
+        self.assertGreaterEqual(metrics['databases']['acme']['requests'], 1)
+
+    def test_summary_has_no_hostname(self):
+        with patch.object(registry.settings, 'DATABASES', DATABASES):
+            registry.database_for_host('acme.youtility.in')
+            summary = registry.summary()
+        self.assertEqual(summary['databases'], 3)
+        self.assertGreaterEqual(summary['requests'], 1)
+        self.assertNotIn('acme.youtility.in', str(summary))
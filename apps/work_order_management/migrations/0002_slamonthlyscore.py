@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.db import migrations, models
+
+# monthly scores of the SLAs approved so far, as read by the 12 months trend
+BACKFILL_SQL = '''
+    INSERT INTO sla_monthly_score (vendor_id, bu_id, month, wom_id, overall_score, uptime_score, approved_at)
+    SELECT DISTINCT ON (vendor_id, bu_id, date_trunc('month', cdtz AT TIME ZONE %(tz)s))
+           vendor_id, bu_id, date_trunc('month', cdtz AT TIME ZONE %(tz)s)::date, id,
+           other_data->'overall_score', other_data->'uptime_score', cdtz
+    FROM wom
+    WHERE identifier = 'SLA' AND workpermit = 'APPROVED' AND vendor_id IS NOT NULL AND bu_id IS NOT NULL
+    ORDER BY vendor_id, bu_id, date_trunc('month', cdtz AT TIME ZONE %(tz)s), cdtz DESC, id DESC
+'''
+
+
+def backfill(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(BACKFILL_SQL, {'tz': settings.TIME_ZONE})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('work_order_management', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlaMonthlyScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vendor_id', models.BigIntegerField()),
+                ('bu_id', models.BigIntegerField()),
+                ('month', models.DateField(help_text='first day of the month of the SLA')),
+                ('wom_id', models.BigIntegerField()),
+                ('overall_score', models.JSONField(null=True)),
+                ('uptime_score', models.JSONField(null=True)),
+                ('approved_at', models.DateTimeField(help_text='cdtz of the SLA, the latest of the month wins')),
+            ],
+            options={
+                'db_table': 'sla_monthly_score',
+                'indexes': [models.Index(fields=['wom_id'], name='sla_monthly_score_wom_idx')],
+                'constraints': [models.UniqueConstraint(fields=('vendor_id', 'bu_id', 'month'), name='sla_monthly_score_key')],
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -243,4 +243,31 @@ class Approver(BaseModel):
                 fields=['people', 'approverfor', 'sites'],
                 name = 'people_approverfor_forallsites_sites_uk'
             )
-        ]
\ No newline at end of file
+        ]
+
+class SlaMonthlyScore(models.Model):
+    """
+    Score of the latest approved SLA of a vendor and site per month, read
+    by the 12 months trend of the SLA report. Rows are written on approval
+    and rebuilt by apps.work_order_management.sla_scores.refresh().
+    """
+    vendor_id     = models.BigIntegerField()
+    bu_id         = models.BigIntegerField()
+    month         = models.DateField(help_text="first day of the month of the SLA")
+    wom_id        = models.BigIntegerField()
+    # as stored in other_data of the SLA
+    overall_score = models.JSONField(null=True)
+    uptime_score  = models.JSONField(null=True)
+    approved_at   = models.DateTimeField(help_text="cdtz of the SLA, the latest of the month wins")
+
+    class Meta:
+        db_table = 'sla_monthly_score'
+        constraints = [
+            models.UniqueConstraint(fields=['vendor_id', 'bu_id', 'month'], name='sla_monthly_score_key'),
+        ]
+        indexes = [
+            models.Index(fields=['wom_id'], name='sla_monthly_score_wom_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.vendor_id} {self.bu_id} {self.month} {self.overall_score}"
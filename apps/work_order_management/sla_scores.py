@@ -0,0 +1,180 @@
+'''
+Scores of the vendor SLAs.
+
+get_sla_answers used to run two womdetails queries per section of an SLA,
+average the answers in python and save the SLA after fetching it again.
+The 12 months trend of the SLA report ran an aggregate and a fetch per
+month, 24 queries per report.
+
+- score() reads every section of an SLA with one grouped query: the sum
+  and count of the numeric answers (0 to 10), the questions and answers in
+  order and the last remark. The averages, weighted by section_weightage,
+  give the overall score out of 100, as before.
+- SlaMonthlyScore keeps the score of the latest approved SLA of each
+  vendor, site and month. record_approved() writes it wherever a wom is
+  approved, from the web views or the mobile service, refresh() rebuilds the last REFRESH_MONTHS months from wom (periodic task
+  refresh_sla_scores) and catches approvals made elsewhere.
+- trend() returns the months of a vendor and site with one query.
+'''
+import json
+import logging
+from datetime import date
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from apps.tenants import registry
+
+log = logging.getLogger('django')
+
+REFRESH_MONTHS = getattr(settings, 'SLA_SCORE_REFRESH_MONTHS', 13)
+APPROVED = 'APPROVED'
+SLA = 'SLA'
+
+SECTIONS_SQL = '''
+    SELECT c.id, c.seqno, c.description, c.other_data->'section_weightage',
+           SUM(s.score), COUNT(s.score),
+           array_agg(q.quesname ORDER BY d.mdtz, d.id) FILTER (WHERE d.id IS NOT NULL),
+           array_agg(s.score ORDER BY d.mdtz, d.id) FILTER (WHERE s.score IS NOT NULL),
+           (array_agg(COALESCE(d.answer, '') ORDER BY d.mdtz DESC, d.id DESC)
+               FILTER (WHERE d.id IS NOT NULL AND COALESCE(d.answer, '') !~ '^[0-9]+$'))[1]
+    FROM wom c
+    LEFT JOIN womdetails d ON d.wom_id = c.id
+    LEFT JOIN question q ON q.id = d.question_id
+    CROSS JOIN LATERAL (
+        SELECT CASE WHEN d.answer ~ '^[0-9]{1,9}$' THEN
+            CASE WHEN d.answer::int <= 10 THEN d.answer::int END END AS score
+    ) s
+    WHERE c.parent_id = %s
+    GROUP BY c.id
+    ORDER BY c.seqno, c.id
+'''
+
+SAVE_SQL = '''
+    UPDATE wom SET other_data = COALESCE(other_data, '{}'::jsonb) || jsonb_build_object(
+        'overall_score', %(overall)s::jsonb, 'remarks', %(remarks)s::text)
+    WHERE id = %(id)s;
+    UPDATE sla_monthly_score SET overall_score = %(overall)s::jsonb WHERE wom_id = %(id)s;
+'''
+
+UPSERT_SQL = '''
+    INSERT INTO sla_monthly_score (vendor_id, bu_id, month, wom_id, overall_score, uptime_score, approved_at)
+    VALUES (%s, %s, %s, %s, %s::jsonb, %s::jsonb, %s)
+    ON CONFLICT (vendor_id, bu_id, month) DO UPDATE SET
+        wom_id = EXCLUDED.wom_id, overall_score = EXCLUDED.overall_score,
+        uptime_score = EXCLUDED.uptime_score, approved_at = EXCLUDED.approved_at
+    WHERE sla_monthly_score.approved_at <= EXCLUDED.approved_at
+'''
+
+REFRESH_SQL = '''
+    DELETE FROM sla_monthly_score WHERE month >= %(since)s;
+    INSERT INTO sla_monthly_score (vendor_id, bu_id, month, wom_id, overall_score, uptime_score, approved_at)
+    SELECT DISTINCT ON (vendor_id, bu_id, date_trunc('month', cdtz AT TIME ZONE %(tz)s))
+           vendor_id, bu_id, date_trunc('month', cdtz AT TIME ZONE %(tz)s)::date, id,
+           other_data->'overall_score', other_data->'uptime_score', cdtz
+    FROM wom
+    WHERE identifier = 'SLA' AND workpermit = 'APPROVED' AND vendor_id IS NOT NULL AND bu_id IS NOT NULL
+      AND cdtz AT TIME ZONE %(tz)s >= %(since)s
+    ORDER BY vendor_id, bu_id, date_trunc('month', cdtz AT TIME ZONE %(tz)s), cdtz DESC, id DESC
+'''
+
+
+def get_databases():
+    return registry.databases('SLA_SCORE_DATABASES')
+
+
+def score(slaid, using='default'):
+    '''
+    (sla_details, overall_score, question_ans, all_average_score, remarks)
+    of an SLA, as returned by get_sla_answers
+    '''
+    with connections[using].cursor() as cursor:
+        cursor.execute(SECTIONS_SQL, [slaid])
+        rows = cursor.fetchall()
+    sla_details, averages, questions, answers = [], [], [], []
+    overall, remarks = 0, ''
+    for _, seqno, description, weight, total, count, names, numbers, remark in rows:
+        average = total / count if count and total else 0
+        averages.append(round(average, 1))
+        overall += average * weight
+        questions.extend(names or [])
+        answers.extend(numbers or [])
+        if remark is not None:
+            remarks = remark
+        sla_details.append({"section": description, "sectionID": seqno, "section_weightage": weight})
+    return sla_details, round(overall * 10, 2), dict(zip(questions, answers)), averages, remarks
+
+
+def save(slaid, overall_score, remarks, using='default'):
+    "stores the score in other_data of the SLA and in its monthly row"
+    with connections[using].cursor() as cursor:
+        cursor.execute(SAVE_SQL, {'id': slaid, 'overall': json.dumps(overall_score), 'remarks': remarks})
+
+
+def month_of(value):
+    "first day of the month of a datetime, in the current time zone as cdtz__month"
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    return value.date().replace(day=1)
+
+
+def record(slaid, using='default'):
+    '''
+    scores an approved SLA and keeps it as the score of its vendor, site
+    and month unless a later SLA of the month is kept. Returns the score.
+    '''
+    from apps.work_order_management.models import Wom
+    sla = Wom.objects.using(using).filter(id=slaid).values(
+        'identifier', 'vendor_id', 'bu_id', 'cdtz', 'workpermit', 'other_data').first()
+    if not sla or sla['identifier'] != SLA or sla['workpermit'] != APPROVED or sla['vendor_id'] is None or sla['bu_id'] is None:
+        return None
+    _, overall_score, _, _, remarks = score(slaid, using)
+    uptime_score = (sla['other_data'] or {}).get('uptime_score')
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        save(slaid, overall_score, remarks, using)
+        cursor.execute(UPSERT_SQL, [
+            sla['vendor_id'], sla['bu_id'], month_of(sla['cdtz']), slaid,
+            json.dumps(overall_score), json.dumps(uptime_score), sla['cdtz']])
+    return overall_score
+
+
+def record_approved(using='default', **lookup):
+    '''
+    records the approved SLAs among the woms of lookup, called wherever a
+    wom becomes APPROVED. A failure is logged, refresh_sla_scores catches up.
+    '''
+    from apps.work_order_management.models import Wom
+    slaids = list(Wom.objects.using(using).filter(
+        identifier=SLA, workpermit=APPROVED, **lookup).values_list('id', flat=True))
+    for slaid in slaids:
+        try:
+            record(slaid, using)
+        except Exception:
+            log.error(f"monthly score of sla {slaid} not recorded", exc_info=True)
+    return slaids
+
+
+def first_of_month(months_back, today=None):
+    today = today or timezone.localdate()
+    month = today.year * 12 + today.month - 1 - months_back
+    return date(month // 12, month % 12 + 1, 1)
+
+
+def refresh(months=REFRESH_MONTHS, using='default'):
+    "rebuilds the monthly scores of the last months, returns the number of rows"
+    since = first_of_month(months - 1)
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        cursor.execute(REFRESH_SQL, {'since': since, 'tz': timezone.get_current_timezone_name()})
+        cursor.execute('SELECT COUNT(*) FROM sla_monthly_score WHERE month >= %s', [since])
+        count = cursor.fetchone()[0]
+    log.info(f"sla monthly scores of {using} since {since} rebuilt, {count} rows")
+    return count
+
+
+def trend(vendor_id, bu_id, months, using=None):
+    "{month: (overall_score, uptime_score)} of the months with an approved SLA"
+    from apps.work_order_management.models import SlaMonthlyScore
+    qset = SlaMonthlyScore.objects.using(using) if using else SlaMonthlyScore.objects
+    return {month: (overall_score, uptime_score) for month, overall_score, uptime_score in qset.filter(
+        vendor_id=vendor_id, bu_id=bu_id, month__in=months).values_list('month', 'overall_score', 'uptime_score')}
@@ -0,0 +1,128 @@
+"""
+Tests for the scores of the vendor SLAs
+"""
+import json
+from datetime import date, datetime, timezone as dt_timezone
+from unittest.mock import patch
+
+from apps.work_order_management import sla_scores
+
+
+def cursor_of(mock_connections):
+    return mock_connections.__getitem__.return_value.cursor.return_value.__enter__.return_value
+
+
+def legacy_score(sections):
+    "get_sla_answers before sla_scores, sections are (description, seqno, weight, [(question, answer)])"
+    sla_details, overall_score, all_questions, all_answers, all_average_score, remarks = [], [], [], [], [], []
+    for description, seqno, weight, details in sections:
+        ans = []
+        for _, answer in details:
+            if answer.isdigit():
+                if int(answer) <= 10:
+                    all_answers.append(int(answer))
+                    ans.append(int(answer))
+            else:
+                remarks.append(answer)
+        all_questions.extend(question for question, _ in details)
+        average_score = 0 if sum(ans) == 0 or len(ans) == 0 else sum(ans) / len(ans)
+        all_average_score.append(round(average_score, 1))
+        overall_score.append(average_score * weight)
+        sla_details.append({"section": description, "sectionID": seqno, "section_weightage": weight})
+    return (sla_details, round(sum(overall_score) * 10, 2), dict(zip(all_questions, all_answers)),
+            all_average_score, remarks[-1] if remarks else '')
+
+
+def grouped_rows(sections):
+    "rows of SECTIONS_SQL for the same sections"
+    rows = []
+    for id, (description, seqno, weight, details) in enumerate(sections):
+        numbers = [int(answer) for _, answer in details if answer.isdigit() and int(answer) <= 10]
+        remarks = [answer for _, answer in details if not answer.isdigit()]
+        rows.append((id, seqno, description, weight, sum(numbers) if numbers else None, len(numbers),
+                     [question for question, _ in details] or None, numbers or None,
+                     remarks[-1] if remarks else None))
+    return rows
+
+
+SECTIONS = [
+    ('Housekeeping', 1, 0.3, [('Cleanliness', '8'), ('Staff attendance', '9'), ('Uniform', '7')]),
+    ('Security', 2, 0.5, [('Patrolling', '10'), ('Incident response', '6'), ('Out of range', '45')]),
+    ('Empty', 3, 0.0, []),
+    ('Remarks', 4, 0.2, [('Zero score', '0'), ('Comments', 'Good work this month')]),
+]
+
+
+class TestScore:
+
+    @patch('apps.work_order_management.sla_scores.connections')
+    def test_same_result_as_the_section_loop(self, mock_connections):
+        cursor_of(mock_connections).fetchall.return_value = grouped_rows(SECTIONS)
+        assert sla_scores.score(7, using='sps') == legacy_score(SECTIONS)
+        mock_connections.__getitem__.assert_called_with('sps')
+        sql, params = cursor_of(mock_connections).execute.call_args.args
+        assert 'GROUP BY c.id' in sql
+        assert params == [7]
+
+    @patch('apps.work_order_management.sla_scores.connections')
+    def test_sla_without_sections(self, mock_connections):
+        cursor_of(mock_connections).fetchall.return_value = []
+        assert sla_scores.score(7) == ([], 0, {}, [], '')
+
+    @patch('apps.work_order_management.sla_scores.connections')
+    def test_save_updates_the_sla_and_its_monthly_row(self, mock_connections):
+        sla_scores.save(7, 83.5, 'Good work', using='sps')
+        sql, params = cursor_of(mock_connections).execute.call_args.args
+        assert 'UPDATE wom SET other_data' in sql and 'UPDATE sla_monthly_score' in sql
+        assert params == {'id': 7, 'overall': '83.5', 'remarks': 'Good work'}
+
+
+class TestRecord:
+
+    def sla(self, **values):
+        sla = {'identifier': 'SLA', 'vendor_id': 3, 'bu_id': 5, 'cdtz': datetime(2025, 3, 31, 20, 0, tzinfo=dt_timezone.utc),
+               'workpermit': 'APPROVED', 'other_data': {'uptime_score': '99.5'}}
+        sla.update(values)
+        return sla
+
+    @patch('apps.work_order_management.sla_scores.transaction')
+    @patch('apps.work_order_management.sla_scores.connections')
+    @patch('apps.work_order_management.sla_scores.save')
+    @patch('apps.work_order_management.sla_scores.score', return_value=([], 91.0, {}, [], ''))
+    @patch('apps.work_order_management.models.Wom')
+    def test_approved_sla_is_kept_as_the_score_of_its_month(
+            self, mock_wom, mock_score, mock_save, mock_connections, mock_transaction):
+        mock_wom.objects.using.return_value.filter.return_value.values.return_value.first.return_value = self.sla()
+        with patch('apps.work_order_management.sla_scores.month_of', return_value=date(2025, 3, 1)):
+            assert sla_scores.record(7, using='sps') == 91.0
+        mock_save.assert_called_once_with(7, 91.0, '', 'sps')
+        sql, params = cursor_of(mock_connections).execute.call_args.args
+        assert 'WHERE sla_monthly_score.approved_at <= EXCLUDED.approved_at' in sql
+        assert params[:6] == [3, 5, date(2025, 3, 1), 7, '91.0', json.dumps('99.5')]
+
+    @patch('apps.work_order_management.sla_scores.score')
+    @patch('apps.work_order_management.models.Wom')
+    def test_pending_sla_is_not_recorded(self, mock_wom, mock_score):
+        mock_wom.objects.using.return_value.filter.return_value.values.return_value.first.return_value = \
+            self.sla(workpermit='PENDING')
+        assert sla_scores.record(7) is None
+        mock_wom.objects.using.return_value.filter.return_value.values.return_value.first.return_value = \
+            self.sla(identifier='WP')
+        assert sla_scores.record(7) is None
+        mock_score.assert_not_called()
+
+    @patch('apps.work_order_management.sla_scores.record', side_effect=[88.0, Exception('locked')])
+    @patch('apps.work_order_management.models.Wom')
+    def test_approved_slas_of_a_lookup_are_recorded(self, mock_wom, mock_record):
+        mock_wom.objects.using.return_value.filter.return_value.values_list.return_value = [7, 8]
+        assert sla_scores.record_approved('sps', uuid='abc') == [7, 8]
+        mock_wom.objects.using.assert_called_with('sps')
+        mock_wom.objects.using.return_value.filter.assert_called_with(
+            identifier='SLA', workpermit='APPROVED', uuid='abc')
+        assert [c.args for c in mock_record.call_args_list] == [(7, 'sps'), (8, 'sps')]
+
+
+def test_first_of_month():
+    assert sla_scores.first_of_month(0, today=date(2025, 3, 15)) == date(2025, 3, 1)
+    assert sla_scores.first_of_month(12, today=date(2025, 3, 15)) == date(2024, 3, 1)
+    assert sla_scores.first_of_month(3, today=date(2025, 1, 31)) == date(2024, 10, 1)
@@ -0,0 +1,80 @@
+"""
+Tests for the answers of a work permit submission
+"""
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.http import QueryDict
+
+from apps.work_order_management import workpermit_details
+
+
+def qsb(id, answertype, alerton=None, seqno=1):
+    return SimpleNamespace(id=id, question_id=id * 10, answertype=answertype, alerton=alerton, seqno=seqno,
+                           isavpt=False, options=None, min=None, max=None, ismandatory=True)
+
+
+QSBS = {
+    1: qsb(1, 'CHECKBOX', 'NO', 1),
+    2: qsb(2, 'NUMERIC', '<10, >20', 2),
+    3: qsb(3, 'NUMERIC', '>5', 3),
+    4: qsb(4, 'MULTISELECT', 'Fire', 1),
+    5: qsb(5, 'SINGLELINE', None, 2),
+}
+
+FORM = 'csrfmiddlewaretoken=x&ctzoffset=330&1_7=NO&2_7=25&3_7=1&4_8=Gas&4_8=Fire&5_8=ok'
+
+
+@pytest.fixture
+def models():
+    with patch('apps.activity.models.question_model.QuestionSetBelonging') as mock_qsb, \
+            patch('apps.activity.models.question_model.QuestionSet') as mock_qset, \
+            patch('apps.work_order_management.models.Wom') as mock_wom, \
+            patch('apps.work_order_management.models.WomDetails') as mock_details, \
+            patch('apps.work_order_management.workpermit_details.transaction'), \
+            patch('apps.work_order_management.workpermit_details.router'):
+        mock_qsb.objects.in_bulk.return_value = QSBS
+        mock_qset.objects.in_bulk.return_value = {
+            7: SimpleNamespace(id=7, seqno=1, qsetname='Hot work'), 8: SimpleNamespace(id=8, seqno=2, qsetname='PPE')}
+        mock_wom.objects.filter.return_value = []
+        mock_details.side_effect = lambda **values: values
+        yield SimpleNamespace(qsb=mock_qsb, qset=mock_qset, wom=mock_wom, details=mock_details)
+
+
+class TestAlert:
+
+    def test_alerts_of_the_answer_types(self):
+        formdata = QueryDict(FORM)
+        assert workpermit_details.alert(QSBS[1], 'NO', formdata, '1_7') == (True, 'NO')
+        assert workpermit_details.alert(QSBS[2], '15', formdata, '2_7') == (False, '15')
+        assert workpermit_details.alert(QSBS[2], '25', formdata, '2_7') == (True, '25')
+        assert workpermit_details.alert(QSBS[4], 'Fire', formdata, '4_8') == (True, 'Gas,Fire')
+        assert workpermit_details.alert(QSBS[5], 'ok', formdata, '5_8') == (False, 'ok')
+
+    def test_numeric_without_a_range_keeps_the_previous_alerts(self):
+        assert workpermit_details.alert(QSBS[3], '1', QueryDict(), '3_7', previous=True) == (True, '1')
+
+
+class TestSave:
+
+    def test_answers_are_inserted_in_one_batch(self, models):
+        models.wom.objects.create.side_effect = lambda **values: SimpleNamespace(id=100 + values['qset'].id)
+        wom = MagicMock(id=50, other_data={})
+        details = workpermit_details.save(wom, QueryDict(FORM), user_id=3)
+        models.qsb.objects.in_bulk.assert_called_once_with({1, 2, 3, 4, 5})
+        models.qset.objects.in_bulk.assert_called_once_with([7, 8])
+        # one section per question set
+        assert [c.kwargs['seqno'] for c in models.wom.objects.create.call_args_list] == [1, 2]
+        models.details.objects.bulk_create.assert_called_once_with(details)
+        assert [(d['wom_id'], d['question_id'], d['answer'], d['alerts']) for d in details] == [
+            (107, 10, 'NO', True), (107, 20, '25', True), (107, 30, '1', True),
+            (108, 40, 'Gas,Fire', True), (108, 50, 'ok', False)]
+        assert {d['cuser_id'] for d in details} == {3}
+
+    def test_sections_of_the_permit_are_reused(self, models):
+        models.wom.objects.filter.return_value = [
+            SimpleNamespace(id=201, qset_id=7, seqno=3), SimpleNamespace(id=202, qset_id=8, seqno=3)]
+        details = workpermit_details.save(SimpleNamespace(id=50), QueryDict('1_7=YES&5_8=done'), 3, rwp_seqno=3)
+        models.wom.objects.create.assert_not_called()
+        assert [d['wom_id'] for d in details] == [201, 202]
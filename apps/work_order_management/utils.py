@@ -316,8 +316,8 @@ def get_report_object(permit_name):
 
 
 
-from django.db.models import Max
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from apps.work_order_management import sla_scores
 
 def get_month_number(MONTH_CHOICES,month_name):
         if month_name == 0:
@@ -330,7 +330,7 @@ def get_month_number(MONTH_CHOICES,month_name):
 
 def get_last_12_months_sla_reports(vendor_id, bu_id,month_number):
     logger.info(f'Month Number: {month_number}')
-    sla_reports = {}
+    sla_reports, report_months = {}, {}
     # Get the last 3 months' approved records, excluding the current month
     current_month = datetime.now().month
     
@@ -362,24 +362,13 @@ def get_last_12_months_sla_reports(vendor_id, bu_id,month_number):
         month_year = f"{month_name}'{year_}"
         if month<=0:
             month= month + 12
-        latest_report = Wom.objects.filter(
-            vendor_id=vendor_id,
-            identifier='SLA',
-            bu_id=bu_id,
-            workpermit=Wom.WorkPermitStatus.APPROVED,
-            cdtz__month=month,
-            cdtz__year=year
-        ).aggregate(max_date=Max('cdtz'))
-
-        if latest_report['max_date']:
-            report = Wom.objects.filter(
-                vendor_id=vendor_id,
-                identifier='SLA',
-                bu_id=bu_id,
-                workpermit=Wom.WorkPermitStatus.APPROVED,
-                cdtz=latest_report['max_date']
-            ).first()
-            sla_reports[month_year] = [report.other_data['overall_score'],report.other_data.get('uptime_score','N/A')]
+        report_months[month_year] = date(year, month, 1)
+    # the latest approved SLA of every month is kept in SlaMonthlyScore, one query for the 12 months
+    scores = sla_scores.trend(vendor_id, bu_id, list(report_months.values()))
+    for month_year, month in report_months.items():
+        if month in scores:
+            overall_score, uptime_score = scores[month]
+            sla_reports[month_year] = [overall_score, 'N/A' if uptime_score is None else uptime_score]
         else:
             sla_reports[month_year] = ['N/A','N/A']
     return sla_reports
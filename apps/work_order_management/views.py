@@ -16,6 +16,8 @@ from apps.work_order_management.utils import check_all_approved,reject_workpermi
 import logging
 from django.utils import timezone
 from apps.work_order_management import utils as wom_utils
+from apps.work_order_management import sla_scores
+from apps.work_order_management import workpermit_details
 # from apps.reports.report_designs.workpermit import GeneralWorkPermit
 from apps.reports.report_designs.service_level_agreement import ServiceLevelAgreement
 from apps.onboarding.models import Bt
@@ -394,6 +396,7 @@ class WorkPermit(LoginRequiredMixin, View):
                 return rp.JsonResponse(data={'data': 'Work Permit is already cancelled'}, status=200)
             if is_all_approved := check_all_approved(wom.uuid, request.user.peoplecode):
                 Wom.objects.filter(id=R['womid']).update(workpermit=Wom.WorkPermitStatus.APPROVED.value)
+                sla_scores.record_approved(utils.get_current_db_name(), id=R['womid'])
                 if is_all_approved:
                     ReportObject = self.get_report_object(R['permit_name'])
                     client_id = request.session.get('client_id')
@@ -602,91 +605,11 @@ class WorkPermit(LoginRequiredMixin, View):
             logger.info(f"wom already exist with qset_id {qset_id} so returning it")
             return childwom
         else:
-            logger.info(f'creating wom for qset_id {qset_id}')
-            return Wom.objects.create(
-                parent_id      = wom.id,
-                description    = qset.qsetname,
-                plandatetime   = wom.plandatetime,
-                expirydatetime = wom.expirydatetime,
-                starttime      = wom.starttime,
-                gpslocation    = wom.gpslocation,
-                asset          = wom.asset,
-                location       = wom.location,
-                workstatus     = wom.workstatus,
-                seqno          = rwp_seqno or qset.seqno,
-                approvers      = wom.approvers,
-                verifiers       = wom.verifiers,
-                workpermit     = wom.workpermit,
-                priority       = wom.priority,
-                vendor         = wom.vendor,
-                client         = wom.client,
-                bu             = wom.bu,
-                ticketcategory = wom.ticketcategory,
-                other_data     = wom.other_data,
-                qset           = qset,
-                cuser          = wom.cuser,
-                muser          = wom.muser,
-                ctzoffset      = wom.ctzoffset
-            )
+            return workpermit_details.child_wom(wom, qset, rwp_seqno or qset.seqno)
     
     def create_workpermit_details(self, R, wom,  request, formdata, rwp_seqno=None):
         logger.info(f'creating wp_details started {R}')
-        S = request.session
-        
-        for k,v in formdata.items():
-            if k not in ['ctzoffset', 'wom_id', 'action', 'csrfmiddlewaretoken'] and '_' in k:
-                ids = k.split('_')
-                qsb_id = ids[0]
-                qset_id = ids[1]
-                qsb_obj = QuestionSetBelonging.objects.filter(id = qsb_id).first()
-                if qsb_obj.answertype in ['CHECKBOX', 'DROPDOWN']:
-                    alerts = (qsb_obj.alerton and v in qsb_obj.alerton) or False
-                    # alerts = v in qsb_obj.alerton
-                elif qsb_obj.answertype == 'MULTISELECT':
-                    selected_values = formdata.getlist(k)
-                    if selected_values:
-                        if qsb_obj.alerton:
-                            alerts = any(value in qsb_obj.alerton for value in selected_values)
-                        else:
-                            alerts = False
-                        v = ','.join(selected_values)
-                    else:
-                        alerts = False
-                        v = ''
-                elif qsb_obj.answertype in  ['NUMERIC'] and len(qsb_obj.alerton) > 0:
-                    alerton = qsb_obj.alerton.replace('>', '').replace('<', '').split(',')
-                    if len(alerton) > 1:
-                        _min, _max = alerton[0], alerton[1]
-                        alerts = float(v) < float(_min) or float(v) > float(_max)
-                else:
-                    alerts = False
-                    
-                childwom = self.create_child_wom(wom, qset_id, rwp_seqno=rwp_seqno)
-                
-                lookup_args = {
-                    'wom_id':childwom.id,
-                    'question_id':qsb_obj.question_id,
-                    'qset_id':qset_id
-                }
-                default_data = {
-                    'seqno'       : qsb_obj.seqno,
-                    'answertype'  : qsb_obj.answertype,
-                    'answer'      : v,
-                    'isavpt'      : qsb_obj.isavpt,
-                    'options'     : qsb_obj.options,
-                    'min'         : qsb_obj.min,
-                    'max'         : qsb_obj.max,
-                    'alerton'     : qsb_obj.alerton,
-                    'ismandatory' : qsb_obj.ismandatory,
-                    'alerts'      : alerts,
-                    'cuser_id'    : request.user.id,
-                    'muser_id'    : request.user.id,
-                }
-                data = lookup_args | default_data
-                WomDetails.objects.create(
-                    **data
-                )
-                logger.info(f"wom detail is created for the for the child wom: {childwom.description}")
+        workpermit_details.save(wom, formdata, request.user.id, rwp_seqno=rwp_seqno)
 
     
     def getReportFormatBasedOnWorkpermitType(self, R):
@@ -815,6 +738,7 @@ class ReplyWorkPermit(View):
             if is_all_approved := check_all_approved(wp.uuid, p.peoplecode):
                 if Wom.WorkPermitStatus.APPROVED != Wom.objects.get(id = R['womid']).workpermit:
                     Wom.objects.filter(id = R['womid']).update(workpermit = Wom.WorkPermitStatus.APPROVED.value)
+                    sla_scores.record_approved(utils.get_current_db_name(), id=R['womid'])
                     if is_all_approved:
                         wom_id = R['womid']
                         wom = Wom.objects.get(id = wom_id)
@@ -871,6 +795,7 @@ class ReplySla(View):
                 logger.info("Inside of the if")
                 if Wom.WorkPermitStatus.APPROVED.value != Wom.objects.get(uuid = R['womid']).workpermit:
                     Wom.objects.filter(uuid = R['womid']).update(workpermit = Wom.WorkPermitStatus.APPROVED.value)
+                    sla_scores.record_approved(utils.get_current_db_name(), uuid=R['womid'])
                     logger.info("Inside of the second if")
                     if is_all_approved:
                         logger.info("Inside of the third if")
@@ -1029,6 +954,8 @@ class SLA_View(LoginRequiredMixin, View):
             report_path = save_pdf_to_tmp_location(sla_attachment,report_name=filename,report_number=wom.other_data['wp_seqno'])
             if is_all_approved := check_all_approved(wom.uuid, request.user.peoplecode):
                 Wom.objects.filter(id=R['slaid']).update(workpermit=Wom.WorkPermitStatus.APPROVED.value)
+                # the score of the month is read by the 12 months trend of the report
+                sla_scores.record_approved(utils.get_current_db_name(), id=R['slaid'])
                 if is_all_approved:
                     workpermit_status = 'APPROVED'
                     sla_uuid = wom.uuid
@@ -0,0 +1,137 @@
+'''
+Answers of a work permit submission.
+
+create_workpermit_details used to fetch the QuestionSetBelonging, the
+QuestionSet and the child wom of the section for every answer of the form,
+then insert the WomDetails one by one, several hundred queries for a permit
+of 120 questions.
+
+- The belongings and the question sets of the form are read with one query
+  each, the child woms of the permit with one more.
+- The child wom of a section is created once, with Wom.objects.create so
+  that the pre_save signal of Wom still runs.
+- The alerts are evaluated from the belongings, as before.
+- The WomDetails are inserted with one bulk_create.
+
+The rows are the same as the ones create_workpermit_details inserted.
+'''
+import logging
+
+from django.db import router, transaction
+
+log = logging.getLogger('django')
+
+SKIPPED = ['ctzoffset', 'wom_id', 'action', 'csrfmiddlewaretoken']
+
+
+def answers(formdata):
+    "[(key, qsb_id, qset_id, value)] of the answers of the form, keys are qsbid_qsetid"
+    return [(k, int(k.split('_')[0]), int(k.split('_')[1]), v)
+            for k, v in formdata.items() if k not in SKIPPED and '_' in k]
+
+
+def alert(qsb, value, formdata, key, previous=False):
+    '''
+    (alerts, answer) of an answer. A NUMERIC answer whose alerton is not a
+    range keeps the alerts of the previous answer, as the loop it replaces.
+    '''
+    if qsb.answertype in ['CHECKBOX', 'DROPDOWN']:
+        return (qsb.alerton and value in qsb.alerton) or False, value
+    if qsb.answertype == 'MULTISELECT':
+        selected_values = formdata.getlist(key)
+        if not selected_values:
+            return False, ''
+        alerts = any(v in qsb.alerton for v in selected_values) if qsb.alerton else False
+        return alerts, ','.join(selected_values)
+    if qsb.answertype in ['NUMERIC'] and len(qsb.alerton) > 0:
+        alerton = qsb.alerton.replace('>', '').replace('<', '').split(',')
+        if len(alerton) > 1:
+            _min, _max = alerton[0], alerton[1]
+            return float(value) < float(_min) or float(value) > float(_max), value
+        return previous, value
+    return False, value
+
+
+def child_wom(wom, qset, seqno):
+    "section of the permit wom for a question set"
+    from apps.work_order_management.models import Wom
+    log.info(f'creating wom for qset_id {qset.id}')
+    return Wom.objects.create(
+        parent_id      = wom.id,
+        description    = qset.qsetname,
+        plandatetime   = wom.plandatetime,
+        expirydatetime = wom.expirydatetime,
+        starttime      = wom.starttime,
+        gpslocation    = wom.gpslocation,
+        asset          = wom.asset,
+        location       = wom.location,
+        workstatus     = wom.workstatus,
+        seqno          = seqno,
+        approvers      = wom.approvers,
+        verifiers      = wom.verifiers,
+        workpermit     = wom.workpermit,
+        priority       = wom.priority,
+        vendor         = wom.vendor,
+        client         = wom.client,
+        bu             = wom.bu,
+        ticketcategory = wom.ticketcategory,
+        other_data     = wom.other_data,
+        qset           = qset,
+        cuser          = wom.cuser,
+        muser          = wom.muser,
+        ctzoffset      = wom.ctzoffset
+    )
+
+
+def children(wom, qset_ids, rwp_seqno=None):
+    "{qset_id: child wom} of the sections, the missing ones are created in form order"
+    from apps.activity.models.question_model import QuestionSet
+    from apps.work_order_management.models import Wom
+    qsets = QuestionSet.objects.in_bulk(qset_ids)
+    existing = {}
+    # first() of the loop it replaces, in the ordering of Wom
+    for childwom in Wom.objects.filter(parent_id=wom.id, qset_id__in=qset_ids):
+        existing.setdefault((childwom.qset_id, childwom.seqno), childwom)
+    sections = {}
+    for qset_id in qset_ids:
+        if qset_id not in qsets:
+            raise QuestionSet.DoesNotExist(f"QuestionSet {qset_id} does not exist")
+        seqno = rwp_seqno or qsets[qset_id].seqno
+        sections[qset_id] = existing.get((qset_id, seqno)) or child_wom(wom, qsets[qset_id], seqno)
+    return sections
+
+
+def save(wom, formdata, user_id, rwp_seqno=None):
+    "creates the sections and the WomDetails of the answers of a permit, returns the WomDetails"
+    from apps.activity.models.question_model import QuestionSetBelonging
+    from apps.work_order_management.models import WomDetails
+    rows = answers(formdata)
+    if not rows:
+        return []
+    qsbs = QuestionSetBelonging.objects.in_bulk({qsb_id for _, qsb_id, _, _ in rows})
+    details, alerts = [], False
+    with transaction.atomic(using=router.db_for_write(WomDetails)):
+        sections = children(wom, list(dict.fromkeys(qset_id for _, _, qset_id, _ in rows)), rwp_seqno)
+        for key, qsb_id, qset_id, value in rows:
+            qsb = qsbs[qsb_id]
+            alerts, value = alert(qsb, value, formdata, key, alerts)
+            details.append(WomDetails(
+                wom_id      = sections[qset_id].id,
+                question_id = qsb.question_id,
+                qset_id     = qset_id,
+                seqno       = qsb.seqno,
+                answertype  = qsb.answertype,
+                answer      = value,
+                isavpt      = qsb.isavpt,
+                options     = qsb.options,
+                min         = qsb.min,
+                max         = qsb.max,
+                alerton     = qsb.alerton,
+                ismandatory = qsb.ismandatory,
+                alerts      = alerts,
+                cuser_id    = user_id,
+                muser_id    = user_id,
+            ))
+        WomDetails.objects.bulk_create(details)
+    log.info(f"{len(details)} wom details created in {len(sections)} sections of wom {wom.id}")
+    return details
@@ -15,6 +15,7 @@ from pprint import pformat
 import json
 import traceback as tb
 import os
+import shutil
 from io import BytesIO
 
 
@@ -201,6 +202,17 @@ def save_report_to_tmp_folder(filename, ext, report_output, dir=None):
             os.makedirs(directory)
 
         mode = 'wb' if ext in ['pdf', 'xlsx'] else 'w'
+        if not isinstance(report_output, (BytesIO, str, bytes)) and hasattr(report_output, 'read'):
+            # streamed exports are spooled to a temporary file
+            try:
+                with open(filepath, 'wb') as f:
+                    shutil.copyfileobj(report_output, f)
+            except Exception as e:
+                log.error(f"Error while saving file {filename}.{ext}: {e}")
+                return None
+            finally:
+                report_output.close()
+            return filepath
         try:
             with open(filepath, mode) as f:
                 if isinstance(report_output, BytesIO):
@@ -0,0 +1,100 @@
+"""
+Batched celery task status lookups for the mutation status topic.
+
+Devices poll the status of dozens of task ids every few seconds. Instead
+of one AsyncResult round trip per id, all ids of a request are resolved
+with a single backend call: mget on key/value backends (redis), one
+task_id__in query on the django_celery_results database backend. Tasks
+in a terminal state do not change any more, so their status is cached
+for a short while.
+"""
+import threading
+import time
+from logging import getLogger
+
+from celery import current_app, states
+from celery.backends.base import KeyValueStoreBackend
+from celery.result import AsyncResult
+
+log = getLogger("message_q")
+
+# SUCCESS, FAILURE and REVOKED
+TERMINAL_STATES = states.READY_STATES
+TERMINAL_TTL = 60
+CACHE_SIZE = 10000
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _cached(task_ids):
+    now = time.monotonic()
+    found = {}
+    with _cache_lock:
+        for task_id in task_ids:
+            entry = _cache.get(task_id)
+            if entry is None:
+                continue
+            if entry[1] < now:
+                del _cache[task_id]
+            else:
+                found[task_id] = entry[0]
+    return found
+
+
+def _remember(statuses):
+    expires = time.monotonic() + TERMINAL_TTL
+    with _cache_lock:
+        if len(_cache) >= CACHE_SIZE:
+            _cache.clear()
+        for task_id, status in statuses.items():
+            if status in TERMINAL_STATES:
+                _cache[task_id] = (status, expires)
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
+
+
+def fetch_statuses(task_ids, backend=None):
+    """
+    returns {task_id: status} of task_ids with a single call to the result
+    backend. Unknown ids are PENDING, just like AsyncResult.status.
+    """
+    backend = backend or current_app.backend
+    if isinstance(backend, KeyValueStoreBackend):
+        values = backend.mget([backend.get_key_for_task(task_id) for task_id in task_ids])
+        return {
+            task_id: backend.decode_result(value)['status'] if value else states.PENDING
+            for task_id, value in zip(task_ids, values)}
+    if hasattr(backend, 'TaskModel'):
+        # django_celery_results database backend
+        found = dict(backend.TaskModel._default_manager.filter(
+            task_id__in = task_ids).values_list('task_id', 'status'))
+        return {task_id: found.get(task_id, states.PENDING) for task_id in task_ids}
+    log.info(f"{type(backend).__name__} has no batched lookup, resolving statuses one by one")
+    return {task_id: AsyncResult(task_id, backend=backend).status for task_id in task_ids}
+
+
+def get_statuses(task_ids, backend=None):
+    "returns {task_id: status}, terminal statuses are served from the cache"
+    task_ids = list(dict.fromkeys(task_ids))
+    statuses = _cached(task_ids)
+    missing = [task_id for task_id in task_ids if task_id not in statuses]
+    if missing:
+        fetched = fetch_statuses(missing, backend)
+        _remember(fetched)
+        statuses.update(fetched)
+    return statuses
+
+
+def get_task_statuses(items, backend=None):
+    """
+    sets the status of every {'taskId': ...} item of a
+    status request, returns the items.
+    """
+    statuses = get_statuses([item.get('taskId') for item in items if item.get('taskId')], backend)
+    for item in items:
+        item.update({'status': statuses.get(item.get('taskId'), states.PENDING)})
+    return items
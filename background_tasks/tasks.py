@@ -1,5 +1,6 @@
 from intelliwiz_config.celery import app
 from celery import shared_task
+from celery.signals import worker_process_init
 from background_tasks import utils as butils
 from apps.core import utils
 from django.apps import apps
@@ -248,6 +249,13 @@ def send_reminder_email():
     return resp
 
 
+@shared_task(name="create_job_bulk")
+def create_job_bulk(jobids=None):
+    # set-based create_job, see apps.schedhuler.scheduler_engine
+    from apps.schedhuler.scheduler_engine import create_job_bulk as schedule_jobs
+    return schedule_jobs(jobids)
+
+
 @shared_task(name="create_ppm_job")
 def create_ppm_job(jobid=None):
     F, d = {}, []
@@ -336,52 +344,42 @@ def perform_facerecognition_bgt(self, pel_uuid, peopleid, db='default'):
     
     try:
         logger.info("perform_facerecognition ...start [+]")
-        with transaction.atomic(using=utils.get_current_db_name()):
-            utils.set_db_for_router(db)
-            if pel_uuid not in [None, 'NONE', '', 1] and peopleid not in [None, 'NONE', 1, ""]:
-                # Retrieve the event picture
-                Attachment = apps.get_model('activity', 'Attachment')
-                pel_att = Attachment.objects.get_people_pic(pel_uuid, db)  # people event pic
+        # no transaction around the verification, the stored reference embedding
+        # is kept when the event picture has no face
+        utils.set_db_for_router(db)
+        if pel_uuid not in [None, 'NONE', '', 1] and peopleid not in [None, 'NONE', 1, ""]:
+            # Retrieve the event picture
+            Attachment = apps.get_model('activity', 'Attachment')
+            pel_att = Attachment.objects.get_people_pic(pel_uuid, db)  # people event pic
+            
+            # Retrieve the person, the embedding of their default picture is stored once
+            People = apps.get_model('peoples', 'People')
+            people_obj = People.objects.get(id=peopleid)
+            
+            if pel_att.people_event_pic:
+                images_info = f"default image:{people_obj.peopleimg.name} and uploaded file path:{pel_att.people_event_pic}"
+                logger.info(f'{images_info}')
+                result['story'] += f'{images_info}\n'
                 
-                # Retrieve the default profile picture of the person
-                People = apps.get_model('peoples', 'People')
-                people_obj = People.objects.get(id=peopleid)
-                default_peopleimg = f'{settings.MEDIA_ROOT}/{people_obj.peopleimg.url.replace("/youtility4_media/", "")}'
+                # Perform face verification with the models loaded at worker start
+                from apps.attendance import face_verification
+                fr_results = face_verification.verify(people_obj, pel_att.people_event_pic, using=db)
                 
-                # Use a placeholder image if the default one is blank
-                default_peopleimg = static('assets/media/images/blank.png') if default_peopleimg.endswith('blank.png') else default_peopleimg  
+                logger.info(f"deepface verification completed and results are {fr_results}")
+                result['story'] += f"deepface verification completed and results are {fr_results}\n"
                 
-                if default_peopleimg and pel_att.people_event_pic:
-                    images_info = f"default image path:{default_peopleimg} and uploaded file path:{pel_att.people_event_pic}"
-                    logger.info(f'{images_info}')
-                    result['story'] += f'{images_info}\n'
-                    
-                    # Perform face verification using DeepFace
-                    from deepface import DeepFace
-                    fr_results = DeepFace.verify(
-                        img1_path=default_peopleimg, 
-                        img2_path=pel_att.people_event_pic, 
-                        threshold=0.4,
-                        enforce_detection=True, 
-                        detector_backend='mtcnn', 
-                        model_name='Facenet512',  # Using a stronger model
-                        distance_metric='cosine'  # Cosine distance metric for similarity comparison
-                    )
-                    
-                    logger.info(f"deepface verification completed and results are {fr_results}")
-                    result['story'] += f"deepface verification completed and results are {fr_results}\n"
-                    
-                    # Manually check the distance against the 85% threshold (0.15)
-                    if fr_results['distance'] <= threshold:
-                        logger.info(f"Faces match with at least 85% similarity")
-                        result['story'] += f"Faces match with at least 85% similarity\n"
-                    else:
-                        logger.info(f"Faces do not match (distance {fr_results['distance']} > {threshold})")
-                        result['story'] += f"Faces do not match (distance {fr_results['distance']} > {threshold})\n"
-                    
-                    # Update the face recognition results in the event logger
-                    PeopleEventlog = apps.get_model('attendance', 'PeopleEventlog')
-                    logger.info("%s %s %s",fr_results,pel_uuid,peopleid)
+                # Manually check the distance against the 85% threshold (0.15)
+                if fr_results['distance'] <= threshold:
+                    logger.info(f"Faces match with at least 85% similarity")
+                    result['story'] += f"Faces match with at least 85% similarity\n"
+                else:
+                    logger.info(f"Faces do not match (distance {fr_results['distance']} > {threshold})")
+                    result['story'] += f"Faces do not match (distance {fr_results['distance']} > {threshold})\n"
+                
+                # Update the face recognition results in the event logger
+                PeopleEventlog = apps.get_model('attendance', 'PeopleEventlog')
+                logger.info("%s %s %s",fr_results,pel_uuid,peopleid)
+                with transaction.atomic(using=db):
                     if PeopleEventlog.objects.update_fr_results(fr_results, pel_uuid, peopleid, db):
                         logger.info("updation of fr_results in peopleeventlog is completed...")
     except ValueError as v:
@@ -399,6 +397,53 @@ def perform_facerecognition_bgt(self, pel_uuid, peopleid, db='default'):
 
 
 
+@app.task(bind=True, name='perform_facerecognition_batch_bgt')
+def perform_facerecognition_batch_bgt(self, db='default'):
+    # verifies the punches queued by face_queue.push, one batch task per database at a time
+    from apps.attendance import face_queue
+    utils.set_db_for_router(db)
+    if not face_queue.acquire(db):
+        # the running batch may have popped the queue before the last punches
+        face_queue.kick(db)
+        return 0
+    verified = 0
+    try:
+        while punches := face_queue.pop(db):
+            verified += verify_punches(punches, db)
+    finally:
+        face_queue.release(db)
+    return verified
+
+
+def verify_punches(punches, db):
+    "verifies [(pel_uuid, peopleid)], the stored embeddings are read in one query"
+    from apps.attendance import face_verification
+    Attachment = apps.get_model('activity', 'Attachment')
+    People = apps.get_model('peoples', 'People')
+    PeopleEventlog = apps.get_model('attendance', 'PeopleEventlog')
+    peoples = People.objects.using(db).in_bulk({int(peopleid) for _, peopleid in punches})
+    items = []
+    for pel_uuid, peopleid in punches:
+        try:
+            pel_att = Attachment.objects.get_people_pic(pel_uuid, db)
+        except Exception:
+            logger.error(f"event picture of {pel_uuid} not found", exc_info=True)
+            continue
+        if int(peopleid) in peoples and pel_att.people_event_pic:
+            items.append((pel_uuid, peoples[int(peopleid)], pel_att.people_event_pic))
+    verified = 0
+    results = face_verification.verify_many([(people, pic) for _, people, pic in items], using=db)
+    for (pel_uuid, people, _), (fr_results, error) in zip(items, results):
+        if error is not None:
+            logger.error(f"face recognition of {pel_uuid} failed: {error}")
+            continue
+        with transaction.atomic(using=db):
+            if PeopleEventlog.objects.update_fr_results(fr_results, pel_uuid, people.id, db):
+                verified += 1
+    logger.info(f"face recognition of {verified}/{len(punches)} punches of {db} completed")
+    return verified
+
+
 @app.task(bind=True,  name="alert_sendmail")
 def alert_sendmail(self, id, event, atts=False):
     '''
@@ -1044,20 +1089,17 @@ def process_graphql_mutation_async(self, payload):
 @app.task(bind=True, name="insert_json_records_async")
 def insert_json_records_async(self, records, tablename):
     from apps.service.utils import get_model_or_form
-    from apps.service.validators import clean_record
+    from apps.service import bulk_sync
     if model := get_model_or_form(tablename):
         tlog.info("processing bulk json records for insert/update")
-        for record in records:
-            record = json.loads(record)
-            record = json.loads(record)
-            record = clean_record(record)
-            tlog.info(f"processing record {pformat(record)}")
-            if model.objects.filter(uuid=record['uuid']).exists():
-                model.objects.filter(uuid=record['uuid']).update(**record)
-                tlog.info("record is already exist so updating it now..")
-            else:
-                tlog.info("record is not exist so creating new one..")
-                model.objects.create(**record)
+        data = bulk_sync.decode_records(records, times=2)
+        for record in data:
+            record['tablename'] = tablename
+        tables, count = bulk_sync.group_by_table(data)
+        db = utils.get_current_db_name()
+        with transaction.atomic(using=db):
+            bulk_sync.write_table(tablename, model, tables.get(tablename, []), db)
+        tlog.info(f"{count} records processed")
         return "Records inserted/updated successfully"
     
     
@@ -1210,4 +1252,99 @@ def send_email_notification_for_sla_report(self,slaid,sitename):
 def send_mismatch_notification(mismatch_data):
     # This task sends mismatch data to the NOC dashboard
     logger.info(f"Mismatched detected: {mismatch_data}")
-    # Add logic to send data to NOC dashboard
\ No newline at end of file
+    # Add logic to send data to NOC dashboard
+
+@shared_task(name="refresh_dashboard_counts")
+def refresh_dashboard_counts(days=None):
+    # rebuilds the daily rollup read by the dashboard of every database, pass days to backfill
+    from apps.core import dashboard_counts
+    refreshed = {}
+    for db in dashboard_counts.get_databases():
+        try:
+            refreshed[db] = dashboard_counts.refresh(days or dashboard_counts.ROLLUP_WINDOW_DAYS, using=db)
+        except Exception:
+            logger.critical(f"something went wrong while refreshing dashboard counts of {db}", exc_info=True)
+    return refreshed
+
+
+@shared_task(name="cleanup_stale_uploads")
+def cleanup_stale_uploads():
+    # removes chunked attachment uploads which were abandoned by the client
+    from apps.service.chunked_upload import cleanup_stale_uploads
+    removed = cleanup_stale_uploads()
+    logger.info(f"{removed} stale uploads removed")
+    return removed
+
+
+@shared_task(name="relay_outbox")
+def relay_outbox():
+    # publishes the pending replication events of every database, kicked by outbox.enqueue, see apps.core.outbox
+    from apps.core import outbox
+    relayed = {}
+    for db in outbox.get_databases():
+        try:
+            relayed[db] = outbox.relay(using=db)
+            outbox.purge_if_due(using=db)
+        except Exception:
+            logger.error(f"outbox relay of {db} failed, pending events are retried", exc_info=True)
+    return relayed
+
+
+@shared_task(name="refresh_sla_scores")
+def refresh_sla_scores(months=None):
+    # rebuilds the monthly SLA scores read by the trend of the SLA report, see apps.work_order_management.sla_scores
+    from apps.work_order_management import sla_scores
+    refreshed = {}
+    for db in sla_scores.get_databases():
+        try:
+            refreshed[db] = sla_scores.refresh(months or sla_scores.REFRESH_MONTHS, using=db)
+        except Exception:
+            logger.error(f"sla scores of {db} not refreshed", exc_info=True)
+    return refreshed
+
+
+@shared_task(bind=True, default_retry_delay=60, max_retries=3, name="enrich_geojson_addresses")
+def enrich_geojson_addresses(self, label, pk, fields, db='default'):
+    # addresses of points saved by the mobile sync, see apps.core.geocoding.fill_addresses
+    from apps.core import geocoding
+    try:
+        return geocoding.enrich(apps.get_model(label), pk, fields, using=db)
+    except Exception as e:
+        logger.error(f"geojson addresses of {label} {pk} not saved", exc_info=True)
+        raise self.retry(exc=e)
+
+
+@shared_task(name="build_journey_paths")
+def build_journey_paths():
+    # paths of conveyances and tours whose tracking points arrived after they ended
+    from apps.attendance import journey
+    built = {}
+    for db in journey.get_databases():
+        try:
+            built[db] = journey.build_pending_paths(using=db)
+        except Exception:
+            logger.error(f"journey paths of {db} not built", exc_info=True)
+    return built
+
+
+@worker_process_init.connect
+def warmup_sentinels(**kwargs):
+    # every worker process resolves the NONE rows once instead of a get_or_create per call
+    from apps.core import sentinels
+    for db in settings.DATABASES:
+        try:
+            sentinels.warmup(db)
+        except Exception:
+            logger.error(f"NONE rows of {db} not resolved at worker start", exc_info=True)
+
+
+@worker_process_init.connect
+def warmup_face_models(**kwargs):
+    # opt-in for the workers of the face recognition queue, other workers never load tensorflow
+    if not getattr(settings, 'FACE_MODEL_WARMUP', False):
+        return
+    from apps.attendance import face_verification
+    try:
+        face_verification.warmup()
+    except Exception:
+        logger.error("face models not loaded at worker start", exc_info=True)
@@ -0,0 +1,84 @@
+import itertools
+from django.test import TestCase
+from unittest.mock import patch
+from paho.mqtt import client as mqtt
+
+import mqtt_utils
+
+
+class FakeInfo:
+    def __init__(self, mid, rc):
+        self.mid, self.rc = mid, rc
+
+
+class FakeClient:
+    """In-process stand-in for paho's client, acks are delivered by the test"""
+
+    def __init__(self):
+        self.online = True
+        self.sent = []
+        self.started = False
+        self._mids = itertools.count(1)
+
+    def reconnect_delay_set(self, min_delay, max_delay): pass
+    def max_queued_messages_set(self, size): pass
+    def connect_async(self, host, port, keepalive): pass
+    def loop_start(self): self.started = True
+    def loop_stop(self): self.started = False
+    def disconnect(self): pass
+
+    def publish(self, topic, message, qos=0, retain=False):
+        info = FakeInfo(next(self._mids), mqtt.MQTT_ERR_SUCCESS if self.online else mqtt.MQTT_ERR_NO_CONN)
+        self.sent.append((topic, message, qos, info.mid))
+        return info
+
+    def ack(self, mid):
+        self.on_publish(self, None, mid, 0, None)
+
+
+class MqttPublisherTest(TestCase):
+
+    def setUp(self):
+        self.client = FakeClient()
+        self.publisher = mqtt_utils.MqttPublisher('localhost', 1883, client_factory=lambda: self.client)
+
+    def test_connection_is_started_once(self):
+        self.assertTrue(self.client.started)
+        self.publisher.publish_many([('a', '1'), ('b', '2')])
+        self.assertEqual(len(self.client.sent), 2)
+
+    def test_ack_clears_in_flight(self):
+        info = self.publisher.publish('test/topic', 'payload')
+        self.assertEqual(self.publisher.metrics()['in_flight'], 1)
+        self.client.ack(info.mid)
+        metrics = self.publisher.metrics()
+        self.assertEqual(metrics['in_flight'], 0)
+        self.assertEqual(metrics['acked'], 1)
+
+    def test_ack_before_publish_returns_is_counted(self):
+        self.client.on_publish(self.client, None, 1, 0, None)
+        self.publisher.publish('test/topic', 'payload')
+        self.assertEqual(self.publisher.metrics()['in_flight'], 0)
+
+    def test_qos1_is_buffered_while_offline(self):
+        self.client.online = False
+        self.publisher.publish('test/topic', 'payload', qos=1)
+        self.publisher.publish('test/topic', 'payload', qos=0)
+        metrics = self.publisher.metrics()
+        self.assertEqual(metrics['buffered'], 1)
+        self.assertEqual(metrics['failed'], 1)
+        self.assertEqual(metrics['in_flight'], 1)
+
+
+class GetPublisherTest(TestCase):
+
+    def tearDown(self):
+        mqtt_utils._publishers.clear()
+
+    @patch('mqtt_utils.MqttPublisher')
+    def test_publisher_is_reused_within_a_process(self, mock_publisher):
+        mock_publisher.return_value.pid = mqtt_utils.os.getpid()
+        first = mqtt_utils.get_publisher('localhost', 1883)
+        second = mqtt_utils.get_publisher('localhost', 1883)
+        self.assertIs(first, second)
+        mock_publisher.assert_called_once_with('localhost', 1883)
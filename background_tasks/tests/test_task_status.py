@@ -0,0 +1,35 @@
+from django.test import TestCase
+from unittest.mock import Mock, patch
+from celery.backends.base import KeyValueStoreBackend
+
+from background_tasks import task_status
+
+
+class TaskStatusTest(TestCase):
+
+    def setUp(self):
+        task_status.clear_cache()
+        self.backend = Mock(spec=KeyValueStoreBackend)
+        self.backend.get_key_for_task.side_effect = lambda task_id: task_id
+        self.backend.decode_result.side_effect = lambda value: {'status': value}
+
+    def test_ids_are_resolved_with_one_mget(self):
+        self.backend.mget.return_value = ['SUCCESS', None, 'STARTED']
+        items = [{'taskId': 'a'}, {'taskId': 'b'}, {'taskId': 'c'}]
+        result = task_status.get_task_statuses(items, self.backend)
+        self.backend.mget.assert_called_once_with(['a', 'b', 'c'])
+        self.assertEqual([i['status'] for i in result], ['SUCCESS', 'PENDING', 'STARTED'])
+
+    def test_only_terminal_states_are_cached(self):
+        self.backend.mget.return_value = ['SUCCESS', 'STARTED']
+        task_status.get_statuses(['a', 'b'], self.backend)
+        self.backend.mget.return_value = ['SUCCESS']
+        task_status.get_statuses(['a', 'b'], self.backend)
+        self.backend.mget.assert_called_with(['b'])
+
+    def test_expired_entries_are_fetched_again(self):
+        self.backend.mget.return_value = ['FAILURE']
+        task_status.get_statuses(['a'], self.backend)
+        with patch('background_tasks.task_status.time.monotonic', return_value=10 ** 9):
+            task_status.get_statuses(['a'], self.backend)
+        self.assertEqual(self.backend.mget.call_count, 2)
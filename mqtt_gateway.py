@@ -0,0 +1,141 @@
+# mqtt_gateway.py
+
+import logging
+import queue
+import threading
+import time
+
+log = logging.getLogger("message_q")
+
+DEFAULT_WORKERS = 4
+DEFAULT_QUEUE_SIZE = 1000
+# subscriptions are paused once the queue fills up to this share of its size,
+# the slots above it take the messages the broker has already sent
+PAUSE_RATIO = 0.8
+# subscriptions are resumed once the queue drains below this share of its size
+RESUME_RATIO = 0.5
+
+
+class IngestionGateway:
+    """
+    Moves the handling of received MQTT messages off paho's network thread.
+
+    on_message only enqueues the raw topic and payload; a bounded pool of
+    worker threads decodes and dispatches them through handler(client,
+    topic, payload). on_message never blocks, paho's network loop has to
+    keep sending acks, pings and the unsubscribe of a pause. When the queue
+    reaches the pause mark the gateway unsubscribes from its topics, the
+    free slots take the messages already in flight, and the topics are
+    subscribed again once the queue has drained to the resume mark.
+
+    The client acknowledges manually (client.manual_ack_set(True)): a
+    message is acked once it is in the queue, in the order received. A
+    message that still finds the queue full is not acked and counted as
+    rejected, the broker delivers it again.
+    """
+
+    def __init__(self, handler, subscriptions, workers=DEFAULT_WORKERS,
+                 queue_size=DEFAULT_QUEUE_SIZE, pause_ratio=PAUSE_RATIO, resume_ratio=RESUME_RATIO):
+        self.handler = handler
+        self.subscriptions = list(subscriptions)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.pause_at = max(1, int(queue_size * pause_ratio))
+        self.resume_at = min(int(queue_size * resume_ratio), self.pause_at - 1)
+        self.paused = False
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._stats = {'received': 0, 'processed': 0, 'failed': 0, 'rejected': 0, 'pauses': 0,
+                       'max_depth': 0, 'wait_total': 0.0}
+        self._workers = [
+            threading.Thread(target=self._work, name=f"mqtt-ingest-{i}", daemon=True)
+            for i in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def subscribe(self, client):
+        "(re)subscribes the gateway topics unless ingestion is paused"
+        if not self.paused:
+            client.subscribe(self.subscriptions)
+
+    def submit(self, client, msg):
+        "called from on_message, enqueues and acks the message, never blocks"
+        item = (client, msg.topic, msg.payload, time.monotonic())
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            with self._lock:
+                self._stats['rejected'] += 1
+            log.error(f"Ingestion queue is full ({self.queue.maxsize}), message {msg.mid} on topic {msg.topic} "
+                      "left unacknowledged for redelivery")
+            self.pause(client)
+            return
+        client.ack(msg.mid, msg.qos)
+        depth = self.queue.qsize()
+        with self._lock:
+            self._stats['received'] += 1
+            self._stats['max_depth'] = max(self._stats['max_depth'], depth)
+        if depth >= self.pause_at:
+            self.pause(client)
+
+    def pause(self, client):
+        with self._lock:
+            if self.paused:
+                return
+            self.paused = True
+            self._stats['pauses'] += 1
+        log.warning(f"Ingestion queue is at {self.queue.qsize()} of {self.queue.maxsize}, pausing subscriptions")
+        client.unsubscribe([topic for topic, _ in self.subscriptions])
+
+    def resume(self, client):
+        with self._lock:
+            if not self.paused or self.queue.qsize() > self.resume_at:
+                return
+            self.paused = False
+        log.info(f"Ingestion queue drained to {self.queue.qsize()}, resuming subscriptions")
+        client.subscribe(self.subscriptions)
+
+    def _work(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                return
+            client, topic, payload, enqueued = item
+            try:
+                self.handler(client, topic, payload)
+                failed = False
+            except Exception as e:
+                failed = True
+                log.error(f"Error processing message on topic {topic}: {e}", exc_info=True)
+            finally:
+                self.queue.task_done()
+            with self._lock:
+                self._stats['failed' if failed else 'processed'] += 1
+                self._stats['wait_total'] += time.monotonic() - enqueued
+            if self.paused:
+                self.resume(client)
+
+    def metrics(self):
+        with self._lock:
+            done = self._stats['processed'] + self._stats['failed']
+            elapsed = time.monotonic() - self._started
+            return {
+                'queue_depth': self.queue.qsize(),
+                'queue_size': self.queue.maxsize,
+                'max_depth': self._stats['max_depth'],
+                'paused': self.paused,
+                'pauses': self._stats['pauses'],
+                'received': self._stats['received'],
+                'processed': self._stats['processed'],
+                'failed': self._stats['failed'],
+                'rejected': self._stats['rejected'],
+                'throughput_per_sec': round(done / elapsed, 2) if elapsed else 0.0,
+                'avg_latency_ms': round(self._stats['wait_total'] / done * 1000, 2) if done else 0.0,
+            }
+
+    def stop(self, timeout=10):
+        "lets the workers finish the queued messages, then stops them"
+        for _ in self._workers:
+            self.queue.put(None)
+        for worker in self._workers:
+            worker.join(timeout)
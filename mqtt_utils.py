@@ -1,23 +1,201 @@
 # mqtt_utils.py
 
+import atexit
 import logging
+import os
+import threading
+import time
 from paho.mqtt import client as mqtt
 from paho.mqtt.enums import CallbackAPIVersion
 
 log = logging.getLogger("message_qlogs")
 
-def publish_message(topic, message, host="django5.youtility.in", port=1883, qos=1):
-    try:
+DEFAULT_HOST = "django5.youtility.in"
+DEFAULT_PORT = 1883
+KEEPALIVE = 60
+# seconds between reconnect attempts, doubled up to the max
+RECONNECT_MIN_DELAY, RECONNECT_MAX_DELAY = 1, 30
+# QoS>0 messages kept by paho while the broker is unreachable
+MAX_BUFFERED = 10000
+
+
+class MqttPublisher:
+    """
+    Long lived, thread safe MQTT publisher.
+
+    One connection is kept per process and driven by paho's network thread
+    (loop_start), which also reconnects with backoff when the broker goes
+    away. QoS>0 messages published while offline are queued by paho and
+    sent once the connection is back. Acknowledgements are tracked to
+    expose in-flight count and publish latency.
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, keepalive=KEEPALIVE,
+                 client_factory=None, max_buffered=MAX_BUFFERED):
+        self.host, self.port = host, port
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+        self._connected = threading.Event()
+        self._ever_connected = False
+        self._pending = {}
+        self._acked = set()
+        self._stats = {'published': 0, 'acked': 0, 'failed': 0, 'buffered': 0,
+                       'reconnects': 0, 'latency_total': 0.0, 'latency_max': 0.0}
+
+        client_factory = client_factory or (lambda: mqtt.Client(callback_api_version=CallbackAPIVersion.VERSION2))
+        self.client = client_factory()
+        self.client.on_connect = self.on_connect
+        self.client.on_disconnect = self.on_disconnect
+        self.client.on_publish = self.on_publish
+        self.client.reconnect_delay_set(RECONNECT_MIN_DELAY, RECONNECT_MAX_DELAY)
+        self.client.max_queued_messages_set(max_buffered)
         log.info(f"Connecting to MQTT broker at {host}:{port}")
-        client = mqtt.Client(callback_api_version=CallbackAPIVersion.VERSION2)
-        client.connect(host, port, 60)
-        result = client.publish(topic, message, qos=qos)
-        client.loop(2)
-        client.disconnect()
-        log.info(f"Published message to topic {topic}: {message}")
-        if result.rc == mqtt.MQTT_ERR_SUCCESS:
-            log.info(f"[MQTT] Message sent to topic {topic}")
+        # the network thread retries the first connection as well
+        self.client.connect_async(host, port, keepalive)
+        self.client.loop_start()
+
+    # paho callbacks, called from the network thread
+    def on_connect(self, client, userdata, flags, rc, props):
+        if rc == 0:
+            if self._ever_connected:
+                self._stats['reconnects'] += 1
+            self._ever_connected = True
+            self._connected.set()
+            log.info(f"[MQTT] Connected to broker {self.host}:{self.port}")
         else:
-            log.warning(f"[MQTT] Failed with result code {result.rc}")
+            log.warning(f"[MQTT] Failed to connect, return code {rc}")
+
+    def on_disconnect(self, client, userdata, disconnect_flags, rc, props):
+        self._connected.clear()
+        log.warning(f"[MQTT] Disconnected from broker {self.host}:{self.port}, return code {rc}")
+
+    def on_publish(self, client, userdata, mid, rc, props):
+        # paho holds its message lock here, so only our own lock is taken
+        with self._lock:
+            start = self._pending.pop(mid, None)
+            if start is None:
+                # acknowledged before publish() recorded it
+                self._acked.add(mid)
+                return
+            self._record_ack(time.monotonic() - start)
+
+    def _record_ack(self, latency):
+        self._stats['acked'] += 1
+        self._stats['latency_total'] += latency
+        self._stats['latency_max'] = max(self._stats['latency_max'], latency)
+
+    @property
+    def connected(self):
+        return self._connected.is_set()
+
+    def publish(self, topic, message, qos=1, retain=False):
+        """
+        queues message for topic and returns paho's MQTTMessageInfo
+        without waiting for the broker.
+        """
+        start = time.monotonic()
+        info = self.client.publish(topic, message, qos=qos, retain=retain)
+        with self._lock:
+            self._stats['published'] += 1
+            if info.rc == mqtt.MQTT_ERR_SUCCESS or (info.rc == mqtt.MQTT_ERR_NO_CONN and qos > 0):
+                if info.rc == mqtt.MQTT_ERR_NO_CONN:
+                    self._stats['buffered'] += 1
+                if info.mid in self._acked:
+                    self._acked.discard(info.mid)
+                    self._record_ack(time.monotonic() - start)
+                else:
+                    self._pending[info.mid] = start
+            else:
+                self._stats['failed'] += 1
+        if info.rc == mqtt.MQTT_ERR_NO_CONN and qos > 0:
+            log.warning(f"[MQTT] Broker unreachable, message to topic {topic} buffered")
+        elif info.rc != mqtt.MQTT_ERR_SUCCESS:
+            log.warning(f"[MQTT] Failed with result code {info.rc}")
+        return info
+
+    def publish_many(self, messages, qos=1):
+        """
+        publishes an iterable of (topic, message) pairs over the
+        shared connection, returns their MQTTMessageInfo.
+        """
+        return [self.publish(topic, message, qos=qos) for topic, message in messages]
+
+    def flush(self, timeout=10):
+        "waits until every tracked message is acknowledged, returns True if none is left"
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                if not self._pending:
+                    return True
+            time.sleep(0.05)
+        return False
+
+    def metrics(self):
+        with self._lock:
+            acked = self._stats['acked']
+            return {
+                'connected': self.connected,
+                'in_flight': len(self._pending),
+                'published': self._stats['published'],
+                'acked': acked,
+                'failed': self._stats['failed'],
+                'buffered': self._stats['buffered'],
+                'reconnects': self._stats['reconnects'],
+                'avg_latency_ms': round(self._stats['latency_total'] / acked * 1000, 2) if acked else 0.0,
+                'max_latency_ms': round(self._stats['latency_max'] * 1000, 2),
+            }
+
+    def close(self, timeout=5):
+        self.flush(timeout)
+        self.client.disconnect()
+        self.client.loop_stop()
+
+
+_publishers = {}
+_publishers_lock = threading.Lock()
+
+
+def get_publisher(host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """
+    returns the process wide publisher of a broker. A forked worker
+    does not inherit the network thread, so it gets its own publisher.
+    """
+    key, pid = (host, port), os.getpid()
+    publisher = _publishers.get(key)
+    if publisher is None or publisher.pid != pid:
+        with _publishers_lock:
+            publisher = _publishers.get(key)
+            if publisher is None or publisher.pid != pid:
+                publisher = _publishers[key] = MqttPublisher(host, port)
+    return publisher
+
+
+@atexit.register
+def close_publishers():
+    for publisher in list(_publishers.values()):
+        if publisher.pid == os.getpid():
+            try:
+                publisher.close()
+            except Exception as e:
+                log.error(f"[MQTT] Exception while closing publisher: {e}", exc_info=True)
+    _publishers.clear()
+
+
+def publish_message(topic, message, host=DEFAULT_HOST, port=DEFAULT_PORT, qos=1):
+    try:
+        info = get_publisher(host, port).publish(topic, message, qos=qos)
+        if info.rc == mqtt.MQTT_ERR_SUCCESS:
+            log.info(f"[MQTT] Message sent to topic {topic}")
+        return info
     except Exception as e:
         log.error(f"[MQTT] Exception during publish: {e}", exc_info=True)
+
+
+def publish_messages(messages, host=DEFAULT_HOST, port=DEFAULT_PORT, qos=1):
+    "publishes an iterable of (topic, message) pairs over the shared connection"
+    try:
+        infos = get_publisher(host, port).publish_many(messages, qos=qos)
+        log.info(f"[MQTT] {len(infos)} messages sent")
+        return infos
+    except Exception as e:
+        log.error(f"[MQTT] Exception during batch publish: {e}", exc_info=True)
@@ -11,11 +11,12 @@ from django.conf import settings
 from background_tasks.tasks import (
     process_graphql_mutation_async
 )
-from celery.result import AsyncResult
+from background_tasks.task_status import get_task_statuses
 import json
 import logging
 from base64 import b64decode
 from zlib import decompress
+from mqtt_gateway import IngestionGateway, DEFAULT_WORKERS, DEFAULT_QUEUE_SIZE, PAUSE_RATIO
 
 MQTT_CONFIG = settings.MQTT_CONFIG
 log = logging.getLogger("message_q")
@@ -39,14 +40,15 @@ TESTPUBMQ = "django5received"
 
 REDMINE_TO_NOC = "redmine_to_noc"
 
+SUBSCRIPTIONS = [
+    (GRAPHQL_MUTATION, 1),
+    (MUTATION_STATUS, 1),
+    (TESTMQ, 0),
+    (GRAPHQL_ATTACHMENT, 1),
+]
 
-def get_task_status(item):
-    """
-    Get status of a task
-    """
-    status = AsyncResult(item.get("taskId")).status
-    item.update({"status": status})
-    return item
+# compressed payloads larger than this are not echoed back in acknowledgements
+ECHO_PAYLOAD_LIMIT = MQTT_CONFIG.get("ECHO_PAYLOAD_LIMIT", 1024)
 
 
 def unzip_string(encoded_input):
@@ -60,6 +62,62 @@ def unzip_string(encoded_input):
     return bytes.decode("utf-8")
 
 
+def acknowledgement(result, post_data, payload):
+    """
+    response published once a mutation is handed over to celery. The
+    compressed payload is only echoed back when it is small.
+    """
+    response = {
+        "task_id": result.task_id,
+        "status": result.state,
+        "uuids": post_data.get("uuids", []),
+        "serviceName": post_data.get("serviceName", ""),
+    }
+    if len(payload) <= ECHO_PAYLOAD_LIMIT:
+        response["payload"] = payload
+    else:
+        response["payload_size"] = len(payload)
+    return json.dumps(response)
+
+
+def handle_message(client, topic, payload):
+    """
+    decodes and dispatches a message received on topic, runs
+    on the ingestion gateway workers.
+    """
+    log.info(f"processing started [+] {topic}")
+    if topic == TESTMQ:
+        response = json.dumps({'name':'Satyam'})
+        log.info(
+            f"Response published to {RESPONSE_TOPIC} after accepting"
+        )
+        client.publish(TESTPUBMQ, response, qos=2)
+
+    if topic in (GRAPHQL_MUTATION, GRAPHQL_ATTACHMENT):
+        log.info(f"Received Message on Topic {topic}")
+        payload = payload.decode("utf-8")
+        original_message = unzip_string(payload)
+        # process graphql mutations received on this topic
+        result = process_graphql_mutation_async.delay(original_message)
+        post_data = json.loads(original_message)
+        log.info(
+            f"Response published to {RESPONSE_TOPIC} after accepting {post_data.get('serviceName', '')}"
+        )
+        client.publish(RESPONSE_TOPIC, acknowledgement(result, post_data, payload), qos=2)
+
+    if topic == MUTATION_STATUS:
+        log.info(f"Received Message on Topic {MUTATION_STATUS}")
+        # enquire the status of tasks ids received on this topic
+        payload = json.loads(payload.decode())
+        log.info(f"Received taskIds payload: {payload}")
+        taskids = payload.get("taskIds", [])
+        taskids_with_status = get_task_statuses(taskids)
+        response = json.dumps(taskids_with_status)
+        log.info(f"Response published to {STATUS_TOPIC}: {response}")
+        client.publish(STATUS_TOPIC, response, qos=2)
+    log.info("processing completed [-]")
+
+
 class MqttClient:
     """
     MQTT client class listens for connection, messages,
@@ -71,12 +129,20 @@ class MqttClient:
         Initializes the MQTT client
         """
         self.client = mqtt.Client(CallbackAPIVersion.VERSION2)
+        # messages are acked by the gateway once queued, see IngestionGateway
+        self.client.manual_ack_set(True)
         self.client.on_connect = self.on_connect
         self.client.on_message = self.on_message
         self.client.on_disconnect = self.on_disconnect
+        self.gateway = IngestionGateway(
+            handle_message, SUBSCRIPTIONS,
+            workers=MQTT_CONFIG.get("INGEST_WORKERS", DEFAULT_WORKERS),
+            queue_size=MQTT_CONFIG.get("INGEST_QUEUE_SIZE", DEFAULT_QUEUE_SIZE),
+            pause_ratio=MQTT_CONFIG.get("INGEST_PAUSE_RATIO", PAUSE_RATIO))
         """
         Initializes the MQTT client and sets up the callback functions
-        for connect, message, and disconnect events.
+        for connect, message, and disconnect events. Received messages
+        are handled by the ingestion gateway workers.
         """
 
     # MQTT client callback functions
@@ -84,94 +150,22 @@ class MqttClient:
         log.info("Hello %s",rc)
         if rc == 'Success':
             log.info("Connected to MQTT Broker!")
-            client.subscribe(GRAPHQL_MUTATION, qos=1)
-            client.subscribe(MUTATION_STATUS, qos=1)
-            client.subscribe(TESTMQ)
-            #client.subscribe(GRAPHQL_DOWNLOAD, qos=1)
-            client.subscribe(GRAPHQL_ATTACHMENT, qos=1)
+            self.gateway.subscribe(client)
         else:
             fail = f"Failed to connect, return code {rc}"
 
     def on_message(self, client, userdata, msg):
-        try:
-            log.info(
-                "message: {} from MQTT broker on topic {} {}".format(
-                    msg.mid,
-                    msg.topic,
-                    "payload recieved" if msg.payload else "payload not recieved",
-                )
+        log.info(
+            "message: {} from MQTT broker on topic {} {}".format(
+                msg.mid,
+                msg.topic,
+                "payload recieved" if msg.payload else "payload not recieved",
             )
-            log.info("processing started [+]")
-            
-            if msg.topic == TESTMQ:
-                response = json.dumps({'name':'Satyam'})
-                log.info(
-                    f"Response published to {RESPONSE_TOPIC} after accepting"
-                )
-                client.publish(TESTPUBMQ, response, qos=2)
-
-            if msg.topic == GRAPHQL_MUTATION:
-
-                # Process the received message
-                log.info(f"Received Message on Topic {GRAPHQL_MUTATION}")
-                payload = msg.payload.decode("utf-8")
-                original_message = unzip_string(payload)
-                # process graphql mutations received on this topic GRAPHQL_MUTATION
-                result = process_graphql_mutation_async.delay(original_message)
-                post_data = json.loads(original_message)
-                uuids, service_name = post_data.get("uuids", []), post_data.get(
-                    "serviceName", ""
-                )
-                response = json.dumps(
-                    {
-                        "task_id": result.task_id,
-                        "status": result.state,
-                        "uuids": uuids,
-                        "serviceName": service_name,
-                        "payload": payload,
-                    }
-                )
-
-                log.info(
-                    f"Response published to {RESPONSE_TOPIC} after accepting {service_name}"
-                )
-                client.publish(RESPONSE_TOPIC, response, qos=2)
-
-            if msg.topic == MUTATION_STATUS:
-                log.info(f"Received Message on Topic {MUTATION_STATUS}")
-                payload = msg.payload.decode()
-                # enquire the status of tasks ids received on this topic
-                payload = json.loads(payload)
-                log.info(f"Received taskIds payload: {payload}")
-                taskids = payload.get("taskIds", [])
-                taskids_with_status = list(map(get_task_status, taskids))
-                response = json.dumps(taskids_with_status)
-                log.info(f"Response published to {STATUS_TOPIC}: {response}")
-                client.publish(STATUS_TOPIC, response, qos=2)
-            
-            if msg.topic == GRAPHQL_ATTACHMENT:
-                log.info(f"Received Message on Topic {GRAPHQL_ATTACHMENT}")
-                payload = msg.payload.decode("utf-8")
-                original_message = unzip_string(payload)
-                log.info("Inside of the Graphql attachment")
-                result = process_graphql_mutation_async.delay(original_message)
-                post_data = json.loads(original_message)
-                uuids, service_name = post_data.get("uuids", []), post_data.get(
-                    "serviceName", ""
-                )
-                response = json.dumps(
-                    {
-                        "task_id": result.task_id,
-                        "status": result.state,
-                        "uuids": uuids,
-                        "serviceName": service_name,
-                        "payload": payload,
-                    }
-                )
-                client.publish(RESPONSE_TOPIC, response, qos=2)
-        except Exception as e:
-            log.error(f"Error processing message: {e}", exc_info=True)
-            raise e
+        )
+        self.gateway.submit(client, msg)
+
+    def metrics(self):
+        return self.gateway.metrics()
 
     def on_disconnect(self, client, userdata, disconnect_flags, rc, props):
         log.info("Disconnected from MQTT broker")
@@ -179,7 +173,10 @@ class MqttClient:
     def loop_forever(self):
         # Connect to MQTT broker
         self.client.connect(BROKER_ADDRESS, BROKER_PORT)
-        self.client.loop_forever()
+        try:
+            self.client.loop_forever()
+        finally:
+            self.gateway.stop()
     
     # def publish_message(self,topic,message):
     #     result_code, mid = self.client.publish(topic, message,qos=0)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Attachment Upload Benchmark for YOUTILITY3
+Compares the List[Int] upload of UploadAttMutaion (file bytes sent as JSON
+numbers, parsed into python ints and rebuilt with bytes()) with the chunked
+binary upload of apps/service/chunked_upload.py.
+
+Each upload runs in a fresh process so peak RSS is measured per upload.
+The chunked upload is fed from a file the way multipart chunks arrive.
+
+Usage:
+    python3 attachment_upload_benchmark.py [--size-mb 3] [--chunk-kb 512]
+"""
+
+import argparse
+import importlib.util
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+import types
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def load_chunked_upload():
+    # loaded by path, importing apps.service pulls in django models
+    try:
+        import django.conf  # noqa: F401
+    except ImportError:
+        sys.modules['django'] = types.ModuleType('django')
+        sys.modules['django.conf'] = types.SimpleNamespace(settings=object())
+    spec = importlib.util.spec_from_file_location(
+        'chunked_upload', os.path.join(project_root, 'apps', 'service', 'chunked_upload.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def list_of_ints(source, size, chunk_size, workdir):
+    # what the mobile client sends and graphene parses before the mutation runs
+    with open(source, 'rb') as f:
+        payload = json.dumps({'bytes': list(f.read())})
+    data = json.loads(payload)['bytes']
+    content = bytes(data)
+    with open(os.path.join(workdir, 'stored'), 'wb') as f:
+        f.write(content)
+    return len(payload)
+
+
+def chunked(source, size, chunk_size, workdir):
+    chunked_upload = load_chunked_upload()
+    checksum = chunked_upload.file_checksum(source)
+    upload = chunked_upload.ChunkedUpload.create(
+        {}, {}, size, checksum, chunk_size, root=os.path.join(workdir, 'partial'))
+    with open(source, 'rb') as f:
+        for index in range(upload.total_chunks):
+            upload.write_chunk(index, f.read(chunk_size))
+    assert upload.missing() == []
+    assert chunked_upload.file_checksum(upload.data_path) == checksum
+    upload.discard()
+    return size
+
+
+def measure(fn, args, queue):
+    start = time.perf_counter()
+    payload = fn(*args)
+    elapsed = time.perf_counter() - start
+    queue.put((elapsed, payload, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+
+def run(fn, *args):
+    queue = multiprocessing.Queue()
+    proc = multiprocessing.Process(target=measure, args=(fn, args, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size-mb', type=float, default=3)
+    parser.add_argument('--chunk-kb', type=int, default=512)
+    args = parser.parse_args()
+
+    size, chunk_size = int(args.size_mb * 2**20), args.chunk_kb * 1024
+    with tempfile.TemporaryDirectory() as workdir:
+        source = os.path.join(workdir, 'photo.jpg')
+        with open(source, 'wb') as f:
+            f.write(os.urandom(size))
+        print(f"\n📤 Uploading a {args.size_mb}MB attachment")
+        old_time, old_payload, old_rss = run(list_of_ints, source, size, chunk_size, workdir)
+        new_time, new_payload, new_rss = run(chunked, source, size, chunk_size, workdir)
+        print(f"  List[Int] : {old_time * 1000:7.0f}ms  peak {old_rss:6.0f}MB  payload {old_payload / 2**20:6.1f}MB")
+        print(f"  chunked   : {new_time * 1000:7.0f}ms  peak {new_rss:6.0f}MB  payload {new_payload / 2**20:6.1f}MB"
+              f"  ({-(-size // chunk_size)} chunks of {args.chunk_kb}KB)")
+
+
+if __name__ == '__main__':
+    main()
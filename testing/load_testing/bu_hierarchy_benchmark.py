@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+BU Hierarchy Benchmark for YOUTILITY3
+Compares the bu lists of a client read by the recursive fn_get_bulist with
+the lookups of the bt_closure table (apps/onboarding/hierarchy.py):
+
+- subtree: fn_get_bulist(client, false, true) against
+  SELECT descendant FROM bt_closure WHERE ancestor = client
+- tree:    fn_get_bulist(client, true, true) against the union of the
+  subtree and the ancestors of the client
+
+Runs against a migrated database holding both the functions and
+bt_closure, nothing is written.
+
+Usage:
+    python3 bu_hierarchy_benchmark.py --dsn "dbname=youtility user=postgres" --client 4 [--iterations 200]
+"""
+
+import argparse
+import statistics
+import time
+
+import psycopg2
+
+QUERIES = {
+    'subtree': (
+        "SELECT fn_get_bulist(%(client)s, false, true, 'array'::text, null::bigint[])",
+        "SELECT array_agg(descendant) FROM bt_closure WHERE ancestor = %(client)s",
+    ),
+    'tree': (
+        "SELECT fn_get_bulist(%(client)s, true, true, 'array'::text, null::bigint[])",
+        '''SELECT array_agg(id ORDER BY id) FROM (
+               SELECT descendant AS id FROM bt_closure WHERE ancestor = %(client)s
+               UNION
+               SELECT ancestor FROM bt_closure
+               WHERE descendant = %(client)s AND NOT (ancestor IN (1, -1) AND depth > 0)) AS tree''',
+    ),
+}
+
+
+def timed(cursor, sql, params, iterations):
+    times, result = [], None
+    for _ in range(iterations):
+        start = time.perf_counter()
+        cursor.execute(sql, params)
+        result = cursor.fetchone()[0]
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), max(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--dsn', required=True, help='libpq connection string of a migrated database')
+    parser.add_argument('--client', type=int, required=True, help='id of the client bu')
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(args.dsn)
+    conn.autocommit = True
+    cursor = conn.cursor()
+    params = {'client': args.client}
+    try:
+        for name, (old_sql, new_sql) in QUERIES.items():
+            print(f"\n🌳 {name} of client {args.client}")
+            old_median, old_max, old_ids = timed(cursor, old_sql, params, args.iterations)
+            new_median, new_max, new_ids = timed(cursor, new_sql, params, args.iterations)
+            same = set(old_ids or []) == set(new_ids or [])
+            print(f"  fn_get_bulist  median {old_median:8.2f}ms   max {old_max:8.2f}ms   {len(old_ids or [])} bus")
+            print(f"  bt_closure     median {new_median:8.2f}ms   max {new_max:8.2f}ms   {len(new_ids or [])} bus")
+            print(f"  speedup {old_median / new_median if new_median else 0:.1f}x, "
+                  f"{'same bus' if same else '⚠️  different bus'}")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Cron Expansion Benchmark for YOUTILITY3
+Compares per-job croniter iteration (the old get_datetime_list loop) with the
+cached occurrence generator in apps/schedhuler/cron_occurrences.py over a
+nightly scheduling run of 10k jobs sharing a small set of cron expressions.
+
+Usage:
+    python3 cron_expansion_benchmark.py [--jobs 10000] [--days 2]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from croniter import croniter
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from apps.schedhuler import cron_occurrences  # noqa: E402
+
+CRONS = [
+    '0 */2 * * *', '0 */4 * * *', '*/30 * * * *', '0 8 * * *', '0 8,20 * * *',
+    '0 9 * * 1-5', '*/15 8-18 * * 1-5', '0 0 1 * *', '0 6 * * 0,6', '0 */1 * * *',
+]
+OFFSETS = [330, 0, 240, 480, -300]
+
+
+def make_windows(n_jobs, days):
+    random.seed(42)
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    windows = []
+    for _ in range(n_jobs):
+        tz = timezone(timedelta(minutes=random.choice(OFFSETS)))
+        start = (now + timedelta(seconds=random.randint(0, 600))).astimezone(tz)
+        windows.append((random.choice(CRONS), start, start + timedelta(days=days)))
+    return windows
+
+
+def per_job_croniter(windows):
+    total = 0
+    for cron, start, end in windows:
+        itr = croniter(cron, start)
+        while itr.get_next(datetime) < end:
+            total += 1
+    return total
+
+
+def cached_generator(windows):
+    cron_occurrences.clear_cache()
+    return sum(len(cron_occurrences.get_occurrences(cron, start, end)) for cron, start, end in windows)
+
+
+def timeit(fn, windows):
+    start = time.perf_counter()
+    count = fn(windows)
+    return time.perf_counter() - start, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--jobs', type=int, default=10000)
+    parser.add_argument('--days', type=int, default=2)
+    args = parser.parse_args()
+
+    windows = make_windows(args.jobs, args.days)
+    print(f"\n🔍 Expanding {args.jobs} jobs over {args.days} day(s), {len(CRONS)} distinct crons")
+
+    old_time, old_count = timeit(per_job_croniter, windows)
+    new_time, new_count = timeit(cached_generator, windows)
+    assert old_count == new_count, f"occurrence mismatch {old_count} != {new_count}"
+
+    print(f"  Occurrences generated : {new_count}")
+    print(f"  croniter per job      : {old_time * 1000:.1f}ms")
+    print(f"  cached generator      : {new_time * 1000:.1f}ms")
+    print(f"  Speedup               : {old_time / new_time:.1f}x")
+    print(f"  Cache                 : {cron_occurrences.cache_info()}")
+
+
+if __name__ == '__main__':
+    main()
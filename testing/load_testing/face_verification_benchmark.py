@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Face Verification Benchmark for YOUTILITY3
+Compares the throughput of one worker process, CPU only, for the punches of
+one people:
+
+- before: DeepFace.verify(reference, punch) per punch, the reference image
+  is detected and embedded again every time
+- after:  apps/attendance/face_verification.py, models loaded once, the
+  reference embedded once, one detection and embedding per punch and a
+  cosine distance
+
+The first call of each path, which loads the models, is reported apart.
+
+Usage:
+    python3 face_verification_benchmark.py --reference people.jpg --punches punches_dir/ [--limit 50]
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+import time
+
+# CPU only, as the celery workers
+os.environ.setdefault('CUDA_VISIBLE_DEVICES', '-1')
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def load_face_verification():
+    # loaded by path, importing apps.attendance pulls in django models
+    from django.conf import settings
+    if not settings.configured:
+        settings.configure()
+    spec = importlib.util.spec_from_file_location(
+        'face_verification', os.path.join(project_root, 'apps', 'attendance', 'face_verification.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run(label, verify, punches):
+    start = time.perf_counter()
+    first = verify(punches[0])
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    distances = [first] + [verify(punch) for punch in punches[1:]]
+    warm = time.perf_counter() - start
+    rate = (len(punches) - 1) / warm if len(punches) > 1 else 0
+    print(f"  {label:<8} first punch {cold:6.2f}s   then {rate:6.2f} punches/s "
+          f"({warm / max(1, len(punches) - 1) * 1000:7.1f}ms each)")
+    return distances
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--reference', required=True, help='default image of the people')
+    parser.add_argument('--punches', required=True, help='directory of event pictures, each with a face')
+    parser.add_argument('--limit', type=int, default=50)
+    args = parser.parse_args()
+
+    punches = sorted(os.path.join(args.punches, name) for name in os.listdir(args.punches)
+                     if name.lower().endswith(IMAGE_EXTENSIONS))[:args.limit]
+    if not punches:
+        sys.exit(f"no image in {args.punches}")
+    face_verification = load_face_verification()
+    from deepface import DeepFace
+
+    print(f"\n🙂 {len(punches)} punches, {face_verification.MODEL_NAME}/{face_verification.DETECTOR}, CPU only")
+
+    def before(punch):
+        return DeepFace.verify(img1_path=args.reference, img2_path=punch, threshold=face_verification.MATCH_THRESHOLD,
+                               enforce_detection=True, detector_backend=face_verification.DETECTOR,
+                               model_name=face_verification.MODEL_NAME, distance_metric='cosine')['distance']
+
+    refs = {}
+
+    def after(punch):
+        if 'ref' not in refs:
+            refs['ref'] = face_verification.embed(args.reference)[0]
+        return min(face_verification.cosine_distance(refs['ref'], face) for face in face_verification.embed(punch))
+
+    # the service first, its cold start includes loading the models
+    new = run('after', after, punches)
+    old = run('before', before, punches)
+    drift = max(abs(a - b) for a, b in zip(old, new))
+    print(f"  largest distance difference {drift:.6f}")
+
+
+if __name__ == '__main__':
+    main()
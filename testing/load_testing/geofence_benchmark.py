@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Geofence Evaluation Benchmark for YOUTILITY3
+Compares the per-point checks of PELManager.is_point_in_geofence (WKT parsed
+with a regex, math haversine per point, GEOS Point + Polygon.contains per
+point) with the array evaluation of apps/attendance/geofence.py over a day
+of tracking points of one site.
+
+Polygon checks need GEOS (django.contrib.gis), they are skipped without it.
+
+Usage:
+    python3 geofence_benchmark.py [--points 20000] [--vertices 40]
+"""
+
+import argparse
+import importlib.util
+import math
+import os
+import re
+import sys
+import time
+import types
+
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CENTER = (28.6139, 77.2090)
+
+
+def load_geofence():
+    # loaded by path, importing apps.attendance pulls in django models
+    try:
+        import django.conf  # noqa: F401
+    except ImportError:
+        sys.modules['django'] = types.ModuleType('django')
+        sys.modules['django.conf'] = types.SimpleNamespace(settings=object())
+        sys.modules['django.core'] = types.ModuleType('django.core')
+        sys.modules['django.core.cache'] = types.SimpleNamespace(cache=None)
+    spec = importlib.util.spec_from_file_location(
+        'geofence', os.path.join(project_root, 'apps', 'attendance', 'geofence.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_points(n):
+    rng = np.random.default_rng(42)
+    lats = CENTER[0] + rng.normal(0, 0.004, n)
+    lons = CENTER[1] + rng.normal(0, 0.004, n)
+    wkts = [f"SRID=4326;POINT ({lon} {lat})" for lat, lon in zip(lats, lons)]
+    return lats, lons, wkts
+
+
+def old_circle(wkts, radius_km):
+    inside = 0
+    for wkt in wkts:
+        match = re.search(r"POINT \(([-\d.]+) ([-\d.]+)\)", wkt)
+        lon, lat = float(match.group(1)), float(match.group(2))
+        lat1, lon1, lat2, lon2 = map(math.radians, (lat, lon, *CENTER))
+        a = math.sin((lat2 - lat1) / 2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2)**2
+        inside += 6371 * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a)) <= radius_km
+    return inside
+
+
+def make_polygon(vertices):
+    from django.contrib.gis.geos import Polygon
+    angles = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+    radius = 0.003 * (1 + 0.3 * np.sin(5 * angles))
+    ring = [(CENTER[1] + r * np.cos(a), CENTER[0] + r * np.sin(a)) for a, r in zip(angles, radius)]
+    return Polygon(ring + ring[:1], srid=4326)
+
+
+def old_polygon(wkts, polygon):
+    from django.contrib.gis.geos import Point
+    inside = 0
+    for wkt in wkts:
+        match = re.search(r"POINT \(([-\d.]+) ([-\d.]+)\)", wkt)
+        inside += polygon.contains(Point(float(match.group(1)), float(match.group(2))))
+    return inside
+
+
+def timeit(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, int(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--points', type=int, default=20000)
+    parser.add_argument('--vertices', type=int, default=40)
+    parser.add_argument('--radius-km', type=float, default=0.3)
+    args = parser.parse_args()
+
+    geofence = load_geofence()
+    lats, lons, wkts = make_points(args.points)
+    print(f"\n📍 Evaluating {args.points} tracking points")
+
+    old_time, old_inside = timeit(old_circle, wkts, args.radius_km)
+    circle = geofence.Circle(*CENTER, args.radius_km)
+    new_time, new_inside = timeit(lambda: circle.contains_many(lats, lons).sum())
+    print(f"  circle  per point : {old_time * 1000:8.1f}ms  inside {old_inside}")
+    print(f"  circle  vectorized: {new_time * 1000:8.1f}ms  inside {new_inside}  ({old_time / new_time:.0f}x)")
+
+    try:
+        polygon = make_polygon(args.vertices)
+    except Exception as e:
+        print(f"  polygon checks skipped, GEOS is not available: {e}")
+        return
+    old_time, old_inside = timeit(old_polygon, wkts, polygon)
+    engine = geofence.Polygon(polygon)
+    new_time, new_inside = timeit(lambda: engine.contains_many(lats, lons).sum())
+    print(f"  polygon per point : {old_time * 1000:8.1f}ms  inside {old_inside}")
+    print(f"  polygon vectorized: {new_time * 1000:8.1f}ms  inside {new_inside}  ({old_time / new_time:.0f}x)"
+          f"  ({args.vertices} vertices)")
+
+
+if __name__ == '__main__':
+    main()
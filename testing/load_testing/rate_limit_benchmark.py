@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Rate Limiter Overhead Benchmark for YOUTILITY3
+Measures the cost added to a request by apps/core/rate_limits.py (check of
+the buckets before the view, record of the attempt after it) while
+--threads threads replay a sync storm of --users users, a share of them
+failing. The flush is timed separately, without database the batch is
+dropped.
+
+With --dsn the previous path is timed as well: the check_rate_limit SQL
+function and the insert of a RateLimitAttempt row per request, rolled
+back afterwards. The database needs the function of migration core 0002.
+
+Usage:
+    python3 rate_limit_benchmark.py [--requests 200000] [--threads 8] [--users 5000] [--dsn "dbname=youtility"]
+"""
+
+import argparse
+import importlib.util
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import types
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def load_rate_limits():
+    # loaded by path, importing apps.core pulls in django models
+    try:
+        from django.conf import settings
+        if not settings.configured:
+            settings.configure(USE_TZ=True)
+    except ImportError:
+        from datetime import datetime, timezone
+        sys.modules['django'] = types.ModuleType('django')
+        sys.modules['django.conf'] = types.SimpleNamespace(settings=object())
+        sys.modules['django.db'] = types.SimpleNamespace(DatabaseError=Exception)
+        sys.modules['django.db.models'] = types.SimpleNamespace(Count=None)
+        sys.modules['django.utils'] = types.SimpleNamespace(
+            timezone=types.SimpleNamespace(now=lambda: datetime.now(timezone.utc)))
+    spec = importlib.util.spec_from_file_location(
+        'rate_limits', os.path.join(project_root, 'apps', 'core', 'rate_limits.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def storm(rate_limits, requests, users, failure_rate, seed, times):
+    rng = random.Random(seed)
+    for _ in range(requests):
+        user = f"guard{rng.randrange(users)}"
+        ip_address = f"10.{rng.randrange(256)}.{rng.randrange(256)}.1"
+        start = time.perf_counter()
+        result = rate_limits.check(ip_address, user)
+        if not result['is_blocked']:
+            success = rng.random() >= failure_rate
+            rate_limits.record(ip_address, user, 'okhttp/4.9', 'login', success,
+                               None if success else 'Invalid credentials')
+        times.append((time.perf_counter() - start) * 1e6)
+
+
+def run_in_process(rate_limits, args):
+    per_thread = args.requests // args.threads
+    times = [[] for _ in range(args.threads)]
+    threads = [threading.Thread(target=storm, args=(rate_limits, per_thread, args.users, args.failure_rate, n, times[n]))
+               for n in range(args.threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    times = sorted(t for per in times for t in per)
+    print(f"  {len(times)} requests on {args.threads} threads in {elapsed:.2f}s")
+    print(f"  overhead per request   median {statistics.median(times):6.1f}µs"
+          f"   p99 {times[int(len(times) * 0.99)]:6.1f}µs   max {times[-1]:8.1f}µs")
+
+    pending = len(rate_limits._pending)
+    rate_limits.write = lambda attempts: []
+    rate_limits.sync = lambda using: None
+    start = time.perf_counter()
+    rate_limits.flush()
+    print(f"  flush of {pending} buffered attempts {(time.perf_counter() - start) * 1000:.1f}ms (database excluded),"
+          f" {len(rate_limits._buckets)} buckets")
+
+
+def run_database(args):
+    import psycopg2
+    conn = psycopg2.connect(args.dsn)
+    cursor = conn.cursor()
+    rng, times = random.Random(0), []
+    n = min(args.requests, 5000)
+    try:
+        for _ in range(n):
+            user = f"guard{rng.randrange(args.users)}"
+            start = time.perf_counter()
+            cursor.execute("SELECT check_rate_limit(%s, %s, %s::INTERVAL, %s)", ['10.0.0.1', user, '15 minutes', 5])
+            cursor.fetchone()
+            cursor.execute(
+                '''INSERT INTO auth_rate_limit_attempts
+                   (ip_address, username, user_agent, attempt_time, attempt_type, success, failure_reason, created_at)
+                   VALUES (%s, %s, %s, now(), 'login', false, 'Invalid credentials', now())''',
+                ['10.0.0.1', user, 'okhttp/4.9'])
+            times.append((time.perf_counter() - start) * 1e6)
+    finally:
+        conn.rollback()
+        conn.close()
+    times.sort()
+    print(f"  check_rate_limit + insert, {n} requests")
+    print(f"  overhead per request   median {statistics.median(times):6.1f}µs"
+          f"   p99 {times[int(len(times) * 0.99)]:6.1f}µs   max {times[-1]:8.1f}µs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=200000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--failure-rate', type=float, default=0.1)
+    parser.add_argument('--dsn', help='libpq connection string to time the previous path')
+    args = parser.parse_args()
+
+    rate_limits = load_rate_limits()
+    print("\n🚦 In-process token buckets")
+    run_in_process(rate_limits, args)
+    if args.dsn:
+        print("\n🐘 check_rate_limit SQL function")
+        run_database(args)
+
+
+if __name__ == '__main__':
+    main()
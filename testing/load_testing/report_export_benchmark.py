@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Report Export Memory Benchmark for YOUTILITY3
+Compares the DataFrame based exports of BaseReportsExport (list -> DataFrame
+-> applymap -> BytesIO) with the streaming writers in
+apps/reports/streaming_export.py for a LISTOFTOURS shaped result.
+
+Rows are generated lazily, standing in for a server side cursor, and each
+export runs in a fresh process so peak RSS is measured per export.
+
+Usage:
+    python3 report_export_benchmark.py [--rows 1000000] [--formats csv json xlsx]
+"""
+
+import argparse
+import importlib.util
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from io import BytesIO
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# loaded by path, importing apps.reports pulls in django
+spec = importlib.util.spec_from_file_location(
+    'streaming_export', os.path.join(project_root, 'apps', 'reports', 'streaming_export.py'))
+streaming_export = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(streaming_export)
+
+COLUMNS = ['Client', 'Site', 'Tour/Route', 'Planned Datetime', 'Expiry Datetime', 'Assigned To',
+           'JobType', 'Status', 'Performed On', 'Performed By', 'Is Time Bound', 'Score']
+
+
+def rows(n):
+    start = datetime(2025, 1, 1)
+    for i in range(n):
+        planned = start + timedelta(minutes=i)
+        yield ('Acme Facilities', f'Site {i % 300}', f'Route {i % 40}', planned,
+               planned + timedelta(minutes=30), f'Guard {i % 900}', 'SCHEDULE',
+               'COMPLETED' if i % 3 else 'AUTOCLOSED', planned + timedelta(minutes=12),
+               f'Guard {i % 900}', i % 2 == 0, Decimal(i % 1000) / 10)
+
+
+def dataframe_export(n, fmt):
+    import pandas as pd
+    data = [dict(zip(COLUMNS, row)) for row in rows(n)]
+    df = pd.DataFrame(data)
+    output = BytesIO()
+    if fmt == 'csv':
+        df.to_csv(output, index=False, date_format='%Y-%m-%d %H:%M:%S')
+    elif fmt == 'json':
+        df.to_json(output, orient='records', date_format='iso')
+    else:
+        df = df.map(lambda x: float(x) if isinstance(x, Decimal) else x)
+        with pd.ExcelWriter(output, engine='xlsxwriter', datetime_format='yyyy-mm-dd hh:mm:ss') as writer:
+            df.to_excel(writer, index=False, sheet_name='Sheet1', startrow=2, header=False)
+    return output.tell()
+
+
+def streaming(n, fmt):
+    write, _ = streaming_export.WRITERS[fmt]
+    with tempfile.TemporaryFile() as output:
+        write(rows(n), COLUMNS, output)
+        return output.tell()
+
+
+def measure(fn, n, fmt, queue):
+    start = time.perf_counter()
+    size = fn(n, fmt)
+    elapsed = time.perf_counter() - start
+    queue.put((elapsed, size, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+
+def run(fn, n, fmt):
+    queue = multiprocessing.Queue()
+    proc = multiprocessing.Process(target=measure, args=(fn, n, fmt, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--formats', nargs='+', default=['csv', 'json', 'xlsx'])
+    args = parser.parse_args()
+
+    print(f"\n🔍 Exporting {args.rows} rows x {len(COLUMNS)} columns")
+    for fmt in args.formats:
+        old_time, old_size, old_rss = run(dataframe_export, args.rows, fmt)
+        new_time, new_size, new_rss = run(streaming, args.rows, fmt)
+        print(f"  {fmt:<5} DataFrame : {old_time:6.1f}s  peak {old_rss:7.0f}MB  {old_size / 2**20:6.1f}MB file")
+        print(f"  {fmt:<5} streaming : {new_time:6.1f}s  peak {new_rss:7.0f}MB  {new_size / 2**20:6.1f}MB file")
+
+
+if __name__ == '__main__':
+    main()
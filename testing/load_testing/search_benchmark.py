@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+List View Search Benchmark for YOUTILITY3
+Compares the DataTables search of the jobneed grid before and after
+apps/core/search.py over a generated jobneed table (5M rows by default):
+
+- before: OR of ILIKE over jobdesc, jobstatus and the joined site name,
+  followed by an exact count(*)
+- after:  ILIKE on the trigram indexed jobdesc, jobstatus by its matching
+  choices, the site name as a bt_id IN (subquery), and the planner estimate
+  for the count
+
+The tables are created in a scratch schema of the given database and
+dropped afterwards unless --keep is passed. Needs the pg_trgm extension.
+
+Usage:
+    python3 search_benchmark.py --dsn "dbname=youtility user=postgres" [--rows 5000000] [--term pump]
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+import psycopg2
+
+SCHEMA = 'search_benchmark'
+
+SETUP_SQL = f'''
+    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+    DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;
+    CREATE SCHEMA {SCHEMA};
+    CREATE TABLE {SCHEMA}.bt (id serial PRIMARY KEY, buname varchar(200));
+    INSERT INTO {SCHEMA}.bt (buname)
+        SELECT 'Site ' || (ARRAY['North', 'South', 'Gate', 'Tower', 'Plant'])[1 + i % 5] || ' ' || i
+        FROM generate_series(1, 2000) AS i;
+    CREATE TABLE {SCHEMA}.jobneed (
+        id bigserial PRIMARY KEY, jobdesc varchar(200), jobstatus varchar(60), bu_id int, mdtz timestamptz);
+    INSERT INTO {SCHEMA}.jobneed (jobdesc, jobstatus, bu_id, mdtz)
+        SELECT (ARRAY['Check pump room', 'Fire extinguisher round', 'Lift inspection', 'DG set reading',
+                      'Night patrol', 'Water tank cleaning', 'Meter reading'])[1 + i % 7] || ' #' || i,
+               (ARRAY['ASSIGNED', 'COMPLETED', 'AUTOCLOSED', 'PARTIALLYCOMPLETED'])[1 + i % 4],
+               1 + i % 2000, now() - (i || ' seconds')::interval
+        FROM generate_series(1, %(rows)s) AS i;
+    CREATE INDEX ON {SCHEMA}.jobneed (bu_id);
+    ANALYZE {SCHEMA}.bt;
+    ANALYZE {SCHEMA}.jobneed;
+'''
+
+INDEX_SQL = f'''
+    CREATE INDEX jobneed_jobdesc_trgm_idx ON {SCHEMA}.jobneed USING gin (jobdesc gin_trgm_ops);
+    CREATE INDEX bt_buname_trgm_idx ON {SCHEMA}.bt USING gin (buname gin_trgm_ops);
+    ANALYZE {SCHEMA}.jobneed;
+'''
+
+OLD_WHERE = f'''
+    FROM {SCHEMA}.jobneed j LEFT JOIN {SCHEMA}.bt b ON b.id = j.bu_id
+    WHERE j.jobdesc ILIKE %(like)s OR j.jobstatus ILIKE %(like)s OR b.buname ILIKE %(like)s
+'''
+
+NEW_WHERE = f'''
+    FROM {SCHEMA}.jobneed j
+    WHERE j.jobdesc ILIKE %(like)s OR j.jobstatus = ANY(%(statuses)s)
+       OR j.bu_id IN (SELECT id FROM {SCHEMA}.bt WHERE buname ILIKE %(like)s)
+'''
+
+STATUSES = ['ASSIGNED', 'COMPLETED', 'AUTOCLOSED', 'PARTIALLYCOMPLETED']
+
+
+def timed(cursor, sql, params, iterations):
+    times, result = [], None
+    for _ in range(iterations):
+        start = time.perf_counter()
+        cursor.execute(sql, params)
+        result = cursor.fetchall()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), result
+
+
+def estimate(cursor, sql, params):
+    cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+    plan = cursor.fetchone()[0]
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def run(cursor, label, where, params, iterations):
+    page_sql = f'SELECT j.id, j.jobdesc, j.jobstatus {where} ORDER BY j.mdtz DESC LIMIT 10'
+    count_sql = f'SELECT count(*) {where}'
+    page_ms, _ = timed(cursor, page_sql, params, iterations)
+    count_ms, rows = timed(cursor, count_sql, params, iterations)
+    start = time.perf_counter()
+    estimated = estimate(cursor, f'SELECT j.id {where}', params)
+    estimate_ms = (time.perf_counter() - start) * 1000
+    print(f"  {label:<22} page {page_ms:9.1f}ms   count {count_ms:9.1f}ms ({rows[0][0]} rows)"
+          f"   estimate {estimate_ms:6.1f}ms ({estimated} rows)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--dsn', required=True, help='libpq connection string of a scratch database')
+    parser.add_argument('--rows', type=int, default=5000000)
+    parser.add_argument('--term', default='pump')
+    parser.add_argument('--iterations', type=int, default=3)
+    parser.add_argument('--keep', action='store_true', help='keep the generated tables')
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(args.dsn)
+    conn.autocommit = True
+    cursor = conn.cursor()
+    print(f"\n🔍 Generating {args.rows} jobneed rows in schema {SCHEMA} ...")
+    start = time.perf_counter()
+    cursor.execute(SETUP_SQL, {'rows': args.rows})
+    print(f"  generated in {time.perf_counter() - start:.0f}s")
+
+    like = f"%{args.term}%"
+    statuses = [status for status in STATUSES if args.term.lower() in status.lower()]
+    try:
+        print(f"\n📊 Search '{args.term}'")
+        run(cursor, 'before (OR, no index)', OLD_WHERE, {'like': like}, args.iterations)
+        start = time.perf_counter()
+        cursor.execute(INDEX_SQL)
+        print(f"  trigram indexes built in {time.perf_counter() - start:.0f}s")
+        run(cursor, 'after (trigram)', NEW_WHERE, {'like': like, 'statuses': statuses}, args.iterations)
+    finally:
+        if not args.keep:
+            cursor.execute(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE')
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
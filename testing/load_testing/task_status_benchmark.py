@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Task Status Lookup Benchmark for YOUTILITY3
+Compares resolving the task ids of a MUTATION_STATUS request one AsyncResult
+at a time with the batched lookup in background_tasks/task_status.py.
+
+The result backend is an in-process key/value store which sleeps --rtt
+milliseconds per round trip, so the numbers reflect round trips rather
+than the speed of a particular redis instance.
+
+Usage:
+    python3 task_status_benchmark.py [--ids 50] [--requests 200] [--rtt 0.5]
+"""
+
+import argparse
+import importlib.util
+import os
+import random
+import sys
+import time
+import uuid
+
+from celery import Celery, states
+from celery.backends.base import KeyValueStoreBackend
+from celery.result import AsyncResult
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# loaded by path, importing the background_tasks package pulls in django
+spec = importlib.util.spec_from_file_location(
+    'task_status', os.path.join(project_root, 'background_tasks', 'task_status.py'))
+task_status = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(task_status)
+
+
+class SlowBackend(KeyValueStoreBackend):
+    """key/value result backend with a fixed round trip time"""
+
+    def __init__(self, app, rtt, **kwargs):
+        super().__init__(app, **kwargs)
+        self.rtt, self.data, self.round_trips = rtt, {}, 0
+
+    def get(self, key):
+        self.round_trips += 1
+        time.sleep(self.rtt)
+        return self.data.get(key)
+
+    def mget(self, keys):
+        self.round_trips += 1
+        time.sleep(self.rtt)
+        return [self.data.get(key) for key in keys]
+
+    def set(self, key, value):
+        self.data[key] = value
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+def make_backend(n_tasks, rtt):
+    random.seed(42)
+    backend = SlowBackend(Celery('benchmark'), rtt)
+    task_ids = [str(uuid.uuid4()) for _ in range(n_tasks)]
+    for task_id in task_ids:
+        state = random.choice([states.SUCCESS, states.SUCCESS, states.FAILURE, states.STARTED])
+        backend.store_result(task_id, None, state)
+    return backend, task_ids
+
+
+def per_id(backend, polls):
+    return [{t: AsyncResult(t, backend=backend).status for t in ids} for ids in polls]
+
+
+def batched(backend, polls):
+    task_status.clear_cache()
+    return [task_status.get_statuses(ids, backend) for ids in polls]
+
+
+def timeit(fn, backend, polls):
+    backend.round_trips = 0
+    start = time.perf_counter()
+    result = fn(backend, polls)
+    return time.perf_counter() - start, backend.round_trips, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--ids', type=int, default=50, help='task ids per status request')
+    parser.add_argument('--requests', type=int, default=200, help='status requests')
+    parser.add_argument('--rtt', type=float, default=0.5, help='backend round trip in ms')
+    args = parser.parse_args()
+
+    backend, task_ids = make_backend(args.ids * 4, args.rtt / 1000)
+    # devices keep polling a sliding window of their recent tasks
+    polls = [random.sample(task_ids, args.ids) for _ in range(args.requests)]
+    print(f"\n🔍 {args.requests} status requests of {args.ids} ids, {args.rtt}ms per round trip")
+
+    old_time, old_trips, old = timeit(per_id, backend, polls)
+    new_time, new_trips, new = timeit(batched, backend, polls)
+    assert old == new, "status mismatch between per-id and batched lookups"
+
+    print(f"  per-id AsyncResult    : {old_time * 1000:.1f}ms, {old_trips} round trips")
+    print(f"  batched + cache       : {new_time * 1000:.1f}ms, {new_trips} round trips")
+    print(f"  Speedup               : {old_time / new_time:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
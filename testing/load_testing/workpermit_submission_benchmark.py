@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Work Permit Submission Benchmark for YOUTILITY3
+Compares the time and the queries of saving the answers of a work permit:
+
+- before: the loop of WorkPermit.create_workpermit_details, a belonging
+  lookup, a child wom lookup or insert and a WomDetails insert per answer
+- after:  apps/work_order_management/workpermit_details.py, the belongings,
+  question sets and sections read once, one bulk_create
+
+The answers of every enabled section of the permit template are generated
+by answer type, as the form posts them. Each run saves them for a copy of an
+existing permit inside a transaction that is rolled back, and the rows of
+both paths are compared.
+
+Usage:
+    python3 workpermit_submission_benchmark.py --permit 1234 [--iterations 20]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'intelliwiz_config.settings')
+import django
+django.setup()
+
+from django.db import connection, transaction
+from django.http import QueryDict
+from django.test.utils import CaptureQueriesContext
+
+from apps.activity.models.question_model import QuestionSet, QuestionSetBelonging
+from apps.work_order_management import workpermit_details
+from apps.work_order_management.models import Wom, WomDetails
+from apps.work_order_management.views import WorkPermit
+
+COMPARED = ['question_id', 'qset_id', 'seqno', 'answertype', 'answer', 'isavpt', 'options',
+            'min', 'max', 'alerton', 'ismandatory', 'alerts', 'cuser_id', 'muser_id',
+            'wom__description', 'wom__seqno']
+
+
+class Rollback(Exception):
+    pass
+
+
+def answer(qsb):
+    if qsb.answertype == 'NUMERIC':
+        return [str(qsb.max or 10)]
+    if qsb.answertype in ['CHECKBOX', 'DROPDOWN', 'MULTISELECT'] and qsb.options:
+        options = qsb.options.split(',')
+        return options[:2] if qsb.answertype == 'MULTISELECT' else options[:1]
+    return ['NA']
+
+
+def permit_form(wp_qset_id):
+    formdata = QueryDict(mutable=True)
+    formdata['ctzoffset'] = '330'
+    sections = QuestionSet.objects.filter(parent_id=wp_qset_id, enable=True).order_by('seqno')
+    for qsb in QuestionSetBelonging.objects.filter(qset__in=sections).order_by('qset__seqno', 'seqno'):
+        formdata.setlist(f'{qsb.id}_{qsb.qset_id}', answer(qsb))
+    return formdata
+
+
+def before(wom, formdata, user):
+    view = WorkPermit()
+    for k, v in formdata.items():
+        if k not in ['ctzoffset', 'wom_id', 'action', 'csrfmiddlewaretoken'] and '_' in k:
+            qsb_id, qset_id = k.split('_')[:2]
+            qsb_obj = QuestionSetBelonging.objects.filter(id=qsb_id).first()
+            if qsb_obj.answertype in ['CHECKBOX', 'DROPDOWN']:
+                alerts = (qsb_obj.alerton and v in qsb_obj.alerton) or False
+            elif qsb_obj.answertype == 'MULTISELECT':
+                selected_values = formdata.getlist(k)
+                alerts = bool(qsb_obj.alerton) and any(value in qsb_obj.alerton for value in selected_values)
+                v = ','.join(selected_values)
+            elif qsb_obj.answertype in ['NUMERIC'] and len(qsb_obj.alerton) > 0:
+                alerton = qsb_obj.alerton.replace('>', '').replace('<', '').split(',')
+                if len(alerton) > 1:
+                    alerts = float(v) < float(alerton[0]) or float(v) > float(alerton[1])
+            else:
+                alerts = False
+            childwom = view.create_child_wom(wom, qset_id)
+            WomDetails.objects.create(
+                wom_id=childwom.id, question_id=qsb_obj.question_id, qset_id=qset_id, seqno=qsb_obj.seqno,
+                answertype=qsb_obj.answertype, answer=v, isavpt=qsb_obj.isavpt, options=qsb_obj.options,
+                min=qsb_obj.min, max=qsb_obj.max, alerton=qsb_obj.alerton, ismandatory=qsb_obj.ismandatory,
+                alerts=alerts, cuser_id=user, muser_id=user)
+
+
+def after(wom, formdata, user):
+    workpermit_details.save(wom, formdata, user)
+
+
+def timed(save, permit, formdata):
+    "(ms, queries, rows) of saving the answers for a copy of the permit"
+    result = {}
+    try:
+        with transaction.atomic():
+            wom = Wom.objects.get(id=permit)
+            wom.pk, wom.uuid, wom.other_data = None, uuid.uuid4(), dict(wom.other_data or {})
+            wom.save()
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                save(wom, formdata, wom.cuser_id)
+                result['ms'] = (time.perf_counter() - start) * 1000
+            result['queries'] = len(queries)
+            result['rows'] = list(WomDetails.objects.filter(wom__parent_id=wom.id).order_by(
+                'wom__seqno', 'seqno', 'question_id').values_list(*COMPARED))
+            raise Rollback
+    except Rollback:
+        pass
+    return result['ms'], result['queries'], result['rows']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--permit', type=int, required=True, help='id of an existing work permit wom')
+    parser.add_argument('--iterations', type=int, default=20)
+    args = parser.parse_args()
+
+    permit = Wom.objects.get(id=args.permit)
+    formdata = permit_form(permit.qset_id)
+    print(f"\n📝 permit {permit.id} ({permit.qset.qsetname}), {len(formdata) - 1} answers")
+    results = {}
+    for label, save in [('before', before), ('after', after)]:
+        runs = [timed(save, permit.id, formdata) for _ in range(args.iterations)]
+        times = [ms for ms, _, _ in runs]
+        results[label] = runs[-1][2]
+        print(f"  {label:<7} median {statistics.median(times):8.1f}ms   max {max(times):8.1f}ms   "
+              f"{runs[-1][1]} queries")
+    same = results['before'] == results['after']
+    print(f"  {len(results['after'])} rows, {'same rows' if same else '⚠️  different rows'}")
+
+
+if __name__ == '__main__':
+    main()